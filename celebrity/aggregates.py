@@ -0,0 +1,145 @@
+"""
+ستون‌های تجمیعی بازیگر/کارگردان: movie_count و average_rating (میانگین imdb_rating فیلم‌ها).
+
+این ستون‌ها ذخیره و ایندکس می‌شوند تا لیست‌ها بدون annotate(Count(...)) فیلتر و مرتب شوند. هر تغییر
+(لینک M2M، ذخیره یا حذف فیلم) فقط ردیف افرادِ درگیر را با یک SELECT و زیرکوئری همبسته دوباره حساب و
+ردیف‌های تغییر کرده را با bulk_update می‌نویسد؛ هزینه آن به تعداد فیلم‌های همان افراد بستگی دارد. داخل تراکنش، شناسه‌ها جمع و یک بار بعد از commit
+به‌روز می‌شوند (مثل movielenz.signals.schedule_refresh).
+
+تغییرهایی که سیگنال نمی‌فرستند (SQL خام، bulk_create روی جدول واسط) را دستور recompute_celebrity_aggregates
+اصلاح می‌کند.
+"""
+import threading
+from decimal import Decimal
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Avg, Count, DecimalField, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Actor, Director
+
+_pending = threading.local()
+
+UPDATE_BATCH_SIZE = 500
+
+
+def relation_name(model):
+    return {Actor: 'actors', Director: 'directors'}[model]
+
+
+def through_columns(model):
+    """(جدول واسط، ستون فیلم، ستون فرد) رابطه Movie.actors یا Movie.directors."""
+    from movielenz.models import Movie
+
+    field = Movie._meta.get_field(relation_name(model))
+    return field.remote_field.through, field.m2m_column_name(), field.m2m_reverse_name()
+
+
+def aggregate_expressions(model):
+    through, movie_column, person_column = through_columns(model)
+    links = through.objects.filter(**{person_column: OuterRef('pk')}).order_by().values(person_column)
+    movie = movie_column.removesuffix('_id')
+    return {
+        'movie_count': Coalesce(
+            Subquery(links.annotate(value=Count(movie)).values('value')),
+            Value(0), output_field=IntegerField(),
+        ),
+        'average_rating': Subquery(
+            links.annotate(value=Avg('%s__imdb_rating' % movie)).values('value'),
+            output_field=DecimalField(max_digits=3, decimal_places=1),
+        ),
+    }
+
+
+def recompute(model, person_ids=None, using=DEFAULT_DB_ALIAS):
+    """
+    ستون‌های تجمیعی افراد داده شده (یا همه، با None) را حساب می‌کند و شناسه افرادی را برمی‌گرداند که
+    مقدارشان واقعا تغییر کرده. زیرکوئری‌ها یک بار در همان SELECT اجرا می‌شوند و فقط ردیف‌های تغییر کرده با
+    bulk_update از همان مقادیر نوشته می‌شوند. ردیف‌ها تا پایان تراکنش قفل می‌شوند تا محاسبه هم‌زمان دیگری
+    مقدار کهنه‌تری روی نتیجه ننویسد.
+    """
+    queryset = model.objects.using(using)
+    if person_ids is not None:
+        person_ids = set(person_ids)
+        if not person_ids:
+            return set()
+        queryset = queryset.filter(pk__in=person_ids)
+    expressions = aggregate_expressions(model)
+    rating_field = model._meta.get_field('average_rating')
+    quantum = Decimal(1).scaleb(-rating_field.decimal_places)
+    updates = []
+    with transaction.atomic(using=using):
+        rows = (queryset.select_for_update(of=('self',)).order_by('pk')
+                .annotate(**{'new_%s' % name: value for name, value in expressions.items()})
+                .values_list('pk', 'movie_count', 'average_rating', 'new_movie_count', 'new_average_rating'))
+        for pk, count, rating, new_count, new_rating in rows:
+            # میانگین حساب شده (مثل 6.35) با همان دقت ستون ذخیره می‌شود و باید با همان دقت مقایسه شود.
+            if new_rating is not None:
+                new_rating = Decimal(new_rating).quantize(quantum, context=rating_field.context)
+            if (count, rating) != (new_count, new_rating):
+                updates.append(model(pk=pk, movie_count=new_count, average_rating=new_rating))
+        model.objects.using(using).bulk_update(
+            updates, ['movie_count', 'average_rating'], batch_size=UPDATE_BATCH_SIZE,
+        )
+    return {person.pk for person in updates}
+
+
+def movie_ids_for(model, person_ids, using=DEFAULT_DB_ALIAS):
+    through, movie_column, person_column = through_columns(model)
+    return set(through.objects.using(using).filter(**{'%s__in' % person_column: person_ids})
+               .values_list(movie_column, flat=True))
+
+
+def people_for(movie_ids, using=DEFAULT_DB_ALIAS):
+    """{Actor: شناسه‌ها, Director: شناسه‌ها} افراد فیلم‌های داده شده."""
+    people = {}
+    for model in (Actor, Director):
+        through, movie_column, person_column = through_columns(model)
+        people[model] = set(through.objects.using(using).filter(**{'%s__in' % movie_column: movie_ids})
+                            .values_list(person_column, flat=True))
+    return people
+
+
+def apply(model, person_ids, using=DEFAULT_DB_ALIAS):
+    """
+    ستون‌ها را دوباره حساب می‌کند و چون داده افراد در کارت فیلم‌ها و پاسخ‌های کش شده فیلم‌ها هم آمده، کارت
+    و برچسب‌های کش فیلم‌های افرادی که مقدارشان تغییر کرده را هم به‌روز/باطل می‌کند. شناسه همان افراد را
+    برمی‌گرداند.
+    """
+    from movielenz.response_cache import invalidate_tags
+    from movielenz.signals import schedule_refresh
+
+    changed = recompute(model, person_ids, using=using)
+    if not changed:
+        return changed
+    prefix = model._meta.model_name
+    movie_ids = movie_ids_for(model, changed, using=using)
+    invalidate_tags(
+        {'%s:list' % prefix, 'movie:list'}
+        | {'%s:%s' % (prefix, pk) for pk in changed} | {'movie:%s' % pk for pk in movie_ids},
+        using=using,
+    )
+    schedule_refresh(movie_ids, using=using)
+    return changed
+
+
+def _pending_ids():
+    if not hasattr(_pending, 'people'):
+        _pending.people = {}
+    return _pending.people
+
+
+def _flush(using):
+    for model, person_ids in _pending_ids().pop(using, {}).items():
+        apply(model, person_ids, using=using)
+
+
+def schedule(model, person_ids, using=DEFAULT_DB_ALIAS):
+    person_ids = [pk for pk in person_ids if pk is not None]
+    if not person_ids:
+        return
+    if not transaction.get_connection(using).in_atomic_block:
+        apply(model, person_ids, using=using)
+        return
+    _pending_ids().setdefault(using, {}).setdefault(model, set()).update(person_ids)
+    transaction.on_commit(lambda: _flush(using), using=using)
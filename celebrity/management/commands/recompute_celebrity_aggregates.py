@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from celebrity import aggregates
+from celebrity.models import Actor, Director
+
+
+class Command(BaseCommand):
+    help = (
+        "movie_count و average_rating همه بازیگران و کارگردان‌ها را دسته‌ای دوباره حساب می‌کند و کارت فیلم‌ها "
+        "و کش پاسخ را فقط برای ردیف‌هایی که تغییر کرده‌اند به‌روز می‌کند."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        batch_size = options['batch_size']
+
+        for model in (Actor, Director):
+            person_ids = list(model.objects.using(using).order_by('pk').values_list('pk', flat=True))
+            changed = 0
+            for start in range(0, len(person_ids), batch_size):
+                chunk = person_ids[start:start + batch_size]
+                with transaction.atomic(using=using):
+                    # apply فقط ردیف‌های اشتباه را اصلاح و کارت‌ها و کش آن‌ها را به‌روز می‌کند.
+                    drifted = aggregates.apply(model, chunk, using=using)
+                changed += len(drifted)
+            self.stdout.write(self.style.SUCCESS("%s: %d of %d rows repaired." % (
+                model.__name__, changed, len(person_ids),
+            )))
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('celebrity', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='actor',
+            index=models.Index(fields=['-popularity', '-id'], name='actor_popularity_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='director',
+            index=models.Index(fields=['-popularity', '-id'], name='director_popularity_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:37
+
+import re
+
+from django.db import migrations, models
+
+
+# نسخه ثابت common.normalization.normalize_text در زمان این migration؛ تغییرات بعدی آن ماژول نباید
+# نتیجه این migration را عوض کند.
+_CHARACTER_MAP = {
+    'ي': 'ی', 'ى': 'ی', 'ئ': 'ی',
+    'ك': 'ک',
+    'ۀ': 'ه', 'ة': 'ه',
+    'أ': 'ا', 'إ': 'ا', 'ٱ': 'ا',
+    'ؤ': 'و',
+}
+_CHARACTER_MAP.update({chr(0x06F0 + digit): str(digit) for digit in range(10)})
+_CHARACTER_MAP.update({chr(0x0660 + digit): str(digit) for digit in range(10)})
+_CHARACTER_MAP.update({char: None for char in '\u200c\u200d\u200e\u200f\ufeff\u0640'})
+_CHARACTER_MAP.update({chr(code): None for code in range(0x064B, 0x0653)})
+_CHARACTER_MAP[chr(0x0670)] = None
+_TRANSLATION_TABLE = str.maketrans(_CHARACTER_MAP)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(value):
+    if value is None:
+        return ''
+    value = str(value).translate(_TRANSLATION_TABLE)
+    return _WHITESPACE_RE.sub(' ', value).strip().casefold()
+
+
+def populate_normalized_names(apps, schema_editor):
+    for model_name, source_field in (('Actor', 'name'), ('Director', 'full_name')):
+        model = apps.get_model('celebrity', model_name)
+        people = list(model.objects.only('pk', source_field))
+        for person in people:
+            person.normalized_name = normalize_text(getattr(person, source_field))
+        model.objects.bulk_update(people, ['normalized_name'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('celebrity', '0002_actor_actor_popularity_keyset_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actor',
+            name='normalized_name',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='director',
+            name='normalized_name',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=500),
+        ),
+        migrations.RunPython(populate_normalized_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:59
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_aggregates(apps, schema_editor):
+    Movie = apps.get_model('movielenz', 'Movie')
+    for model_name, relation, column in (('Actor', 'actors', 'actor'), ('Director', 'directors', 'director')):
+        model = apps.get_model('celebrity', model_name)
+        through = Movie._meta.get_field(relation).remote_field.through
+        links = through.objects.filter(**{column: OuterRef('pk')}).order_by().values(column)
+        model.objects.using(schema_editor.connection.alias).update(
+            movie_count=Coalesce(Subquery(links.annotate(value=Count('movie')).values('value')), Value(0)),
+            average_rating=Subquery(links.annotate(value=Avg('movie__imdb_rating')).values('value')),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('celebrity', '0003_actor_normalized_name_director_normalized_name'),
+        ('movielenz', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actor',
+            name='average_rating',
+            field=models.DecimalField(blank=True, decimal_places=1, max_digits=3, null=True, verbose_name='میانگین امتیاز فیلم\u200cها'),
+        ),
+        migrations.AddField(
+            model_name='director',
+            name='average_rating',
+            field=models.DecimalField(blank=True, decimal_places=1, max_digits=3, null=True, verbose_name='میانگین امتیاز فیلم\u200cها'),
+        ),
+        migrations.AddIndex(
+            model_name='actor',
+            index=models.Index(fields=['-movie_count', '-id'], name='actor_count_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actor',
+            index=models.Index(fields=['-average_rating', '-id'], name='actor_rating_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='director',
+            index=models.Index(fields=['-movie_count', '-id'], name='director_count_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='director',
+            index=models.Index(fields=['-average_rating', '-id'], name='director_rating_keyset_idx'),
+        ),
+        migrations.RunPython(fill_aggregates, migrations.RunPython.noop),
+    ]
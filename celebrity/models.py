@@ -1,65 +1,69 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
+
+from common.normalization import normalize_text
 # Create your models here.
 
 class Actor(models.Model):
     name = models.CharField(_("نام بازیگر"), max_length=500, unique=True)
+    normalized_name = models.CharField(max_length=500, blank=True, db_index=True, editable=False)
     poster = models.URLField(_("تصویر بازیگر"), null=True, blank=True)
     tmdb_id = models.IntegerField(
         _("ایدی بازیگر"), unique=True, null=True, blank=True)
     popularity = models.DecimalField(
         _("معروفیت"), max_digits=5, decimal_places=2, null=True, blank=True)
+    # ستون‌های تجمیعی که celebrity.aggregates به‌روز نگه می‌دارد.
     movie_count = models.PositiveIntegerField(
         _("تعداد فیلم‌ها"), null=True, blank=True)
+    average_rating = models.DecimalField(
+        _("میانگین امتیاز فیلم‌ها"), max_digits=3, decimal_places=1, null=True, blank=True)
     
-    class Meta:
-        constraints = [
-            models.UniqueConstraint(
-                fields=['name'], 
-                name='unique_actor_name'
-            )
-        ]
-
     def get_role(self):
         return 'actor'
 
-    @property
-    def average_rating(self):
-        return self.imdb_rating
-
     class Meta:
         verbose_name = _("بازیگر")
         verbose_name_plural = _("بازیگران")
+        indexes = [
+            models.Index(fields=['-popularity', '-id'], name='actor_popularity_keyset_idx'),
+            models.Index(fields=['-movie_count', '-id'], name='actor_count_keyset_idx'),
+            models.Index(fields=['-average_rating', '-id'], name='actor_rating_keyset_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_text(self.name)
+        super().save(*args, **kwargs)
+
 
 class Director(models.Model):
     tmdb_id = models.IntegerField(_("شناسه TMDB کارگردان"), unique=True,null=True,blank=True)
     full_name = models.CharField(_("نام کارگردان"), max_length=500, unique=True)
+    normalized_name = models.CharField(max_length=500, blank=True, db_index=True, editable=False)
     poster = models.URLField(_('تصویر کارگردان'), blank=True, null=True)
     popularity = models.DecimalField(_("معروفیت"), max_digits=5, decimal_places=2, null=True, blank=True)
+    # ستون‌های تجمیعی که celebrity.aggregates به‌روز نگه می‌دارد.
     movie_count = models.PositiveIntegerField(_("تعداد فیلم‌ها"), null=True, blank=True)
+    average_rating = models.DecimalField(
+        _("میانگین امتیاز فیلم‌ها"), max_digits=3, decimal_places=1, null=True, blank=True)
     
-    class Meta:
-        constraints = [
-            models.UniqueConstraint(
-                fields=['full_name'], 
-                name='unique_director_name'
-            )
-        ]
-
     def get_role(self):
         return 'director'
 
-    @property
-    def average_rating(self):
-        return self.imdb_rating
-
     class Meta:
         verbose_name = _("کارگردان")
         verbose_name_plural = _("کارگردان‌ها")
+        indexes = [
+            models.Index(fields=['-popularity', '-id'], name='director_popularity_keyset_idx'),
+            models.Index(fields=['-movie_count', '-id'], name='director_count_keyset_idx'),
+            models.Index(fields=['-average_rating', '-id'], name='director_rating_keyset_idx'),
+        ]
 
     def __str__(self):
         return self.full_name
+
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_text(self.full_name)
+        super().save(*args, **kwargs)
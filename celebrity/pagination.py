@@ -0,0 +1,14 @@
+from movielenz.pagination import KeysetPagination, OptionalKeysetPagination
+
+
+class CelebrityKeysetPagination(KeysetPagination):
+    orderings = {
+        '-popularity': ['-popularity'],
+        '-movie_count': ['-movie_count'],
+        '-average_rating': ['-average_rating'],
+    }
+    default_ordering = '-popularity'
+
+
+class CelebrityPagination(OptionalKeysetPagination):
+    keyset_class = CelebrityKeysetPagination
@@ -15,7 +15,7 @@ class ActorSerializer(serializers.ModelSerializer):
             'average_rating', 
             'get_role',
         ]
-        read_only_fields = ['id', 'get_role', 'average_rating']
+        read_only_fields = ['id', 'get_role', 'movie_count', 'average_rating']
         
 
 class DirectorSerializer(serializers.ModelSerializer):
@@ -31,4 +31,4 @@ class DirectorSerializer(serializers.ModelSerializer):
             'average_rating',
             'get_role',
         ]
-        read_only_fields = ['id', 'get_role', 'average_rating']
\ No newline at end of file
+        read_only_fields = ['id', 'get_role', 'movie_count', 'average_rating']
\ No newline at end of file
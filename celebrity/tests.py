@@ -1,3 +1,34 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from movielenz.response_cache import reset_response_cache
+
+from .models import Actor, Director
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class NormalizedSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.actor = Actor.objects.create(name='علي كريمي')
+        Actor.objects.create(name='Sara Rossi')
+        cls.director = Director.objects.create(full_name='Christopher Nolan')
+
+    def setUp(self):
+        reset_response_cache()
+
+    def search(self, path, query):
+        response = self.client.get(path, {'search': query}, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        return [person['id'] for person in response.json()['results']]
+
+    def test_search_matches_inside_normalized_names(self):
+        # «ي/ك» عربی، بخشی از نام و بزرگی/کوچکی حروف.
+        for query in ('علی کریمی', 'کریمی', 'لی کر'):
+            with self.subTest(query=query):
+                self.assertEqual(self.search('/actors/', query), [self.actor.pk])
+        for query in ('nolan', 'NOLAN', 'topher'):
+            with self.subTest(query=query):
+                self.assertEqual(self.search('/directors/', query), [self.director.pk])
+        self.assertEqual(self.search('/actors/', 'nolan'), [])
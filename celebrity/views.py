@@ -2,27 +2,43 @@ from django_filters.rest_framework import DjangoFilterBackend
 
 from rest_framework import generics, filters
 
+from movielenz.db_routing import ReplicaReadMixin
+from movielenz.filters import NormalizedSearchFilter
+from movielenz.response_cache import CachedResponseMixin, cache_response
+from movielenz.fast_serializers import FastActorSerializer, FastDirectorSerializer, FastListMixin
+from movielenz.instrumentation import SerializePhaseMixin
+
 from .models import Actor, Director
+from .pagination import CelebrityPagination
 from .serializers import ActorSerializer, DirectorSerializer
 
 # --- Actore views ---
 
-class ActorListAPIView(generics.ListAPIView):
+class ActorListAPIView(ReplicaReadMixin, CachedResponseMixin, FastListMixin, generics.ListAPIView):
     """
     API endpoint to retrieve a list of actors.
     Supports filtering, searching, and ordering.
     """
     queryset = Actor.objects.all().order_by('-popularity')
     serializer_class = ActorSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = CelebrityPagination
+    filter_backends = [DjangoFilterBackend, NormalizedSearchFilter, filters.OrderingFilter]
     filterset_fields = {
         'popularity': ['exact', 'gte', 'lte', 'gt', 'lt'],
         'movie_count': ['exact', 'gte', 'lte', 'gt', 'lt'],
+        'average_rating': ['exact', 'gte', 'lte', 'gt', 'lt'],
     }
-    search_fields = ['name', 'tmdb_id'] 
-    ordering_fields = ['name', 'popularity', 'movie_count'] 
+    search_fields = ['normalized_name__contains', 'tmdb_id'] 
+    # movie_count و average_rating ستون‌های ذخیره و ایندکس شده هستند (celebrity.aggregates).
+    ordering_fields = ['name', 'popularity', 'movie_count', 'average_rating']
+    cache_tag_prefix = 'actor'
+    compiled_serializer_class = FastActorSerializer
+
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
-class ActorDetailAPIView(generics.RetrieveAPIView):
+class ActorDetailAPIView(ReplicaReadMixin, SerializePhaseMixin, generics.RetrieveAPIView):
     """
     API endpoint to retrieve details of a specific actor.
     """
@@ -32,22 +48,30 @@ class ActorDetailAPIView(generics.RetrieveAPIView):
 
 # --- Director Views ---
 
-class DirectorListAPIView(generics.ListAPIView):
+class DirectorListAPIView(ReplicaReadMixin, CachedResponseMixin, FastListMixin, generics.ListAPIView):
     """
     API endpoint to retrieve a list of directors.
     Supports filtering, searching, and ordering.
     """
     queryset = Director.objects.all().order_by('-popularity')
     serializer_class = DirectorSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = CelebrityPagination
+    filter_backends = [DjangoFilterBackend, NormalizedSearchFilter, filters.OrderingFilter]
     filterset_fields = {
         'popularity': ['exact', 'gte', 'lte', 'gt', 'lt'],
         'movie_count': ['exact', 'gte', 'lte', 'gt', 'lt'],
+        'average_rating': ['exact', 'gte', 'lte', 'gt', 'lt'],
     }
-    search_fields = ['full_name', 'tmdb_id']
-    ordering_fields = ['full_name', 'popularity', 'movie_count']
+    search_fields = ['normalized_name__contains', 'tmdb_id']
+    ordering_fields = ['full_name', 'popularity', 'movie_count', 'average_rating']
+    cache_tag_prefix = 'director'
+    compiled_serializer_class = FastDirectorSerializer
+
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
-class DirectorDetailAPIView(generics.RetrieveAPIView):
+class DirectorDetailAPIView(ReplicaReadMixin, SerializePhaseMixin, generics.RetrieveAPIView):
     """
     API endpoint to retrieve details of a specific director.
     """
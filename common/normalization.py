@@ -0,0 +1,40 @@
+"""
+یکسان‌سازی متن فارسی برای جستجو و مقایسه.
+
+یک کلمه ممکن است با «ي/ك» عربی یا «ی/ک» فارسی، با یا بدون نیم‌فاصله و با ارقام فارسی، عربی یا لاتین
+ذخیره شده باشد. normalize_text همه این حالت‌ها را به یک شکل واحد تبدیل می‌کند تا مقایسه‌ها به صورت
+برابری دقیق روی ستون‌های ایندکس‌دار (normalized_*) انجام شوند.
+"""
+import re
+
+_CHARACTER_MAP = {
+    # ی و ک عربی
+    'ي': 'ی', 'ى': 'ی', 'ئ': 'ی',
+    'ك': 'ک',
+    # ه و الف
+    'ۀ': 'ه', 'ة': 'ه',
+    'أ': 'ا', 'إ': 'ا', 'ٱ': 'ا',
+    'ؤ': 'و',
+}
+# ارقام فارسی و عربی به لاتین
+_CHARACTER_MAP.update({chr(0x06F0 + digit): str(digit) for digit in range(10)})
+_CHARACTER_MAP.update({chr(0x0660 + digit): str(digit) for digit in range(10)})
+# نیم‌فاصله، کشیده و سایر نویسه‌های نامرئی حذف می‌شوند
+_CHARACTER_MAP.update({char: None for char in '\u200c\u200d\u200e\u200f\ufeff\u0640'})
+# اعراب (فتحه، کسره، ضمه، تنوین، تشدید، سکون و الف مقصوره کوچک)
+_CHARACTER_MAP.update({chr(code): None for code in range(0x064B, 0x0653)})
+_CHARACTER_MAP[chr(0x0670)] = None
+
+_TRANSLATION_TABLE = str.maketrans(_CHARACTER_MAP)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(value):
+    """
+    متن را برای مقایسه یکسان‌سازی می‌کند:
+    ی/ک فارسی، ارقام لاتین، حذف نیم‌فاصله و اعراب، حروف کوچک و فاصله‌های یکتا.
+    """
+    if value is None:
+        return ''
+    value = str(value).translate(_TRANSLATION_TABLE)
+    return _WHITESPACE_RE.sub(' ', value).strip().casefold()
@@ -1,7 +1,8 @@
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 
-from .models import Episode, EpisodeQuality
+from . import packaging
+from .models import Episode, EpisodeQuality, HLSRendition
 # Register your models here.
 
 class EpisodeQualityInline(admin.TabularInline):
@@ -69,3 +70,21 @@ class EpisodeQualityAdmin(admin.ModelAdmin):
             return obj.file.name
         return _("فایل موجود نیست")
     file_info.short_description = _("فایل")
+
+
+@admin.register(HLSRendition)
+class HLSRenditionAdmin(admin.ModelAdmin):
+    list_display = ('episode_quality', 'status', 'duration', 'bandwidth', 'packaged_at')
+    list_filter = ('status', 'episode_quality__quality')
+    search_fields = ('episode_quality__episode__title', 'episode_quality__episode__movie__title')
+    readonly_fields = [field.name for field in HLSRendition._meta.fields]
+    actions = ['package_again']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description=_("بسته‌بندی دوباره"))
+    def package_again(self, request, queryset):
+        for rendition in queryset.select_related('episode_quality'):
+            packaging.enqueue(rendition.episode_quality)
+        self.message_user(request, _("در صف بسته‌بندی قرار گرفت."))
@@ -0,0 +1,197 @@
+"""
+تحویل فایل EpisodeQuality با پشتیبانی از Range (/episodes/<pk>/download/).
+
+- Range / If-Range: یک بازه bytes=a-b، a- یا -n پاسخ 206 با Content-Range می‌گیرد. چند بازه، Range
+  نامعتبر، یا If-Range ای که با ETag / Last-Modified فعلی فایل نمی‌خواند کل فایل را با 200 برمی‌گرداند و
+  بازه خارج از فایل 416 می‌گیرد. If-None-Match / If-Modified-Since پاسخ 304 می‌گیرند.
+- بدون کپی: فایل باز و تا ابتدای بازه seek می‌شود و FileResponse آن را برمی‌گرداند؛ سرور WSGI با
+  wsgi.file_wrapper (مثلا gunicorn) از همان موقعیت و به اندازه Content-Length با sendfile می‌فرستد، بدون
+  خواندن فایل در پایتون. در بقیه سرورها بایت‌ها فقط از همان بازه خوانده می‌شوند (نه از بایت صفر).
+- EPISODE_DELIVERY['OFFLOAD']: با 'x-accel-redirect' (nginx) یا 'x-sendfile' (Apache mod_xsendfile،
+  lighttpd) فقط هدر مسیر فایل فرستاده می‌شود و خود سرور جلویی فایل، Range و ETag را مدیریت می‌کند. برای
+  nginx:
+
+      location /protected-media/ {
+          internal;
+          alias /path/to/MEDIA_ROOT/;
+      }
+
+ETag قوی از زمان تغییر و اندازه فایل ساخته می‌شود (مثل nginx)، پس بازه‌های یک نسخه فایل با هم
+سازگارند. storage هایی که مسیر محلی ندارند (مثلا S3) به file.url هدایت می‌شوند.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+from rest_framework.negotiation import DefaultContentNegotiation
+
+DEFAULTS = {
+    # None (خود جنگو)، 'x-accel-redirect' یا 'x-sendfile'
+    'OFFLOAD': None,
+    'X_ACCEL_PREFIX': '/protected-media/',
+    'BLOCK_SIZE': 64 * 1024,
+}
+
+OFFLOAD_HEADERS = {
+    'x-accel-redirect': 'X-Accel-Redirect',
+    'x-sendfile': 'X-Sendfile',
+}
+
+RANGE_RE = re.compile(r'^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$', re.IGNORECASE)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'EPISODE_DELIVERY', {})}
+
+
+class MediaContentNegotiation(DefaultContentNegotiation):
+    """پخش‌کننده‌ها Accept: video/* یا audio/* می‌فرستند؛ پاسخ فایل است و به renderer نیاز ندارد."""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class RangeFile:
+    """
+    فایل باز شده که از موقعیت فعلی‌اش فقط length بایت خوانده می‌شود. fileno برای sendfile از همان
+    موقعیت در wsgi.file_wrapper است؛ seek/tell ندارد تا FileResponse طول را از کل فایل حساب نکند.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    (start, end) شامل، None برای «کل فایل» (Range نامعتبر یا چند بازه نادیده گرفته می‌شود) یا
+    ValueError برای بازه خارج از فایل (416).
+    """
+    match = RANGE_RE.match(header)
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # -n: n بایت آخر
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def file_etag(stat):
+    return '"%x-%x"' % (stat.st_mtime_ns, stat.st_size)
+
+
+def if_range_matches(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith(('"', 'W/')):
+        # مقایسه قوی: ETag ضعیف هیچ وقت نمی‌خواند.
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def offload_response(field_file, header):
+    content_type = mimetypes.guess_type(field_file.name)[0] or 'application/octet-stream'
+    response = HttpResponse(content_type=content_type)
+    if header == 'X-Accel-Redirect':
+        response[header] = get_config()['X_ACCEL_PREFIX'].rstrip('/') + '/' + quote(field_file.name.lstrip('/'))
+    else:
+        response[header] = field_file.path
+    return response
+
+
+def serve_file(request, field_file):
+    """پاسخ دانلود / پخش FieldFile با Range، ETag و offload طبق EPISODE_DELIVERY."""
+    if not field_file:
+        raise Http404
+    try:
+        path = field_file.path
+    except NotImplementedError:
+        return HttpResponseRedirect(field_file.url)
+
+    config = get_config()
+    offload = config['OFFLOAD']
+    if offload:
+        if offload not in OFFLOAD_HEADERS:
+            raise ValueError("EPISODE_DELIVERY['OFFLOAD'] must be one of %s." % ', '.join(OFFLOAD_HEADERS))
+        return offload_response(field_file, OFFLOAD_HEADERS[offload])
+
+    try:
+        file = open(path, 'rb')
+    except (FileNotFoundError, IsADirectoryError):
+        raise Http404
+    try:
+        stat = os.fstat(file.fileno())
+        size = stat.st_size
+        last_modified = int(stat.st_mtime)
+        etag = file_etag(stat)
+
+        # 304 برای If-None-Match / If-Modified-Since و 412 برای If-Match / If-Unmodified-Since
+        conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if conditional is not None:
+            file.close()
+            conditional['ETag'] = etag
+            conditional['Accept-Ranges'] = 'bytes'
+            return conditional
+
+        byte_range = None
+        range_header = request.META.get('HTTP_RANGE')
+        if range_header and if_range_matches(request, etag, last_modified):
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                file.close()
+                response = HttpResponse(status=416)
+                response['Content-Range'] = 'bytes */%d' % size
+                response['Accept-Ranges'] = 'bytes'
+                return response
+
+        start, end = byte_range or (0, size - 1)
+        length = end - start + 1 if size else 0
+        file.seek(start)
+        response = FileResponse(RangeFile(file, length), filename=os.path.basename(field_file.name),
+                                status=206 if byte_range else 200)
+    except BaseException:
+        file.close()
+        raise
+    response.block_size = config['BLOCK_SIZE']
+    response['Content-Length'] = str(length)
+    if byte_range:
+        response['Content-Range'] = 'bytes %d-%d/%d' % (start, end, size)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
@@ -0,0 +1,75 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from episode import packaging
+from episode.models import EpisodeQuality, HLSRendition
+
+
+class Command(BaseCommand):
+    help = (
+        "فایل‌های EpisodeQuality در صف را به HLS (قطعه‌ها، playlist واریانت و master) بسته‌بندی می‌کند؛ با "
+        "--input / --output یک فایل محلی را بدون پایگاه داده بسته‌بندی می‌کند."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--input', help="فایل محلی برای اجرای مستقل (همراه با --output).")
+        parser.add_argument('--output', help="پوشه خروجی اجرای مستقل.")
+        parser.add_argument('--segment-duration', type=int, help="طول قطعه‌ها (ثانیه)؛ پیش‌فرض SEGMENT_DURATION.")
+        parser.add_argument('--episode', type=int, action='append', dest='episodes', help="فقط این قسمت (تکرارپذیر).")
+        parser.add_argument('--quality', type=int, action='append', dest='qualities',
+                            help="فقط این EpisodeQuality (تکرارپذیر).")
+        parser.add_argument('--force', action='store_true',
+                            help="خروجی‌های آماده یا در حال processing را هم دوباره بسته‌بندی می‌کند.")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        if options['input'] or options['output']:
+            self.package_local(options)
+            return
+
+        using = options['database']
+        queryset = EpisodeQuality.objects.using(using).exclude(file='').order_by('pk')
+        if options['episodes']:
+            queryset = queryset.filter(episode_id__in=options['episodes'])
+        if options['qualities']:
+            queryset = queryset.filter(pk__in=options['qualities'])
+        if not options['force']:
+            # در صف، ناموفق، processing رها شده، یا فایل‌هایی که هنوز خروجی ندارند
+            queryset = queryset.exclude(hls__status=HLSRendition.READY).exclude(
+                hls__status=HLSRendition.PROCESSING, hls__updated_at__gte=packaging.processing_cutoff(),
+            )
+
+        counts = {HLSRendition.READY: 0, HLSRendition.FAILED: 0}
+        for episode_quality in queryset:
+            HLSRendition.objects.using(using).update_or_create(
+                episode_quality=episode_quality, defaults={'status': HLSRendition.PENDING, 'error': ''},
+            )
+            rendition = packaging.package_quality(episode_quality.pk, using=using,
+                                                  segment_duration=options['segment_duration'])
+            if rendition is None:
+                continue
+            counts[rendition.status] = counts.get(rendition.status, 0) + 1
+            if rendition.status == HLSRendition.FAILED:
+                self.stderr.write("%s: %s" % (episode_quality, rendition.error))
+        self.stdout.write(self.style.SUCCESS(
+            "Packaged %d episode qualities (%d failed)." % (counts[HLSRendition.READY], counts[HLSRendition.FAILED])
+        ))
+
+    def package_local(self, options):
+        source, output_dir = options['input'], options['output']
+        if not source or not output_dir:
+            raise CommandError("--input and --output must be used together.")
+        if not os.path.isfile(source):
+            raise CommandError("%s does not exist." % source)
+        os.makedirs(output_dir, exist_ok=True)
+        try:
+            variant = packaging.package_file(source, output_dir, options['segment_duration'])
+        except packaging.PackagingError as exc:
+            raise CommandError(str(exc))
+        packaging.write_local(variant, output_dir)
+        self.stdout.write(self.style.SUCCESS(
+            "Wrote %d segments (%.1f s, %d bit/s peak) and %s to %s." % (
+                len(variant.segments), variant.duration, variant.bandwidth, packaging.MASTER_NAME, output_dir)
+        ))
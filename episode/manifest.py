@@ -0,0 +1,200 @@
+"""
+manifest جریانی قسمت‌ها، صفحه‌بندی شده بر اساس فیلم (/episodes/manifest/).
+
+CombinedEpisodeQualityViewSet.list همه EpisodeQuality ها را در حافظه می‌خواند، با groupby گروه‌بندی و هر
+گروه را دوباره مرتب می‌کند. اینجا فیلم‌های یک صفحه با کوئری‌های صفحه‌بندی (count و صفحه) انتخاب می‌شوند و
+ردیف‌های کیفیت/قسمت همان فیلم‌ها با یک کوئری values() که پایگاه داده به ترتیب (فیلم، فصل، کیفیت، قسمت) مرتب
+کرده به صورت تکه‌ای (iterator) خوانده می‌شوند. ManifestWriter هر ردیف را همان لحظه به JSON تبدیل می‌کند و
+فقط گروه جاری را به خاطر دارد؛ پس حافظه به اندازه یک chunk می‌ماند و اولین بایت پاسخ قبل از خواندن ردیف‌ها
+فرستاده می‌شود.
+
+خروجی هر فیلم همان ساختار list است ({"season-1": [{"qualities": [...]}]} برای سریال‌ها و
+{"qualities": [...]} برای بقیه) در کلید manifest، همراه با id، title و slug فیلم.
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Case, F, IntegerField, When
+
+from rest_framework.compat import SHORT_SEPARATORS, LONG_SEPARATORS
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+from movielenz.fast_serializers import CompiledSerializer, register
+from movielenz.models import Movie, Series
+
+from .serializers import BasicEpisodeSerializer
+
+# تعداد ردیف‌هایی که هر بار از cursor پایگاه داده خوانده می‌شود
+CHUNK_SIZE = 2000
+EPISODE_PREFIX = 'episode__'
+
+
+def series_ctype_id(using='default'):
+    return ContentType.objects.db_manager(using).get_for_model(Series, for_concrete_model=False).pk
+
+
+def is_series(movie):
+    """نوع واقعی از polymorphic_ctype؛ نمونه‌های پایه Movie (مثلا از select_related) ارتقا داده نمی‌شوند."""
+    return movie.polymorphic_ctype_id == series_ctype_id(movie._state.db or 'default')
+
+
+@register
+class FastEpisodeSerializer(CompiledSerializer):
+    serializer_class = BasicEpisodeSerializer
+
+
+class ManifestPagination(PageNumberPagination):
+    """صفحه‌بندی manifest بر اساس فیلم (نه ردیف‌های کیفیت)."""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+def manifest_movies(episode_qualities):
+    """فیلم‌هایی که در episode_qualities (queryset فیلتر شده view) ردیف دارند، به ترتیب list."""
+    return (Movie.objects.using(episode_qualities.db).non_polymorphic()
+            .filter(pk__in=episode_qualities.order_by().values('episode__movie_id'))
+            .order_by('title', 'slug', 'pk')
+            .values('pk', 'title', 'slug', 'polymorphic_ctype_id'))
+
+
+def manifest_rows(episode_qualities, movie_ids):
+    """
+    ردیف‌های (کیفیت، قسمت) فیلم‌های داده شده به ترتیبی که ManifestWriter انتظار دارد؛ با
+    .iterator(CHUNK_SIZE) (یا aiterator در مسیر async) خوانده می‌شود.
+    """
+    compiled = FastEpisodeSerializer.for_fields()
+    # فصل فقط برای سریال‌ها کلید گروه است؛ قسمت‌های بدون فصل مثل list در انتها (season-0) می‌آیند.
+    season = Case(
+        When(episode__movie__polymorphic_ctype_id=series_ctype_id(episode_qualities.db),
+             then=F('episode__season')),
+        default=None, output_field=IntegerField(),
+    )
+    return (episode_qualities.filter(episode__movie_id__in=movie_ids)
+            .order_by('episode__movie__title', 'episode__movie__slug', 'episode__movie_id',
+                      season.asc(nulls_last=True), 'quality', 'episode_id')
+            .values('quality', 'episode__movie_id', 'episode__season',
+                    *[EPISODE_PREFIX + column for column in compiled.columns]))
+
+
+class ManifestWriter:
+    """
+    ردیف‌های مرتب manifest_rows را به تکه‌های JSON تبدیل می‌کند. movies ردیف‌های صفحه (manifest_movies)
+    و envelope بقیه کلیدهای پاسخ (count، next، previous) است. فیلمی که بین دو کوئری ردیف‌هایش حذف شده
+    باشد با manifest خالی نوشته می‌شود.
+    """
+
+    def __init__(self, movies, envelope, using='default'):
+        self.movies = list(movies)
+        self.envelope = envelope
+        self.series_ctype_id = series_ctype_id(using)
+        self.compiled = FastEpisodeSerializer.for_fields()
+        self.encoder = encoders.JSONEncoder(
+            ensure_ascii=not api_settings.UNICODE_JSON,
+            allow_nan=not api_settings.STRICT_JSON,
+            separators=SHORT_SEPARATORS if api_settings.COMPACT_JSON else LONG_SEPARATORS,
+        )
+        self.position = 0
+        self.movie = None
+        self.series = False
+        self.season = self.quality = self.episode_id = None
+        self.season_open = self.quality_open = False
+
+    def encode(self, value):
+        return self.encoder.encode(value)
+
+    def start(self):
+        return self.encode(self.envelope)[:-1] + ',"results":['
+
+    def write(self, rows):
+        yield self.start()
+        for row in rows:
+            chunk = self.row(row)
+            if chunk:
+                yield chunk
+        yield self.finish()
+
+    async def awrite(self, rows):
+        yield self.start()
+        async for row in rows:
+            chunk = self.row(row)
+            if chunk:
+                yield chunk
+        yield self.finish()
+
+    def row(self, row):
+        parts = []
+        if self.movie is None or row['episode__movie_id'] != self.movie['pk']:
+            parts.append(self.close_movie())
+            parts.append(self.open_movies(until=row['episode__movie_id']))
+            if self.movie is None:
+                # ردیف فیلمی خارج از صفحه (نباید رخ دهد)
+                return ''.join(parts)
+
+        if self.series:
+            season = row['episode__season']
+            if not self.season_open or season != self.season:
+                separator = ',' if self.season_open else ''
+                parts.append(self.close_season())
+                parts.append('%s%s:[{"qualities":[' % (
+                    separator, self.encode('season-%s' % (season if season is not None else 0)),
+                ))
+                self.season, self.season_open = season, True
+
+        if not self.quality_open or row['quality'] != self.quality:
+            parts.append(self.close_quality(separator=True))
+            parts.append('{%s:[{"episodes":[' % self.encode(row['quality']))
+            self.quality, self.quality_open, self.episode_id = row['quality'], True, None
+
+        episode_id = row[EPISODE_PREFIX + 'id']
+        # یک قسمت با دو فایل هم‌کیفیت یک بار نوشته می‌شود (مثل list).
+        if episode_id != self.episode_id:
+            episode = {column: row[EPISODE_PREFIX + column] for column in self.compiled.columns}
+            parts.append('%s%s' % (',' if self.episode_id is not None else '', self.encode(
+                {key: get(episode, None) for key, get in self.compiled.steps}
+            )))
+            self.episode_id = episode_id
+        return ''.join(parts)
+
+    def finish(self):
+        return self.close_movie() + self.open_movies(until=None) + self.close_movie() + ']}'
+
+    # --- باز و بسته کردن گروه‌ها ---
+
+    def open_movies(self, until):
+        """فیلم‌های صفحه را تا until (بدون ردیف‌ها، با manifest خالی) می‌نویسد و until را باز می‌کند."""
+        parts = []
+        while self.position < len(self.movies):
+            movie = self.movies[self.position]
+            self.position += 1
+            self.movie, self.series = movie, movie['polymorphic_ctype_id'] == self.series_ctype_id
+            self.season_open = self.quality_open = False
+            parts.append('%s%s,"manifest":{%s' % (
+                ',' if self.position > 1 else '',
+                self.encode({'id': movie['pk'], 'title': movie['title'], 'slug': movie['slug']})[:-1],
+                '' if self.series else '"qualities":[',
+            ))
+            if movie['pk'] == until:
+                return ''.join(parts)
+            parts.append(self.close_movie())
+        return ''.join(parts)
+
+    def close_quality(self, separator=False):
+        if not self.quality_open:
+            return ''
+        self.quality_open = False
+        return ']}]}' + (',' if separator else '')
+
+    def close_season(self):
+        if not self.season_open:
+            return ''
+        self.season_open = False
+        return self.close_quality() + ']}]'
+
+    def close_movie(self):
+        if self.movie is None:
+            return ''
+        movie, self.movie = self.movie, None
+        if self.series:
+            return self.close_season() + '}}'
+        return self.close_quality() + ']}}'
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('episode', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='episodequality',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='به\u200cروزرسانی شده'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('episode', '0002_episodequality_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HLSRendition',
+            fields=[
+                ('episode_quality', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='hls', serialize=False, to='episode.episodequality', verbose_name='کیفیت قسمت')),
+                ('status', models.CharField(choices=[('pending', 'در صف'), ('processing', 'در حال پردازش'), ('ready', 'آماده'), ('failed', 'ناموفق')], db_index=True, default='pending', max_length=20, verbose_name='وضعیت')),
+                ('source', models.CharField(blank=True, max_length=255, verbose_name='فایل منبع')),
+                ('playlist', models.FileField(blank=True, max_length=255, upload_to='', verbose_name='playlist')),
+                ('target_duration', models.PositiveIntegerField(default=0, verbose_name='حداکثر طول قطعه (ثانیه)')),
+                ('duration', models.FloatField(default=0, verbose_name='مدت (ثانیه)')),
+                ('bandwidth', models.PositiveIntegerField(default=0)),
+                ('average_bandwidth', models.PositiveIntegerField(default=0)),
+                ('codecs', models.CharField(blank=True, max_length=100)),
+                ('error', models.TextField(blank=True, verbose_name='خطا')),
+                ('packaged_at', models.DateTimeField(blank=True, null=True, verbose_name='بسته\u200cبندی شده')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='به\u200cروزرسانی شده')),
+            ],
+            options={
+                'verbose_name': 'خروجی HLS',
+                'verbose_name_plural': 'خروجی\u200cهای HLS',
+            },
+        ),
+        migrations.CreateModel(
+            name='HLSSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveIntegerField()),
+                ('duration', models.FloatField()),
+                ('size', models.PositiveBigIntegerField()),
+                ('file', models.FileField(max_length=255, upload_to='')),
+                ('rendition', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segments', to='episode.hlsrendition')),
+            ],
+            options={
+                'verbose_name': 'قطعه HLS',
+                'verbose_name_plural': 'قطعه\u200cهای HLS',
+                'ordering': ['rendition', 'sequence'],
+                'constraints': [models.UniqueConstraint(fields=('rendition', 'sequence'), name='unique_hls_segment_sequence')],
+            },
+        ),
+    ]
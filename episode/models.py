@@ -51,10 +51,74 @@ class EpisodeQuality(models.Model):
     )
     quality = models.CharField(_("کیفیت"), max_length=50, choices=QUALITY_CHOICES)
     file = models.FileField(_("فایل ویدیو"), upload_to='episodes/', max_length=255)
+    updated_at = models.DateTimeField(_("به‌روزرسانی شده"), auto_now=True)
 
     class Meta:
         verbose_name = _("کیفیت قسمت")
         verbose_name_plural = _("کیفیت‌های قسمت")
 
     def __str__(self):
-        return f"{self.episode.title} - {self.quality}"
\ No newline at end of file
+        return f"{self.episode.title} - {self.quality}"
+
+class HLSRendition(models.Model):
+    """
+    خروجی HLS یک EpisodeQuality (playlist واریانت و قطعه‌ها)؛ بعد از آپلود فایل در پس‌زمینه یا با دستور
+    package_episodes ساخته می‌شود (episode.packaging).
+    """
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    READY = 'ready'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, _("در صف")),
+        (PROCESSING, _("در حال پردازش")),
+        (READY, _("آماده")),
+        (FAILED, _("ناموفق")),
+    ]
+
+    episode_quality = models.OneToOneField(
+        EpisodeQuality,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='hls',
+        verbose_name=_("کیفیت قسمت")
+    )
+    status = models.CharField(_("وضعیت"), max_length=20, choices=STATUS_CHOICES, default=PENDING, db_index=True)
+    # نام فایلی که بسته‌بندی شده؛ اگر با EpisodeQuality.file فرق کند دوباره بسته‌بندی می‌شود.
+    source = models.CharField(_("فایل منبع"), max_length=255, blank=True)
+    playlist = models.FileField(_("playlist"), max_length=255, blank=True)
+    target_duration = models.PositiveIntegerField(_("حداکثر طول قطعه (ثانیه)"), default=0)
+    duration = models.FloatField(_("مدت (ثانیه)"), default=0)
+    # بیت در ثانیه: بیشینه قطعه‌ها و میانگین کل (BANDWIDTH و AVERAGE-BANDWIDTH در master playlist)
+    bandwidth = models.PositiveIntegerField(default=0)
+    average_bandwidth = models.PositiveIntegerField(default=0)
+    codecs = models.CharField(max_length=100, blank=True)
+    error = models.TextField(_("خطا"), blank=True)
+    packaged_at = models.DateTimeField(_("بسته‌بندی شده"), null=True, blank=True)
+    updated_at = models.DateTimeField(_("به‌روزرسانی شده"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("خروجی HLS")
+        verbose_name_plural = _("خروجی‌های HLS")
+
+    def __str__(self):
+        return f"{self.episode_quality} ({self.status})"
+
+
+class HLSSegment(models.Model):
+    rendition = models.ForeignKey(HLSRendition, related_name='segments', on_delete=models.CASCADE)
+    sequence = models.PositiveIntegerField()
+    duration = models.FloatField()
+    size = models.PositiveBigIntegerField()
+    file = models.FileField(max_length=255)
+
+    class Meta:
+        ordering = ['rendition', 'sequence']
+        constraints = [
+            models.UniqueConstraint(fields=['rendition', 'sequence'], name='unique_hls_segment_sequence'),
+        ]
+        verbose_name = _("قطعه HLS")
+        verbose_name_plural = _("قطعه‌های HLS")
+
+    def __str__(self):
+        return self.file.name
@@ -0,0 +1,507 @@
+"""
+بسته‌بندی HLS فایل‌های EpisodeQuality.
+
+بعد از آپلود (ذخیره EpisodeQuality با فایل جدید) یک HLSRendition در صف ساخته می‌شود و بعد از commit در
+یک thread پس‌زمینه (یا با دستور package_episodes) بسته‌بندی می‌شود:
+
+- فایل به قطعه‌های حدودا SEGMENT_DURATION ثانیه‌ای تقسیم و قطعه‌ها و playlist واریانت (index.m3u8) در
+  storage زیر OUTPUT_DIR/<شناسه قسمت>/<شناسه EpisodeQuality>/<نسخه>/ نوشته می‌شوند؛ مشخصات قطعه‌ها در HLSSegment ثبت
+  می‌شوند. هر بار بسته‌بندی در پوشه نسخه جدید نوشته می‌شود و فایل‌های نسخه قبلی بعد از جایگزینی پاک
+  می‌شوند، پس آدرس قطعه‌ها تغییرناپذیر است (قابل کش در CDN).
+- master playlist قسمت (OUTPUT_DIR/<episode>/master.m3u8) کیفیت‌های آماده 480p/720p/1080p/4k را با
+  BANDWIDTH / AVERAGE-BANDWIDTH / CODECS به هم پیوند می‌دهد؛ API آن را در
+  /episodes/hls/<episode_id>/master.m3u8 برمی‌گرداند.
+- خروجی‌ای که بیش از PROCESSING_TIMEOUT ثانیه در وضعیت processing مانده (پروسه وسط کار از بین رفته)
+  دوباره در صف حساب می‌شود و با ذخیره بعدی یا package_episodes دوباره بسته‌بندی می‌شود.
+
+MP3 (مثل فایل‌های فعلی episodes/) بدون ابزار خارجی، روی مرز فریم‌ها و به صورت Packed Audio (RFC 8216
+بخش 3.4: فریم‌ها با یک تگ ID3 حاوی timestamp در ابتدای هر قطعه) بسته‌بندی می‌شود. بقیه فرمت‌ها (ویدیو)
+با ffmpeg (-c copy -f hls، قطعه‌های MPEG-TS) بسته‌بندی می‌شوند؛ اگر ffmpeg نصب نباشد وضعیت failed می‌شود.
+
+اجرای مستقل روی یک فایل محلی بدون پایگاه داده:
+
+    python manage.py package_episodes --input episodes/remembering.mp3 --output /tmp/hls
+"""
+import contextlib
+import logging
+import math
+import mmap
+import os
+import posixpath
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import EpisodeQuality, HLSRendition, HLSSegment
+
+logger = logging.getLogger(__name__)
+
+_master_lock = threading.Lock()
+
+DEFAULTS = {
+    'SEGMENT_DURATION': 6,
+    'OUTPUT_DIR': 'hls',
+    # False: فقط در صف می‌ماند تا package_episodes (مثلا از cron یا worker) اجرا شود.
+    'PACKAGE_ON_UPLOAD': True,
+    'FFMPEG': 'ffmpeg',
+    # ثانیه؛ processing قدیمی‌تر از این رها شده حساب می‌شود و دوباره برداشته می‌شود.
+    'PROCESSING_TIMEOUT': 3600,
+}
+
+PLAYLIST_CONTENT_TYPE = 'application/vnd.apple.mpegurl'
+PLAYLIST_NAME = 'index.m3u8'
+MASTER_NAME = 'master.m3u8'
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'HLS_PACKAGING', {})}
+
+
+class PackagingError(Exception):
+    pass
+
+
+Segment = namedtuple('Segment', ['name', 'duration', 'size'])
+
+
+class Variant(namedtuple('Variant', ['segments', 'codecs'])):
+    """نتیجه بسته‌بندی یک فایل؛ segments نام فایل‌ها در پوشه خروجی به ترتیب است."""
+
+    @property
+    def duration(self):
+        return sum(segment.duration for segment in self.segments)
+
+    @property
+    def target_duration(self):
+        # EXTINF گرد شده هر قطعه نباید از EXT-X-TARGETDURATION بیشتر باشد.
+        return max([math.ceil(segment.duration) for segment in self.segments] or [1])
+
+    @property
+    def bandwidth(self):
+        return max([math.ceil(segment.size * 8 / segment.duration)
+                    for segment in self.segments if segment.duration] or [0])
+
+    @property
+    def average_bandwidth(self):
+        duration = self.duration
+        return math.ceil(sum(segment.size for segment in self.segments) * 8 / duration) if duration else 0
+
+
+# --- MP3 ---
+
+# kbit/s بر اساس (MPEG-1، layer)؛ MPEG-2 و 2.5 در layer II و III جدول یکسان دارند.
+BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# بر اساس بیت‌های نسخه: 0 = MPEG-2.5، 2 = MPEG-2، 3 = MPEG-1
+SAMPLE_RATES = {0: (11025, 12000, 8000), 2: (22050, 24000, 16000), 3: (44100, 48000, 32000)}
+# RFC 6381 / HLS authoring: MP3
+MP3_CODECS = 'mp4a.40.34'
+TIMESTAMP_OWNER = b'com.apple.streaming.transportStreamTimestamp\x00'
+
+Frame = namedtuple('Frame', ['length', 'samples', 'sample_rate', 'layer', 'side_info'])
+
+
+def parse_frame_header(header):
+    """Frame یا None اگر چهار بایت هدر فریم MPEG audio معتبر نباشند."""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 3
+    layer = 4 - ((header[1] >> 1) & 3)
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 3
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][rate_index]
+    padding = (header[2] >> 1) & 1
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if layer == 2 or mpeg1 else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+    mono = header[3] >> 6 == 3
+    side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    return Frame(length, samples, sample_rate, layer, side_info)
+
+
+def _syncsafe(value):
+    return bytes((value >> shift) & 0x7F for shift in (21, 14, 7, 0))
+
+
+def _id3_size(header):
+    """طول کل تگ ID3v2 ابتدای فایل (0 اگر وجود ندارد)."""
+    if len(header) < 10 or header[:3] != b'ID3':
+        return 0
+    size = 0
+    for byte in header[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    return size + 10 + (10 if header[5] & 0x10 else 0)
+
+
+def timestamp_tag(seconds):
+    """تگ ID3 ابتدای هر قطعه Packed Audio: PTS اولین نمونه با ساعت 90kHz (33 بیت)."""
+    payload = TIMESTAMP_OWNER + struct.pack('>Q', round(seconds * 90000) & (2 ** 33 - 1))
+    frame = b'PRIV' + _syncsafe(len(payload)) + b'\x00\x00' + payload
+    return b'ID3\x04\x00\x00' + _syncsafe(len(frame)) + frame
+
+
+def iter_frames(data):
+    """
+    (موقعیت، Frame) فریم‌های صوتی؛ تگ‌های ID3 / APE و بایت‌های خراب رد می‌شوند. بعد از گم شدن هماهنگی،
+    فریمی پذیرفته می‌شود که فریم بعدی‌اش هم معتبر باشد.
+    """
+    position, end = _id3_size(data[:10]), len(data)
+    locked = False
+    while position + 4 <= end:
+        frame = parse_frame_header(data[position:position + 4])
+        if frame is not None and position + frame.length <= end:
+            following = position + frame.length
+            if locked or following == end or parse_frame_header(data[following:following + 4]) is not None:
+                yield position, frame
+                position, locked = following, True
+                continue
+        locked = False
+        position = data.find(b'\xff', position + 1)
+        if position < 0:
+            break
+
+
+def is_info_frame(data, position, frame):
+    """فریم Xing / Info / VBRI ابتدای فایل‌های VBR صدا ندارد و فقط اندازه کل فایل را توصیف می‌کند."""
+    if frame.layer != 3:
+        return False
+    offset = position + 4 + frame.side_info
+    return data[offset:offset + 4] in (b'Xing', b'Info') or data[position + 36:position + 40] == b'VBRI'
+
+
+def package_mp3(source, output_dir, segment_duration):
+    segments = []
+    with open(source, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            raise PackagingError("%s is empty." % source)
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            elapsed = 0.0
+            output, start, duration = None, 0.0, 0.0
+            for index, (position, frame) in enumerate(iter_frames(data)):
+                if index == 0 and is_info_frame(data, position, frame):
+                    continue
+                if output is not None and duration >= segment_duration:
+                    segments.append(Segment(os.path.basename(output.name), duration, output.tell()))
+                    output.close()
+                    output = None
+                if output is None:
+                    name = 'segment-%05d.mp3' % len(segments)
+                    output = open(os.path.join(output_dir, name), 'wb')
+                    start, duration = elapsed, 0.0
+                    output.write(timestamp_tag(start))
+                output.write(data[position:position + frame.length])
+                seconds = frame.samples / frame.sample_rate
+                elapsed += seconds
+                duration += seconds
+            if output is not None:
+                segments.append(Segment(os.path.basename(output.name), duration, output.tell()))
+                output.close()
+        finally:
+            data.close()
+    if not segments:
+        raise PackagingError("No MPEG audio frames found in %s." % source)
+    return Variant(segments, MP3_CODECS)
+
+
+# --- ffmpeg ---
+
+def read_playlist(path):
+    """(نام، مدت) قطعه‌های یک media playlist."""
+    entries, duration = [], None
+    with open(path, encoding='utf-8') as playlist:
+        for line in playlist:
+            line = line.strip()
+            if line.startswith('#EXTINF:'):
+                duration = float(line[len('#EXTINF:'):].split(',', 1)[0])
+            elif line and not line.startswith('#') and duration is not None:
+                entries.append((line, duration))
+                duration = None
+    return entries
+
+
+def package_with_ffmpeg(source, output_dir, segment_duration):
+    ffmpeg = shutil.which(get_config()['FFMPEG'])
+    if ffmpeg is None:
+        raise PackagingError("ffmpeg was not found; only MP3 files can be packaged without it.")
+    playlist = os.path.join(output_dir, PLAYLIST_NAME)
+    try:
+        subprocess.run(
+            [ffmpeg, '-nostdin', '-v', 'error', '-i', source, '-map', '0:v?', '-map', '0:a?', '-c', 'copy',
+             '-f', 'hls', '-hls_time', str(segment_duration), '-hls_playlist_type', 'vod',
+             '-hls_segment_filename', os.path.join(output_dir, 'segment-%05d.ts'), playlist],
+            check=True, capture_output=True,
+        )
+    except subprocess.CalledProcessError as exc:
+        raise PackagingError("ffmpeg failed: %s" % exc.stderr.decode(errors='replace').strip()[-500:])
+    segments = [Segment(name, duration, os.path.getsize(os.path.join(output_dir, name)))
+                for name, duration in read_playlist(playlist)]
+    os.remove(playlist)
+    if not segments:
+        raise PackagingError("ffmpeg produced no segments for %s." % source)
+    # CODECS بدون ffprobe معلوم نیست و در master حذف می‌شود.
+    return Variant(segments, '')
+
+
+def package_file(source, output_dir, segment_duration=None):
+    """فایل محلی source را در output_dir قطعه‌بندی می‌کند (بدون نوشتن playlist)."""
+    segment_duration = segment_duration or get_config()['SEGMENT_DURATION']
+    if os.path.splitext(source)[1].lower() == '.mp3':
+        return package_mp3(source, output_dir, segment_duration)
+    return package_with_ffmpeg(source, output_dir, segment_duration)
+
+
+# --- playlist ها ---
+
+def variant_playlist(variant, uris):
+    lines = [
+        '#EXTM3U',
+        '#EXT-X-VERSION:3',
+        '#EXT-X-TARGETDURATION:%d' % variant.target_duration,
+        '#EXT-X-MEDIA-SEQUENCE:0',
+        '#EXT-X-PLAYLIST-TYPE:VOD',
+    ]
+    for segment, uri in zip(variant.segments, uris):
+        lines += ['#EXTINF:%.3f,' % segment.duration, uri]
+    lines.append('#EXT-X-ENDLIST')
+    return '\n'.join(lines) + '\n'
+
+
+def master_playlist(variants):
+    """variants: (uri، آبجکتی با bandwidth / average_bandwidth / codecs) به ترتیب نمایش."""
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+    for uri, variant in variants:
+        attributes = ['BANDWIDTH=%d' % variant.bandwidth]
+        if variant.average_bandwidth:
+            attributes.append('AVERAGE-BANDWIDTH=%d' % variant.average_bandwidth)
+        if variant.codecs:
+            attributes.append('CODECS="%s"' % variant.codecs)
+        lines += ['#EXT-X-STREAM-INF:' + ','.join(attributes), uri]
+    return '\n'.join(lines) + '\n'
+
+
+def write_local(variant, output_dir):
+    """playlist واریانت و یک master تک واریانتی را کنار قطعه‌ها می‌نویسد (اجرای مستقل)."""
+    with open(os.path.join(output_dir, PLAYLIST_NAME), 'w', encoding='utf-8') as playlist:
+        playlist.write(variant_playlist(variant, [segment.name for segment in variant.segments]))
+    with open(os.path.join(output_dir, MASTER_NAME), 'w', encoding='utf-8') as master:
+        master.write(master_playlist([(PLAYLIST_NAME, variant)]))
+
+
+# --- storage و پایگاه داده ---
+
+def episode_dir(episode_id):
+    return posixpath.join(get_config()['OUTPUT_DIR'], str(episode_id))
+
+
+def master_name(episode_id):
+    return posixpath.join(episode_dir(episode_id), MASTER_NAME)
+
+
+@contextlib.contextmanager
+def local_source(field_file):
+    """مسیر محلی فایل؛ برای storage های بدون مسیر (مثلا S3) در یک فایل موقت کپی می‌شود."""
+    try:
+        path = field_file.path
+    except NotImplementedError:
+        path = None
+    if path is not None:
+        yield path
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'source' + os.path.splitext(field_file.name)[1])
+        with field_file.open('rb') as source, open(path, 'wb') as target:
+            shutil.copyfileobj(source, target)
+        yield path
+
+
+def delete_files(names):
+    for name in names:
+        if name:
+            default_storage.delete(name)
+
+
+def delete_directory(directory):
+    """فایل‌های یک پوشه نسخه خروجی در storage."""
+    if not directory:
+        return
+    try:
+        _directories, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    delete_files(posixpath.join(directory, name) for name in files)
+
+
+def rendition_directory(rendition):
+    return posixpath.dirname(rendition.playlist.name) if rendition.playlist else ''
+
+
+def store_variant(variant, output_dir, directory):
+    """قطعه‌ها و playlist را در storage ذخیره می‌کند؛ (نام playlist، نام قطعه‌ها)."""
+    names = []
+    for segment in variant.segments:
+        with open(os.path.join(output_dir, segment.name), 'rb') as file:
+            names.append(default_storage.save(posixpath.join(directory, segment.name), File(file)))
+    playlist = variant_playlist(variant, [posixpath.basename(name) for name in names])
+    playlist_name = default_storage.save(posixpath.join(directory, PLAYLIST_NAME),
+                                         ContentFile(playlist.encode('utf-8')))
+    return playlist_name, names
+
+
+def master_renditions(episode_id, using=DEFAULT_DB_ALIAS):
+    """خروجی‌های آماده قسمت، یکی برای هر کیفیت، به ترتیب QUALITY_CHOICES."""
+    renditions = (HLSRendition.objects.using(using)
+                  .filter(episode_quality__episode_id=episode_id, status=HLSRendition.READY)
+                  .select_related('episode_quality').order_by('episode_quality_id'))
+    by_quality = {}
+    for rendition in renditions:
+        by_quality.setdefault(rendition.episode_quality.quality, rendition)
+    rank = {quality: index for index, (quality, _label) in enumerate(EpisodeQuality.QUALITY_CHOICES)}
+    return sorted(by_quality.values(), key=lambda rendition: rank.get(rendition.episode_quality.quality, len(rank)))
+
+
+def write_master(episode_id, using=DEFAULT_DB_ALIAS):
+    """master playlist ذخیره شده قسمت را از نو می‌نویسد (یا اگر کیفیت آماده‌ای نمانده پاک می‌کند)."""
+    name = master_name(episode_id)
+    directory = episode_dir(episode_id)
+    renditions = master_renditions(episode_id, using=using)
+    playlist = master_playlist([(posixpath.relpath(rendition.playlist.name, directory), rendition)
+                                for rendition in renditions])
+    # کیفیت‌هایی که هم‌زمان آماده می‌شوند؛ storage نام تکراری را تغییر می‌دهد.
+    with _master_lock:
+        default_storage.delete(name)
+        if renditions:
+            default_storage.save(name, ContentFile(playlist.encode('utf-8')))
+
+
+def processing_cutoff():
+    """processing ای که updated_at آن قبل از این زمان است رها شده حساب می‌شود."""
+    return timezone.now() - timedelta(seconds=get_config()['PROCESSING_TIMEOUT'])
+
+
+def stale_processing(prefix=''):
+    """Q خروجی‌هایی که بیش از PROCESSING_TIMEOUT در processing مانده‌اند؛ prefix مثلا 'hls__'."""
+    return Q(**{prefix + 'status': HLSRendition.PROCESSING, prefix + 'updated_at__lt': processing_cutoff()})
+
+
+def enqueue(episode_quality, using=DEFAULT_DB_ALIAS):
+    """در صف قرار می‌دهد و اگر PACKAGE_ON_UPLOAD فعال است بعد از commit در پس‌زمینه بسته‌بندی می‌کند."""
+    HLSRendition.objects.using(using).update_or_create(
+        episode_quality=episode_quality, defaults={'status': HLSRendition.PENDING, 'error': ''},
+    )
+    if get_config()['PACKAGE_ON_UPLOAD']:
+        pk = episode_quality.pk
+        transaction.on_commit(
+            lambda: threading.Thread(target=_package_in_background, args=(pk, using), daemon=True).start(),
+            using=using,
+        )
+
+
+def package_quality(pk, using=DEFAULT_DB_ALIAS, segment_duration=None):
+    """
+    خروجی در صف EpisodeQuality با شناسه pk را بسته‌بندی می‌کند؛ None اگر در صف نبود (یا پردازش دیگری آن
+    را برداشته است). خطاها در HLSRendition.error ثبت می‌شوند.
+    """
+    # update() فیلد auto_now را پر نمی‌کند؛ زمان برداشتن صریحا ثبت می‌شود و فقط همین پردازش می‌تواند نتیجه
+    # را بنویسد (اگر کار رها شده دوباره برداشته شود، پردازش قبلی دیگر چیزی نمی‌نویسد).
+    claimed_at = timezone.now()
+    if not HLSRendition.objects.using(using).filter(
+            Q(status=HLSRendition.PENDING) | stale_processing(), pk=pk,
+    ).update(status=HLSRendition.PROCESSING, error='', updated_at=claimed_at):
+        return None
+    rendition = HLSRendition.objects.using(using).select_related('episode_quality').get(pk=pk)
+    episode_quality = rendition.episode_quality
+    source = episode_quality.file.name
+    directory = posixpath.join(episode_dir(episode_quality.episode_id), str(pk), uuid.uuid4().hex[:8])
+    try:
+        if not source:
+            raise PackagingError("Episode quality %s has no file." % pk)
+        with local_source(episode_quality.file) as path, tempfile.TemporaryDirectory() as output_dir:
+            variant = package_file(path, output_dir, segment_duration)
+            playlist_name, names = store_variant(variant, output_dir, directory)
+    except Exception as exc:
+        delete_directory(directory)
+        logger.warning("HLS packaging of episode quality %s failed: %s", pk, exc)
+        HLSRendition.objects.using(using).filter(
+            pk=pk, status=HLSRendition.PROCESSING, updated_at=claimed_at,
+        ).update(
+            status=HLSRendition.FAILED, error=str(exc) or repr(exc), source=source, updated_at=timezone.now(),
+        )
+        rendition.refresh_from_db(using=using)
+        return rendition
+
+    with transaction.atomic(using=using):
+        # اگر وسط کار فایل دوباره آپلود شده باشد خروجی کهنه است و کار در صف می‌ماند.
+        replaced = HLSRendition.objects.using(using).filter(
+            pk=pk, status=HLSRendition.PROCESSING, updated_at=claimed_at, episode_quality__file=source,
+        ).update(
+            status=HLSRendition.READY, source=source, playlist=playlist_name, error='', updated_at=timezone.now(),
+            target_duration=variant.target_duration, duration=variant.duration, bandwidth=variant.bandwidth,
+            average_bandwidth=variant.average_bandwidth, codecs=variant.codecs, packaged_at=timezone.now(),
+        )
+        if replaced:
+            HLSSegment.objects.using(using).filter(rendition_id=pk).delete()
+            HLSSegment.objects.using(using).bulk_create([
+                HLSSegment(rendition_id=pk, sequence=sequence, duration=segment.duration, size=segment.size,
+                           file=name)
+                for sequence, (segment, name) in enumerate(zip(variant.segments, names))
+            ])
+    if replaced:
+        delete_directory(rendition_directory(rendition))
+        write_master(episode_quality.episode_id, using=using)
+    else:
+        delete_directory(directory)
+    rendition.refresh_from_db(using=using)
+    return rendition
+
+
+def _package_in_background(pk, using):
+    try:
+        package_quality(pk, using=using)
+    finally:
+        # اتصال‌های همین thread
+        connections.close_all()
+
+
+def schedule_packaging(episode_quality, using=DEFAULT_DB_ALIAS):
+    """
+    بعد از ذخیره EpisodeQuality: فایل جدید (یا خروجی ناموفق یا رها شده قبلی) در صف قرار می‌گیرد و بعد از commit در
+    پس‌زمینه بسته‌بندی می‌شود؛ اگر فقط کیفیت عوض شده master دوباره نوشته می‌شود.
+    """
+    if not episode_quality.file:
+        return
+    current = (HLSRendition.objects.using(using).filter(pk=episode_quality.pk)
+               .values_list('source', 'status', 'updated_at').first())
+    if current is not None and current[0] == episode_quality.file.name and current[1] != HLSRendition.FAILED \
+            and not (current[1] == HLSRendition.PROCESSING and current[2] < processing_cutoff()):
+        if current[1] == HLSRendition.READY:
+            episode_id = episode_quality.episode_id
+            transaction.on_commit(lambda: write_master(episode_id, using=using), using=using)
+        return
+    enqueue(episode_quality, using=using)
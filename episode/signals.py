@@ -0,0 +1,30 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import packaging
+from .models import EpisodeQuality, HLSRendition
+
+
+@receiver(post_save, sender=EpisodeQuality)
+def episode_quality_saved(sender, instance, using, raw=False, **kwargs):
+    if raw:
+        return
+    packaging.schedule_packaging(instance, using=using)
+
+
+@receiver(pre_delete, sender=EpisodeQuality)
+def episode_quality_deleting(sender, instance, using, **kwargs):
+    # خروجی HLS با حذف آبشاری پاک می‌شود؛ پوشه فایل‌هایش همین حالا گرفته می‌شود.
+    rendition = HLSRendition.objects.using(using).filter(pk=instance.pk).first()
+    instance._hls_directory = packaging.rendition_directory(rendition) if rendition else ''
+
+
+@receiver(post_delete, sender=EpisodeQuality)
+def episode_quality_deleted(sender, instance, using, **kwargs):
+    directory, episode_id = getattr(instance, '_hls_directory', ''), instance.episode_id
+
+    def cleanup():
+        packaging.delete_directory(directory)
+        packaging.write_master(episode_id, using=using)
+    transaction.on_commit(cleanup, using=using)
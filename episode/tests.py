@@ -1,3 +1,138 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils.http import http_date
+
+from movielenz.models import Movie, Series, Type
+from movielenz.response_cache import reset_response_cache
+
+from .delivery import if_range_matches, parse_range
+from .models import Episode, EpisodeQuality
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, HLS_PACKAGING={'PACKAGE_ON_UPLOAD': False})
+class ManifestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        movie_type = Type.objects.create(name='Movie', slug='movie')
+        cls.movie = Movie.objects.create(title='Arrival', type=movie_type)
+        cls.series = Series.objects.create(title='Dark')
+
+        feature = Episode.objects.create(movie=cls.movie, title='Arrival')
+        for quality in ('480p', '1080p'):
+            EpisodeQuality.objects.create(episode=feature, quality=quality, file='episodes/arrival-%s.mp4' % quality)
+
+        for season, title in ((2, 'Lost and Found'), (1, 'Secrets'), (1, 'Lies'), (None, 'Trailer')):
+            episode = Episode.objects.create(movie=cls.series, season=season, title=title)
+            EpisodeQuality.objects.create(episode=episode, quality='720p', file='episodes/%s.mp4' % episode.slug)
+        # دو فایل هم‌کیفیت برای یک قسمت
+        EpisodeQuality.objects.create(episode=Episode.objects.get(title='Secrets'), quality='720p',
+                                      file='episodes/secrets-copy.mp4')
+
+    def setUp(self):
+        cache.clear()
+        reset_response_cache()
+
+    def get_json(self, path, params=None):
+        response = self.client.get(path, params or {}, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            return json.loads(b''.join(response.streaming_content))
+        return response.json()
+
+    def test_manifest_matches_list(self):
+        grouped = self.get_json('/episodes/')
+        manifest = self.get_json('/episodes/manifest/')
+        self.assertEqual((manifest['count'], manifest['next'], manifest['previous']), (2, None, None))
+        self.assertEqual([(movie['id'], movie['title'], movie['slug']) for movie in manifest['results']],
+                         [(self.movie.pk, 'Arrival', self.movie.slug), (self.series.pk, 'Dark', self.series.slug)])
+        for movie in manifest['results']:
+            self.assertEqual(movie['manifest'], grouped[movie['title']])
+
+    def test_series_structure(self):
+        manifest = self.get_json('/episodes/manifest/', {'movie_slug': self.series.slug})
+        dark = manifest['results'][0]['manifest']
+        # فصل‌ها به ترتیب و قسمت‌های بدون فصل در انتها (season-0)
+        self.assertEqual(list(dark), ['season-1', 'season-2', 'season-0'])
+        qualities = dark['season-1'][0]['qualities']
+        self.assertEqual([list(quality) for quality in qualities], [['720p']])
+        # Secrets با دو فایل فقط یک بار آمده است.
+        self.assertEqual(sorted(episode['title'] for episode in qualities[0]['720p'][0]['episodes']),
+                         ['Lies', 'Secrets'])
+
+    def test_movie_structure_and_filters(self):
+        manifest = self.get_json('/episodes/manifest/', {'quality': '1080p'})
+        self.assertEqual(manifest['count'], 1)
+        arrival = manifest['results'][0]['manifest']
+        self.assertEqual(list(arrival), ['qualities'])
+        self.assertEqual([list(quality) for quality in arrival['qualities']], [['1080p']])
+        self.assertEqual([episode['title'] for episode in arrival['qualities'][0]['1080p'][0]['episodes']],
+                         ['Arrival'])
+
+    def test_pages_by_movie(self):
+        first = self.get_json('/episodes/manifest/', {'page_size': 1})
+        self.assertEqual(first['count'], 2)
+        self.assertEqual([movie['title'] for movie in first['results']], ['Arrival'])
+        self.assertIn('page=2', first['next'])
+        second = self.get_json('/episodes/manifest/', {'page_size': 1, 'page': 2})
+        self.assertEqual([movie['title'] for movie in second['results']], ['Dark'])
+        self.assertIsNone(second['next'])
+
+    def test_missing_movie(self):
+        response = self.client.get('/episodes/manifest/', {'movie_slug': 'missing'}, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 404)
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_closed_range(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_range(' bytes = 10 - 19 ', 1000), (10, 19))
+
+    def test_open_ended_range(self):
+        self.assertEqual(parse_range('bytes=500-', 1000), (500, 999))
+
+    def test_end_is_clamped_to_file_size(self):
+        self.assertEqual(parse_range('bytes=900-5000', 1000), (900, 999))
+
+    def test_suffix_range(self):
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-5000', 1000), (0, 999))
+
+    def test_ignored_ranges_return_whole_file(self):
+        for header in ('bytes=abc', 'items=0-1', 'bytes=-', 'bytes=0-1,5-6', 'bytes=10-5'):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range(header, 1000))
+
+    def test_unsatisfiable_ranges(self):
+        for header, size in (('bytes=1000-', 1000), ('bytes=2000-3000', 1000), ('bytes=-0', 1000),
+                             ('bytes=-10', 0)):
+            with self.subTest(header=header, size=size):
+                with self.assertRaises(ValueError):
+                    parse_range(header, size)
+
+
+class IfRangeMatchesTests(SimpleTestCase):
+    etag = '"5f1e-3e8"'
+    last_modified = 1700000000
+
+    def matches(self, **headers):
+        request = RequestFactory().get('/', **headers)
+        return if_range_matches(request, self.etag, self.last_modified)
+
+    def test_without_if_range(self):
+        self.assertTrue(self.matches())
+
+    def test_etag(self):
+        self.assertTrue(self.matches(HTTP_IF_RANGE=self.etag))
+        self.assertFalse(self.matches(HTTP_IF_RANGE='"other"'))
+
+    def test_weak_etag_never_matches(self):
+        self.assertFalse(self.matches(HTTP_IF_RANGE='W/' + self.etag))
+
+    def test_date(self):
+        self.assertTrue(self.matches(HTTP_IF_RANGE=http_date(self.last_modified)))
+        self.assertFalse(self.matches(HTTP_IF_RANGE=http_date(self.last_modified - 60)))
+        self.assertFalse(self.matches(HTTP_IF_RANGE='not a date'))
@@ -1,12 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CombinedEpisodeQualityViewSet # مسیر view خود را تنظیم کنید
+from .views import CombinedEpisodeQualityViewSet, EpisodeMasterPlaylistView # مسیر view خود را تنظیم کنید
 
 router = DefaultRouter()
 router.register(r'episodes', CombinedEpisodeQualityViewSet, basename='combined-episode-quality')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('episodes/hls/<int:episode_id>/master.m3u8', EpisodeMasterPlaylistView.as_view(), name='episode-hls-master'),
     path('episodes/<str:movie_slug>/', CombinedEpisodeQualityViewSet.as_view({'get': 'list'}), name='combined-episode-detail-by-slug'),
 ]
 
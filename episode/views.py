@@ -1,16 +1,25 @@
 # در فایل views.py
 
 from itertools import groupby
-from django.db.models import Prefetch, Q
+from django.db.models import Prefetch
+from django.db.models.query import EmptyQuerySet
+from django.http import HttpResponse, StreamingHttpResponse
 
-from rest_framework import viewsets, mixins, permissions ,status
+from rest_framework import generics, viewsets, mixins, permissions ,status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 
-from movielenz.models import Type, Movie
+from movielenz.conditional import ConditionalResponseMixin, conditional_response
+from movielenz.db_routing import ReplicaReadMixin
+from movielenz.instrumentation import serializer_data
+from movielenz.resolver import resolve_movie
 
-from .models import EpisodeQuality # مطمئن شوید Type enum وارد شده است
+from .delivery import MediaContentNegotiation, serve_file
+from .manifest import CHUNK_SIZE, ManifestPagination, ManifestWriter, is_series, manifest_movies, manifest_rows
+from .models import Episode, EpisodeQuality
+from .packaging import PLAYLIST_CONTENT_TYPE, master_playlist, master_renditions
 from .serializers import BasicEpisodeSerializer # سریالایزری که در مرحله ۱ به‌روزرسانی شد
 
 # class CombinedEpisodeQualityViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
@@ -117,7 +126,8 @@ from .serializers import BasicEpisodeSerializer # سریالایزری که در
 #         return Response(result_data)
 
 
-class CombinedEpisodeQualityViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+class CombinedEpisodeQualityViewSet(ReplicaReadMixin, ConditionalResponseMixin, mixins.ListModelMixin,
+                                    viewsets.GenericViewSet):
     serializer_class = BasicEpisodeSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -147,48 +157,18 @@ class CombinedEpisodeQualityViewSet(mixins.ListModelMixin, viewsets.GenericViewS
     
     ordering = ['episode__movie__title', 'episode__movie__slug', 'episode__season', 'quality']
 
-    def get_movie_instance(self, movie_identifier):
+    # manifest از کیفیت‌ها، قسمت‌ها و عنوان/نوع فیلم ساخته می‌شود.
+    validator_fields = ('updated_at', 'episode__updated_at', 'episode__movie__updated_at')
+
+    # فیلم‌های صفحه جاری manifest (یک بار در هر درخواست خوانده می‌شوند)
+    manifest_movies_page = None
+
+    def get_movie(self, movie_identifier):
         """
-        کمکی برای دریافت نمونه Movie بر اساس شناسه، اسلاگ یا عنوان.
-        این تابع نمونه Polymorphic صحیح را برمی‌گرداند.
+        شناسه، اسلاگ یا عنوان فیلم -> ResolvedMovie (pk و کلاس واقعی) یا None؛ از LRU مشترک
+        movielenz.resolver، پس get_queryset و list یک درخواست فقط یک بار (و درخواست‌های بعدی اصلا) کوئری نمی‌زنند.
         """
-        movie_queryset = Movie.objects.all() # ابتدا یک queryset پایه ایجاد می‌کنیم
-
-        try:
-            if isinstance(movie_identifier, int) or movie_identifier.isdigit():
-                # برای دریافت نمونه واقعی با PK، بهتر است ابتدا فیلتر کنید و سپس get_real_instances
-                # یا اگر مطمئن هستید که فقط یک نتیجه وجود دارد و می‌خواهید مستقیما نمونه واقعی را بگیرید:
-                # return movie_queryset.get_real_instances(pk=int(movie_identifier)).first() # اگر get_real_instances مستقیما pk بگیرد
-                # روش امن‌تر:
-                instance = movie_queryset.filter(pk=int(movie_identifier)).first()
-                if instance:
-                    return instance.get_real_instance() # دریافت نمونه واقعی از یک آبجکت پایه
-                return None
-            
-            # سپس با اسلاگ یا عنوان
-            # ابتدا فیلتر می‌کنیم، سپس select_subclasses را روی queryset حاصله اعمال می‌کنیم
-            filtered_queryset = movie_queryset.filter(
-                Q(slug=movie_identifier) | Q(title=movie_identifier)
-            )
-            # select_subclasses باید روی queryset اعمال شود تا زیرکلاس‌ها را هم در نظر بگیرد
-            movie = filtered_queryset.select_subclasses().first()
-            return movie
-        except Movie.DoesNotExist: # این استثنا معمولا با .first() رخ نمی‌دهد، اما برای اطمینان
-            return None
-        except ValueError: # اگر movie_identifier نتواند به int تبدیل شود و عددی هم نباشد
-            # این بخش ممکن است تکراری با بلوک Q بالا باشد، اما برای پوشش حالت‌های مختلف نگه داشته شده
-            filtered_queryset = movie_queryset.filter(
-                Q(slug=movie_identifier) | Q(title=movie_identifier)
-            )
-            movie = filtered_queryset.select_subclasses().first()
-            return movie
-        except Exception: # برای خطاهای پیش‌بینی نشده دیگر
-            # می‌توانید لاگ کنید یا مدیریت خطای بهتری انجام دهید
-            return None
-
-    # ... (بقیه متدهای کلاس get_queryset و list مانند قبل باقی می‌مانند)
-    # فقط مطمئن شوید که در get_queryset و list از get_movie_instance استفاده می‌کنید
-    # و سایر بخش‌های کد با این تغییرات سازگار هستند.
+        return resolve_movie(movie_identifier)
 
     def get_queryset(self):
         """
@@ -199,59 +179,44 @@ class CombinedEpisodeQualityViewSet(mixins.ListModelMixin, viewsets.GenericViewS
             'episode__movie' 
         ).all()
 
-        movie_identifier = self.kwargs.get('movie_slug')
-        
-        if not movie_identifier:
-            movie_identifier = self.request.query_params.get('movie_slug') or \
-                               self.request.query_params.get('movie_title') or \
-                               self.request.query_params.get('movie_id')
-
+        movie_identifier = self.get_movie_identifier()
         if movie_identifier:
-            movie_instance = self.get_movie_instance(movie_identifier)
+            movie = self.get_movie(movie_identifier)
+            if movie is None:
+                return EpisodeQuality.objects.none()
+            queryset = queryset.filter(episode__movie_id=movie.pk)
 
-            if movie_instance:
-                queryset = queryset.filter(episode__movie=movie_instance)
-            else:
-                return EpisodeQuality.objects.none() 
-        
         return queryset
 
-    # متد list بدون تغییر باقی می‌ماند، چون منطق دریافت movie_instance و queryset
-    # در متدهای get_movie_instance و get_queryset انجام شده است.
-    # فقط بخش مربوط به بررسی وجود فیلم برای خطای 404 در ابتدای متد list را مرور کنید
-    # تا مطمئن شوید با خروجی get_movie_instance (که می‌تواند None باشد) به درستی کار می‌کند.
-
-    def list(self, request, *args, **kwargs):
-        movie_identifier_from_url = kwargs.get('movie_slug')
-        movie_identifier_from_query = request.query_params.get('movie_slug') or \
-                                      request.query_params.get('movie_title') or \
-                                      request.query_params.get('movie_id')
-        
-        specific_movie_requested = bool(movie_identifier_from_url or movie_identifier_from_query)
-        target_movie_identifier = movie_identifier_from_url or movie_identifier_from_query
-
-        # اگر یک فیلم خاص درخواست شده، ابتدا بررسی می‌کنیم که آیا آن فیلم وجود دارد یا خیر
-        # این کار قبل از اجرای get_queryset اصلی انجام می‌شود تا اگر فیلم وجود نداشت، سریعا 404 برگردانیم.
-        if specific_movie_requested:
-            movie_instance_check = self.get_movie_instance(target_movie_identifier)
-            if not movie_instance_check:
-                return Response({"detail": "فیلم یا سریال مورد نظر یافت نشد."}, status=status.HTTP_404_NOT_FOUND)
-
-        # حالا queryset را بر اساس فیلم موجود (اگر مشخص شده) یا همه فیلم‌ها دریافت می‌کنیم
-        queryset = self.filter_queryset(self.get_queryset())
+    def get_movie_identifier(self):
+        """شناسه فیلم از URL یا یکی از پارامترهای movie_slug / movie_title / movie_id."""
+        return self.kwargs.get('movie_slug') or \
+            self.request.query_params.get('movie_slug') or \
+            self.request.query_params.get('movie_title') or \
+            self.request.query_params.get('movie_id')
 
-        # اگر یک فیلم خاص درخواست شده بود و پس از فیلترها، queryset برای قسمت‌ها خالی است
-        # (یعنی فیلم وجود دارد اما قسمتی ندارد)، لیست خالی برگردانده می‌شود که صحیح است.
-        # خطای 404 برای "فیلم یافت نشد" قبلا مدیریت شده است.
+    def missing_movie_response(self):
+        """
+        اگر یک فیلم خاص درخواست شده و وجود ندارد پاسخ 404؛ قبل از اجرای get_queryset اصلی بررسی می‌شود.
+        (اگر فیلم وجود دارد اما قسمتی ندارد، لیست خالی برگردانده می‌شود که صحیح است.)
+        """
+        movie_identifier = self.get_movie_identifier()
+        if movie_identifier and self.get_movie(movie_identifier) is None:
+            return Response({"detail": "فیلم یا سریال مورد نظر یافت نشد."}, status=status.HTTP_404_NOT_FOUND)
+        return None
 
+    def group_qualities(self, episode_qualities):
+        """
+        خروجی گروه‌بندی شده (فیلم -> فصل -> کیفیت -> قسمت‌ها) از EpisodeQuality های مرتب شده.
+        اگر یک فیلم خاص درخواست شده باشد، ورودی فقط شامل داده‌های همان فیلم است.
+        """
         result_data = {}
         # گروه‌بندی اولیه بر اساس فیلم
-        # اگر specific_movie_requested درست باشد، queryset فقط شامل داده‌های یک فیلم است.
-        for movie_instance, eq_for_movie_iter in groupby(queryset, key=lambda eq: eq.episode.movie):
+        for movie_instance, eq_for_movie_iter in groupby(episode_qualities, key=lambda eq: eq.episode.movie):
             movie_title_key = movie_instance.title 
             eq_for_movie_list = list(eq_for_movie_iter)
 
-            if movie_instance.type == Type.SERIES:
+            if is_series(movie_instance):
                 movie_payload = {}
                 eq_for_movie_list.sort(key=lambda eq: (eq.episode.season is None, eq.episode.season))
                 for season_number, eq_for_season_iter in groupby(eq_for_movie_list, key=lambda eq: eq.episode.season):
@@ -261,7 +226,7 @@ class CombinedEpisodeQualityViewSet(mixins.ListModelMixin, viewsets.GenericViewS
                     eq_for_season_list.sort(key=lambda eq: eq.quality)
                     for quality_value, eq_for_quality_iter in groupby(eq_for_season_list, key=lambda eq: eq.quality):
                         unique_episodes = {eq.episode.id: eq.episode for eq in eq_for_quality_iter}
-                        serialized_episodes = BasicEpisodeSerializer(list(unique_episodes.values()), many=True).data
+                        serialized_episodes = serializer_data(BasicEpisodeSerializer(list(unique_episodes.values()), many=True))
                         qualities_data_for_season.append({quality_value: [{"episodes": serialized_episodes}]})
                     movie_payload[season_key] = [{"qualities": qualities_data_for_season}]
                 result_data[movie_title_key] = movie_payload
@@ -270,17 +235,93 @@ class CombinedEpisodeQualityViewSet(mixins.ListModelMixin, viewsets.GenericViewS
                 eq_for_movie_list.sort(key=lambda eq: eq.quality)
                 for quality_value, eq_for_quality_iter in groupby(eq_for_movie_list, key=lambda eq: eq.quality):
                     unique_episodes = {eq.episode.id: eq.episode for eq in eq_for_quality_iter}
-                    serialized_episodes = BasicEpisodeSerializer(list(unique_episodes.values()), many=True).data
+                    serialized_episodes = serializer_data(BasicEpisodeSerializer(list(unique_episodes.values()), many=True))
                     qualities_data_for_movie.append({quality_value: [{"episodes": serialized_episodes}]})
                 result_data[movie_title_key] = {"qualities": qualities_data_for_movie}
-        
-        # اگر یک فیلم خاص درخواست شده بود و هیچ داده‌ای برای آن در result_data نیست
-        # (این حالت زمانی رخ می‌دهد که فیلم وجود دارد اما هیچ قسمت یا کیفیتی برای آن ثبت نشده)
-        if specific_movie_requested and not result_data:
-            # movie_instance_check از بررسی اولیه در ابتدای متد list در دسترس است
-            # اگر به اینجا رسیده‌ایم، یعنی فیلم وجود دارد (movie_instance_check معتبر است)
-            # اما هیچ قسمت یا کیفیتی برای آن در queryset نهایی نبوده.
-            # در این حالت، result_data خالی برگردانده می‌شود که رفتار درستی است.
-            pass
-
-        return Response(result_data)
\ No newline at end of file
+        return result_data
+
+    @conditional_response
+    def list(self, request, *args, **kwargs):
+        missing = self.missing_movie_response()
+        if missing is not None:
+            return missing
+
+        # حالا queryset را بر اساس فیلم موجود (اگر مشخص شده) یا همه فیلم‌ها دریافت می‌کنیم
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(self.group_qualities(queryset))
+
+    def paginate_manifest_movies(self, episode_qualities):
+        if self.manifest_movies_page is None:
+            self.manifest_movies_page = self.paginate_queryset(manifest_movies(episode_qualities))
+        return self.manifest_movies_page
+
+    def get_validator_queryset(self, request, *args, **kwargs):
+        queryset = super().get_validator_queryset(request, *args, **kwargs)
+        if self.action != 'manifest' or isinstance(queryset, EmptyQuerySet):
+            return queryset
+        # COUNT/MAX فقط روی ردیف‌های فیلم‌های همین صفحه، نه کل join فیلتر شده.
+        movies = self.paginate_manifest_movies(queryset.using(queryset.db))
+        return queryset.filter(episode__movie_id__in=[movie['pk'] for movie in movies])
+
+    def get_validator_extra(self, request):
+        extra = super().get_validator_extra(request)
+        if self.action == 'manifest' and self.manifest_movies_page is not None:
+            # count و لینک‌های next/previous پاکت به تعداد کل فیلم‌ها بستگی دارند.
+            extra.append(self.paginator.page.paginator.count)
+        return extra
+
+    def manifest_page(self):
+        """
+        (writer، queryset ردیف‌ها) برای manifest: فیلم‌های صفحه و کلیدهای صفحه‌بندی همین‌جا خوانده می‌شوند
+        و ردیف‌ها هنگام فرستادن پاسخ.
+        """
+        episode_qualities = self.filter_queryset(self.get_queryset())
+        # ردیف‌ها بعد از پایان dispatch خوانده می‌شوند؛ پایگاه داده (replica) همین حالا ثابت می‌شود.
+        episode_qualities = episode_qualities.using(episode_qualities.db)
+        movies = self.paginate_manifest_movies(episode_qualities)
+        envelope = {
+            'count': self.paginator.page.paginator.count,
+            'next': self.paginator.get_next_link(),
+            'previous': self.paginator.get_previous_link(),
+        }
+        writer = ManifestWriter(movies, envelope, using=episode_qualities.db)
+        return writer, manifest_rows(episode_qualities, [movie['pk'] for movie in movies])
+
+    @action(detail=False, methods=['get'], pagination_class=ManifestPagination)
+    @conditional_response
+    def manifest(self, request, *args, **kwargs):
+        """
+        همان خروجی list، صفحه‌بندی شده بر اساس فیلم و به صورت جریانی (episode.manifest)؛ با همان فیلترهای
+        list و ?page= / ?page_size= (تعداد فیلم در هر صفحه).
+        """
+        missing = self.missing_movie_response()
+        if missing is not None:
+            return missing
+        writer, rows = self.manifest_page()
+        return StreamingHttpResponse(writer.write(rows.iterator(chunk_size=CHUNK_SIZE)),
+                                     content_type='application/json')
+
+    @action(detail=True, methods=['get'], content_negotiation_class=MediaContentNegotiation)
+    def download(self, request, *args, **kwargs):
+        """فایل یک کیفیت با پشتیبانی Range / If-Range برای جلو و عقب بردن پخش (episode.delivery)."""
+        return serve_file(request, self.get_object().file)
+
+
+class EpisodeMasterPlaylistView(ReplicaReadMixin, generics.GenericAPIView):
+    """
+    master playlist HLS یک قسمت با کیفیت‌های بسته‌بندی شده آن (episode.packaging)؛ playlist واریانت‌ها و
+    قطعه‌ها از storage (MEDIA_URL) خوانده می‌شوند.
+    """
+    queryset = Episode.objects.all()
+    lookup_url_kwarg = 'episode_id'
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    content_negotiation_class = MediaContentNegotiation
+
+    def get(self, request, *args, **kwargs):
+        episode = self.get_object()
+        renditions = master_renditions(episode.pk, using=episode._state.db)
+        if not renditions:
+            return Response({"detail": "نسخه HLS این قسمت هنوز آماده نیست."}, status=status.HTTP_404_NOT_FOUND)
+        playlist = master_playlist([(request.build_absolute_uri(rendition.playlist.url), rendition)
+                                    for rendition in renditions])
+        return HttpResponse(playlist, content_type=PLAYLIST_CONTENT_TYPE)
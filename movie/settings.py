@@ -84,6 +84,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # must stay first: it times every middleware below it
+    'movielenz.instrumentation.InstrumentationMiddleware',
+    'movielenz.db_routing.DatabaseRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     # 'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -125,6 +128,72 @@ DATABASES = {
     }
 }
 
+# Read replicas (movielenz.db_routing). Catalog views read from one of DATABASE_REPLICAS; writes and
+# user_account views stay on 'default'. Any alias added to DATABASES and listed here is used, e.g. a
+# local PostgreSQL standby. For local testing DJANGO_SQLITE_REPLICA names a file copy of db.sqlite3
+# that `manage.py sync_replica` refreshes.
+DATABASE_REPLICAS = []
+if os.environ.get('DJANGO_SQLITE_REPLICA'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / os.environ['DJANGO_SQLITE_REPLICA'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append('replica')
+
+DATABASE_ROUTERS = ['movielenz.db_routing.PrimaryReplicaRouter']
+
+# After a write the client (cookie) and user (cache key) read from 'default' for PIN_SECONDS
+DATABASE_ROUTING = {
+    'PIN_SECONDS': 5,
+    'PIN_COOKIE': 'db_pin',
+}
+
+# Shared by every worker process: response cache and DB pins in 'default'; the version keys of the
+# in-process indexes (type tree, movie resolver, autocomplete) and of the response cache tags in
+# 'versions' (movielenz.versioning), which must never evict them. DJANGO_REDIS_URL (needs redis-py)
+# for several hosts -- run that Redis with a noeviction/volatile-* maxmemory-policy, version keys
+# have no expiry; otherwise file-based caches in DJANGO_CACHE_DIR shared by the processes of one
+# host, 'versions' in its own directory with culling disabled.
+# TIMEOUT None keeps version keys (cache.incr re-sets them with the default timeout); every other
+# cache.set passes its own timeout.
+CACHE_DIR = Path(os.environ.get('DJANGO_CACHE_DIR', BASE_DIR / '.cache'))
+
+if os.environ.get('DJANGO_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['DJANGO_REDIS_URL'],
+            'TIMEOUT': None,
+        },
+        'versions': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['DJANGO_REDIS_URL'],
+            'TIMEOUT': None,
+            'KEY_PREFIX': 'versions',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+            'TIMEOUT': None,
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        },
+        'versions': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR / 'versions',
+            'TIMEOUT': None,
+            # Never reached, so culling never drops a version key.
+            'OPTIONS': {'MAX_ENTRIES': 10 ** 9},
+        },
+    }
+
+VERSION_CACHE = {
+    'ALIAS': 'versions',
+}
+
 # DATABASES = {
 #     'default': dj_database_url.config(
 #         default=os.environ.get('DATABASE_URL')
@@ -251,4 +320,99 @@ JAZZMIN_SETTINGS = {
     "show_header": True,
     "navigation_expanded": False,
     "custom_css": "css/custom.css",  # آدرس CSS سفارشی
-}
\ No newline at end of file
+}
+
+# In-process Type tree snapshot (movielenz.type_tree); reloaded on version bumps in the shared CACHES
+# and at the latest after TTL seconds
+TYPE_TREE = {
+    'TTL': 300,
+}
+
+# Precomputed list cards (movielenz.cards)
+MOVIE_CARDS_ENABLED = True
+
+# Tag-invalidated response cache for catalog endpoints (movielenz.response_cache)
+# BACKEND: 'shared' (CACHES[ALIAS], tag versions seen by every process) or 'lru' (in-process,
+# invalidation only reaches the current process: single-process deployments only)
+RESPONSE_CACHE = {
+    'ENABLED': True,
+    'BACKEND': 'shared',
+    'MAX_ENTRIES': 2000,
+    'TIMEOUT': 300,
+    'ALIAS': 'default',
+}
+
+# Compiled read-only serializers for list endpoints (movielenz.fast_serializers)
+FAST_SERIALIZERS_ENABLED = True
+
+# "Similar titles" index (movielenz.similarity, built by build_similarity_index)
+SIMILAR_TITLES = {
+    'TOP_K': 20,
+    'MAX_DF': 1000,
+}
+
+# Personalised home feed (user_account.feed, built by build_user_feeds)
+USER_FEED = {
+    'SIZE': 100,
+    'POOL_SIZE': 2000,
+    'POOL_TTL': 600,
+}
+
+# Trending by recent watch activity (movielenz.trending)
+TRENDING = {
+    'DEFAULT_WINDOW': '24h',
+    'SIZE': 100,
+    'REFRESH': 60,
+}
+
+# In-process typeahead prefix index (movielenz.autocomplete); built in the background on each process's first
+# request, patched from the change log in CACHES when its version key is bumped, and fully rebuilt at least
+# every REBUILD_INTERVAL seconds for writes that send no signals
+AUTOCOMPLETE = {
+    'LIMIT': 10,
+    'MAX_LIMIT': 20,
+    'REBUILD_INTERVAL': 600,
+}
+
+# Episode file delivery with Range support (episode.delivery)
+EPISODE_DELIVERY = {
+    # None (served by Django via FileResponse), 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache/lighttpd)
+    'OFFLOAD': None,
+    # internal nginx location aliased to MEDIA_ROOT, used with 'x-accel-redirect'
+    'X_ACCEL_PREFIX': '/protected-media/',
+    'BLOCK_SIZE': 64 * 1024,
+}
+
+# HLS packaging of uploaded episode files (episode.packaging, package_episodes)
+HLS_PACKAGING = {
+    'SEGMENT_DURATION': 6,
+    # storage directory for playlists and segments: <OUTPUT_DIR>/<episode id>/<EpisodeQuality pk>/<version>/
+    'OUTPUT_DIR': 'hls',
+    # package in a background thread after upload; False leaves it queued for package_episodes
+    'PACKAGE_ON_UPLOAD': True,
+    # used for non-MP3 sources
+    'FFMPEG': 'ffmpeg',
+    # seconds after which a rendition stuck in processing is picked up again
+    'PROCESSING_TIMEOUT': 3600,
+}
+
+# In-process LRU for movie id/slug/title lookups (movielenz.resolver), invalidated through the shared CACHES
+MOVIE_RESOLVER = {
+    'MAX_ENTRIES': 10000,
+}
+
+# Async catalog read views under /async/ (movielenz.async_views, movielenz.async_db)
+ASYNC_VIEWS = {
+    # run independent queries of a request on separate connections (one extra connection per branch)
+    'CONCURRENT_QUERIES': True,
+}
+
+# Per-request query count / SQL time, Server-Timing header and /metrics/ (movielenz.instrumentation)
+INSTRUMENTATION = {
+    'ENABLED': True,
+    # 'all', 'staff' or 'off'
+    'SERVER_TIMING': 'staff',
+    'QUERY_WARNING': 50,
+    # without a token /metrics/ is only served with DEBUG (404 otherwise)
+    'METRICS_TOKEN': os.environ.get('METRICS_TOKEN') or None,
+}
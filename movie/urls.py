@@ -19,6 +19,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from movielenz.instrumentation import metrics_view
+
 from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularSwaggerView,
@@ -26,6 +28,7 @@ from drf_spectacular.views import (
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics/', metrics_view, name='metrics'),
     
     path('api/schema/', SpectacularAPIView.as_view(), name='api_schema'),
     path('api/', SpectacularSwaggerView.as_view(url_name='api_schema')),
@@ -34,6 +37,9 @@ urlpatterns = [
     path("", include("episode.urls")),
     path("", include("movielenz.urls", namespace='cinema-api')),
     path("", include("user_account.urls")),
+
+    # نسخه async endpoint های خواندنی کاتالوگ برای اجرا زیر ASGI
+    path("async/", include("movielenz.async_urls", namespace='async')),
     
 ]
 if settings.DEBUG:
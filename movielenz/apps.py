@@ -4,4 +4,7 @@ from django.utils.translation import gettext_lazy as _
 class MovielenzConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'movielenz'
-    verbose_name = _("فیلم و سریال")
\ No newline at end of file
+    verbose_name = _("فیلم و سریال")
+
+    def ready(self):
+        from . import instrumentation, signals  # noqa: F401
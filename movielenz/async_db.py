@@ -0,0 +1,65 @@
+"""
+اجرای هم‌زمان کوئری‌های مستقل یک درخواست در view های async (movielenz.async_views).
+
+متدهای async ORM جنگو (acount، async for، ...) کوئری را با sync_to_async(thread_sensitive=True) روی
+thread مخصوص همان درخواست اجرا می‌کنند؛ پس asyncio.gather به تنهایی آن‌ها را پشت سر هم اجرا می‌کند. gather
+هر شاخه را در ThreadSensitiveContext خودش اجرا می‌کند: شاخه thread و اتصال‌های پایگاه داده جدا دارد و
+اتصال‌هایش در پایان بسته می‌شوند.
+
+هزینه: هر شاخه (به جز اولی که روی thread و اتصال درخواست می‌ماند) یک اتصال تازه باز می‌کند؛ برای
+PostgreSQL بدون pool (یا pgbouncer) با ASYNC_VIEWS['CONCURRENT_QUERIES'] = False شاخه‌ها پشت سر هم روی
+همان اتصال درخواست اجرا می‌شوند.
+"""
+import asyncio
+
+from asgiref.sync import SyncToAsync, ThreadSensitiveContext, sync_to_async
+
+from django.conf import settings
+from django.db import connections
+
+DEFAULTS = {
+    'CONCURRENT_QUERIES': True,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'ASYNC_VIEWS', {})}
+
+
+def _open_own_connections():
+    # اتصال‌های درخواست (که در context کپی شده دیده می‌شوند) مال thread دیگری هستند.
+    for alias in connections:
+        connections[alias] = connections.create_connection(alias)
+
+
+async def _isolated(coroutine):
+    context = ThreadSensitiveContext()
+    # ThreadSensitiveContext تو در تو کاری نمی‌کند (ASGIHandler یکی برای کل درخواست ساخته است)؛
+    # برای این شاخه context جدید مستقیم تنظیم می‌شود و __aexit__ آن executor شاخه را می‌بندد.
+    context.token = SyncToAsync.thread_sensitive_context.set(context)
+    async with context:
+        await sync_to_async(_open_own_connections)()
+        try:
+            return await coroutine
+        finally:
+            await sync_to_async(connections.close_all)()
+
+
+async def gather(*coroutines):
+    """
+    coroutine ها را هم‌زمان اجرا می‌کند و نتیجه‌ها را به همان ترتیب برمی‌گرداند. اولی روی thread درخواست
+    و بقیه هر کدام روی thread و اتصال خودشان اجرا می‌شوند.
+    """
+    if len(coroutines) < 2 or not get_config()['CONCURRENT_QUERIES']:
+        return [await coroutine for coroutine in coroutines]
+    first, *rest = coroutines
+    tasks = [asyncio.ensure_future(_isolated(coroutine)) for coroutine in rest]
+    try:
+        # اولی در همین task اجرا می‌شود تا اتصال درخواست در context خود درخواست بماند.
+        result = await first
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return [result, *await asyncio.gather(*tasks)]
@@ -0,0 +1,25 @@
+# مسیرهای async کاتالوگ (movielenz.async_views)؛ همان مسیرهای sync زیر پیشوند /async/
+
+from django.urls import path
+
+from . import async_views
+
+app_name = 'async'
+
+urlpatterns = [
+    path('movie/', async_views.MovieListView.as_view(), name='movie-list'),
+    path('movie/latest/', async_views.MovieLatestView.as_view(), name='movie-latest-content'),
+    path('movie/<int:pk>/', async_views.MovieDetailView.as_view(), name='movie-detail'),
+
+    path('genres/', async_views.GenreListView.as_view(), name='genre-list'),
+    path('genres/<str:slug>/', async_views.GenreDetailView.as_view(), name='genre-detail'),
+
+    path('actors/', async_views.ActorListView.as_view(), name='actor-list'),
+    path('actors/<int:pk>/', async_views.ActorDetailView.as_view(), name='actor-detail'),
+    path('directors/', async_views.DirectorListView.as_view(), name='director-list'),
+    path('directors/<int:pk>/', async_views.DirectorDetailView.as_view(), name='director-detail'),
+
+    path('episodes/', async_views.EpisodeListView.as_view(), name='episode-list'),
+    path('episodes/manifest/', async_views.EpisodeManifestView.as_view(), name='episode-manifest'),
+    path('episodes/<str:movie_slug>/', async_views.EpisodeListView.as_view(), name='episode-list-by-slug'),
+]
@@ -0,0 +1,362 @@
+"""
+مسیر خواندن async کاتالوگ برای اجرا زیر ASGI (movie/asgi.py)، در /async/...
+
+همان endpoint های لیست/جزئیات/جدیدترین فیلم‌ها، ژانرها، بازیگران، کارگردان‌ها و قسمت‌ها با همان خروجی؛
+اما view ها async هستند: انتظار برای پایگاه داده یا کلاینت کند thread ای را اشغال نمی‌کند، و کوئری‌های
+مستقل هر درخواست (شمارش صفحه‌بندی و ردیف‌های صفحه، رابطه‌های many، کارت فیلم) هم‌زمان اجرا می‌شوند
+(movielenz.async_db).
+
+منطق view ها تکرار نمی‌شود: هر درخواست اول در یک مرحله کوتاه sync (plan) نمونه‌ای از view DRF متناظر
+می‌سازد و احراز هویت، دسترسی‌ها، throttle، انتخاب replica، کش پاسخ و ساخت queryset با فیلترها را به آن
+می‌سپارد. بعد ردیف‌ها با async ORM خوانده و با کارت‌ها یا سریالایزر کامپایل شده ساخته می‌شوند. حالت‌هایی
+که مسیر سریع ندارند (?pagination=cursor، ?polymorphic=true، ?page=last، FAST_SERIALIZERS_ENABLED = False)
+همان متد view DRF را در sync_to_async اجرا می‌کنند.
+
+ETag و پاسخ 304 (movielenz.conditional) فقط در مسیرهای sync ساخته می‌شوند؛ اینجا فقط پاسخ‌های
+fallback که از view DRF می‌آیند آن‌ها را دارند.
+"""
+from asgiref.sync import sync_to_async
+
+from django.core.paginator import Paginator
+from django.http import Http404, HttpResponseBase, StreamingHttpResponse
+from django.template.response import SimpleTemplateResponse
+from django.views import View
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from celebrity.views import ActorDetailAPIView, ActorListAPIView, DirectorDetailAPIView, DirectorListAPIView
+from episode.manifest import CHUNK_SIZE
+from episode.views import CombinedEpisodeQualityViewSet
+
+from . import async_db
+from .cards import aget_cards, aget_stored_cards
+from .db_routing import _replica
+from .fast_serializers import FastActorSerializer, FastDirectorSerializer, fast_serializers_enabled
+from .instrumentation import phase
+from .response_cache import (
+    CachedResponseMixin, entry_response, get_response_cache, replica_may_be_stale, response_entry,
+)
+from .views import GenreViewSet, MovieViewSet
+
+
+class CatalogReadView(View):
+    """
+    پایه view های async. viewset کلاس view DRF (ViewSet یا generic) و action نام متد آن است که
+    fallback اجرا می‌کند. زیرکلاس‌ها prepare (sync) و fetch (async) را پیاده می‌کنند.
+    """
+    viewset = None
+    action = 'list'
+    detail = False
+    # برای view هایی که خودشان get_compiled_serializer ندارند (جزئیات بازیگر/کارگردان).
+    compiled_serializer_class = None
+
+    http_method_names = ['get', 'head', 'options']
+
+    async def get(self, request, *args, **kwargs):
+        # replica انتخاب شده در plan فقط برای همین درخواست است.
+        token = _replica.set(None)
+        try:
+            response = await sync_to_async(self.plan)(request, kwargs)
+            store = response is None
+            if store:
+                try:
+                    response = await self.fetch()
+                    if not isinstance(response, HttpResponseBase):
+                        response = Response(response)
+                except Exception as exc:
+                    response = await sync_to_async(self.drf_view.handle_exception)(exc)
+            return await sync_to_async(self.finish)(response, store)
+        finally:
+            _replica.reset(token)
+
+    # --- مرحله sync ---
+
+    def plan(self, request, kwargs):
+        """None یعنی پاسخ با fetch ساخته شود؛ در غیر این صورت پاسخ آماده (hit کش، خطا یا fallback)."""
+        # initkwargs همان action (مثلا pagination_class در @action)
+        initkwargs = getattr(getattr(self.viewset, self.action, None), 'kwargs', {})
+        view = self.drf_view = self.viewset(**{'detail': self.detail, **initkwargs})
+        view.action_map = {'get': self.action, 'head': self.action}
+        view.action = self.action
+        view.args, view.kwargs = (), kwargs
+        view.headers = view.default_response_headers
+        view.format_kwarg = None
+        view.request = view.initialize_request(request, **kwargs)
+        self.cache = None
+        try:
+            view.initial(view.request, **kwargs)
+            if not self.prepare():
+                return getattr(view, self.action)(view.request, **kwargs)
+            return self.cached_response()
+        except Exception as exc:
+            return view.handle_exception(exc)
+
+    def prepare(self):
+        """queryset و منبع ردیف‌ها را آماده می‌کند؛ False یعنی این درخواست مسیر سریع ندارد."""
+        raise NotImplementedError
+
+    def cached_response(self):
+        view = self.drf_view
+        if isinstance(view, CachedResponseMixin):
+            self.cache = get_response_cache()
+        if self.cache is None:
+            return None
+        self.cache_key = view.get_cache_key(view.request)
+        entry = self.cache.get(self.cache_key)
+        if entry is not None:
+            return entry_response(view.request, entry)
+        self.generation = self.cache.generation()
+        return None
+
+    def finish(self, response, store):
+        view = self.drf_view
+        if store and self.cache is not None and response.status_code == 200 and not replica_may_be_stale(self.cache):
+            self.cache.set(self.cache_key, response_entry(response), view.get_cache_tags(response.data),
+                           self.generation)
+        response = view.finalize_response(view.request, response)
+        if isinstance(response, SimpleTemplateResponse):
+            with phase('serialize'):
+                response.render()
+        return response
+
+    def get_compiled_serializer(self):
+        view = self.drf_view
+        if hasattr(view, 'get_compiled_serializer'):
+            return view.get_compiled_serializer()
+        if self.compiled_serializer_class is None or not fast_serializers_enabled():
+            return None
+        if view.get_serializer_class() is not self.compiled_serializer_class.serializer_class:
+            return None
+        return self.compiled_serializer_class.for_fields()
+
+    def select_source(self, queryset):
+        """منبع ردیف‌ها: کارت‌ها (فقط فیلم‌ها) یا ردیف‌های values() سریالایزر کامپایل شده."""
+        self.using = queryset.db
+        use_cards = getattr(self.drf_view, 'use_cards', None)
+        if use_cards is not None and use_cards():
+            self.source = queryset.non_polymorphic().select_related(None).prefetch_related(None)
+            self.build = self.build_cards
+            return True
+        self.compiled = self.get_compiled_serializer()
+        if self.compiled is None:
+            return False
+        self.source = self.compiled.values(queryset)
+        self.build = self.build_compiled
+        return True
+
+    # --- مرحله async ---
+
+    async def fetch(self):
+        raise NotImplementedError
+
+    @staticmethod
+    async def read(queryset):
+        return [row async for row in queryset]
+
+    async def build_cards(self, movies, prefetched=None):
+        pks = [movie.pk for movie in movies]
+        if prefetched is not None and all(pk in prefetched for pk in pks):
+            cards = [prefetched[pk] for pk in pks]
+        else:
+            cards = await aget_cards(pks, using=self.using)
+        return self.drf_view.trim_cards(cards)
+
+    async def build_compiled(self, rows, prefetched=None):
+        if prefetched is None:
+            return await self.compiled.aserialize(rows, using=self.using)
+        with phase('serialize'):
+            return self.compiled.serialize_context(rows, prefetched)
+
+
+class CatalogListView(CatalogReadView):
+    """لیست با صفحه‌بندی شماره صفحه DRF (همان خروجی count/next/previous/results)."""
+    paginate = True
+
+    def get_list_queryset(self):
+        return self.drf_view.filter_queryset(self.drf_view.get_queryset())
+
+    def prepare(self):
+        view = self.drf_view
+        self.page_size = None
+        paginator = view.paginator if self.paginate else None
+        if paginator is not None:
+            use_keyset = getattr(paginator, 'use_keyset', None)
+            if not isinstance(paginator, PageNumberPagination) or (use_keyset and use_keyset(view.request)):
+                return False
+            self.paginator = paginator
+            self.page_size = paginator.get_page_size(view.request)
+            if self.page_size:
+                page_number = view.request.query_params.get(paginator.page_query_param) or 1
+                if page_number in paginator.last_page_strings:
+                    # شماره صفحه آخر به شمارش نیاز دارد.
+                    return False
+                self.page_number = self.validate_page_number(page_number)
+        return self.select_source(self.get_list_queryset())
+
+    def validate_page_number(self, page_number):
+        messages = Paginator.default_error_messages
+        try:
+            number = int(page_number)
+        except (TypeError, ValueError):
+            self.invalid_page(page_number, messages['invalid_page'])
+        if number < 1:
+            self.invalid_page(page_number, messages['min_page'])
+        return number
+
+    def invalid_page(self, page_number, message):
+        raise NotFound(self.paginator.invalid_page_message.format(page_number=page_number, message=message))
+
+    async def fetch(self):
+        if not self.page_size:
+            return await self.build(await self.read(self.source))
+        offset = (self.page_number - 1) * self.page_size
+        # شمارش و ردیف‌های صفحه به هم وابسته نیستند.
+        count, rows = await async_db.gather(
+            self.source.acount(), self.read(self.source[offset:offset + self.page_size]),
+        )
+        if not rows and self.page_number > 1:
+            self.invalid_page(self.page_number, Paginator.default_error_messages['no_results'])
+        return {
+            'count': count,
+            'next': self.page_link(self.page_number + 1) if offset + self.page_size < count else None,
+            'previous': self.page_link(self.page_number - 1) if self.page_number > 1 else None,
+            'results': await self.build(rows),
+        }
+
+    def page_link(self, page_number):
+        url = self.drf_view.request.build_absolute_uri()
+        if page_number == 1:
+            return remove_query_param(url, self.paginator.page_query_param)
+        return replace_query_param(url, self.paginator.page_query_param, page_number)
+
+
+class CatalogDetailView(CatalogReadView):
+    """
+    جزئیات یک آبجکت با lookup_field همان view. اگر کلید اصلی در URL باشد، کارت یا رابطه‌های many
+    هم‌زمان با خود ردیف خوانده می‌شوند. (دسترسی‌های این view ها قانون سطح آبجکت ندارند.)
+    """
+    action = 'retrieve'
+    detail = True
+
+    def prepare(self):
+        view = self.drf_view
+        lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+        self.lookup = {view.lookup_field: view.kwargs[lookup_url_kwarg]}
+        queryset = view.filter_queryset(view.get_queryset()).filter(**self.lookup)
+        self.model_name = queryset.model._meta.object_name
+        return self.select_source(queryset)
+
+    def lookup_pk(self):
+        value = self.lookup.get('pk', self.lookup.get('id'))
+        return int(value) if value is not None and str(value).isdigit() else None
+
+    async def prefetch(self, pk):
+        if self.build == self.build_cards:
+            return await aget_stored_cards([pk], using=self.using)
+        if self.compiled.relations:
+            return await self.compiled.aload_relations([pk], using=self.using)
+        return None
+
+    async def fetch(self):
+        pk = self.lookup_pk()
+        if pk is None:
+            rows, prefetched = await self.read(self.source[:1]), None
+        else:
+            rows, prefetched = await async_db.gather(self.read(self.source[:1]), self.prefetch(pk))
+        if not rows:
+            raise Http404('No %s matches the given query.' % self.model_name)
+        return (await self.build(rows, prefetched))[0]
+
+
+# --- فیلم‌ها ---
+
+class MovieListView(CatalogListView):
+    viewset = MovieViewSet
+
+
+class MovieLatestView(CatalogListView):
+    viewset = MovieViewSet
+    action = 'latest_content'
+    paginate = False
+
+    def get_list_queryset(self):
+        return self.drf_view.get_latest_queryset()
+
+
+class MovieDetailView(CatalogDetailView):
+    viewset = MovieViewSet
+
+
+# --- ژانرها ---
+
+class GenreListView(CatalogListView):
+    viewset = GenreViewSet
+
+
+class GenreDetailView(CatalogDetailView):
+    viewset = GenreViewSet
+
+
+# --- بازیگران و کارگردان‌ها ---
+
+class ActorListView(CatalogListView):
+    viewset = ActorListAPIView
+
+
+class ActorDetailView(CatalogDetailView):
+    viewset = ActorDetailAPIView
+    compiled_serializer_class = FastActorSerializer
+
+
+class DirectorListView(CatalogListView):
+    viewset = DirectorListAPIView
+
+
+class DirectorDetailView(CatalogDetailView):
+    viewset = DirectorDetailAPIView
+    compiled_serializer_class = FastDirectorSerializer
+
+
+# --- قسمت‌ها ---
+
+class EpisodeListView(CatalogReadView):
+    """کیفیت‌های قسمت‌ها با async ORM خوانده و مثل CombinedEpisodeQualityViewSet.list گروه‌بندی می‌شوند."""
+    viewset = CombinedEpisodeQualityViewSet
+
+    def plan(self, request, kwargs):
+        self.missing = None
+        return super().plan(request, kwargs)
+
+    def prepare(self):
+        view = self.drf_view
+        self.missing = view.missing_movie_response()
+        if self.missing is None:
+            self.source = view.filter_queryset(view.get_queryset())
+        return True
+
+    def cached_response(self):
+        return self.missing
+
+    async def fetch(self):
+        episode_qualities = await self.read(self.source)
+        # group_qualities نوع فیلم را از رابطه می‌خواند و باید sync اجرا شود.
+        return await sync_to_async(self.drf_view.group_qualities)(episode_qualities)
+
+
+class EpisodeManifestView(EpisodeListView):
+    """manifest جریانی (episode.manifest)؛ ردیف‌ها با aiterator تکه تکه خوانده و فرستاده می‌شوند."""
+    action = 'manifest'
+
+    def prepare(self):
+        view = self.drf_view
+        self.missing = view.missing_movie_response()
+        if self.missing is None:
+            self.writer, self.source = view.manifest_page()
+        return True
+
+    async def fetch(self):
+        return StreamingHttpResponse(self.writer.awrite(self.source.aiterator(chunk_size=CHUNK_SIZE)),
+                                     content_type='application/json')
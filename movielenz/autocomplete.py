@@ -0,0 +1,369 @@
+"""
+ایندکس پیشوندی تکمیل خودکار (/autocomplete/?q=).
+
+عنوان فیلم‌ها/سریال‌های فعال و نام بازیگران و کارگردان‌ها (ستون‌های normalized_* که با normalize_text
+یکسان‌سازی شده‌اند) در یک آرایه مرتب از کلیدها نگه داشته می‌شوند. برای هر نام، خود نام و ادامه آن از ابتدای
+هر کلمه (تا MAX_TOKENS کلمه) کلید است تا «nolan» هم «christopher nolan» را پیدا کند. جستجو دو bisect روی
+آرایه است و بازه پیدا شده بر اساس (شروع نام، محبوبیت) رتبه‌بندی می‌شود؛ برای پیشوندهای کوتاه که بازه بزرگی
+دارند نتیجه رتبه‌بندی تا تغییر بعدی آن بازه در حافظه می‌ماند.
+
+ایندکس هر پروسه با اولین درخواست آن پروسه (سیگنال request_started) در پس‌زمینه ساخته می‌شود و با
+ذخیره/حذف ردیف‌ها (movielenz.signals) در همان پروسه بلافاصله به‌روز می‌شود. مثل movielenz.type_tree هر
+تغییر بعد از commit یک شماره نسخه را افزایش می‌دهد و ورودی‌های تغییر کرده را با همان شماره در لاگ تغییرات
+(کش جنگو) می‌نویسد؛ پروسه‌های دیگر در درخواست بعدی نسخه جدید را می‌بینند و در پس‌زمینه فقط همان ورودی‌ها را
+دوباره می‌خوانند (تا آن موقع ایندکس قبلی جواب می‌دهد). ایندکس فقط وقتی کامل از نو ساخته می‌شود که لاگ
+ناقص باشد (بیرون رانده شده، بیش از MAX_CHANGES تغییر یا پایان import_catalog) یا REBUILD_INTERVAL
+گذشته باشد؛ این سقف عمر برای تغییراتی است که سیگنال ندارند (مثلا QuerySet.update). همه این‌ها فقط با
+CACHES مشترک بین پروسه‌ها کار می‌کند.
+"""
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from celebrity.models import Actor, Director
+from common.normalization import normalize_text
+
+from .models import Movie, Series
+from .versioning import VersionedKey
+
+DEFAULTS = {
+    'MAX_TOKENS': 4,
+    'LIMIT': 10,
+    'MAX_LIMIT': 20,
+    # بازه‌های بزرگ‌تر از این مقدار یک بار رتبه‌بندی و نگه داشته می‌شوند.
+    'SCAN_LIMIT': 256,
+    'REBUILD_INTERVAL': 3600,
+    # بیشتر از این تعداد تغییر عقب‌افتاده به جای خواندن لاگ، ساختن کامل ایندکس
+    'MAX_CHANGES': 1000,
+    # ساختن ایندکس با اولین درخواست هر پروسه (نه با اولین /autocomplete/)
+    'WARM': True,
+}
+
+VERSION_KEY = VersionedKey('movielenz:autocomplete-version')
+# ورودی‌های تغییر کرده در هر نسخه: [(نوع، شناسه), ...]
+CHANGE_KEY = 'movielenz:autocomplete-change:%s'
+
+# replace با بیش از این تعداد کلید به جای list.insert آرایه‌ها را ادغام می‌کند.
+MERGE_THRESHOLD = 64
+
+Entry = namedtuple('Entry', ['kind', 'pk', 'label', 'slug', 'poster', 'weight', 'keys'])
+
+logger = logging.getLogger(__name__)
+
+_indexes = {}
+_rebuilding = set()
+_lock = threading.Lock()
+# ساختن کامل؛ درخواستی که ایندکس ندارد منتظر ساختنی می‌ماند که warm شروع کرده است.
+_build_lock = threading.Lock()
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'AUTOCOMPLETE', {})}
+
+
+def index_keys(normalized, max_tokens):
+    starts = [0] + [position + 1 for position, char in enumerate(normalized) if char == ' ']
+    return tuple(dict.fromkeys(normalized[start:] for start in starts[:max_tokens] if normalized[start:]))
+
+
+class PrefixIndex:
+    def __init__(self, config, version=None):
+        self.config = config
+        # نسخه کش در زمان شروع ساختن؛ تغییری که وسط ساختن برسد ساختن دوباره را لازم می‌کند.
+        self.version = version
+        self.keys = []
+        # owners[i]: (شناسه ورودی، آیا keys[i] از ابتدای نام است)
+        self.owners = []
+        self.entries = {}
+        self.ranked = {}
+        self.lock = threading.RLock()
+        self.built_at = time.monotonic()
+
+    def load(self, entries):
+        pairs = []
+        for entry in entries:
+            ref = (entry.kind, entry.pk)
+            self.entries[ref] = entry
+            pairs.extend((key, (ref, position == 0)) for position, key in enumerate(entry.keys))
+        pairs.sort(key=lambda pair: pair[0])
+        self.keys = [key for key, _owner in pairs]
+        self.owners = [owner for _key, owner in pairs]
+
+    def _forget_ranked(self, key):
+        for length in range(1, len(key) + 1):
+            self.ranked.pop(key[:length], None)
+
+    def _discard(self, ref, entry):
+        for key in entry.keys:
+            index = bisect_left(self.keys, key)
+            while index < len(self.keys) and self.keys[index] == key:
+                if self.owners[index][0] == ref:
+                    del self.keys[index]
+                    del self.owners[index]
+                    break
+                index += 1
+
+    def replace(self, refs, entries):
+        """
+        ورودی‌های refs را حذف و entries را (به جای نسخه قبلی‌شان) اضافه می‌کند. هر list.insert/del هزینه
+        O(n) دارد؛ دسته‌ای با بیش از MERGE_THRESHOLD کلید به جای آن با یک ادغام دو آرایه مرتب نوشته می‌شود.
+        """
+        with self.lock:
+            refs = set(refs) | {(entry.kind, entry.pk) for entry in entries}
+            removed = {ref: self.entries.pop(ref) for ref in refs if ref in self.entries}
+            pairs = sorted(
+                ((key, ((entry.kind, entry.pk), position == 0))
+                 for entry in entries for position, key in enumerate(entry.keys)),
+                key=lambda pair: pair[0],
+            )
+            for entry in [*removed.values(), *entries]:
+                for key in entry.keys:
+                    self._forget_ranked(key)
+            for entry in entries:
+                self.entries[(entry.kind, entry.pk)] = entry
+
+            if len(pairs) + sum(len(entry.keys) for entry in removed.values()) <= MERGE_THRESHOLD:
+                for ref, entry in removed.items():
+                    self._discard(ref, entry)
+                for key, owner in pairs:
+                    index = bisect_left(self.keys, key)
+                    self.keys.insert(index, key)
+                    self.owners.insert(index, owner)
+                return
+            kept = ((key, owner) for key, owner in zip(self.keys, self.owners) if owner[0] not in removed)
+            merged = list(heapq.merge(kept, pairs, key=lambda pair: pair[0]))
+            self.keys = [key for key, _owner in merged]
+            self.owners = [owner for _key, owner in merged]
+
+    def add(self, entry):
+        self.replace((), [entry])
+
+    def remove(self, ref):
+        self.replace([ref], ())
+
+    def rank(self, owners, limit):
+        best = {}
+        for ref, head in owners:
+            best[ref] = best.get(ref, False) or head
+        entries = self.entries
+        return heapq.nlargest(
+            limit, best,
+            key=lambda ref: (best[ref], entries[ref].weight, -len(entries[ref].label), -ref[1]),
+        )
+
+    def search(self, query, limit):
+        prefix = normalize_text(query)
+        if not prefix:
+            return []
+        with self.lock:
+            low = bisect_left(self.keys, prefix)
+            high = bisect_left(self.keys, prefix + '\U0010ffff', low)
+            if high - low <= self.config['SCAN_LIMIT']:
+                refs = self.rank(self.owners[low:high], limit)
+            else:
+                refs = self.ranked.get(prefix)
+                if refs is None:
+                    refs = self.ranked[prefix] = self.rank(self.owners[low:high], self.config['MAX_LIMIT'])
+                refs = refs[:limit]
+            return [self.entries[ref] for ref in refs]
+
+
+# --- ساختن ورودی‌ها از پایگاه داده ---
+
+def movie_entry(pk, normalized_title, title, slug, poster, popularity, is_series, config):
+    return Entry('series' if is_series else 'movie', pk, title, slug, poster, float(popularity or 0),
+                 index_keys(normalized_title or normalize_text(title), config['MAX_TOKENS']))
+
+
+def person_entry(kind, pk, normalized_name, name, poster, popularity, config):
+    return Entry(kind, pk, name, None, poster, float(popularity or 0),
+                 index_keys(normalized_name or normalize_text(name), config['MAX_TOKENS']))
+
+
+def iter_entries(config, using=DEFAULT_DB_ALIAS, refs=None):
+    """ورودی‌های همه ردیف‌ها، یا با refs فقط همان (نوع، شناسه) ها."""
+    from django.contrib.contenttypes.models import ContentType
+
+    def restrict(queryset, *kinds):
+        if refs is None:
+            return queryset
+        return queryset.filter(pk__in={pk for kind, pk in refs if kind in kinds})
+
+    series_ctype = ContentType.objects.db_manager(using).get_for_model(Series, for_concrete_model=False).pk
+    movies = (restrict(Movie.objects.using(using).non_polymorphic(), 'movie', 'series').filter(status=True)
+              .values_list('pk', 'normalized_title', 'title', 'slug', 'poster', 'tmdb_popularity',
+                           'polymorphic_ctype_id'))
+    for pk, normalized, title, slug, poster, popularity, ctype in movies.iterator(chunk_size=5000):
+        yield movie_entry(pk, normalized, title, slug, poster, popularity, ctype == series_ctype, config)
+    for model, kind, name_field in ((Actor, 'actor', 'name'), (Director, 'director', 'full_name')):
+        rows = (restrict(model.objects.using(using), kind)
+                .values_list('pk', 'normalized_name', name_field, 'poster', 'popularity'))
+        for pk, normalized, name, poster, popularity in rows.iterator(chunk_size=5000):
+            yield person_entry(kind, pk, normalized, name, poster, popularity, config)
+
+
+def instance_entry(instance, config):
+    """ورودی یک نمونه ذخیره شده؛ برای فیلم غیرفعال None (از ایندکس حذف می‌شود)."""
+    if isinstance(instance, Movie):
+        if not instance.status:
+            return None
+        return movie_entry(instance.pk, instance.normalized_title, instance.title, instance.slug, instance.poster,
+                           instance.tmdb_popularity, isinstance(instance, Series), config)
+    if isinstance(instance, Actor):
+        return person_entry('actor', instance.pk, instance.normalized_name, instance.name, instance.poster,
+                            instance.popularity, config)
+    return person_entry('director', instance.pk, instance.normalized_name, instance.full_name, instance.poster,
+                        instance.popularity, config)
+
+
+def instance_ref(instance):
+    if isinstance(instance, Movie):
+        # سریال و فیلم یک کلید اصلی دارند؛ هر دو نوع حذف می‌شود تا تغییر نوع هم پوشش داده شود.
+        return [('movie', instance.pk), ('series', instance.pk)]
+    return [('actor' if isinstance(instance, Actor) else 'director', instance.pk)]
+
+
+# --- نمونه پروسه ---
+
+def build_index(using=DEFAULT_DB_ALIAS):
+    config = get_config()
+    index = PrefixIndex(config, version=VERSION_KEY.get())
+    index.load(iter_entries(config, using=using))
+    return index
+
+
+def _build(using, replace=False):
+    """ایندکس را (اگر هنوز نیست یا با replace) کامل می‌سازد؛ فقط یک ساختن در هر لحظه."""
+    with _build_lock:
+        if replace or using not in _indexes:
+            _indexes[using] = build_index(using)
+        return _indexes[using]
+
+
+def apply_changes(index, version, using=DEFAULT_DB_ALIAS):
+    """
+    ورودی‌های تغییر کرده بین نسخه ایندکس و version را از لاگ تغییرات می‌خواند و فقط همان‌ها را از پایگاه
+    داده دوباره می‌سازد. False اگر لاگ کامل نیست و ایندکس باید کامل از نو ساخته شود.
+    """
+    start = index.version
+    if start is None or not 0 < version - start <= index.config['MAX_CHANGES']:
+        return False
+    keys = [CHANGE_KEY % number for number in range(start + 1, version + 1)]
+    changes = cache.get_many(keys)
+    if len(changes) != len(keys):
+        return False
+    refs = {tuple(ref) for key in keys for ref in changes[key]}
+    entries = list(iter_entries(index.config, using=using, refs=refs))
+    with index.lock:
+        if index.version != start:
+            # همین پروسه در این فاصله نسخه را جلو برده؛ دفعه بعد از نسخه جدید ادامه می‌دهد.
+            return True
+        index.replace(refs, entries)
+        index.version = version
+    return True
+
+
+def _refresh(using):
+    try:
+        index = _indexes.get(using)
+        if index is None:
+            _build(using)
+            return
+        version = VERSION_KEY.get()
+        if time.monotonic() - index.built_at > index.config['REBUILD_INTERVAL'] or not (
+                index.version == version or apply_changes(index, version, using)):
+            _build(using, replace=True)
+    except Exception:
+        logger.exception('Refreshing the autocomplete index failed; the previous index stays in use.')
+    finally:
+        _rebuilding.discard(using)
+        # اتصال‌های همین thread
+        connections.close_all()
+
+
+def _start_refresh(using):
+    with _lock:
+        if using in _rebuilding:
+            return
+        _rebuilding.add(using)
+    threading.Thread(target=_refresh, args=(using,), daemon=True).start()
+
+
+def is_stale(index):
+    return (index.version != VERSION_KEY.get()
+            or time.monotonic() - index.built_at > index.config['REBUILD_INTERVAL'])
+
+
+def warm(using=DEFAULT_DB_ALIAS):
+    """
+    اگر ایندکس این پروسه ساخته نشده، ساختن آن را در پس‌زمینه شروع می‌کند (movielenz.signals، با هر
+    درخواست). داخل تراکنش (مثلا TestCase) کاری نمی‌کند؛ thread دیگر داده commit نشده را نمی‌بیند.
+    """
+    if using in _indexes or using in _rebuilding or not get_config()['WARM']:
+        return
+    if connections[using].in_atomic_block:
+        return
+    _start_refresh(using)
+
+
+def get_index(using=DEFAULT_DB_ALIAS):
+    index = _indexes.get(using)
+    if index is None:
+        return _build(using)
+    if using not in _rebuilding and is_stale(index):
+        _start_refresh(using)
+    return index
+
+
+def update_instance(instance, using=DEFAULT_DB_ALIAS):
+    """ورودی نمونه را در ایندکس ساخته شده این پروسه (اگر ساخته شده باشد) جایگزین می‌کند."""
+    index = _indexes.get(using)
+    if index is None:
+        return
+    entry = instance_entry(instance, index.config)
+    index.replace(instance_ref(instance), [entry] if entry is not None else [])
+
+
+def remove_refs(refs, using=DEFAULT_DB_ALIAS):
+    index = _indexes.get(using)
+    if index is None:
+        return
+    index.replace(refs, ())
+
+
+def invalidate_autocomplete(using=DEFAULT_DB_ALIAS, refs=None):
+    """
+    بعد از commit نسخه را افزایش می‌دهد و refs (ورودی‌های تغییر کرده) را با نسخه جدید در لاگ تغییرات
+    می‌نویسد. بدون refs (مثلا پایان import_catalog) لاگ آن نسخه خالی می‌ماند و همه پروسه‌ها ایندکس را کامل
+    از نو می‌سازند. با refs تغییر قبلا (update_instance / remove_refs) در ایندکس همین پروسه اعمال شده است،
+    پس ایندکس این پروسه اگر دقیقا نسخه قبلی را داشت به نسخه جدید می‌رسد.
+    """
+    refs = None if refs is None else [list(ref) for ref in refs]
+
+    def bump():
+        version = VERSION_KEY.bump()
+        if refs is None:
+            return
+        cache.set(CHANGE_KEY % version, refs, get_config()['REBUILD_INTERVAL'])
+        index = _indexes.get(using)
+        if index is not None:
+            with index.lock:
+                if index.version == version - 1:
+                    index.version = version
+    transaction.on_commit(bump, using=using)
+
+
+def search(query, limit=None, using=DEFAULT_DB_ALIAS):
+    index = get_index(using)
+    limit = min(limit or index.config['LIMIT'], index.config['MAX_LIMIT'])
+    return [
+        {'type': entry.kind, 'id': entry.pk, 'label': entry.label, 'slug': entry.slug, 'poster': entry.poster}
+        for entry in index.search(query, limit)
+    ]
@@ -0,0 +1,349 @@
+"""
+بار هم‌زمان روی endpoint های عمومی و گزارش JSON قابل مقایسه (دستور bench_endpoints).
+
+هر endpoint با چند worker هم‌زمان درخواست می‌گیرد؛ برای هر درخواست زمان پاسخ، کد وضعیت و تعداد کوئری و
+زمان SQL (از هدر Server-Timing که movielenz.instrumentation می‌گذارد) ثبت و در پایان p50/p95/p99،
+throughput و میانگین کوئری‌ها حساب می‌شود.
+
+دو روش اجرا:
+- InProcessTransport: django.test.Client در همین پروسه (هر worker یک Client و یک اتصال پایگاه داده)؛
+- HttpTransport: درخواست HTTP واقعی به یک سرور در حال اجرا (--base-url) با اتصال keep-alive برای هر worker.
+
+مسیرها از داده فعلی پایگاه داده (یک فیلم، سریال، بازیگر و ...) ساخته می‌شوند؛ دستور generate_catalog داده
+مناسب این کار را می‌سازد. compare_reports دو گزارش (مثلا دو commit) را مقایسه می‌کند.
+"""
+import datetime
+import http.client
+import json
+import platform
+import re
+import subprocess
+import threading
+import time
+import warnings
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+import django
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+Endpoint = namedtuple('Endpoint', ['name', 'path', 'auth'])
+Sample = namedtuple('Sample', ['latency', 'status', 'queries', 'db_time', 'error'])
+
+REPORT_VERSION = 1
+PERCENTILES = (50, 95, 99)
+# معیارهایی که compare_reports مقایسه می‌کند؛ True یعنی مقدار بیشتر بهتر است.
+COMPARED_METRICS = {
+    'p50_ms': False, 'p95_ms': False, 'p99_ms': False, 'throughput_rps': True, 'queries_mean': False,
+}
+
+_DB_TIMING = re.compile(r'(?:^|,)\s*db;dur=([\d.]+)(?:;desc="(\d+) queries")?')
+
+# InProcessTransport بدنه پاسخ‌های جریانی async را عمدا همگام می‌خواند (زیر WSGI هم همین اتفاق می‌افتد).
+warnings.filterwarnings('ignore', message='StreamingHttpResponse must consume asynchronous iterators')
+
+# endpoint هایی که نسخه async در /async/ دارند
+ASYNC_ENDPOINTS = {
+    'movie-list', 'movie-latest', 'movie-detail', 'genre-list', 'genre-detail', 'actor-list', 'actor-detail',
+    'director-list', 'director-detail', 'episode-list', 'episode-by-series', 'episode-manifest',
+}
+
+
+def discover_endpoints(using=DEFAULT_DB_ALIAS, authenticated=False):
+    """مسیرهای عمومی API با شناسه‌های نمونه از داده فعلی؛ endpoint هایی که داده ندارند کنار گذاشته می‌شوند."""
+    from celebrity.models import Actor, Director
+    from episode.models import Episode
+
+    from .models import Genre, Movie, Series, Type
+
+    movies = Movie.objects.using(using).non_polymorphic().filter(status=True)
+    movie = movies.order_by('-tmdb_popularity', 'pk').values('pk', 'title').first()
+    series_slug = (Episode.objects.using(using).filter(movie__in=Series.objects.using(using).all())
+                   .order_by('movie_id').values_list('movie__slug', flat=True).first())
+    actor = Actor.objects.using(using).order_by('-movie_count', 'pk').values_list('pk', flat=True).first()
+    director = Director.objects.using(using).order_by('-movie_count', 'pk').values_list('pk', flat=True).first()
+    genre = Genre.objects.using(using).exclude(slug=None).order_by('pk').values_list('slug', flat=True).first()
+    root_type = Type.objects.using(using).filter(parent=None).order_by('pk').values_list('slug', flat=True).first()
+
+    endpoints = [
+        Endpoint('movie-list', '/movie/', False),
+        Endpoint('movie-list-keyset', '/movie/?' + urlencode({'pagination': 'cursor'}), False),
+        Endpoint('movie-latest', '/movie/latest/', False),
+        Endpoint('movie-facets', '/movie/facets/', False),
+        Endpoint('movie-trending', '/movie/trending/', False),
+        Endpoint('genre-list', '/genres/', False),
+        Endpoint('actor-list', '/actors/', False),
+        Endpoint('director-list', '/directors/', False),
+        Endpoint('episode-list', '/episodes/', False),
+        Endpoint('episode-manifest', '/episodes/manifest/', False),
+    ]
+    if movie is not None:
+        word = movie['title'].split()[0]
+        endpoints += [
+            Endpoint('movie-detail', '/movie/%d/' % movie['pk'], False),
+            Endpoint('movie-similar', '/movie/%d/similar/' % movie['pk'], False),
+            Endpoint('movie-search', '/movie/?' + urlencode({'search': word}), False),
+            Endpoint('autocomplete', '/autocomplete/?' + urlencode({'q': word[:3]}), False),
+        ]
+    if genre is not None:
+        endpoints += [
+            Endpoint('genre-detail', '/genres/%s/' % genre, False),
+            Endpoint('movie-filter-genre', '/movie/?' + urlencode({'genres__slug': genre}), False),
+        ]
+    if root_type is not None:
+        endpoints.append(Endpoint('movie-by-type', '/movie/type/%s/' % root_type, False))
+    if actor is not None:
+        endpoints.append(Endpoint('actor-detail', '/actors/%d/' % actor, False))
+    if director is not None:
+        endpoints.append(Endpoint('director-detail', '/directors/%d/' % director, False))
+    if series_slug:
+        endpoints.append(Endpoint('episode-by-series', '/episodes/%s/' % series_slug, False))
+    # همان endpoint ها از مسیر async (movielenz.async_views)؛ برای مقایسه زیر ASGI با --base-url
+    endpoints += [Endpoint('async-' + endpoint.name, '/async' + endpoint.path, False)
+                  for endpoint in endpoints if endpoint.name in ASYNC_ENDPOINTS]
+    if authenticated:
+        endpoints += [
+            Endpoint('me', '/me/', True),
+            Endpoint('me-feed', '/me/feed/', True),
+            Endpoint('history', '/history/', True),
+            Endpoint('favorites', '/favorites/', True),
+            Endpoint('watchlist', '/watchlist/', True),
+        ]
+    return sorted(endpoints, key=lambda endpoint: endpoint.name)
+
+
+def parse_server_timing(value):
+    """(تعداد کوئری، زمان SQL به ثانیه) از هدر Server-Timing؛ در نبود آن (None, None)."""
+    match = _DB_TIMING.search(value or '')
+    if match is None:
+        return None, None
+    queries = int(match.group(2)) if match.group(2) is not None else None
+    return queries, float(match.group(1)) / 1000
+
+
+# --- روش‌های ارسال درخواست ---
+
+class InProcessTransport:
+    name = 'in-process'
+
+    def __init__(self, user=None):
+        self.user = user
+        self.local = threading.local()
+        hosts = [host for host in settings.ALLOWED_HOSTS if host and host != '*' and not host.startswith('.')]
+        self.host = hosts[0] if hosts else 'localhost'
+
+    def client(self):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            from django.test import Client
+
+            # خطای view ها مثل سرور واقعی به پاسخ 500 تبدیل می‌شود.
+            client = self.local.client = Client(raise_request_exception=False, HTTP_HOST=self.host)
+            if self.user is not None:
+                client.force_login(self.user)
+        return client
+
+    def get(self, path):
+        response = self.client().get(path)
+        if response.streaming:
+            # بدنه پاسخ‌های جریانی (manifest) هنگام خواندن ساخته می‌شود و جزو زمان درخواست است. iter(response)
+            # (نه streaming_content) محتوای async (/async/episodes/manifest/) را هم همگام مصرف می‌کند.
+            for _ in response:
+                pass
+        return response.status_code, response.headers.get('Server-Timing')
+
+    def close(self):
+        # هر worker اتصال پایگاه داده خودش را دارد.
+        connections.close_all()
+
+
+class HttpTransport:
+    def __init__(self, base_url, token=None, timeout=30):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https') or not parts.netloc:
+            raise ValueError('Invalid base URL: %r' % base_url)
+        self.name = base_url
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.headers = {'Accept': 'application/json'}
+        if token:
+            self.headers['Authorization'] = 'Bearer %s' % token
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            connection = self.local.connection = connection_class(self.netloc, timeout=self.timeout)
+        return connection
+
+    def request(self, method, path, body=None, headers=None):
+        for attempt in range(2):
+            connection = self.connection()
+            try:
+                connection.request(method, self.prefix + path, body=body, headers={**self.headers, **(headers or {})})
+                response = connection.getresponse()
+                data = response.read()
+                return response.status, response.getheader('Server-Timing'), data
+            except (http.client.HTTPException, ConnectionError):
+                # سرور اتصال keep-alive را بسته است؛ یک بار با اتصال تازه تکرار می‌شود.
+                connection.close()
+                self.local.connection = None
+                if attempt:
+                    raise
+
+    def get(self, path):
+        status, timing, _data = self.request('GET', path)
+        return status, timing
+
+    def login(self, email, password):
+        status, _timing, data = self.request(
+            'POST', '/login/', json.dumps({'email': email, 'password': password}),
+            {'Content-Type': 'application/json'},
+        )
+        if status != 200:
+            raise ValueError('Login failed with status %s' % status)
+        self.headers['Authorization'] = 'Bearer %s' % json.loads(data)['access']
+
+    def close(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None:
+            connection.close()
+
+
+# --- اجرا و آمار ---
+
+def percentile(sorted_values, percent):
+    """صدک با درون‌یابی خطی بین دو نمونه نزدیک."""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(endpoint, samples, elapsed):
+    latencies = sorted(sample.latency for sample in samples)
+    queries = [sample.queries for sample in samples if sample.queries is not None]
+    db_times = [sample.db_time for sample in samples if sample.db_time is not None]
+    statuses = Counter(sample.status for sample in samples)
+    exceptions = Counter(sample.error for sample in samples if sample.error is not None)
+    summary = {
+        'path': endpoint.path,
+        'requests': len(samples),
+        'errors': sum(count for status, count in statuses.items() if status is None or status >= 400),
+        'status': {str(status): count for status, count in sorted(statuses.items(), key=lambda item: str(item[0]))},
+        'exceptions': dict(sorted(exceptions.items())),
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+        'max_ms': round(latencies[-1] * 1000, 3) if latencies else None,
+        'queries_mean': round(sum(queries) / len(queries), 2) if queries else None,
+        'queries_max': max(queries) if queries else None,
+        'db_mean_ms': round(sum(db_times) / len(db_times) * 1000, 3) if db_times else None,
+    }
+    for percent in PERCENTILES:
+        value = percentile(latencies, percent)
+        summary['p%d_ms' % percent] = round(value * 1000, 3) if value is not None else None
+    return summary
+
+
+def describe_error(exc):
+    return '%s: %s' % (type(exc).__name__, exc)
+
+
+def run_endpoint(transport, endpoint, requests, concurrency, warmup=0):
+    for _ in range(warmup):
+        try:
+            transport.get(endpoint.path)
+        except Exception:
+            # همان خطا در درخواست‌های اندازه‌گیری شده ثبت می‌شود.
+            break
+
+    counter = iter(range(requests))
+    lock = threading.Lock()
+
+    def worker():
+        samples = []
+        try:
+            while True:
+                with lock:
+                    if next(counter, None) is None:
+                        return samples
+                start = time.perf_counter()
+                error = None
+                try:
+                    status, timing = transport.get(endpoint.path)
+                except Exception as exc:
+                    # خطای یک درخواست (اتصال، یا خواندن بدنه در همین پروسه) جزو خطاهای همین endpoint است.
+                    status, timing, error = None, None, describe_error(exc)
+                latency = time.perf_counter() - start
+                queries, db_time = parse_server_timing(timing)
+                samples.append(Sample(latency, status, queries, db_time, error))
+        finally:
+            transport.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(worker) for _ in range(concurrency)]
+        samples = [sample for future in futures for sample in future.result()]
+    return summarize(endpoint, samples, time.perf_counter() - start)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5, check=True,
+            cwd=settings.BASE_DIR,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmark(transport, endpoints, requests=200, concurrency=8, warmup=5, using=DEFAULT_DB_ALIAS, progress=None):
+    results = {}
+    for endpoint in endpoints:
+        try:
+            results[endpoint.name] = run_endpoint(transport, endpoint, requests, concurrency, warmup)
+        except Exception as exc:
+            # یک endpoint خراب بقیه اجرا و گزارش را از بین نمی‌برد.
+            results[endpoint.name] = summarize(endpoint, [], 0)
+            results[endpoint.name].update(errors=1, exceptions={describe_error(exc): 1})
+        if progress is not None:
+            progress(endpoint, results[endpoint.name])
+    meta = {
+        'version': REPORT_VERSION,
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'target': transport.name,
+        'requests': requests,
+        'concurrency': concurrency,
+        'warmup': warmup,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+    }
+    if isinstance(transport, InProcessTransport):
+        from .models import Movie
+
+        meta['database'] = connections[using].vendor
+        meta['titles'] = Movie.objects.using(using).count()
+        meta['response_cache'] = bool(getattr(settings, 'RESPONSE_CACHE', {}).get('ENABLED', True))
+    return {'meta': meta, 'endpoints': results}
+
+
+def compare_reports(baseline, current):
+    """[(endpoint, معیار, مقدار قبلی, مقدار فعلی, درصد تغییر, بدتر شده؟), ...] برای endpoint های مشترک."""
+    rows = []
+    for name in sorted(set(baseline['endpoints']) & set(current['endpoints'])):
+        old, new = baseline['endpoints'][name], current['endpoints'][name]
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if old.get(metric) is None or new.get(metric) is None:
+                continue
+            change = (new[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+            rows.append((name, metric, old[metric], new[metric], round(change, 1),
+                         change < 0 if higher_is_better else change > 0))
+    return rows
@@ -0,0 +1,90 @@
+"""
+read model «کارت فیلم».
+
+هر فیلم/سریال یک MovieCard دارد که خروجی آماده BaseMovieSerializer را نگه می‌دارد؛ لیست‌ها به جای
+کوئری پایه + چهار prefetch + کوئری زیرکلاس‌های polymorphic و سریالایز کردن همه بازیگران، فقط کارت‌های
+صفحه را با یک کوئری روی کلید اصلی می‌خوانند.
+"""
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+
+from .db_routing import primary_alias
+from .models import Movie, MovieCard
+
+
+def cards_enabled():
+    return getattr(settings, 'MOVIE_CARDS_ENABLED', True)
+
+
+def build_card_data(movie_ids, using='default'):
+    """
+    داده کارت‌ها را با خروجی BaseMovieSerializer می‌سازد (از مسیر کامپایل شده movielenz.fast_serializers
+    که همان خروجی را بدون ساختن نمونه‌های مدل تولید می‌کند).
+    """
+    from .fast_serializers import FastMovieSerializer
+
+    compiled = FastMovieSerializer.for_fields()
+    rows = compiled.values(Movie.objects.using(using).non_polymorphic().filter(pk__in=list(movie_ids)))
+    return {card['id']: card for card in compiled.serialize(rows, using=using)}
+
+
+def refresh_cards(movie_ids, using='default'):
+    movie_ids = set(movie_ids)
+    if not movie_ids:
+        return {}
+    data = build_card_data(movie_ids, using=using)
+    MovieCard.objects.using(using).bulk_create(
+        [MovieCard(movie_id=pk, data=card) for pk, card in data.items()],
+        update_conflicts=True,
+        unique_fields=['movie'],
+        update_fields=['data', 'updated_at'],
+    )
+    # فیلم‌هایی که دیگر وجود ندارند
+    missing = movie_ids - set(data)
+    if missing:
+        MovieCard.objects.using(using).filter(movie_id__in=missing).delete()
+    return data
+
+
+def get_cards(movie_ids, using='default'):
+    """
+    کارت‌های فیلم‌های داده شده را به همان ترتیب برمی‌گرداند؛ کارت‌های ساخته نشده همین‌جا ساخته
+    و ذخیره می‌شوند (روی اصلی، حتی اگر using یک replica باشد).
+    """
+    movie_ids = list(movie_ids)
+    cards = dict(MovieCard.objects.using(using).filter(movie_id__in=movie_ids).values_list('movie_id', 'data'))
+    missing = [pk for pk in movie_ids if pk not in cards]
+    if missing:
+        cards.update(refresh_cards(missing, using=primary_alias(using)))
+    return [cards[pk] for pk in movie_ids if pk in cards]
+
+
+async def aget_stored_cards(movie_ids, using='default'):
+    """{شناسه فیلم: داده کارت} فقط برای کارت‌های ذخیره شده (بدون ساختن کارت‌های جا افتاده)."""
+    return {
+        pk: data async for pk, data in
+        MovieCard.objects.using(using).filter(movie_id__in=list(movie_ids)).values_list('movie_id', 'data')
+    }
+
+
+async def aget_cards(movie_ids, using='default'):
+    """نسخه async برای movielenz.async_views؛ کارت‌های ساخته نشده مثل get_cards ساخته می‌شوند."""
+    movie_ids = list(movie_ids)
+    cards = await aget_stored_cards(movie_ids, using=using)
+    missing = [pk for pk in movie_ids if pk not in cards]
+    if missing:
+        cards.update(await sync_to_async(refresh_cards)(missing, using=primary_alias(using)))
+    return [cards[pk] for pk in movie_ids if pk in cards]
+
+
+def get_movie_data(movie_ids, using='default'):
+    """
+    خروجی BaseMovieSerializer فیلم‌های داده شده به همان ترتیب؛ از کارت‌ها یا اگر کارت‌ها خاموش باشند از
+    مسیر کامپایل شده. برای endpoint هایی که فقط یک لیست شناسه را نمایش می‌دهند (مثلا /me/feed/).
+    """
+    if cards_enabled():
+        return get_cards(movie_ids, using=using)
+    from .fast_serializers import FastMovieSerializer
+
+    return FastMovieSerializer.for_fields().serialize_ids(movie_ids, Movie.objects.using(using).non_polymorphic())
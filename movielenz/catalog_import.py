@@ -0,0 +1,556 @@
+"""
+ورود دسته‌ای کاتالوگ (دستور import_catalog).
+
+ردیف‌های یک فایل JSONL یا CSV به صورت جریانی خوانده و در دسته‌های ثابت با bulk_create(update_conflicts=True)
+روی tmdb_id درج/به‌روز می‌شوند؛ ژانرها، بازیگران و کارگردان‌های هر دسته هم به همین شکل upsert می‌شوند و
+ردیف‌های جدول‌های واسط M2M یک‌جا نوشته می‌شوند. Type ها یک بار در هر دسته resolve می‌شوند.
+
+bulk_create سیگنال post_save / m2m_changed نمی‌فرستد، پس ایندکس جستجو، کارت‌ها، ستون‌های تجمیعی
+بازیگران/کارگردان‌ها (celebrity.aggregates) و کش پاسخ در پایان هر دسته صریحا به‌روز می‌شوند.
+
+نمونه ردیف JSONL:
+    {"tmdb_id": 27205, "title": "Inception", "type": "movie", "release_date": "2010-07-16",
+     "genres": [{"tmdb_id": 28, "name": "Action", "translated_genre": "اکشن"}],
+     "actors": [{"tmdb_id": 6193, "name": "Leonardo DiCaprio"}],
+     "directors": [{"tmdb_id": 525, "full_name": "Christopher Nolan"}]}
+
+در CSV ستون‌های genres/actors/directors یا آرایه JSON هستند یا نام‌هایی که با | جدا شده‌اند.
+ردیف سریال با "type": "series" (یا "object_type": "Series") مشخص می‌شود و می‌تواند number_of_seasons،
+episode_count و series_status داشته باشد. سریالی که بعدا بدون نوع series وارد شود به فیلم تبدیل می‌شود.
+"""
+import csv
+import gzip
+import io
+import itertools
+import json
+import sys
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS, NotSupportedError, connections, transaction
+from django.db.models import Q, QuerySet
+from django.utils.text import slugify
+
+from celebrity import aggregates
+from celebrity.models import Actor, Director
+from common.normalization import normalize_text
+
+from . import autocomplete, cards
+from .models import Genre, Movie, Series, Type
+from .resolver import invalidate_movie_resolver
+from .response_cache import invalidate_tags
+
+MOVIE_FIELDS = (
+    'title', 'status', 'release_date', 'description', 'imdb_id', 'imdb_rating', 'duration', 'poster',
+    'trailer', 'production_country', 'language', 'network', 'is_dubbed', 'is_subtitled',
+    'tmdb_user_score', 'tmdb_popularity',
+)
+SERIES_FIELDS = ('number_of_seasons', 'episode_count', 'series_status')
+RELATIONS = ('genres', 'actors', 'directors')
+
+_TRUE = {'1', 't', 'true', 'y', 'yes'}
+_FALSE = {'0', 'f', 'false', 'n', 'no'}
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+# --- خواندن فایل ---
+
+def _open(path):
+    if path == '-':
+        return sys.stdin
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path, 'rb'), encoding='utf-8')
+    return open(path, encoding='utf-8', newline='')
+
+
+def _relation_cell(value):
+    if value is None or isinstance(value, list):
+        return value
+    value = value.strip()
+    if not value:
+        return []
+    if value.startswith('['):
+        return json.loads(value)
+    return [name.strip() for name in value.split('|') if name.strip()]
+
+
+def read_rows(path, format=None):
+    """
+    (شماره خط، ردیف) را به صورت جریانی برمی‌گرداند. ردیف خراب به جای ردیف یک ImportRowError است
+    تا ورود بقیه فایل ادامه پیدا کند.
+    """
+    if format is None:
+        format = 'csv' if path.removesuffix('.gz').endswith('.csv') else 'jsonl'
+    stream = _open(path)
+    try:
+        if format == 'csv':
+            for line_number, row in enumerate(csv.DictReader(stream), start=2):
+                try:
+                    for name in RELATIONS:
+                        if name in row:
+                            row[name] = _relation_cell(row[name])
+                except ValueError as exc:
+                    row = ImportRowError(str(exc))
+                yield line_number, row
+        else:
+            for line_number, line in enumerate(stream, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                    if not isinstance(row, dict):
+                        raise ValueError('expected an object')
+                except ValueError as exc:
+                    row = ImportRowError(str(exc))
+                yield line_number, row
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+# --- تبدیل مقادیر ---
+
+def clean_value(model, name, value):
+    field = model._meta.get_field(name)
+    if isinstance(value, str):
+        value = value.strip()
+        if value == '' and (field.null or field.get_internal_type() != 'CharField'):
+            return None if field.null else field.get_default()
+        if field.get_internal_type() == 'BooleanField':
+            if value.lower() in _TRUE:
+                return True
+            if value.lower() in _FALSE:
+                return False
+    if value is None and not field.null:
+        return field.get_default()
+    try:
+        return field.to_python(value)
+    except ValidationError as exc:
+        raise ImportRowError('%s: %s' % (name, '; '.join(exc.messages)))
+
+
+def clean_tmdb_id(value):
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ImportRowError('tmdb_id: %r' % (value,))
+
+
+class CatalogImporter:
+    def __init__(self, using=DEFAULT_DB_ALIAS, batch_size=1000, refresh=True, stderr=None):
+        self.using = using
+        self.batch_size = batch_size
+        self.refresh = refresh
+        self.stderr = stderr
+        self.type_ids = {}
+        self.movie_ctype_id = ContentType.objects.db_manager(using).get_for_model(Movie, for_concrete_model=False).pk
+        self.series_ctype_id = ContentType.objects.db_manager(using).get_for_model(Series, for_concrete_model=False).pk
+        self.imported = 0
+        self.skipped = 0
+        self.touched_people = {}
+
+    def warn(self, message):
+        if self.stderr is not None:
+            self.stderr.write(message)
+
+    def run(self, rows):
+        for batch in batched(rows, self.batch_size):
+            with transaction.atomic(using=self.using):
+                self.import_batch(batch)
+        if self.imported:
+            # bulk_create سیگنال ندارد؛ ایندکس تکمیل خودکار همه پروسه‌ها یک بار در پایان از نو ساخته می‌شود.
+            autocomplete.invalidate_autocomplete(using=self.using)
+            # عنوان و نوع فیلم‌های موجود هم ممکن است عوض شده باشد.
+            invalidate_movie_resolver(using=self.using)
+        self.refresh_people_movies()
+        return self.imported, self.skipped
+
+    def refresh_people_movies(self):
+        """
+        کارت و پاسخ کش شده فیلم‌ها movie_count و average_rating بازیگران/کارگردان‌ها را هم دارند؛ برای فیلم‌های
+        افراد تغییر کرده یک بار در پایان ورود (نه بعد از هر دسته) برچسب کش باطل و (با refresh) کارت به‌روز می‌شود.
+        """
+        movie_ids = set()
+        for model, person_ids in self.touched_people.items():
+            for chunk in batched(sorted(person_ids), self.batch_size):
+                movie_ids |= aggregates.movie_ids_for(model, chunk, using=self.using)
+        if not movie_ids:
+            return
+        invalidate_tags({'movie:list'} | {'movie:%s' % pk for pk in movie_ids}, using=self.using)
+        if self.refresh and cards.cards_enabled():
+            for chunk in batched(sorted(movie_ids), self.batch_size):
+                cards.refresh_cards(chunk, using=self.using)
+
+    # --- upsert عمومی روی tmdb_id ---
+
+    def upsert(self, model, records, natural_key, update_fields, slug_source=None, nullable_unique=()):
+        """
+        records را (لیست dict مقدار فیلدها) روی tmdb_id upsert می‌کند و تابعی برمی‌گرداند که pk هر record را
+        می‌دهد. ردیف‌های بدون tmdb_id با natural_key (نام یکتا) پیدا یا درج می‌شوند؛ ردیف موجود با همان نام
+        و بدون tmdb_id، tmdb_id ورودی را می‌گیرد. ردیفی که نامش متعلق به tmdb_id دیگری است رد می‌شود.
+        """
+        # QuerySet ساده: bulk_create در PolymorphicQuerySet گزینه update_conflicts را نمی‌پذیرد و
+        # polymorphic_ctype هر ردیف از قبل تعیین شده است.
+        manager = QuerySet(model, using=self.using)
+        if not records:
+            return lambda record: None
+
+        lookup = Q(tmdb_id__in=[r['tmdb_id'] for r in records if r['tmdb_id'] is not None])
+        lookup |= Q(**{'%s__in' % natural_key: [r[natural_key] for r in records]})
+        columns = ['pk', 'tmdb_id', natural_key]
+        if slug_source is not None:
+            for record in records:
+                record['slug'] = slugify(slug_source(record), allow_unicode=True) or None
+            lookup |= Q(slug__in=[r['slug'] for r in records if r['slug']])
+            columns.append('slug')
+        for name in nullable_unique:
+            lookup |= Q(**{'%s__in' % name: [r[name] for r in records if r.get(name)]})
+            columns.append(name)
+        existing = [dict(zip(columns, row)) for row in manager.filter(lookup).values_list(*columns)]
+
+        by_tmdb = {row['tmdb_id']: row for row in existing if row['tmdb_id'] is not None}
+        by_name = {row[natural_key]: row for row in existing}
+        owners = {name: {row[name]: row['pk'] for row in existing if row[name]}
+                  for name in list(nullable_unique) + (['slug'] if slug_source else [])}
+
+        adopted, upserts, inserts = [], [], []
+        claimed = {}
+        for record in records:
+            name = record[natural_key]
+            if name in claimed:
+                # همان نام در این دسته با tmdb_id دیگری آمده است.
+                if record['tmdb_id'] is not None and claimed[name] not in (None, record['tmdb_id']):
+                    self.warn('%s %r: duplicate name in batch, skipped' % (model.__name__, name))
+                continue
+            target = by_tmdb.get(record['tmdb_id']) if record['tmdb_id'] is not None else None
+            named = by_name.get(name)
+            if named is not None and target is not None and named['pk'] != target['pk']:
+                self.warn('%s %r: name belongs to another row, skipped' % (model.__name__, name))
+                continue
+            if target is None and named is not None:
+                if record['tmdb_id'] is None:
+                    continue
+                if named['tmdb_id'] is not None:
+                    self.warn('%s %r: name belongs to tmdb_id %s, skipped' % (model.__name__, name, named['tmdb_id']))
+                    continue
+                adopted.append(model(pk=named['pk'], tmdb_id=record['tmdb_id']))
+                target = named
+            claimed[name] = record['tmdb_id']
+            # مالک ردیف‌های جدید خود record است تا دو ردیف جدید هم با هم تداخل نداشته باشند.
+            owner = target['pk'] if target is not None else id(record)
+
+            for field in nullable_unique:
+                value = record.get(field)
+                if value and owners[field].setdefault(value, owner) != owner:
+                    record[field] = None
+            if slug_source is not None:
+                record['slug'] = target['slug'] if target is not None else self.unique_slug(
+                    manager, record['slug'] or model._meta.model_name, record['tmdb_id'], owners['slug'])
+            (upserts if record['tmdb_id'] is not None else inserts).append(record)
+
+        if adopted:
+            manager.bulk_update(adopted, ['tmdb_id'])
+        if upserts:
+            manager.bulk_create(
+                [model(**record) for record in upserts],
+                update_conflicts=True,
+                unique_fields=['tmdb_id'],
+                update_fields=update_fields,
+            )
+        if inserts:
+            manager.bulk_create([model(**record) for record in inserts])
+
+        rows = manager.filter(
+            Q(tmdb_id__in=[r['tmdb_id'] for r in records if r['tmdb_id'] is not None])
+            | Q(**{'%s__in' % natural_key: [r[natural_key] for r in records]})
+        ).values_list('pk', 'tmdb_id', natural_key)
+        pk_by_tmdb, pk_by_name = {}, {}
+        for pk, tmdb_id, name in rows:
+            if tmdb_id is not None:
+                pk_by_tmdb[tmdb_id] = pk
+            pk_by_name[name] = pk
+
+        def resolve(record):
+            if record['tmdb_id'] is not None and record['tmdb_id'] in pk_by_tmdb:
+                return pk_by_tmdb[record['tmdb_id']]
+            return pk_by_name.get(record[natural_key])
+        return resolve
+
+    @staticmethod
+    def unique_slug(manager, base, tmdb_id, taken):
+        """اسلاگ آزاد؛ در صورت تکرار tmdb_id (یا یک شماره) به انتهای آن اضافه می‌شود."""
+        slug = base
+        if slug in taken and tmdb_id is not None:
+            slug = '%s-%s' % (base, tmdb_id)
+        number = 1
+        while slug in taken or (slug != base and manager.filter(slug=slug).exists()):
+            number += 1
+            slug = '%s-%s' % (base, number)
+        taken[slug] = None
+        return slug
+
+    # --- دسته ---
+
+    def resolve_types(self, slugs):
+        missing = set(slugs) - set(self.type_ids)
+        if missing:
+            self.type_ids.update(Type.objects.using(self.using).filter(slug__in=missing).values_list('slug', 'pk'))
+            for slug in missing - set(self.type_ids):
+                self.type_ids[slug] = Type.objects.db_manager(self.using).create(name=slug, slug=slug).pk
+
+    def person_record(self, model, natural_key, entry):
+        if isinstance(entry, str):
+            entry = {natural_key: entry}
+        name = (entry.get(natural_key) or entry.get('name') or '').strip()
+        if not name:
+            raise ImportRowError('%s without a name' % model.__name__)
+        record = {
+            'tmdb_id': clean_tmdb_id(entry.get('tmdb_id')),
+            natural_key: name,
+            'normalized_name': normalize_text(name),
+        }
+        for field in ('poster', 'popularity'):
+            if field in entry:
+                record[field] = clean_value(model, field, entry[field])
+        return record
+
+    def genre_record(self, entry):
+        if isinstance(entry, str):
+            entry = {'name': entry}
+        name = (entry.get('name') or '').strip()
+        if not name:
+            raise ImportRowError('Genre without a name')
+        translated = (entry.get('translated_genre') or '').strip() or name
+        return {
+            'tmdb_id': clean_tmdb_id(entry.get('tmdb_id')),
+            'name': name,
+            'translated_genre': translated,
+            'normalized_name': normalize_text(name),
+            'normalized_translated_genre': normalize_text(translated),
+        }
+
+    def parse_row(self, row):
+        title = (row.get('title') or '').strip()
+        if not title:
+            raise ImportRowError('title is required')
+        is_series = (str(row.get('object_type') or '').lower() == 'series'
+                     or str(row.get('type') or '').lower() == 'series')
+        record = {name: clean_value(Movie, name, row[name]) for name in MOVIE_FIELDS if name in row}
+        record.update({
+            'title': title,
+            'normalized_title': normalize_text(title),
+            'tmdb_id': clean_tmdb_id(row.get('tmdb_id')),
+            'polymorphic_ctype_id': self.series_ctype_id if is_series else self.movie_ctype_id,
+        })
+        type_slug = 'series' if is_series else (str(row.get('type') or '').strip().lower() or 'movie')
+        series = None
+        if is_series:
+            series = {name: clean_value(Series, name, row[name]) for name in SERIES_FIELDS if name in row}
+        relations = {
+            'genres': [self.genre_record(entry) for entry in row['genres'] or ()] if 'genres' in row else None,
+            'actors': ([self.person_record(Actor, 'name', entry) for entry in row['actors'] or ()]
+                       if 'actors' in row else None),
+            'directors': ([self.person_record(Director, 'full_name', entry) for entry in row['directors'] or ()]
+                          if 'directors' in row else None),
+        }
+        return record, type_slug, series, relations
+
+    def import_batch(self, batch):
+        parsed = []
+        seen = set()
+        for line_number, row in batch:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                record, type_slug, series, relations = self.parse_row(row)
+            except ImportRowError as exc:
+                self.skipped += 1
+                self.warn('line %s: %s' % (line_number, exc))
+                continue
+            key = record['tmdb_id'] if record['tmdb_id'] is not None else record['title']
+            if key in seen:
+                self.skipped += 1
+                self.warn('line %s: duplicate of an earlier row in the batch, skipped' % line_number)
+                continue
+            seen.add(key)
+            parsed.append((record, type_slug, series, relations))
+        if not parsed:
+            return
+
+        self.resolve_types({type_slug for _record, type_slug, _series, _relations in parsed})
+        for record, type_slug, _series, _relations in parsed:
+            record['type_id'] = self.type_ids[type_slug]
+
+        update_fields = sorted({name for record, *_rest in parsed for name in record} - {'tmdb_id', 'slug'})
+        update_fields.append('updated_at')
+        resolve_movie = self.upsert(
+            Movie, [record for record, *_rest in parsed], 'title', update_fields,
+            slug_source=lambda record: record['title'], nullable_unique=('imdb_id',),
+        )
+        movies = [(resolve_movie(record), series, relations) for record, _type_slug, series, relations in parsed]
+        movies = [movie for movie in movies if movie[0] is not None]
+        self.skipped += len(parsed) - len(movies)
+
+        self.import_series([(pk, series) for pk, series, _relations in movies if series is not None])
+        self.drop_series([pk for pk, series, _relations in movies if series is None])
+        people = self.import_relations(movies)
+
+        movie_ids = [pk for pk, _series, _relations in movies]
+        # imdb_rating فیلم‌های به‌روز شده هم در average_rating افرادشان اثر دارد.
+        for model, person_ids in aggregates.people_for(movie_ids, using=self.using).items():
+            people[model] = people.get(model, set()) | person_ids
+        tags = set()
+        for model, person_ids in people.items():
+            changed = aggregates.recompute(model, person_ids, using=self.using)
+            self.touched_people.setdefault(model, set()).update(changed)
+            tags.update('%s:%s' % (model._meta.model_name, pk) for pk in person_ids)
+
+        self.imported += len(movie_ids)
+        if self.refresh:
+            from .signals import refresh_movies
+            refresh_movies(movie_ids, using=self.using)
+        invalidate_tags(
+            {'movie:list', 'genre:list', 'actor:list', 'director:list'} | {'movie:%s' % pk for pk in movie_ids} | tags,
+            using=self.using,
+        )
+
+    def import_series(self, rows):
+        """
+        Series ارث‌بری چند جدولی دارد و bulk_create از آن پشتیبانی نمی‌کند؛ ردیف‌های جدول فرزند با یک
+        INSERT ... ON CONFLICT پارامتری (مثل همان که bulk_create می‌سازد) در دسته‌های batch_size نوشته می‌شوند.
+        """
+        if not rows:
+            return
+        connection = connections[self.using]
+        if not connection.features.supports_update_conflicts_with_target:
+            raise NotSupportedError("Importing series requires INSERT ... ON CONFLICT support.")
+        opts = Series._meta
+        fields = list(opts.local_concrete_fields)
+        # فقط ستون‌هایی که در فایل آمده‌اند به‌روز می‌شوند.
+        update_fields = [opts.get_field(name) for name in SERIES_FIELDS if any(name in values for _pk, values in rows)]
+
+        quote = connection.ops.quote_name
+        columns = ', '.join(quote(field.column) for field in fields)
+        placeholders = '(%s)' % ', '.join(['%s'] * len(fields))
+        if update_fields:
+            on_conflict = 'DO UPDATE SET %s' % ', '.join(
+                '%s = EXCLUDED.%s' % (quote(field.column), quote(field.column)) for field in update_fields
+            )
+        else:
+            on_conflict = 'DO NOTHING'
+        # سقف پارامترهای هر کوئری (مثلا SQLITE_MAX_VARIABLE_NUMBER) هم رعایت می‌شود.
+        batch_size = max(min(self.batch_size, connection.ops.bulk_batch_size(fields, rows)), 1)
+        with connection.cursor() as cursor:
+            for batch in batched(rows, batch_size):
+                params = []
+                for pk, values in batch:
+                    obj = Series(**values)
+                    obj.movie_ptr_id = pk
+                    params.extend(field.get_db_prep_save(getattr(obj, field.attname), connection) for field in fields)
+                cursor.execute(
+                    'INSERT INTO %s (%s) VALUES %s ON CONFLICT (%s) %s' % (
+                        quote(opts.db_table), columns, ', '.join([placeholders] * len(batch)),
+                        quote(opts.pk.column), on_conflict,
+                    ),
+                    params,
+                )
+
+    def drop_series(self, movie_ids):
+        """
+        سریالی که دوباره به عنوان فیلم وارد شده polymorphic_ctype فیلم را گرفته است؛ ردیف جدول فرزند Series آن
+        هم حذف می‌شود (ردیف Movie و قسمت‌هایش می‌مانند). حذف با ORM خود ردیف Movie را هم حذف می‌کرد.
+        """
+        if not movie_ids:
+            return
+        connection = connections[self.using]
+        quote = connection.ops.quote_name
+        opts = Series._meta
+        batch_size = max(connection.ops.bulk_batch_size([opts.pk], movie_ids), 1)
+        with connection.cursor() as cursor:
+            for batch in batched(movie_ids, batch_size):
+                cursor.execute(
+                    'DELETE FROM %s WHERE %s IN (%s)' % (
+                        quote(opts.db_table), quote(opts.pk.column), ', '.join(['%s'] * len(batch)),
+                    ),
+                    batch,
+                )
+
+    def import_relations(self, movies):
+        genre_records = []
+        people_records = {'actors': [], 'directors': []}
+        for _pk, _series, relations in movies:
+            if relations['genres']:
+                genre_records.extend(relations['genres'])
+            for name in people_records:
+                if relations[name]:
+                    people_records[name].extend(relations[name])
+
+        resolvers = {
+            'genres': self.upsert(
+                Genre, self.unique_records(genre_records, 'name'), 'name',
+                ['name', 'translated_genre', 'normalized_name', 'normalized_translated_genre'],
+                slug_source=lambda record: record['translated_genre'],
+            ),
+            'actors': self.upsert(
+                Actor, self.unique_records(people_records['actors'], 'name'), 'name',
+                self.person_update_fields(people_records['actors'], 'name'),
+            ),
+            'directors': self.upsert(
+                Director, self.unique_records(people_records['directors'], 'full_name'), 'full_name',
+                self.person_update_fields(people_records['directors'], 'full_name'),
+            ),
+        }
+
+        people = {}
+        for name, column in (('genres', 'genre_id'), ('actors', 'actor_id'), ('directors', 'director_id')):
+            through = getattr(Movie, name).through
+            movie_ids = [pk for pk, _series, relations in movies if relations[name] is not None]
+            if not movie_ids:
+                continue
+            links = {
+                (pk, resolvers[name](record))
+                for pk, _series, relations in movies if relations[name]
+                for record in relations[name]
+            }
+            existing = through.objects.using(self.using).filter(movie_id__in=movie_ids)
+            if name != 'genres':
+                # ستون‌های تجمیعی افرادی که لینک گرفته یا از دست داده‌اند دوباره حساب می‌شوند.
+                people[through._meta.get_field(column).related_model] = (
+                    set(existing.values_list(column, flat=True)) | {related_pk for _pk, related_pk in links}
+                )
+            existing.delete()
+            through.objects.using(self.using).bulk_create(
+                [through(movie_id=pk, **{column: related_pk}) for pk, related_pk in links if related_pk is not None],
+                batch_size=self.batch_size,
+                ignore_conflicts=True,
+            )
+        return people
+
+    @staticmethod
+    def unique_records(records, natural_key):
+        unique = {}
+        for record in records:
+            key = record['tmdb_id'] if record['tmdb_id'] is not None else record[natural_key]
+            unique.setdefault(key, record)
+        return list(unique.values())
+
+    @staticmethod
+    def person_update_fields(records, natural_key):
+        fields = {natural_key, 'normalized_name'}
+        for record in records:
+            fields.update(record)
+        return sorted(fields - {'tmdb_id'})
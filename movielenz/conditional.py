@@ -0,0 +1,123 @@
+"""
+درخواست‌های شرطی GET (ETag / Last-Modified).
+
+validator ها از یک کوئری aggregate (MAX روی ستون‌های updated_at و COUNT) روی همان queryset فیلتر شده‌ای که
+view نمایش می‌دهد و نسخه برچسب‌های کش پاسخ آن (movielenz.response_cache) ساخته می‌شوند؛ اگر
+If-None-Match / If-Modified-Since کلاینت هنوز معتبر باشد پاسخ 304 بدون سریالایز کردن و بدون کوئری‌های صفحه
+برگردانده می‌شود. زیر cache_response این کار فقط در miss انجام می‌شود و hit ها با ETag ذخیره شده همراه ورودی
+کش، بدون کوئری، 304 می‌گیرند.
+"""
+import functools
+import hashlib
+
+from django.db.models import Count, Max
+from django.db.models.query import EmptyQuerySet
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from rest_framework import status
+
+from .response_cache import tag_versions
+
+
+def queryset_validators(queryset, fields, *extra):
+    """
+    (etag, count, last_modified) را برای queryset برمی‌گرداند. last_modified یک timestamp (ثانیه)
+    است و اگر queryset خالی باشد None است؛ COUNT حذف ردیف‌ها را هم در ETag منعکس می‌کند.
+    """
+    aggregates = {'validator_count': Count('pk', distinct=True)}
+    aggregates.update(('validator_%d' % index, Max(field)) for index, field in enumerate(fields))
+    values = queryset.order_by().aggregate(**aggregates)
+
+    timestamps = [values['validator_%d' % index] for index in range(len(fields))]
+    timestamps = [value for value in timestamps if value is not None]
+    last_modified = int(max(timestamps).timestamp()) if timestamps else None
+
+    raw = '|'.join([str(values['validator_count'])]
+                   + [value.isoformat() for value in timestamps]
+                   + [str(value) for value in extra])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest(), values['validator_count'], last_modified
+
+
+def conditional_response(method):
+    """
+    دکوریتور متدهای GET یک view. validator ها با get_conditional_validators ساخته می‌شوند؛
+    اگر None برگردد (مثلا آبجکت پیدا نشد) متد بدون تغییر اجرا می‌شود.
+    زیر cache_response قرار می‌گیرد تا ETag و Last-Modified همراه پاسخ کش شوند.
+    """
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return method(self, request, *args, **kwargs)
+
+        validators = self.get_conditional_validators(request, *args, **kwargs)
+        if validators is None:
+            return method(self, request, *args, **kwargs)
+        etag, last_modified = validators
+        # validator ها از داده ساخته می‌شوند نه از بایت‌های پاسخ، پس ETag ضعیف است.
+        etag = 'W/%s' % quote_etag(etag)
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = method(self, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+    return wrapper
+
+
+class ConditionalResponseMixin:
+    """
+    validator های پیش‌فرض برای ViewSet ها: در list روی queryset فیلتر شده و در retrieve روی همان
+    آبجکت درخواست شده. validator_fields ستون‌های تاریخ به‌روزرسانی (قابل دنبال کردن با __) هستند.
+    """
+    validator_fields = ('updated_at',)
+
+    def get_validator_queryset(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if getattr(self, 'detail', False):
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def get_validator_tags(self):
+        """
+        برچسب‌های کش پاسخ همین پاسخ (برچسب لیست یا برچسب آبجکت)؛ تغییر ردیف‌های مرتبط (نام بازیگر، ژانر،
+        ...) که در validator_fields دیده نمی‌شود نسخه آن‌ها را عوض می‌کند.
+        """
+        prefix = getattr(self, 'cache_tag_prefix', None)
+        if prefix is None:
+            return []
+        if getattr(self, 'detail', False):
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            return ['%s:%s' % (prefix, self.kwargs[lookup_url_kwarg])]
+        return ['%s:list' % prefix]
+
+    def get_validator_extra(self, request):
+        """
+        مقادیری که نمایش پاسخ به آن‌ها بستگی دارد ولی در داده نیستند
+        (آدرس کامل با query string، staff بودن کاربر، فرمت خروجی، نسخه برچسب‌های کش).
+        """
+        return [
+            request.get_full_path(),
+            'staff' if request.user.is_staff else 'public',
+            request.accepted_renderer.format if getattr(request, 'accepted_renderer', None) else '',
+            sorted(tag_versions(self.get_validator_tags()).items()),
+        ]
+
+    def get_conditional_validators(self, request, *args, **kwargs):
+        queryset = self.get_validator_queryset(request, *args, **kwargs)
+        if isinstance(queryset, EmptyQuerySet):
+            # view خودش پاسخ را مشخص می‌کند (مثلا 404 برای فیلمی که پیدا نشد).
+            return None
+        etag, count, last_modified = queryset_validators(
+            queryset, self.validator_fields, *self.get_validator_extra(request)
+        )
+        if not count and getattr(self, 'detail', False):
+            # retrieve باید 404 خودش را برگرداند.
+            return None
+        return etag, last_modified
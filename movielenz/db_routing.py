@@ -0,0 +1,154 @@
+"""
+مسیریابی خواندن/نوشتن بین پایگاه داده اصلی و replica ها.
+
+همه نوشتن‌ها و به صورت پیش‌فرض همه خواندن‌ها روی default هستند. فقط view هایی که ReplicaReadMixin دارند
+(لیست‌ها و جزئیات کاتالوگ) درخواست‌های GET/HEAD خود را روی یکی از DATABASE_REPLICAS اجرا می‌کنند؛ یک
+replica برای کل درخواست انتخاب می‌شود تا همه کوئری‌های آن یک snapshot را ببینند. view های user_account
+این mixin را ندارند و همیشه از اصلی می‌خوانند.
+
+تاخیر replica: هر درخواستی که چیزی بنویسد (هر db_for_write، از جمله ادمین) تا PIN_SECONDS ثانیه
+کلاینت را به اصلی «سنجاق» می‌کند؛ با یک کوکی برای همان مرورگر/کلاینت و یک کلید در کش جنگو برای همان
+کاربر (کلاینت‌های JWT که کوکی نگه نمی‌دارند)؛ این کلید فقط وقتی همه پروسه‌ها آن را می‌بینند کار می‌کند
+که CACHES مشترک باشد (نه LocMem). داخل تراکنش باز روی اصلی، و برای نمونه‌هایی که از اصلی خوانده
+شده‌اند، خواندن‌ها روی اصلی می‌مانند. کش پاسخ (movielenz.response_cache) خواندن‌های replica را تا
+PIN_SECONDS بعد از آخرین ابطال ذخیره نمی‌کند.
+
+اجرای محلی: با DJANGO_SQLITE_REPLICA یک کپی فایل SQLite به عنوان replica تعریف می‌شود و دستور
+sync_replica آن را از روی اصلی به‌روز می‌کند.
+"""
+import contextvars
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from rest_framework.permissions import SAFE_METHODS
+
+DEFAULTS = {
+    'PIN_SECONDS': 5,
+    'PIN_COOKIE': 'db_pin',
+}
+
+PIN_KEY = 'movielenz:db-pin:user:%s'
+
+# replica انتخاب شده برای درخواست جاری (None یعنی اصلی)
+_replica = contextvars.ContextVar('movielenz_db_replica', default=None)
+# وضعیت نوشتن درخواست جاری که middleware می‌سازد
+_writes = contextvars.ContextVar('movielenz_db_writes', default=None)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'DATABASE_ROUTING', {})}
+
+
+def replica_aliases():
+    return [alias for alias in getattr(settings, 'DATABASE_REPLICAS', ()) if alias in settings.DATABASES]
+
+
+def choose_replica():
+    aliases = replica_aliases()
+    return random.choice(aliases) if aliases else None
+
+
+def primary_alias(using):
+    """alias نوشتن برای داده‌ای که از using خوانده شده (replica ها فقط خواندنی هستند)."""
+    return DEFAULT_DB_ALIAS if using in replica_aliases() else using
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _replica.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db == DEFAULT_DB_ALIAS:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        state = _writes.get()
+        if state is not None:
+            state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replica ها کپی همان داده اصلی هستند.
+        aliases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+def is_pinned(request):
+    if get_config()['PIN_COOKIE'] in request.COOKIES:
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_authenticated and cache.get(PIN_KEY % user.pk))
+
+
+class DatabaseRoutingMiddleware:
+    """نوشتن‌های درخواست را دنبال می‌کند و بعد از آن کلاینت و کاربر را به اصلی سنجاق می‌کند."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state = {'wrote': False}
+        token = _writes.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _writes.reset(token)
+        if state['wrote'] and replica_aliases():
+            self.pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        state = {'wrote': False}
+        token = _writes.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _writes.reset(token)
+        if state['wrote'] and replica_aliases():
+            # request.user ممکن است هنوز از پایگاه داده خوانده نشده باشد.
+            await sync_to_async(self.pin)(request, response)
+        return response
+
+    @staticmethod
+    def pin(request, response):
+        config = get_config()
+        response.set_cookie(config['PIN_COOKIE'], '1', max_age=config['PIN_SECONDS'], httponly=True,
+                            samesite='Lax')
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            cache.set(PIN_KEY % user.pk, True, config['PIN_SECONDS'])
+
+
+class ReplicaReadMixin:
+    """
+    درخواست‌های فقط خواندنی view را (بعد از احراز هویت، تا سنجاق کاربر دیده شود) روی یک replica اجرا
+    می‌کند.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        token = _replica.set(None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _replica.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not is_pinned(request):
+            _replica.set(choose_replica())
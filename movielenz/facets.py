@@ -0,0 +1,70 @@
+"""
+شمارش facet های مرور کاتالوگ.
+
+همه facet ها برای وضعیت فعلی فیلترها با چند کوئری GROUP BY روی زیرکوئری شناسه فیلم‌های فیلتر شده
+حساب می‌شوند؛ تعداد کوئری‌ها ثابت است و به تعداد مقادیر هر facet بستگی ندارد.
+"""
+from django.db.models import Count, Q
+from django.db.models.functions import ExtractYear
+
+from .models import Movie
+
+VALUE_FACETS = ('production_country', 'language')
+BOOLEAN_FACETS = ('is_dubbed', 'is_subtitled')
+
+
+def _sorted(rows):
+    return sorted(rows, key=lambda row: (-row['count'], str(row.get('value', row.get('slug')))))
+
+
+def compute_facets(queryset):
+    """
+    queryset همان queryset فیلتر شده view است؛ فقط شناسه‌هایش به عنوان زیرکوئری استفاده می‌شود.
+    خروجی: {'count': ..., 'facets': {facet: [{..., 'count': n}, ...]}}
+    """
+    movie_ids = queryset.order_by().values('pk')
+    movies = Movie.objects.using(queryset.db).non_polymorphic().filter(pk__in=movie_ids).order_by()
+
+    totals = movies.aggregate(
+        count=Count('pk'),
+        **{'%s_true' % name: Count('pk', filter=Q(**{name: True})) for name in BOOLEAN_FACETS}
+    )
+
+    facets = {}
+
+    genre_links = (Movie.genres.through.objects.using(queryset.db)
+                   .filter(movie_id__in=movie_ids)
+                   .values_list('genre_id', 'genre__slug', 'genre__name')
+                   .annotate(count=Count('movie_id'))
+                   .order_by())
+    facets['genres'] = _sorted(
+        {'id': pk, 'slug': slug, 'name': name, 'count': count} for pk, slug, name, count in genre_links
+    )
+
+    types = (movies.filter(type__isnull=False)
+             .values_list('type_id', 'type__slug', 'type__name')
+             .annotate(count=Count('pk')))
+    facets['type'] = _sorted(
+        {'id': pk, 'slug': slug, 'name': name, 'count': count} for pk, slug, name, count in types
+    )
+
+    years = (movies.filter(release_date__isnull=False)
+             .annotate(value=ExtractYear('release_date'))
+             .values('value')
+             .annotate(count=Count('pk')))
+    facets['release_year'] = sorted(years, key=lambda row: -row['value'])
+
+    for name in VALUE_FACETS:
+        rows = (movies.exclude(**{'%s__isnull' % name: True}).exclude(**{name: ''})
+                .values_list(name)
+                .annotate(count=Count('pk')))
+        facets[name] = _sorted({'value': value, 'count': count} for value, count in rows)
+
+    for name in BOOLEAN_FACETS:
+        true_count = totals['%s_true' % name]
+        facets[name] = [
+            {'value': True, 'count': true_count},
+            {'value': False, 'count': totals['count'] - true_count},
+        ]
+
+    return {'count': totals['count'], 'facets': facets}
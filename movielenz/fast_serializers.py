@@ -0,0 +1,315 @@
+"""
+مسیر سریالایز سریع (فقط خواندنی) برای endpoint های پرحجم.
+
+هر ModelSerializer یک بار «کامپایل» می‌شود: برای هر فیلد خروجی ستون (یا مسیر JOIN) متناظر در .values()
+و تابع تبدیل آن مشخص می‌شود. بعد از آن هر ردیف فقط با چند دسترسی dict به خروجی تبدیل می‌شود؛ نه نمونه
+مدل ساخته می‌شود و نه سریالایزر و فیلدهای DRF برای هر ردیف اجرا می‌شوند. رابطه‌های many (ژانرها، بازیگران،
+کارگردان‌ها) با یک کوئری روی جدول واسط برای کل صفحه خوانده می‌شوند.
+
+خروجی با خروجی سریالایزر DRF یکسان است؛ مقادیری مثل تاریخ و Decimal با همان to_representation فیلد DRF
+تبدیل می‌شوند. دستور benchmark_serializers این یکسانی و سرعت را بررسی می‌کند.
+"""
+import threading
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS
+
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from celebrity.models import Actor, Director
+from celebrity.serializers import ActorSerializer, DirectorSerializer
+
+from . import async_db
+from .instrumentation import SerializePhaseMixin, phase
+from .serializers import BaseMovieSerializer, GenreSerializer
+
+# فیلدهایی که to_representation آن‌ها برای مقدار خوانده شده از پایگاه داده همان مقدار است.
+IDENTITY_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.ReadOnlyField,
+)
+
+
+def fast_serializers_enabled():
+    return getattr(settings, 'FAST_SERIALIZERS_ENABLED', True)
+
+
+def _model_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def _column_getter(column, field):
+    if isinstance(field, IDENTITY_FIELDS):
+        return lambda row, context, get=itemgetter(column): get(row)
+    to_representation = field.to_representation
+
+    def getter(row, context):
+        value = row[column]
+        return None if value is None else to_representation(value)
+    return getter
+
+
+def _nested_getter(null_column, steps):
+    def getter(row, context):
+        if row[null_column] is None:
+            return None
+        return {key: get(row, context) for key, get in steps}
+    return getter
+
+
+class CompiledSerializer:
+    """
+    نسخه کامپایل شده serializer_class. computed برای فیلدهایی است که ستون پایگاه داده ندارند:
+    {نام فیلد: (ستون‌ها، تابعی که مقدار ستون‌ها را می‌گیرد)}.
+    فیلدی که نه ستون است و نه computed و روی یک نمونه خالی مدل AttributeError می‌دهد، مثل DRF
+    (SkipField) از خروجی حذف می‌شود.
+    """
+    serializer_class = None
+    computed = {}
+
+    _compiled = {}
+    _lock = threading.Lock()
+
+    def __init__(self, fields=None):
+        if fields is not None:
+            serializer = self.serializer_class(fields=fields)
+        else:
+            serializer = self.serializer_class()
+        self.model = serializer.Meta.model
+        self.pk_column = self.model._meta.pk.attname
+        self.relations = []
+        self.steps, columns = self.compile(serializer, self.model, prefix='', top_level=True)
+        self.columns = sorted(set(columns) | {self.pk_column})
+
+    @classmethod
+    def for_fields(cls, fields=None):
+        """نمونه کامپایل شده برای یک مجموعه فیلد (کامپایل هر ترکیب فقط یک بار انجام می‌شود)."""
+        key = (cls, frozenset(fields) if fields is not None else None)
+        compiled = cls._compiled.get(key)
+        if compiled is None:
+            with cls._lock:
+                compiled = cls._compiled.get(key)
+                if compiled is None:
+                    compiled = cls._compiled[key] = cls(fields)
+        return compiled
+
+    # --- کامپایل ---
+
+    def compile(self, serializer, model, prefix, top_level=False, computed=None):
+        computed = self.computed if computed is None else computed
+        steps, columns = [], []
+        for key, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            source = '__'.join(field.source_attrs)
+            model_field = _model_field(model, field.source_attrs[0]) if field.source_attrs else None
+
+            if isinstance(field, serializers.ListSerializer):
+                if not top_level or model_field is None or not model_field.many_to_many:
+                    raise ImproperlyConfigured("Cannot compile nested list field '%s'." % key)
+                steps.append((key, self.compile_many(key, model_field, field.child)))
+            elif isinstance(field, serializers.BaseSerializer):
+                if model_field is None or not model_field.many_to_one:
+                    raise ImproperlyConfigured("Cannot compile nested field '%s'." % key)
+                nested_steps, nested_columns = self.compile(
+                    field, model_field.related_model, prefix + source + '__',
+                    computed=compiled_class_for(type(field)).computed,
+                )
+                columns += nested_columns + [prefix + source]
+                steps.append((key, _nested_getter(prefix + source, nested_steps)))
+            elif isinstance(field, serializers.SlugRelatedField):
+                column = '%s%s__%s' % (prefix, source, field.slug_field)
+                columns.append(column)
+                steps.append((key, _column_getter(column, serializers.ReadOnlyField())))
+            elif isinstance(field, serializers.PrimaryKeyRelatedField):
+                column = prefix + source
+                columns.append(column)
+                steps.append((key, _column_getter(column, serializers.ReadOnlyField())))
+            elif model_field is not None and model_field.concrete and not model_field.is_relation \
+                    and len(field.source_attrs) == 1:
+                columns.append(prefix + source)
+                steps.append((key, _column_getter(prefix + source, field)))
+            elif key in computed:
+                needed, function = computed[key]
+                getters = [itemgetter(prefix + column) for column in needed]
+                columns += [prefix + column for column in needed]
+                steps.append((key, lambda row, context, f=function, g=getters: f(*[get(row) for get in g])))
+            else:
+                try:
+                    getattr(model(), field.source_attrs[0])
+                except AttributeError:
+                    # DRF هم این فیلد را حذف می‌کند (SkipField).
+                    continue
+                raise ImproperlyConfigured("Cannot compile field '%s' of %s." % (key, type(serializer).__name__))
+        return steps, columns
+
+    def compile_many(self, key, model_field, child):
+        through = model_field.remote_field.through
+        source_column = model_field.m2m_column_name()
+        target = model_field.m2m_reverse_field_name()
+        child_steps, child_columns = self.compile(
+            child, model_field.related_model, target + '__',
+            computed=compiled_class_for(type(child)).computed,
+        )
+        self.relations.append((key, through, source_column, [source_column] + child_columns, child_steps))
+        return lambda row, context, get=itemgetter(self.pk_column): context[key].get(get(row), [])
+
+    # --- اجرا ---
+
+    def relation_rows(self, relation, pks, using):
+        key, through, source_column, columns, child_steps = relation
+        # رابطه‌ها مدل ordering ندارند؛ ترتیب درج در جدول واسط همان ترتیب prefetch فعلی است.
+        return (through._base_manager.using(using).filter(**{'%s__in' % source_column: pks})
+                .order_by('pk').values(*columns))
+
+    @staticmethod
+    def group_relation(relation, rows):
+        key, through, source_column, columns, child_steps = relation
+        items = {}
+        for row in rows:
+            items.setdefault(row[source_column], []).append(
+                {name: get(row, None) for name, get in child_steps}
+            )
+        return items
+
+    def load_relations(self, pks, using):
+        return {
+            relation[0]: self.group_relation(relation, self.relation_rows(relation, pks, using))
+            for relation in self.relations
+        }
+
+    async def aload_relations(self, pks, using):
+        """نسخه async؛ کوئری رابطه‌ها هم‌زمان اجرا می‌شوند (movielenz.async_db)."""
+        async def rows(relation):
+            return [row async for row in self.relation_rows(relation, pks, using)]
+
+        loaded = await async_db.gather(*[rows(relation) for relation in self.relations])
+        return {
+            relation[0]: self.group_relation(relation, relation_rows)
+            for relation, relation_rows in zip(self.relations, loaded)
+        }
+
+    def values(self, queryset):
+        """
+        queryset را به ردیف‌های values() با ستون‌های لازم تبدیل می‌کند. ستون‌های خود مدل همگی خوانده
+        می‌شوند تا صفحه‌بندی (مثلا کلیدهای keyset) هم روی ردیف‌ها کار کند.
+        """
+        own = [field.attname for field in self.model._meta.concrete_fields]
+        return queryset.prefetch_related(None).values(*dict.fromkeys(own + self.columns))
+
+    def serialize(self, rows, using=DEFAULT_DB_ALIAS):
+        rows = list(rows)
+        context = self.load_relations([row[self.pk_column] for row in rows], using) if self.relations else {}
+        return self.serialize_context(rows, context)
+
+    def serialize_context(self, rows, context):
+        steps = self.steps
+        return [{key: get(row, context) for key, get in steps} for row in rows]
+
+    async def aserialize(self, rows, using=DEFAULT_DB_ALIAS):
+        context = await self.aload_relations([row[self.pk_column] for row in rows], using) if self.relations else {}
+        with phase('serialize'):
+            return self.serialize_context(rows, context)
+
+    def serialize_ids(self, pks, queryset):
+        """ردیف‌های pks را به همان ترتیب از queryset می‌خواند و سریالایز می‌کند."""
+        pks = list(pks)
+        rows = {row[self.pk_column]: row for row in self.values(queryset.filter(pk__in=pks))}
+        return self.serialize([rows[pk] for pk in pks if pk in rows], using=queryset.db)
+
+
+_registry = {}
+
+
+def register(compiled_class):
+    _registry[compiled_class.serializer_class] = compiled_class
+    return compiled_class
+
+
+def compiled_class_for(serializer_class):
+    for klass in serializer_class.__mro__:
+        if klass in _registry:
+            return _registry[klass]
+    return CompiledSerializer
+
+
+class FastListMixin(SerializePhaseMixin):
+    """
+    list را با سریالایزر کامپایل شده (compiled_serializer_class) پاسخ می‌دهد؛ صفحه‌بندی روی ردیف‌های
+    values() انجام می‌شود. اگر get_compiled_serializer None برگرداند همان list معمولی DRF اجرا می‌شود.
+    """
+    compiled_serializer_class = None
+
+    def get_compiled_serializer(self):
+        if self.compiled_serializer_class is None or not fast_serializers_enabled():
+            return None
+        if self.get_serializer_class() is not self.compiled_serializer_class.serializer_class:
+            return None
+        return self.compiled_serializer_class.for_fields()
+
+    def compiled_response(self, compiled, queryset, paginate=True):
+        rows = compiled.values(queryset)
+        page = self.paginate_queryset(rows) if paginate else None
+        with phase('serialize'):
+            data = compiled.serialize(page if page is not None else rows, using=rows.db)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def list(self, request, *args, **kwargs):
+        compiled = self.get_compiled_serializer()
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+        return self.compiled_response(compiled, self.filter_queryset(self.get_queryset()))
+
+
+# --- سریالایزرهای کامپایل شده ---
+
+def _object_types():
+    from django.contrib.contenttypes.models import ContentType
+
+    return {
+        content_type.pk: content_type.model_class().__name__
+        for content_type in ContentType.objects.filter(app_label='movielenz')
+        if content_type.model_class() is not None
+    }
+
+
+def _object_type(ctype_id):
+    try:
+        return _object_type.names[ctype_id]
+    except (AttributeError, KeyError):
+        _object_type.names = _object_types()
+        return _object_type.names[ctype_id]
+
+
+@register
+class FastActorSerializer(CompiledSerializer):
+    serializer_class = ActorSerializer
+    computed = {'get_role': ((), Actor().get_role)}
+
+
+@register
+class FastDirectorSerializer(CompiledSerializer):
+    serializer_class = DirectorSerializer
+    computed = {'get_role': ((), Director().get_role)}
+
+
+@register
+class FastGenreSerializer(CompiledSerializer):
+    serializer_class = GenreSerializer
+
+
+@register
+class FastMovieSerializer(CompiledSerializer):
+    serializer_class = BaseMovieSerializer
+    # object_type نام کلاس واقعی (Movie یا Series) است که از polymorphic_ctype خوانده می‌شود.
+    computed = {'object_type': (('polymorphic_ctype_id',), _object_type)}
@@ -0,0 +1,81 @@
+import django_filters
+from rest_framework import filters
+
+from common.normalization import normalize_text
+
+from .models import Movie
+from .search import get_search_backend
+from .type_tree import type_subtree_q
+
+
+class NormalizedSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter روی ستون‌های normalized_*: کل عبارت جستجو با همان normalize_text یکسان‌سازی می‌شود. ستون‌ها
+    از قبل یکسان‌سازی (و کوچک) شده‌اند، پس lookup ها حساس به حروف هستند: normalized_name__contains برای
+    جستجوی «شامل»، و پیشوندهای ^ و = به جای istartswith/iexact به startswith/exact نگاشت می‌شوند.
+    """
+    lookup_prefixes = {
+        **filters.SearchFilter.lookup_prefixes,
+        '^': 'startswith',
+        '=': 'exact',
+    }
+
+    def get_search_terms(self, request):
+        # کل عبارت یک عبارت واحد است تا «علی کر» بخشی از «علی کریمی» حساب شود.
+        term = normalize_text(request.query_params.get(self.search_param, ''))
+        return [term] if term else []
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    ?search= را از ایندکس متن کامل (movielenz.search) پاسخ می‌دهد: جدول جستجو در همان کوئری JOIN می‌شود
+    (به جای JOIN روی بازیگران و کارگردان‌ها و LIKE).
+    اگر ?ordering= داده نشده باشد نتایج به ترتیب امتیاز جستجو مرتب می‌شوند.
+    اگر ایندکس در دسترس نباشد همان رفتار SearchFilter (icontains روی search_fields) اجرا می‌شود.
+    """
+    ordering_param = filters.OrderingFilter.ordering_param
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not query.strip():
+            return queryset
+
+        backend = get_search_backend(queryset.db, populated=True)
+        if backend is None:
+            return super().filter_queryset(request, queryset, view)
+
+        queryset = backend.filter_queryset(queryset, query)
+        if not request.query_params.get(self.ordering_param):
+            queryset = queryset.order_by('search_rank', 'pk')
+        return queryset
+
+
+class CharInFilter(django_filters.BaseInFilter, django_filters.CharFilter):
+    pass
+
+
+class MovieFilterSet(django_filters.FilterSet):
+    """
+    فیلترهای لیست فیلم‌ها. فیلتر نوع کل زیردرخت را شامل می‌شود (type__slug=series سریال‌های انواع فرزند
+    را هم برمی‌گرداند) و از کش درخت Type (movielenz.type_tree) استفاده می‌کند.
+    """
+    type__slug = django_filters.CharFilter(method='filter_type_subtree')
+    type__slug__in = CharInFilter(method='filter_type_subtree')
+
+    class Meta:
+        model = Movie
+        fields = {
+            'release_date': ['exact', 'year', 'year__gte', 'year__lte', 'month', 'day'],
+            'status': ['exact'],
+            'is_dubbed': ['exact'],
+            'is_subtitled': ['exact'],
+            'genres__slug': ['exact', 'in'],
+            'imdb_rating': ['gte', 'lte', 'exact'],
+            'production_country': ['iexact', 'icontains'],
+            'language': ['iexact', 'icontains'],
+        }
+
+    def filter_type_subtree(self, queryset, name, value):
+        if not value:
+            return queryset
+        return queryset.filter(type_subtree_q(value, using=queryset.db))
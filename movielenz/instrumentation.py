@@ -0,0 +1,350 @@
+"""
+اندازه‌گیری هر درخواست: تعداد کوئری‌ها، زمان SQL، زمان سریالایز، زمان کل و حجم پاسخ.
+
+InstrumentationMiddleware این مقادیر را
+- در هدر Server-Timing پاسخ می‌گذارد (db، app، serialize، total)،
+- برای هر view (view_name و متد) در حافظه پروسه جمع می‌کند تا metrics_view آن‌ها را با فرمت متنی
+  Prometheus در /metrics/ برگرداند.
+
+زمان serialize جمع زمان رندر پاسخ (response.render) و بلوک‌های phase('serialize') داخل view است (مثلا
+FastListMixin، یا serializer.data سریالایزرهای DRF با serializer_data و SerializePhaseMixin). phase زمان SQL
+داخل خودش را کم می‌کند، پس SQL فقط در db شمرده می‌شود.
+
+Server-Timing به صورت پیش‌فرض فقط برای staff فرستاده می‌شود و /metrics/ بدون METRICS_TOKEN فقط با
+DEBUG در دسترس است (404).
+
+آمار درخواست جاری در یک ContextVar است و یک execute_wrapper دائمی (که هنگام باز شدن هر اتصال با سیگنال
+connection_created نصب می‌شود) کوئری‌ها را در آن می‌شمارد؛ بنابراین middleware هم در WSGI و هم در ASGI
+(از جمله کوئری‌های async ORM که در thread های sync_to_async اجرا می‌شوند) کار می‌کند.
+
+هزینه: دو perf_counter برای هر کوئری و یک قفل کوتاه برای جمع کردن آمار در پایان درخواست. آمار هر پروسه
+جداست؛ Prometheus باید همه پروسه‌ها را scrape کند.
+"""
+import contextvars
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    # 'all'، 'staff' یا 'off'
+    'SERVER_TIMING': 'staff',
+    # درخواستی با کوئری بیشتر از این مقدار (احتمال N+1) در لاگ هشدار داده می‌شود.
+    'QUERY_WARNING': 50,
+    # /metrics/ فقط با هدر «Authorization: Bearer <token>» جواب می‌دهد؛ بدون آن فقط با DEBUG.
+    'METRICS_TOKEN': None,
+}
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+_current = contextvars.ContextVar('movielenz_request_stats', default=None)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'INSTRUMENTATION', {})}
+
+
+class RequestStats:
+    __slots__ = ('queries', 'sql_time', 'phases', 'lock')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.phases = {}
+        # کوئری‌های هم‌زمان یک درخواست async روی چند thread اجرا می‌شوند.
+        self.lock = threading.Lock()
+
+    def add_query(self, duration):
+        with self.lock:
+            self.sql_time += duration
+            self.queries += 1
+
+
+def count_queries(execute, sql, params, many, context):
+    # execute_wrapper دائمی همه اتصال‌ها
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(time.perf_counter() - start)
+
+
+@receiver(connection_created, dispatch_uid='movielenz.instrumentation')
+def install_query_counter(sender, connection, **kwargs):
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+@contextmanager
+def phase(name):
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    start, sql_start = time.perf_counter(), stats.sql_time
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start - (stats.sql_time - sql_start)
+        stats.phases[name] = stats.phases.get(name, 0.0) + elapsed
+
+
+def serializer_data(serializer):
+    """serializer.data؛ زمان ساختن آن (بدون SQL) در phase('serialize') شمرده می‌شود نه در app."""
+    with phase('serialize'):
+        return serializer.data
+
+
+class SerializePhaseMixin:
+    """list و retrieve معمولی DRF که serializer.data را با serializer_data می‌سازند."""
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer_data(self.get_serializer(page, many=True)))
+        return Response(serializer_data(self.get_serializer(queryset, many=True)))
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(serializer_data(self.get_serializer(self.get_object())))
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'total')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+
+class ViewMetrics:
+    __slots__ = ('requests', 'errors', 'duration', 'queries', 'sql_seconds', 'response_bytes', 'phases')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.sql_seconds = 0.0
+        self.response_bytes = 0
+        self.phases = {}
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def record(self, key, status_code, duration, stats, size):
+        with self.lock:
+            metrics = self.views.get(key)
+            if metrics is None:
+                metrics = self.views[key] = ViewMetrics()
+            metrics.requests += 1
+            if status_code >= 500:
+                metrics.errors += 1
+            metrics.duration.observe(duration)
+            metrics.queries.observe(stats.queries)
+            metrics.sql_seconds += stats.sql_time
+            metrics.response_bytes += size
+            for name, value in stats.phases.items():
+                metrics.phases[name] = metrics.phases.get(name, 0.0) + value
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+
+    def render(self):
+        """آمار را با فرمت متنی Prometheus (نسخه 0.0.4) برمی‌گرداند."""
+        with self.lock:
+            views = sorted(self.views.items())
+            lines = []
+
+            def family(name, kind, help_text, samples):
+                lines.append('# HELP %s %s' % (name, help_text))
+                lines.append('# TYPE %s %s' % (name, kind))
+                lines.extend(samples)
+
+            def labels(key, **extra):
+                view, method = key
+                pairs = [('view', view), ('method', method)] + sorted(extra.items())
+                return '{%s}' % ','.join('%s="%s"' % (name, _escape(value)) for name, value in pairs)
+
+            def histogram(name, help_text, attribute):
+                samples = []
+                for key, metrics in views:
+                    histogram = getattr(metrics, attribute)
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                        cumulative += count
+                        samples.append('%s_bucket%s %d' % (name, labels(key, le=_number(bound)), cumulative))
+                    samples.append('%s_sum%s %s' % (name, labels(key), _number(histogram.total)))
+                    samples.append('%s_count%s %d' % (name, labels(key), cumulative))
+                family(name, 'histogram', help_text, samples)
+
+            family('movie_api_requests_total', 'counter', 'Requests handled per view.',
+                   ['movie_api_requests_total%s %d' % (labels(key), metrics.requests) for key, metrics in views])
+            family('movie_api_request_errors_total', 'counter', 'Responses with a 5xx status per view.',
+                   ['movie_api_request_errors_total%s %d' % (labels(key), metrics.errors) for key, metrics in views])
+            histogram('movie_api_request_duration_seconds', 'Request duration per view.', 'duration')
+            histogram('movie_api_db_queries', 'Database queries per request.', 'queries')
+            family('movie_api_db_seconds_total', 'counter', 'Time spent in SQL per view.',
+                   ['movie_api_db_seconds_total%s %s' % (labels(key), _number(metrics.sql_seconds))
+                    for key, metrics in views])
+            family('movie_api_response_bytes_total', 'counter', 'Response body bytes per view.',
+                   ['movie_api_response_bytes_total%s %d' % (labels(key), metrics.response_bytes)
+                    for key, metrics in views])
+            family('movie_api_phase_seconds_total', 'counter',
+                   'Time spent outside SQL in instrumented phases (serialize, ...) per view.',
+                   ['movie_api_phase_seconds_total%s %s' % (labels(key, phase=name), _number(value))
+                    for key, metrics in views for name, value in sorted(metrics.phases.items())])
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if isinstance(value, str):
+        return value
+    return repr(float(value))
+
+
+registry = Registry()
+
+
+def view_key(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return ('<unresolved>', request.method)
+    return (match.view_name or match._func_path, request.method)
+
+
+class InstrumentationMiddleware:
+    """باید اولین middleware باشد تا زمان و کوئری‌های همه middleware های بعدی را هم ببیند."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        config = get_config()
+        if not config['ENABLED']:
+            return self.get_response(request)
+
+        stats, token, start = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, stats, start, config, self.show_header(request, config))
+        return response
+
+    async def __acall__(self, request):
+        config = get_config()
+        if not config['ENABLED']:
+            return await self.get_response(request)
+
+        stats, token, start = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        show_header = config['SERVER_TIMING'] == 'all'
+        if config['SERVER_TIMING'] == 'staff':
+            # request.user ممکن است هنوز از پایگاه داده خوانده نشده باشد.
+            show_header = await sync_to_async(self.show_header)(request, config)
+        self.finish(request, response, stats, start, config, show_header)
+        return response
+
+    @staticmethod
+    def start(request):
+        stats = RequestStats()
+        request._instrumentation_render_start = None
+        return stats, _current.set(stats), time.perf_counter()
+
+    @staticmethod
+    def finish(request, response, stats, start, config, show_header):
+        end = time.perf_counter()
+        render_start = request._instrumentation_render_start
+        if render_start is not None:
+            stats.phases['serialize'] = stats.phases.get('serialize', 0.0) + end - render_start
+        duration = end - start
+        size = len(response.content) if not response.streaming else 0
+        key = view_key(request)
+        if key[0] != 'metrics':
+            registry.record(key, response.status_code, duration, stats, size)
+
+        if stats.queries > config['QUERY_WARNING']:
+            logger.warning('%s %s ran %d queries (%.1f ms SQL)', request.method, request.path, stats.queries,
+                           stats.sql_time * 1000)
+        if show_header:
+            response['Server-Timing'] = server_timing(stats, duration)
+
+    def process_template_response(self, request, response):
+        # درست قبل از response.render() (رندر Response های DRF) صدا زده می‌شود.
+        request._instrumentation_render_start = time.perf_counter()
+        return response
+
+    @staticmethod
+    def show_header(request, config):
+        mode = config['SERVER_TIMING']
+        if mode == 'all':
+            return True
+        if mode == 'staff':
+            user = getattr(request, 'user', None)
+            return bool(user is not None and user.is_staff)
+        return False
+
+
+def server_timing(stats, duration):
+    phases = dict(stats.phases)
+    phases.setdefault('serialize', 0.0)
+    app = max(duration - stats.sql_time - sum(phases.values()), 0.0)
+    entries = [
+        'db;dur=%.2f;desc="%d queries"' % (stats.sql_time * 1000, stats.queries),
+        'app;dur=%.2f' % (app * 1000),
+    ]
+    entries.extend('%s;dur=%.2f' % (name, value * 1000) for name, value in sorted(phases.items()))
+    entries.append('total;dur=%.2f' % (duration * 1000))
+    return ', '.join(entries)
+
+
+def metrics_view(request):
+    """/metrics/ برای Prometheus؛ با METRICS_TOKEN محافظت می‌شود و بدون آن فقط با DEBUG باز است."""
+    token = get_config()['METRICS_TOKEN']
+    if not token:
+        if not settings.DEBUG:
+            raise Http404
+    elif request.headers.get('Authorization') != 'Bearer %s' % token:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,128 @@
+import json
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from django.test.utils import override_settings
+
+from movielenz.benchmark import (
+    HttpTransport, InProcessTransport, compare_reports, discover_endpoints, run_benchmark,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "endpoint های عمومی را با درخواست‌های هم‌زمان اجرا می‌کند و p50/p95/p99، throughput و تعداد کوئری هر "
+        "کدام را در یک گزارش JSON می‌نویسد؛ با --compare گزارش را با گزارش قبلی (مثلا commit دیگر) مقایسه می‌کند."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="تعداد درخواست هر endpoint.")
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--warmup', type=int, default=5, help="درخواست‌های بدون اندازه‌گیری قبل از هر endpoint.")
+        parser.add_argument(
+            '--base-url',
+            help="آدرس سرور در حال اجرا (مثلا http://127.0.0.1:8000)؛ بدون آن درخواست‌ها در همین پروسه اجرا می‌شوند.",
+        )
+        parser.add_argument('--endpoint', action='append', dest='endpoints', help="فقط این endpoint ها (تکرارپذیر).")
+        parser.add_argument('--email', help="کاربر برای endpoint های نیازمند ورود (me، feed، history و ...).")
+        parser.add_argument('--password', help="رمز عبور --email برای ورود با JWT در حالت --base-url.")
+        parser.add_argument('--output', default='benchmark-report.json')
+        parser.add_argument('--compare', help="گزارش قبلی برای مقایسه.")
+        parser.add_argument(
+            '--fail-threshold', type=float,
+            help="اگر p95 یک endpoint بیش از این درصد بدتر شده باشد دستور با خطا تمام می‌شود.",
+        )
+        parser.add_argument('--list', action='store_true', help="فقط endpoint ها را نشان می‌دهد.")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--requests and --concurrency must be positive.")
+        baseline = self.load_report(options['compare']) if options['compare'] else None
+
+        endpoints = discover_endpoints(using=using, authenticated=bool(options['email']))
+        if options['endpoints']:
+            unknown = set(options['endpoints']) - {endpoint.name for endpoint in endpoints}
+            if unknown:
+                raise CommandError("Unknown endpoints: %s." % ', '.join(sorted(unknown)))
+            endpoints = [endpoint for endpoint in endpoints if endpoint.name in options['endpoints']]
+        if options['list']:
+            for endpoint in endpoints:
+                self.stdout.write("%-22s %s" % (endpoint.name, endpoint.path))
+            return
+
+        transport = self.get_transport(options, using)
+        self.stdout.write("%-22s %8s %8s %8s %8s %9s %7s %6s" % (
+            'endpoint', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms', 'req/s', 'queries', 'errors'))
+        # تعداد کوئری‌ها از هدر Server-Timing خوانده می‌شود که به صورت پیش‌فرض فقط برای staff است؛ در همین
+        # پروسه برای همه فعال می‌شود. سرور --base-url باید SERVER_TIMING = 'all' داشته باشد (یا --email یک staff).
+        server_timing = nullcontext()
+        if isinstance(transport, InProcessTransport):
+            server_timing = override_settings(
+                INSTRUMENTATION={**getattr(settings, 'INSTRUMENTATION', {}), 'SERVER_TIMING': 'all'})
+        with server_timing:
+            report = run_benchmark(
+                transport, endpoints,
+                requests=options['requests'], concurrency=options['concurrency'], warmup=options['warmup'],
+                using=using, progress=self.print_result,
+            )
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+        self.stdout.write(self.style.SUCCESS("Report written to %s." % options['output']))
+
+        if baseline is not None:
+            self.print_comparison(baseline, report, options['fail_threshold'])
+
+    def get_transport(self, options, using):
+        if options['base_url']:
+            try:
+                transport = HttpTransport(options['base_url'])
+                if options['email']:
+                    if not options['password']:
+                        raise CommandError("--password is required with --email and --base-url.")
+                    transport.login(options['email'], options['password'])
+            except (OSError, ValueError) as exc:
+                raise CommandError(exc)
+            return transport
+
+        user = None
+        if options['email']:
+            from user_account.models import User
+
+            user = User.objects.using(using).filter(email=options['email']).first()
+            if user is None:
+                raise CommandError("No user with email %s." % options['email'])
+        return InProcessTransport(user=user)
+
+    def load_report(self, path):
+        try:
+            with open(path, encoding='utf-8') as report:
+                return json.load(report)
+        except (OSError, ValueError) as exc:
+            raise CommandError("Cannot read %s: %s" % (path, exc))
+
+    def print_result(self, endpoint, result):
+        def value(name, template='%8.2f'):
+            return template % result[name] if result[name] is not None else ' ' * (len(template % 0))
+
+        self.stdout.write("%-22s %s %s %s %s %s %s %6d" % (
+            endpoint.name, value('p50_ms'), value('p95_ms'), value('p99_ms'), value('max_ms'),
+            value('throughput_rps', '%9.1f'), value('queries_mean', '%7.1f'), result['errors'],
+        ))
+        for message, count in result['exceptions'].items():
+            self.stderr.write("  %dx %s" % (count, message))
+
+    def print_comparison(self, baseline, report, threshold):
+        self.stdout.write("\nCompared with %s (%s):" % (
+            baseline['meta'].get('revision') or '?', baseline['meta'].get('created_at', '?')))
+        regressions = []
+        for name, metric, old, new, change, worse in compare_reports(baseline, report):
+            line = "%-22s %-15s %10s -> %-10s %+7.1f%%" % (name, metric, old, new, change)
+            self.stdout.write(self.style.WARNING(line) if worse and abs(change) >= 5 else line)
+            if metric == 'p95_ms' and threshold is not None and worse and change > threshold:
+                regressions.append(name)
+        if regressions:
+            raise CommandError("p95 regressed by more than %s%% on: %s." % (threshold, ', '.join(regressions)))
@@ -0,0 +1,76 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from celebrity.models import Actor, Director
+from movielenz.fast_serializers import (
+    FastActorSerializer, FastDirectorSerializer, FastGenreSerializer, FastMovieSerializer,
+)
+from movielenz.models import Genre, Movie
+
+
+def _normalize(data):
+    return json.loads(json.dumps(data, cls=JSONEncoder))
+
+
+class Command(BaseCommand):
+    help = (
+        "سریالایزرهای DRF و مسیر کامپایل شده movielenz.fast_serializers را روی داده فعلی مقایسه می‌کند: "
+        "یکسان بودن خروجی و زمان هر کدام."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=500, help="تعداد ردیف هر مدل.")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using, limit, repeat = options['database'], options['limit'], options['repeat']
+        cases = [
+            ('movie', FastMovieSerializer,
+             Movie.objects.using(using).with_subclasses().order_by('-created_at', '-id')
+             .select_related('type__parent').prefetch_related('genres', 'actors', 'directors')),
+            ('actor', FastActorSerializer, Actor.objects.using(using).order_by('id')),
+            ('director', FastDirectorSerializer, Director.objects.using(using).order_by('id')),
+            ('genre', FastGenreSerializer, Genre.objects.using(using).order_by('id')),
+        ]
+
+        mismatches = 0
+        for name, compiled_class, queryset in cases:
+            queryset = queryset[:limit]
+            compiled = compiled_class.for_fields()
+
+            def drf():
+                return compiled_class.serializer_class(queryset.all(), many=True).data
+
+            def fast():
+                return compiled.serialize(compiled.values(queryset.all()), using=using)
+
+            expected, actual = _normalize(drf()), _normalize(fast())
+            if expected != actual:
+                mismatches += 1
+                self.stderr.write(self.style.ERROR("%s: compiled output differs from the DRF serializer." % name))
+
+            drf_time = self.measure(drf, repeat)
+            fast_time = self.measure(fast, repeat)
+            self.stdout.write("%-9s rows=%-6d drf=%8.2fms  compiled=%8.2fms  speedup=%.1fx" % (
+                name, len(expected), drf_time * 1000, fast_time * 1000,
+                drf_time / fast_time if fast_time else 0,
+            ))
+
+        if mismatches:
+            raise CommandError("%d serializer(s) produced different output." % mismatches)
+
+    def measure(self, function, repeat):
+        # بهترین زمان از چند اجرا (هر اجرا کوئری‌ها را دوباره اجرا می‌کند).
+        best = None
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            function()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from movielenz.similarity import build_neighbors, store_neighbors
+
+
+class Command(BaseCommand):
+    help = (
+        "ایندکس عنوان‌های مشابه (SimilarMovies) را از تعامل‌های کاربران و ژانر/بازیگر/کارگردان مشترک "
+        "از نو می‌سازد."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, help="تعداد همسایه‌های ذخیره شده برای هر فیلم.")
+        parser.add_argument('--max-df', type=int, help="ستون‌هایی با بیش از این تعداد فیلم در جفت‌ها شرکت نمی‌کنند.")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        start = time.perf_counter()
+        neighbors = build_neighbors(using=using, top_k=options['top_k'], max_df=options['max_df'])
+        store_neighbors(neighbors, using=using)
+        self.stdout.write(self.style.SUCCESS("Indexed %d titles (%d with neighbors) in %.1fs." % (
+            len(neighbors), sum(1 for items in neighbors.values() if items), time.perf_counter() - start,
+        )))
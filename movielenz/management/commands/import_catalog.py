@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from movielenz.catalog_import import CatalogImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "فیلم‌ها و سریال‌ها را از یک فایل JSONL یا CSV (یا .gz آن‌ها، یا - برای stdin) به صورت دسته‌ای "
+        "وارد می‌کند؛ ردیف‌ها روی tmdb_id درج یا به‌روز می‌شوند."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['jsonl', 'csv'])
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--no-refresh', action='store_true',
+            help="ایندکس جستجو و کارت‌ها به‌روز نمی‌شوند؛ بعد از ورود rebuild_search_index و "
+                 "rebuild_movie_cards را اجرا کنید.",
+        )
+
+    def handle(self, *args, **options):
+        if options['path'] != '-' and options['format'] is None and not options['path'].removesuffix('.gz').endswith(
+                ('.csv', '.jsonl', '.ndjson', '.json')):
+            raise CommandError("Cannot detect the file format; pass --format.")
+
+        importer = CatalogImporter(
+            using=options['database'],
+            batch_size=options['batch_size'],
+            refresh=not options['no_refresh'],
+            stderr=self.stderr if options['verbosity'] > 0 else None,
+        )
+        try:
+            imported, skipped = importer.run(read_rows(options['path'], options['format']))
+        except OSError as exc:
+            raise CommandError(exc)
+        self.stdout.write(self.style.SUCCESS("Imported %d titles, skipped %d rows." % (imported, skipped)))
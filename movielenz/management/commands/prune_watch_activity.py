@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from movielenz.trending import prune
+
+
+class Command(BaseCommand):
+    help = "سطل‌های ساعتی فعالیت تماشا (WatchActivityBucket) قدیمی‌تر از بزرگ‌ترین بازه trending را حذف می‌کند."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-hours', type=int, help="پیش‌فرض: طول بزرگ‌ترین بازه در تنظیمات TRENDING.")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        deleted = prune(keep_hours=options['keep_hours'], using=options['database'])
+        self.stdout.write(self.style.SUCCESS("Deleted %d activity buckets." % deleted))
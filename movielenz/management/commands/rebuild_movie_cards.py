@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from movielenz.cards import refresh_cards
+from movielenz.models import Movie, MovieCard
+
+
+class Command(BaseCommand):
+    help = "کارت‌های آماده نمایش (MovieCard) همه فیلم‌ها و سریال‌ها را از نو می‌سازد."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        batch_size = options['batch_size']
+
+        movie_ids = list(Movie.objects.using(using).non_polymorphic().order_by('pk').values_list('pk', flat=True))
+        MovieCard.objects.using(using).exclude(movie_id__in=Movie.objects.using(using).values('pk')).delete()
+        for start in range(0, len(movie_ids), batch_size):
+            refresh_cards(movie_ids[start:start + batch_size], using=using)
+        self.stdout.write(self.style.SUCCESS("Rebuilt %d movie cards." % len(movie_ids)))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from movielenz.models import Movie
+from movielenz.search import build_documents, get_search_backend
+
+
+class Command(BaseCommand):
+    help = "ایندکس متن کامل فیلم‌ها و سریال‌ها را از نو می‌سازد."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        batch_size = options['batch_size']
+        backend = get_search_backend(using)
+        if backend is None:
+            raise CommandError("Full-text search index is not available on database '%s'." % using)
+
+        movie_ids = list(Movie.objects.using(using).non_polymorphic().order_by('pk').values_list('pk', flat=True))
+        with transaction.atomic(using=using):
+            backend.clear()
+            for start in range(0, len(movie_ids), batch_size):
+                backend.write_documents(build_documents(movie_ids[start:start + batch_size], using=using))
+        self.stdout.write(self.style.SUCCESS("Indexed %d movies." % len(movie_ids)))
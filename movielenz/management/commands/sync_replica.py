@@ -0,0 +1,78 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.models import Max
+
+from celebrity.models import Actor, Director
+from episode.models import Episode, EpisodeQuality
+from movielenz.db_routing import replica_aliases
+from movielenz.models import Genre, Movie, MovieCard
+
+CHECKED_MODELS = (Movie, MovieCard, Genre, Actor, Director, Episode, EpisodeQuality)
+
+
+class Command(BaseCommand):
+    help = (
+        "replica های SQLite محلی (DATABASE_REPLICAS) را با backup آنلاین از روی پایگاه داده اصلی کپی می‌کند؛ "
+        "با --check فقط عقب بودن replica ها را (تعداد ردیف و آخرین updated_at) گزارش می‌دهد."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--replica', action='append', dest='replicas', help="فقط این alias (تکرارپذیر).")
+        parser.add_argument('--check', action='store_true')
+
+    def handle(self, *args, **options):
+        aliases = replica_aliases()
+        if not aliases:
+            raise CommandError("No replicas configured (DATABASE_REPLICAS / DJANGO_SQLITE_REPLICA).")
+        if options['replicas']:
+            unknown = set(options['replicas']) - set(aliases)
+            if unknown:
+                raise CommandError("Unknown replicas: %s." % ', '.join(sorted(unknown)))
+            aliases = options['replicas']
+
+        if options['check']:
+            behind = [alias for alias in aliases if not self.check_replica(alias)]
+            if behind:
+                raise CommandError("Behind the primary: %s." % ', '.join(behind))
+            return
+        for alias in aliases:
+            self.copy(alias)
+
+    def copy(self, alias):
+        source, target = connections[DEFAULT_DB_ALIAS], connections[alias]
+        if source.vendor != 'sqlite' or target.vendor != 'sqlite':
+            raise CommandError(
+                "%s: only SQLite file replicas can be copied; keep other replicas in sync with the database's "
+                "own replication (e.g. a PostgreSQL standby) and use --check." % alias
+            )
+        # اتصال‌های باز replica بسته می‌شوند تا بعد از کپی فایل جدید را ببینند.
+        target.close()
+        source.ensure_connection()
+        destination = sqlite3.connect(target.settings_dict['NAME'])
+        try:
+            source.connection.backup(destination)
+        finally:
+            destination.close()
+        self.stdout.write(self.style.SUCCESS("Copied %s to %s." % (DEFAULT_DB_ALIAS, alias)))
+
+    def check_replica(self, alias):
+        in_sync = True
+        for model in CHECKED_MODELS:
+            states = []
+            for using in (DEFAULT_DB_ALIAS, alias):
+                queryset = model._base_manager.using(using)
+                fields = {field.name for field in model._meta.concrete_fields}
+                try:
+                    latest = queryset.aggregate(latest=Max('updated_at'))['latest'] if 'updated_at' in fields else None
+                    states.append((queryset.count(), latest))
+                except DatabaseError as exc:
+                    states.append(str(exc))
+            if states[0] != states[1]:
+                in_sync = False
+                self.stdout.write(self.style.WARNING("%s %s: primary %s, replica %s" % (
+                    alias, model._meta.label, states[0], states[1])))
+        if in_sync:
+            self.stdout.write(self.style.SUCCESS("%s is in sync." % alias))
+        return in_sync
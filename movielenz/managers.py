@@ -2,19 +2,79 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from django.db.models.query import ModelIterable
+
 from polymorphic.managers import PolymorphicManager
+from polymorphic.query import PolymorphicQuerySet
+
+from common.normalization import normalize_text
 
 class ReviewManager(models.Manager):
     def get_approved(self):
         return self.get_queryset().filter(approved=True)
 
+def subclass_accessors(model):
+    """نام رابطه‌های معکوس parent_link به زیرکلاس‌های مستقیم (مثلا 'series' برای Movie)."""
+    return {
+        relation.related_model: relation.get_accessor_name()
+        for relation in model._meta.related_objects
+        if relation.one_to_one and relation.field.remote_field.parent_link
+    }
+
+
+class SubclassJoinIterable(ModelIterable):
+    """
+    ردیف‌های پایه را با زیرکلاسی که با select_related (LEFT JOIN) در همان کوئری خوانده شده جایگزین می‌کند.
+    اگر JOIN زیرکلاس در کوئری نباشد (مثلا بعد از select_related(None)) همان نمونه پایه برگردانده می‌شود
+    و کوئری اضافه‌ای اجرا نمی‌شود.
+    """
+
+    def __iter__(self):
+        queryset = self.queryset
+        accessors = subclass_accessors(queryset.model)
+        annotations = list(queryset.query.annotation_select)
+        for obj in super().__iter__():
+            for accessor in accessors.values():
+                child = obj._state.fields_cache.get(accessor)
+                if child is None:
+                    continue
+                for name, value in obj._state.fields_cache.items():
+                    if name != accessor:
+                        child._state.fields_cache.setdefault(name, value)
+                for name in annotations:
+                    setattr(child, name, getattr(obj, name))
+                obj = child
+                break
+            yield obj
+
+
+class MovieQuerySet(PolymorphicQuerySet):
+    def with_subclasses(self):
+        """
+        حالت لیست تک کوئری: به جای ارتقای polymorphic (یک کوئری اضافه به ازای هر زیرکلاس در هر صفحه)،
+        جدول زیرکلاس‌ها با LEFT JOIN در همان کوئری پایه خوانده و نمونه Series مستقیما ساخته می‌شود.
+        """
+        queryset = self.non_polymorphic().select_related(*subclass_accessors(self.model).values())
+        queryset._iterable_class = SubclassJoinIterable
+        return queryset
+
+
 class MovieManager(PolymorphicManager):
+    queryset_class = MovieQuerySet
+
+    def with_subclasses(self):
+        return self.get_queryset().with_subclasses()
+
     def get_by_genre(self, genre_name):
         """
-        فیلم‌ها و سریال‌ها را بر اساس نام ژانر برمی‌گرداند.
-        جستجو بدون حساسیت به بزرگی و کوچکی حروف انجام می‌شود.
+        فیلم‌ها و سریال‌ها را بر اساس نام ژانر (یا نام ترجمه شده آن) برمی‌گرداند.
+        مقایسه روی ستون‌های یکسان‌سازی شده انجام می‌شود، پس به بزرگی و کوچکی حروف و
+        تفاوت ی/ک عربی و فارسی حساس نیست.
         """
-        return self.get_queryset().filter(genres__name__iexact=genre_name)
+        normalized = normalize_text(genre_name)
+        return self.get_queryset().filter(
+            models.Q(genres__normalized_name=normalized) | models.Q(genres__normalized_translated_genre=normalized)
+        )
 
     def get_published(self):
         """
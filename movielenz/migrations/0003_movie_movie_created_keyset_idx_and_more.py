@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('celebrity', '0002_actor_actor_popularity_keyset_idx_and_more'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('movielenz', '0002_alter_type_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-created_at', '-id'], name='movie_created_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-tmdb_popularity', '-id'], name='movie_popularity_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-release_date', 'title', '-id'], name='movie_release_keyset_idx'),
+        ),
+    ]
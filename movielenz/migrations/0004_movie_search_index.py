@@ -0,0 +1,121 @@
+import re
+
+from django.db import DatabaseError, migrations
+
+SEARCH_TABLE = 'movielenz_movie_search'
+
+
+# نسخه ثابت common.normalization.normalize_text در زمان این migration؛ تغییرات بعدی آن ماژول نباید
+# نتیجه این migration را عوض کند.
+_CHARACTER_MAP = {
+    'ي': 'ی', 'ى': 'ی', 'ئ': 'ی',
+    'ك': 'ک',
+    'ۀ': 'ه', 'ة': 'ه',
+    'أ': 'ا', 'إ': 'ا', 'ٱ': 'ا',
+    'ؤ': 'و',
+}
+_CHARACTER_MAP.update({chr(0x06F0 + digit): str(digit) for digit in range(10)})
+_CHARACTER_MAP.update({chr(0x0660 + digit): str(digit) for digit in range(10)})
+_CHARACTER_MAP.update({char: None for char in '\u200c\u200d\u200e\u200f\ufeff\u0640'})
+_CHARACTER_MAP.update({chr(code): None for code in range(0x064B, 0x0653)})
+_CHARACTER_MAP[chr(0x0670)] = None
+_TRANSLATION_TABLE = str.maketrans(_CHARACTER_MAP)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(value):
+    if value is None:
+        return ''
+    value = str(value).translate(_TRANSLATION_TABLE)
+    return _WHITESPACE_RE.sub(' ', value).strip().casefold()
+
+
+def create_table(schema_editor, movie_table):
+    """True اگر جدول ساخته شد (SQLite بدون FTS5 یا پایگاه داده پشتیبانی نشده: False)."""
+    connection = schema_editor.connection
+    table = connection.ops.quote_name(SEARCH_TABLE)
+    if connection.vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS %s USING fts5('
+                "title, people, description, identifiers, tokenize = 'unicode61 remove_diacritics 2')" % table
+            )
+        except DatabaseError:
+            # SQLite بدون FTS5 کامپایل شده؛ جستجو به SearchFilter برمی‌گردد.
+            return False
+        return True
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE TABLE IF NOT EXISTS %s ('
+            'movie_id bigint PRIMARY KEY REFERENCES %s (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+            'document tsvector NOT NULL)' % (table, connection.ops.quote_name(movie_table))
+        )
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS %s ON %s USING GIN (document)'
+            % (connection.ops.quote_name(SEARCH_TABLE + '_document_idx'), table)
+        )
+        return True
+    return False
+
+
+def write_documents(schema_editor, rows):
+    connection = schema_editor.connection
+    table = connection.ops.quote_name(SEARCH_TABLE)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.executemany(
+                'INSERT INTO %s (rowid, title, people, description, identifiers) '
+                'VALUES (%%s, %%s, %%s, %%s, %%s)' % table, rows
+            )
+        else:
+            cursor.executemany(
+                'INSERT INTO {table} (movie_id, document) VALUES (%s, '
+                "setweight(to_tsvector('simple', %s), 'A') || "
+                "setweight(to_tsvector('simple', %s), 'B') || "
+                "setweight(to_tsvector('simple', %s), 'C') || "
+                "setweight(to_tsvector('simple', %s), 'A')) "
+                'ON CONFLICT (movie_id) DO NOTHING'.format(table=table), rows
+            )
+
+
+def create_index(apps, schema_editor, batch_size=1000):
+    """جدول جستجو را می‌سازد و اسناد فیلم‌های موجود را (مثل movielenz.search.build_documents) می‌نویسد."""
+    Movie = apps.get_model('movielenz', 'Movie')
+    if not create_table(schema_editor, Movie._meta.db_table):
+        return
+    db_alias = schema_editor.connection.alias
+    movie_ids = list(Movie.objects.using(db_alias).order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(movie_ids), batch_size):
+        batch = movie_ids[start:start + batch_size]
+        people = {pk: [] for pk in batch}
+        for through, name in ((Movie.actors.through, 'actor__name'),
+                              (Movie.directors.through, 'director__full_name')):
+            links = through.objects.using(db_alias).filter(movie_id__in=batch).values_list('movie_id', name)
+            for movie_id, person in links:
+                people[movie_id].append(person)
+        rows = []
+        movies = Movie.objects.using(db_alias).filter(pk__in=batch).values_list(
+            'pk', 'title', 'description', 'imdb_id', 'tmdb_id')
+        for pk, title, description, imdb_id, tmdb_id in movies:
+            identifiers = ' '.join(str(value) for value in (imdb_id, tmdb_id) if value)
+            rows.append((pk, normalize_text(title), normalize_text(' '.join(people[pk])),
+                         normalize_text(description), normalize_text(identifiers)))
+        write_documents(schema_editor, rows)
+
+
+def drop_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute('DROP TABLE IF EXISTS %s' % connection.ops.quote_name(SEARCH_TABLE))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movielenz', '0003_movie_movie_created_keyset_idx_and_more'),
+        ('celebrity', '0002_actor_actor_popularity_keyset_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
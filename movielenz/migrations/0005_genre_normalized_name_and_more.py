@@ -0,0 +1,70 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:37
+
+import re
+
+from django.db import migrations, models
+
+
+# نسخه ثابت common.normalization.normalize_text در زمان این migration؛ تغییرات بعدی آن ماژول نباید
+# نتیجه این migration را عوض کند.
+_CHARACTER_MAP = {
+    'ي': 'ی', 'ى': 'ی', 'ئ': 'ی',
+    'ك': 'ک',
+    'ۀ': 'ه', 'ة': 'ه',
+    'أ': 'ا', 'إ': 'ا', 'ٱ': 'ا',
+    'ؤ': 'و',
+}
+_CHARACTER_MAP.update({chr(0x06F0 + digit): str(digit) for digit in range(10)})
+_CHARACTER_MAP.update({chr(0x0660 + digit): str(digit) for digit in range(10)})
+_CHARACTER_MAP.update({char: None for char in '\u200c\u200d\u200e\u200f\ufeff\u0640'})
+_CHARACTER_MAP.update({chr(code): None for code in range(0x064B, 0x0653)})
+_CHARACTER_MAP[chr(0x0670)] = None
+_TRANSLATION_TABLE = str.maketrans(_CHARACTER_MAP)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(value):
+    if value is None:
+        return ''
+    value = str(value).translate(_TRANSLATION_TABLE)
+    return _WHITESPACE_RE.sub(' ', value).strip().casefold()
+
+
+def populate_normalized_fields(apps, schema_editor):
+    Genre = apps.get_model('movielenz', 'Genre')
+    Movie = apps.get_model('movielenz', 'Movie')
+    genres = list(Genre.objects.all())
+    for genre in genres:
+        genre.normalized_name = normalize_text(genre.name)
+        genre.normalized_translated_genre = normalize_text(genre.translated_genre)
+    Genre.objects.bulk_update(genres, ['normalized_name', 'normalized_translated_genre'], batch_size=500)
+    movies = list(Movie.objects.only('pk', 'title'))
+    for movie in movies:
+        movie.normalized_title = normalize_text(movie.title)
+    Movie.objects.bulk_update(movies, ['normalized_title'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movielenz', '0004_movie_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='genre',
+            name='normalized_name',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='normalized_translated_genre',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='normalized_title',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=300),
+        ),
+        migrations.RunPython(populate_normalized_fields, migrations.RunPython.noop),
+    ]
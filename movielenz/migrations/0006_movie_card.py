@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movielenz', '0005_genre_normalized_name_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieCard',
+            fields=[
+                ('movie', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='movielenz.movie')),
+                ('data', models.JSONField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'کارت فیلم',
+                'verbose_name_plural': 'کارت\u200cهای فیلم',
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movielenz', '0006_movie_card'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='type',
+            index=models.Index(fields=['tree_id', 'lft'], name='type_tree_range_idx'),
+        ),
+    ]
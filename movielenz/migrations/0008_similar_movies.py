@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movielenz', '0007_type_tree_range_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarMovies',
+            fields=[
+                ('movie', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='similar_titles', serialize=False, to='movielenz.movie')),
+                ('neighbors', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'عنوان\u200cهای مشابه',
+                'verbose_name_plural': 'عنوان\u200cهای مشابه',
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movielenz', '0008_similar_movies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WatchActivityBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watch_activity', to='movielenz.movie')),
+            ],
+            options={
+                'verbose_name': 'فعالیت تماشا',
+                'verbose_name_plural': 'فعالیت\u200cهای تماشا',
+                'indexes': [models.Index(fields=['hour', 'movie'], name='watch_activity_hour_idx')],
+                'constraints': [models.UniqueConstraint(fields=('movie', 'hour'), name='watch_activity_movie_hour_uniq')],
+            },
+        ),
+    ]
@@ -8,6 +8,7 @@ from polymorphic.managers import PolymorphicManager
 from mptt.models import TreeForeignKey, MPTTModel
 
 from celebrity.models import Actor, Director
+from common.normalization import normalize_text
 
 from .managers import MovieManager
 
@@ -35,6 +36,10 @@ class Genre(models.Model):
     translated_genre = models.CharField(_("ژانر ترجمه شده"), max_length=50, default='None')
     tmdb_id = models.IntegerField(unique=True, null=True, blank=True)
 
+    # ستون‌های یکسان‌سازی شده برای جستجوی دقیق (common.normalization)
+    normalized_name = models.CharField(max_length=50, blank=True, db_index=True, editable=False)
+    normalized_translated_genre = models.CharField(max_length=50, blank=True, db_index=True, editable=False)
+
     class Meta:
         verbose_name = _("ژانر")
         verbose_name_plural = _("ژانرها")
@@ -49,6 +54,8 @@ class Genre(models.Model):
                 self.slug = slugify(source_for_slug, allow_unicode=True)
             else:
                 raise ValueError(_("نام یا نام ترجمه شده برای تولید اسلاگ مورد نیاز است."))
+        self.normalized_name = normalize_text(self.name)
+        self.normalized_translated_genre = normalize_text(self.translated_genre)
         super().save(*args, **kwargs)
 
 class Type(MPTTModel):
@@ -66,6 +73,10 @@ class Type(MPTTModel):
     verbose_name_plural = _("دسته بندی ها")
     db_table = "type"
     unique_together = [["parent", "slug"]]
+    # فیلتر زیردرخت: tree_id = ? AND lft BETWEEN ? AND ? (movielenz.type_tree)
+    indexes = [
+      models.Index(fields=['tree_id', 'lft'], name='type_tree_range_idx'),
+    ]
   
   def save(self, *args, **kwargs):
     if not self.slug:
@@ -76,6 +87,7 @@ class Type(MPTTModel):
 
 class Movie(PolymorphicModel):
     title = models.CharField(max_length=300, unique=True)
+    normalized_title = models.CharField(max_length=300, blank=True, db_index=True, editable=False)
     slug = models.SlugField(max_length=500, unique=True,blank=True, null=True)
     
     # type = models.CharField(max_length=50, choices=Type.choices, default=Type.MOVIE, verbose_name=_("نوع"),blank=True, null=True)
@@ -118,13 +130,24 @@ class Movie(PolymorphicModel):
     
     objects = MovieManager()
 
+    # مقدار این فیلدها (attname) هنگام خواندن و بعد از هر ذخیره نگه داشته می‌شود تا سیگنال‌ها بدون کوئری
+    # بدانند در ذخیره فعلی چه چیزی عوض شده است (changed_fields).
+    tracked_fields = ('title', 'slug', 'polymorphic_ctype_id', 'imdb_rating')
+
     class Meta:
         verbose_name = _("فیلم")
         verbose_name_plural = _("فیلم‌ها")
+        # کلیدهای صفحه‌بندی keyset (movielenz.pagination.MovieKeysetPagination)
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='movie_created_keyset_idx'),
+            models.Index(fields=['-tmdb_popularity', '-id'], name='movie_popularity_keyset_idx'),
+            models.Index(fields=['-release_date', 'title', '-id'], name='movie_release_keyset_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title, allow_unicode=True)
+        self.normalized_title = normalize_text(self.title)
 
         if self.__class__ == Movie and not self.type_id: 
             movie_type_obj, created = Type.objects.get_or_create(
@@ -132,7 +155,37 @@ class Movie(PolymorphicModel):
             )
             self.type = movie_type_obj
         super().save(*args, **kwargs)
-        
+        self._remember_tracked(kwargs.get('update_fields'))
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_tracked()
+        return instance
+
+    def _remember_tracked(self, update_fields=None):
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        for name in self.tracked_fields:
+            field = self._meta.get_field(name)
+            # فیلد deferred در __dict__ نیست و مقدارش نامعلوم می‌ماند.
+            if name in self.__dict__ and (update_fields is None or field.name in update_fields):
+                loaded[name] = field.to_python(self.__dict__[name])
+
+    def changed_fields(self, update_fields=None):
+        """
+        فیلدهای tracked_fields که با مقدار خوانده/ذخیره شده قبلی فرق دارند (با update_fields فقط همان‌هایی
+        که ذخیره می‌شوند)؛ مقدار نامعلوم تغییر حساب می‌شود.
+        """
+        loaded = self.__dict__.get('_loaded_values', {})
+        changed = set()
+        for name in self.tracked_fields:
+            field = self._meta.get_field(name)
+            if update_fields is not None and field.name not in update_fields:
+                continue
+            if name not in loaded or loaded[name] != field.to_python(getattr(self, name)):
+                changed.add(name)
+        return changed
+
     def __str__(self):
         return self.title
     
@@ -169,3 +222,59 @@ class Series(Movie):
         self.type = series_type_obj
         super(Series, self).save(*args, **kwargs)
 
+
+class MovieCard(models.Model):
+    """
+    کارت آماده نمایش هر فیلم/سریال (خروجی BaseMovieSerializer) برای endpoint های لیست.
+    با سیگنال‌های movielenz.signals به‌روز می‌شود و با دستور rebuild_movie_cards از نو ساخته می‌شود.
+    """
+    movie = models.OneToOneField(Movie, on_delete=models.CASCADE, primary_key=True, related_name='card')
+    data = models.JSONField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("کارت فیلم")
+        verbose_name_plural = _("کارت‌های فیلم")
+
+    def __str__(self):
+        return str(self.movie_id)
+
+
+class SimilarMovies(models.Model):
+    """
+    فهرست از پیش محاسبه شده عنوان‌های مشابه هر فیلم/سریال: [[شناسه، امتیاز], ...] به ترتیب امتیاز.
+    با دستور build_similarity_index ساخته می‌شود (movielenz.similarity).
+    """
+    movie = models.OneToOneField(Movie, on_delete=models.CASCADE, primary_key=True, related_name='similar_titles')
+    neighbors = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("عنوان‌های مشابه")
+        verbose_name_plural = _("عنوان‌های مشابه")
+
+    def __str__(self):
+        return str(self.movie_id)
+
+
+class WatchActivityBucket(models.Model):
+    """
+    شمارنده ساعتی ثبت‌های تماشای هر فیلم/سریال (movielenz.trending). هر ثبت تماشا فقط شمارنده ساعت
+    جاری را یکی زیاد می‌کند؛ سطل‌های قدیمی‌تر از بزرگ‌ترین بازه با دستور prune_watch_activity حذف می‌شوند.
+    """
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='watch_activity')
+    hour = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _("فعالیت تماشا")
+        verbose_name_plural = _("فعالیت‌های تماشا")
+        constraints = [
+            models.UniqueConstraint(fields=['movie', 'hour'], name='watch_activity_movie_hour_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['hour', 'movie'], name='watch_activity_hour_idx'),
+        ]
+
+    def __str__(self):
+        return '%s @ %s' % (self.movie_id, self.hour)
@@ -0,0 +1,264 @@
+import datetime
+import decimal
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.db.models import F, Q
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    صفحه‌بندی کلیدی (keyset / cursor).
+    به جای OFFSET و COUNT(*)، مقدار کلید مرتب‌سازی آخرین ردیف صفحه در cursor ذخیره می‌شود
+    و صفحه بعد با یک شرط روی همان کلید خوانده می‌شود؛ بنابراین هزینه صفحه ۱ و صفحه ۵۰۰ یکسان است.
+    شناسه (id) همیشه به عنوان شکننده تساوی به انتهای کلید اضافه می‌شود.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    cursor_query_description = _('The pagination cursor value.')
+    ordering_query_param = 'ordering'
+    invalid_cursor_message = _('Invalid cursor')
+
+    # نام ترتیب (همان مقدار پارامتر ordering) -> فیلدهای مرتب‌سازی
+    orderings = {}
+    default_ordering = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+
+        cursor = self.decode_cursor(request)
+        self.ordering_key = cursor['o'] if cursor else self.get_ordering_key(request)
+        self.keys = self.get_keys(self.ordering_key)
+        self.reverse = bool(cursor and cursor['r'])
+
+        queryset = queryset.order_by(*self.get_order_by())
+        if cursor:
+            queryset = queryset.filter(self.get_position_filter(cursor['p']))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+        return self.page
+
+    def get_ordering_key(self, request):
+        ordering = request.query_params.get(self.ordering_query_param, '')
+        ordering = ','.join(term.strip() for term in ordering.split(',') if term.strip())
+        if ordering in self.orderings:
+            return ordering
+        return self.default_ordering
+
+    def get_keys(self, ordering_key):
+        """
+        لیست (نام فیلد، نزولی؟، nullable؟) را برای ترتیب انتخاب شده برمی‌گرداند.
+        """
+        keys = []
+        for term in self.orderings[ordering_key]:
+            name = term.lstrip('-')
+            keys.append((name, term.startswith('-'), self.model._meta.get_field(name).null))
+        pk_name = self.model._meta.pk.name
+        keys.append((pk_name, keys[0][1] if keys else False, False))
+        return keys
+
+    def get_order_by(self):
+        order_by = []
+        for name, descending, nullable in self.keys:
+            descending = descending != self.reverse
+            if nullable:
+                # NULL ها در جهت رو به جلو همیشه در انتها قرار می‌گیرند.
+                nulls = {'nulls_first': True} if self.reverse else {'nulls_last': True}
+                order_by.append(F(name).desc(**nulls) if descending else F(name).asc(**nulls))
+            else:
+                order_by.append(F(name).desc() if descending else F(name).asc())
+        return order_by
+
+    def get_position_filter(self, position):
+        """
+        شرط «بعد از موقعیت» را برای کلید چندستونی می‌سازد:
+        k1 > v1 OR (k1 = v1 AND k2 > v2) OR ...
+        """
+        result = Q(pk__in=[])
+        equal_so_far = Q()
+        for (name, descending, nullable), value in zip(self.keys, position):
+            descending = descending != self.reverse
+            nulls_last = nullable and not self.reverse
+
+            if value is None:
+                after = None if not self.reverse else Q(**{'%s__isnull' % name: False})
+                equal = Q(**{'%s__isnull' % name: True})
+            else:
+                lookup = '%s__lt' % name if descending else '%s__gt' % name
+                after = Q(**{lookup: value})
+                if nulls_last:
+                    after |= Q(**{'%s__isnull' % name: True})
+                equal = Q(**{name: value})
+
+            if after is not None:
+                result |= equal_so_far & after
+            equal_so_far &= equal
+        return result
+
+    def get_position(self, instance):
+        # ردیف‌های values() (مسیر سریالایز سریع) هم پشتیبانی می‌شوند.
+        if isinstance(instance, dict):
+            return [instance[name] for name, _descending, _nullable in self.keys]
+        return [getattr(instance, name) for name, _descending, _nullable in self.keys]
+
+    def encode_position(self, position):
+        encoded = []
+        for value in position:
+            if isinstance(value, (datetime.date, datetime.datetime)):
+                value = value.isoformat()
+            elif isinstance(value, decimal.Decimal):
+                value = str(value)
+            encoded.append(value)
+        return encoded
+
+    def decode_position(self, raw_position):
+        if not isinstance(raw_position, list) or len(raw_position) != len(self.keys):
+            raise NotFound(self.invalid_cursor_message)
+        position = []
+        for (name, _descending, _nullable), value in zip(self.keys, raw_position):
+            if value is not None:
+                value = self.model._meta.get_field(name).to_python(value)
+            position.append(value)
+        return position
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if cursor['o'] not in self.orderings:
+                raise ValueError(cursor['o'])
+            self.keys = self.get_keys(cursor['o'])
+            cursor['p'] = self.decode_position(cursor['p'])
+            cursor['r'] = bool(cursor.get('r'))
+        except NotFound:
+            raise
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, instance, reverse):
+        cursor = {
+            'o': self.ordering_key,
+            'p': self.encode_position(self.get_position(instance)),
+            'r': reverse,
+        }
+        encoded = urlsafe_b64encode(json.dumps(cursor, separators=(',', ':')).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': str(self.cursor_query_description),
+                'schema': {'type': 'string'},
+            },
+        ]
+
+
+class OptionalKeysetPagination(PageNumberPagination):
+    """
+    به صورت پیش‌فرض همان PageNumberPagination سراسری است.
+    با ?pagination=cursor (یا وجود پارامتر cursor) به صفحه‌بندی keyset تغییر حالت می‌دهد.
+    """
+    keyset_class = None
+    mode_query_param = 'pagination'
+    keyset = None
+
+    def use_keyset(self, request):
+        if self.keyset_class is None:
+            return False
+        return (request.query_params.get(self.mode_query_param) == 'cursor'
+                or self.keyset_class.cursor_query_param in request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_keyset(request):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        if self.keyset_class is not None:
+            parameters.append({
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': str(_("Set to 'cursor' to use keyset pagination.")),
+                'schema': {'type': 'string', 'enum': ['cursor']},
+            })
+            parameters += self.keyset_class().get_schema_operation_parameters(view)
+        return parameters
+
+
+# --- Movie ---
+
+class MovieKeysetPagination(KeysetPagination):
+    orderings = {
+        '-created_at': ['-created_at'],
+        '-tmdb_popularity': ['-tmdb_popularity'],
+        '-release_date,title': ['-release_date', 'title'],
+    }
+    default_ordering = '-created_at'
+
+
+class MoviePagination(OptionalKeysetPagination):
+    keyset_class = MovieKeysetPagination
@@ -0,0 +1,118 @@
+"""
+تبدیل شناسه فیلم (pk، اسلاگ یا عنوان) به شناسه و کلاس واقعی (Movie، Series، ...) آن.
+
+نتیجه‌ها در یک LRU داخل پروسه نگه داشته می‌شوند؛ پس حل کردن دوباره همان شناسه (در get_queryset و list
+یک درخواست، یا درخواست‌های بعدی) کوئری ندارد. کلاس واقعی از polymorphic_ctype و کش ContentType خوانده
+می‌شود، بدون کوئری زیرکلاس. «پیدا نشد» کش نمی‌شود؛ فیلمی که بعدا ساخته شود بلافاصله پیدا می‌شود.
+
+ابطال مثل movielenz.type_tree با یک شماره نسخه در کش جنگو است که با ذخیره/حذف هر Movie
+(movielenz.signals) بعد از commit افزایش پیدا می‌کند و هر پروسه در مراجعه بعدی LRU خود را خالی می‌کند.
+این فقط وقتی به همه پروسه‌ها می‌رسد که CACHES بین آن‌ها مشترک باشد (نه LocMem)؛ با LocMem فقط
+پروسه‌ای که ذخیره را انجام داده باخبر می‌شود.
+"""
+import threading
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import router, transaction
+from django.db.models import Q
+
+from common.normalization import normalize_text
+
+from .versioning import VersionedKey
+
+DEFAULTS = {
+    'MAX_ENTRIES': 10000,
+}
+
+VERSION_KEY = VersionedKey('movielenz:movie-resolver-version')
+
+# فیلدهایی از Movie (tracked_fields) که نتیجه resolve به آن‌ها بستگی دارد.
+RESOLVED_FIELDS = {'title', 'slug', 'polymorphic_ctype_id'}
+
+ResolvedMovie = namedtuple('ResolvedMovie', ['pk', 'model'])
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'MOVIE_RESOLVER', {})}
+
+
+class MovieResolver:
+    def __init__(self):
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(identifier):
+        identifier = str(identifier).strip()
+        if identifier.isdigit():
+            return 'pk', int(identifier)
+        return 'name', identifier
+
+    def resolve(self, identifier, using=None):
+        """ResolvedMovie یا None؛ using پیش‌فرض همان پایگاه داده خواندن Movie (replica درخواست) است."""
+        from .models import Movie
+
+        if identifier is None or identifier == '':
+            return None
+        if using is None:
+            using = router.db_for_read(Movie)
+        kind, value = self.cache_key(identifier)
+        key = (using, kind, value)
+
+        version = VERSION_KEY.get()
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        resolved = self.lookup(kind, value, using)
+        if resolved is None:
+            return None
+        with self._lock:
+            if version == self.version:
+                self._entries[key] = resolved
+                self._entries.move_to_end(key)
+                while len(self._entries) > get_config()['MAX_ENTRIES']:
+                    self._entries.popitem(last=False)
+        return resolved
+
+    @staticmethod
+    def lookup(kind, value, using):
+        from .models import Movie
+
+        movies = Movie.objects.using(using).non_polymorphic()
+        if kind == 'pk':
+            movies = movies.filter(pk=value)
+        else:
+            movies = movies.filter(Q(slug=value) | Q(normalized_title=normalize_text(value)))
+        row = movies.values_list('pk', 'polymorphic_ctype_id').first()
+        if row is None:
+            return None
+        pk, ctype_id = row
+        model = ContentType.objects.db_manager(using).get_for_id(ctype_id).model_class() if ctype_id else None
+        return ResolvedMovie(pk, model or Movie)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_resolver = MovieResolver()
+
+
+def resolve_movie(identifier, using=None):
+    return _resolver.resolve(identifier, using=using)
+
+
+def invalidate_movie_resolver(using='default'):
+    def bump():
+        _resolver.clear()
+        VERSION_KEY.bump()
+    transaction.on_commit(bump, using=using)
@@ -0,0 +1,316 @@
+"""
+کش پاسخ endpoint های کاتالوگ با ابطال مبتنی بر برچسب (tag).
+
+هر پاسخ با کلیدی از مسیر، query string مرتب شده و تفکیک staff/غیر staff ذخیره می‌شود و با چند برچسب درشت
+علامت می‌خورد: پاسخ یک آبجکت با برچسب همان آبجکت (movie:12)، هر پاسخ چندتایی با برچسب لیست همان نوع
+(movie:list) و همه با ALL_TAG. سیگنال‌های movielenz.signals هنگام تغییر ردیف‌ها یا لینک‌های M2M برچسب
+آبجکت‌هایی که داده‌شان (خودشان یا بازیگر/ژانر/نوع داخلشان) عوض شده و برچسب لیست همان نوع را باطل می‌کنند.
+
+پاسخی که از replica خوانده شده تا PIN_SECONDS (DATABASE_ROUTING) بعد از آخرین ابطال ذخیره نمی‌شود؛
+replica ممکن است هنوز داده قبل از تغییر را داشته باشد و آن پاسخ کهنه با نسل جدید کش می‌شد.
+
+دو backend وجود دارد:
+- shared: کش مشترک جنگو (CACHES) با نسخه‌بندی برچسب‌ها (پیش‌فرض). نسخه برچسب‌ها در alias نسخه‌ها
+  (movielenz.versioning) و پاسخ‌ها در CACHES[ALIAS] نگه داشته می‌شوند. ابطال در یک پروسه برای همه پروسه‌ها
+  دیده می‌شود، پس هر دو باید بین پروسه‌ها مشترک باشند (Redis یا فایل، نه LocMem).
+- lru: LRU داخل پروسه؛ ابطال فقط همان پروسه را پاک می‌کند و فقط با یک پروسه (runserver، یک worker)
+  امن است. ورودی‌ها بعد از TIMEOUT ثانیه منقضی می‌شوند.
+"""
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from .db_routing import _replica, get_config as get_routing_config
+from .versioning import bump_version, get_cache as get_version_cache, get_versions
+
+from rest_framework import status
+from rest_framework.response import Response
+
+DEFAULTS = {
+    'ENABLED': True,
+    'BACKEND': 'shared',
+    'MAX_ENTRIES': 2000,
+    'TIMEOUT': 300,
+    'ALIAS': 'default',
+    'KEY_PREFIX': 'response-cache',
+}
+
+# روی همه ورودی‌ها؛ clear() همین برچسب را باطل می‌کند و کلیدهای دیگر کش را دست نمی‌زند.
+ALL_TAG = '*'
+
+# validator های پاسخ (movielenz.conditional) که همراه داده ذخیره می‌شوند.
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified')
+
+
+class LRUBackend:
+    """فقط برای یک پروسه؛ invalidate پروسه‌های دیگر را پاک نمی‌کند."""
+
+    def __init__(self, max_entries, timeout, **kwargs):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._keys_by_tag = {}
+        self._tag_versions = {}
+        self._generation = 0
+        self._invalidated_at = 0.0
+        self._lock = threading.Lock()
+
+    def generation(self):
+        return self._generation
+
+    def invalidated_at(self):
+        return self._invalidated_at
+
+    def tag_versions(self, tags):
+        with self._lock:
+            return {tag: self._tag_versions.get(tag, 0) for tag in tags}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] is not None and entry[2] <= time.monotonic():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, tags, generation):
+        with self._lock:
+            if generation != self._generation:
+                # در حین ساخت پاسخ چیزی باطل شده؛ ممکن است پاسخ کهنه باشد.
+                return
+            self._discard(key)
+            expires = time.monotonic() + self.timeout if self.timeout is not None else None
+            self._entries[key] = (value, tags, expires)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, tags):
+        with self._lock:
+            self._generation += 1
+            self._invalidated_at = time.time()
+            for tag in tags:
+                self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+                for key in self._keys_by_tag.pop(tag, ()):
+                    self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._invalidated_at = time.time()
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[1]:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+
+class SharedBackend:
+    """
+    روی کش جنگو؛ هر برچسب یک شماره نسخه دارد و هر ورودی نسخه برچسب‌هایش را هنگام ذخیره نگه می‌دارد.
+    ابطال یعنی افزایش نسخه برچسب؛ ورودی‌های قدیمی در خواندن بعدی رد می‌شوند.
+    """
+
+    def __init__(self, alias, timeout, key_prefix, **kwargs):
+        self.cache = caches[alias]
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+
+    def _tag_key(self, tag):
+        return '%s:tag:%s' % (self.key_prefix, tag)
+
+    def generation(self):
+        key = '%s:generation' % self.key_prefix
+        return get_versions([key])[key]
+
+    def invalidated_at(self):
+        return get_version_cache().get('%s:invalidated-at' % self.key_prefix, 0.0)
+
+    def tag_versions(self, tags):
+        keys = {self._tag_key(tag): tag for tag in tags}
+        stored = get_versions(keys)
+        return {tag: stored.get(key) for key, tag in keys.items()}
+
+    def get(self, key):
+        entry = self.cache.get('%s:%s' % (self.key_prefix, key))
+        if entry is None:
+            return None
+        versions, value = entry
+        if self.tag_versions(versions) != versions:
+            return None
+        return value
+
+    def set(self, key, value, tags, generation):
+        if generation != self.generation():
+            return
+        self.cache.set('%s:%s' % (self.key_prefix, key), (self.tag_versions(tags), value), self.timeout)
+
+    def invalidate(self, tags):
+        bump_version('%s:generation' % self.key_prefix)
+        get_version_cache().set('%s:invalidated-at' % self.key_prefix, time.time(), None)
+        for tag in tags:
+            bump_version(self._tag_key(tag))
+
+    def clear(self):
+        self.invalidate({ALL_TAG})
+
+
+BACKENDS = {
+    'lru': LRUBackend,
+    'shared': SharedBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'RESPONSE_CACHE', {})}
+
+
+def get_response_cache():
+    global _backend
+    config = get_config()
+    if not config['ENABLED']:
+        return None
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = BACKENDS[config['BACKEND']](
+                    max_entries=config['MAX_ENTRIES'],
+                    alias=config['ALIAS'],
+                    timeout=config['TIMEOUT'],
+                    key_prefix=config['KEY_PREFIX'],
+                )
+    return _backend
+
+
+def reset_response_cache():
+    global _backend
+    _backend = None
+
+
+def invalidate_tags(tags, using='default'):
+    """برچسب‌ها را بعد از commit تراکنش جاری (یا بلافاصله در autocommit) باطل می‌کند."""
+    tags = set(tags)
+    if not tags:
+        return
+    cache = get_response_cache()
+    if cache is not None:
+        transaction.on_commit(lambda: cache.invalidate(tags), using=using)
+
+
+def tag_versions(tags):
+    """
+    {برچسب: نسخه} برچسب‌ها در backend فعلی؛ با هر ابطال برچسب عوض می‌شود (برای ETag، movielenz.conditional).
+    بدون کش پاسخ {}.
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return {}
+    return cache.tag_versions(tags)
+
+
+def replica_may_be_stale(cache):
+    """پاسخ درخواست جاری از replica خوانده شده و آخرین ابطال کمتر از PIN_SECONDS پیش بوده است."""
+    if _replica.get() is None:
+        return False
+    return time.time() - cache.invalidated_at() < get_routing_config()['PIN_SECONDS']
+
+
+def response_entry(response):
+    """ورودی کش یک پاسخ: (داده، هدرهای VALIDATOR_HEADERS پاسخ)."""
+    return response.data, {name: response[name] for name in VALIDATOR_HEADERS if response.has_header(name)}
+
+
+def entry_response(request, entry):
+    """پاسخ یک ورودی کش؛ اگر validator های ذخیره شده با درخواست شرطی بخوانند 304، بدون هیچ کوئری."""
+    data, headers = entry
+    if headers:
+        not_modified = get_conditional_response(
+            request, etag=headers.get('ETag'), last_modified=parse_http_date_safe(headers.get('Last-Modified')),
+        )
+        if not_modified is not None:
+            return not_modified
+    return Response(data, headers=headers)
+
+
+def cache_response(method):
+    """
+    دکوریتور متدهای GET یک view (list/retrieve/action). در hit، پاسخ بدون اجرای متد (و بدون ORM)
+    برگردانده می‌شود؛ در miss، پاسخ 200 با برچسب‌های get_cache_tags ذخیره می‌شود. conditional_response
+    زیر همین دکوریتور قرار می‌گیرد: ETag و Last-Modified پاسخ همراه داده ذخیره و در hit با همان مقایسه می‌شوند.
+    """
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        cache = get_response_cache()
+        if cache is None or request.method not in ('GET', 'HEAD'):
+            return method(self, request, *args, **kwargs)
+
+        key = self.get_cache_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry_response(request, entry)
+
+        generation = cache.generation()
+        response = method(self, request, *args, **kwargs)
+        if (response.status_code == status.HTTP_200_OK and hasattr(response, 'data')
+                and not replica_may_be_stale(cache)):
+            cache.set(key, response_entry(response), self.get_cache_tags(response.data), generation)
+        return response
+    return wrapper
+
+
+class CachedResponseMixin:
+    """
+    کلید و برچسب‌های پیش‌فرض کش پاسخ برای view ها.
+    cache_tag_prefix نوع آبجکت‌های اصلی پاسخ است (movie, genre, actor, ...).
+    """
+    cache_tag_prefix = None
+
+    def get_cache_key(self, request):
+        query = sorted(
+            (name, value)
+            for name, values in request.query_params.lists()
+            for value in values if value != ''
+        )
+        visibility = 'staff' if request.user.is_staff else 'public'
+        raw = '|'.join([
+            visibility,
+            request.get_host(),
+            request.path,
+            urlencode(query),
+            request.accepted_renderer.format if getattr(request, 'accepted_renderer', None) else '',
+        ])
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get_cache_tags(self, data):
+        """
+        پاسخ یک آبجکت برچسب همان آبجکت و پاسخ چندتایی برچسب لیست را می‌گیرد؛ ابطال برچسب هر آبجکت برچسب
+        لیست همان نوع را هم باطل می‌کند، پس خواندن هر ورودی فقط چند نسخه برچسب را می‌خواند.
+        """
+        prefix = self.cache_tag_prefix
+        if isinstance(data, dict) and 'id' in data:
+            return {ALL_TAG, '%s:%s' % (prefix, data['id'])}
+        return {ALL_TAG, '%s:list' % prefix}
@@ -0,0 +1,284 @@
+"""
+ایندکس متن کامل کاتالوگ.
+
+به جای LIKE '%x%' روی title/description و JOIN روی بازیگران و کارگردان‌ها، برای هر فیلم یک سند
+(عنوان، افراد، توضیحات، شناسه‌ها) در یک جدول جستجو نگه داشته می‌شود:
+- SQLite: جدول مجازی FTS5 (rowid همان id فیلم است)
+- PostgreSQL: ستون tsvector با ایندکس GIN
+
+متن اسناد و عبارت جستجو هر دو با common.normalization یکسان‌سازی می‌شوند.
+migration 0004 جدول را می‌سازد و اسناد فیلم‌های موجود را می‌نویسد؛ بعد از آن سند‌ها توسط سیگنال‌های
+movielenz.signals به‌روز می‌شوند و دستور rebuild_search_index کل ایندکس را از نو می‌سازد. ایندکس خالی کنار
+جدول فیلم غیرخالی (مثلا پایگاه داده‌ای که نسخه قدیمی migration را اجرا کرده) برای جستجو در دسترس حساب
+نمی‌شود و جستجو تا rebuild_search_index به SearchFilter برمی‌گردد.
+
+جستجوی لیست (filter_queryset) در همان کوئری با زیرکوئری روی جدول جستجو فیلتر و رتبه‌بندی می‌کند؛ نه سقفی
+روی تعداد نتایج هست و نه لیست شناسه‌ها به پایتون برمی‌گردد.
+"""
+import re
+
+from django.db import DatabaseError, connections
+from django.db.models import Value
+from django.db.models.expressions import RawSQL
+
+from common.normalization import normalize_text
+
+SEARCH_TABLE = 'movielenz_movie_search'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize_query(query):
+    return _TOKEN_RE.findall(normalize_text(query))
+
+
+def build_documents(movie_ids, using='default'):
+    """
+    اسناد جستجو را برای فیلم‌های داده شده با سه کوئری (فیلم‌ها، بازیگران، کارگردان‌ها) می‌سازد.
+    خروجی: {movie_id: (title, people, description, identifiers)}
+    """
+    from .models import Movie
+
+    movie_ids = list(movie_ids)
+    if not movie_ids:
+        return {}
+
+    rows = (Movie.objects.using(using).non_polymorphic()
+            .filter(pk__in=movie_ids)
+            .values_list('pk', 'title', 'description', 'imdb_id', 'tmdb_id'))
+    people = {pk: [] for pk in movie_ids}
+    actor_links = (Movie.actors.through.objects.using(using)
+                   .filter(movie_id__in=movie_ids)
+                   .values_list('movie_id', 'actor__name'))
+    director_links = (Movie.directors.through.objects.using(using)
+                      .filter(movie_id__in=movie_ids)
+                      .values_list('movie_id', 'director__full_name'))
+    for movie_id, name in list(actor_links) + list(director_links):
+        people[movie_id].append(name)
+
+    documents = {}
+    for pk, title, description, imdb_id, tmdb_id in rows:
+        identifiers = ' '.join(str(value) for value in (imdb_id, tmdb_id) if value)
+        documents[pk] = (
+            normalize_text(title),
+            normalize_text(' '.join(people[pk])),
+            normalize_text(description),
+            normalize_text(identifiers),
+        )
+    return documents
+
+
+class BaseSearchBackend:
+    vendor = None
+
+    def __init__(self, using='default'):
+        self.using = using
+        self.connection = connections[using]
+        self.table = self.connection.ops.quote_name(SEARCH_TABLE)
+
+    def is_available(self):
+        return SEARCH_TABLE in self.connection.introspection.table_names()
+
+    def is_populated(self):
+        """ایندکس سندی دارد یا اصلا فیلمی وجود ندارد."""
+        from .models import Movie
+
+        with self.connection.cursor() as cursor:
+            cursor.execute('SELECT 1 FROM %s LIMIT 1' % self.table)
+            if cursor.fetchone() is not None:
+                return True
+        return not Movie.objects.using(self.using).exists()
+
+    def index_movies(self, movie_ids):
+        movie_ids = list(movie_ids)
+        if not movie_ids:
+            return
+        documents = build_documents(movie_ids, using=self.using)
+        self.remove_movies(movie_ids)
+        self.write_documents(documents)
+
+    def write_documents(self, documents):
+        raise NotImplementedError
+
+    def remove_movies(self, movie_ids):
+        raise NotImplementedError
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute('DELETE FROM %s' % self.table)
+
+    def search(self, query, limit):
+        """شناسه فیلم‌ها را به ترتیب امتیاز (بهترین اول) برمی‌گرداند."""
+        raise NotImplementedError
+
+    def match_query(self, terms):
+        """پارامتر عبارت جستجو برای match_sql و rank_sql."""
+        raise NotImplementedError
+
+    def match_sql(self):
+        """SELECT شناسه فیلم‌های منطبق با عبارت (یک پارامتر)."""
+        raise NotImplementedError
+
+    def rank_sql(self, movie_column):
+        """زیرکوئری امتیاز فیلم movie_column برای عبارت (یک پارامتر)؛ کمتر یعنی بهتر."""
+        raise NotImplementedError
+
+    def filter_queryset(self, queryset, query):
+        """
+        queryset فیلم‌ها محدود به نتایج جستجو (pk IN زیرکوئری جدول جستجو) با ستون search_rank.
+        """
+        terms = tokenize_query(query)
+        if not terms:
+            return queryset.annotate(search_rank=Value(0.0)).none()
+        params = (self.match_query(terms),)
+        return queryset.filter(pk__in=RawSQL(self.match_sql(), params)).annotate(
+            search_rank=RawSQL(self.rank_sql(self.movie_column(queryset)), params),
+        )
+
+    def movie_column(self, queryset):
+        quote_name = self.connection.ops.quote_name
+        return '%s.%s' % (quote_name(queryset.model._meta.db_table), quote_name(queryset.model._meta.pk.column))
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    vendor = 'sqlite'
+    # وزن ستون‌ها برای bm25: title, people, description, identifiers
+    weights = (10.0, 4.0, 1.0, 10.0)
+
+    def write_documents(self, documents):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO %s (rowid, title, people, description, identifiers) '
+                'VALUES (%%s, %%s, %%s, %%s, %%s)' % self.table,
+                [(pk,) + document for pk, document in documents.items()]
+            )
+
+    def remove_movies(self, movie_ids):
+        movie_ids = list(movie_ids)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM %s WHERE rowid IN (%s)' % (self.table, ', '.join(['%s'] * len(movie_ids))),
+                movie_ids
+            )
+
+    def search(self, query, limit):
+        terms = tokenize_query(query)
+        if not terms:
+            return []
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT rowid FROM {table} WHERE {table} MATCH %s '
+                'ORDER BY bm25({table}, {weights}) LIMIT %s'.format(table=self.table, weights=self.bm25_weights()),
+                [self.match_query(terms), limit]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def bm25_weights(self):
+        return ', '.join(str(weight) for weight in self.weights)
+
+    def match_query(self, terms):
+        return ' '.join('"%s"*' % term for term in terms)
+
+    def match_sql(self):
+        return 'SELECT rowid FROM {table} WHERE {table} MATCH %s'.format(table=self.table)
+
+    def rank_sql(self, movie_column):
+        return 'SELECT bm25({table}, {weights}) FROM {table} WHERE {table} MATCH %s AND rowid = {movie}'.format(
+            table=self.table, weights=self.bm25_weights(), movie=movie_column)
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    vendor = 'postgresql'
+    config = 'simple'
+
+    def write_documents(self, documents):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO {table} (movie_id, document) VALUES (%s, '
+                "setweight(to_tsvector('{config}', %s), 'A') || "
+                "setweight(to_tsvector('{config}', %s), 'B') || "
+                "setweight(to_tsvector('{config}', %s), 'C') || "
+                "setweight(to_tsvector('{config}', %s), 'A')) "
+                'ON CONFLICT (movie_id) DO UPDATE SET document = EXCLUDED.document'.format(
+                    table=self.table, config=self.config),
+                [(pk,) + document for pk, document in documents.items()]
+            )
+
+    def remove_movies(self, movie_ids):
+        with self.connection.cursor() as cursor:
+            cursor.execute('DELETE FROM %s WHERE movie_id = ANY(%%s)' % self.table, [list(movie_ids)])
+
+    def search(self, query, limit):
+        terms = tokenize_query(query)
+        if not terms:
+            return []
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT movie_id FROM {table}, to_tsquery('{config}', %s) query "
+                'WHERE document @@ query ORDER BY ts_rank(document, query) DESC LIMIT %s'.format(
+                    table=self.table, config=self.config),
+                [self.match_query(terms), limit]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def match_query(self, terms):
+        return ' & '.join("'%s':*" % term for term in terms)
+
+    def match_sql(self):
+        return "SELECT movie_id FROM {table} WHERE document @@ to_tsquery('{config}', %s)".format(
+            table=self.table, config=self.config)
+
+    def rank_sql(self, movie_column):
+        return ("SELECT -ts_rank(document, to_tsquery('{config}', %s)) FROM {table} "
+                'WHERE movie_id = {movie}'.format(table=self.table, config=self.config, movie=movie_column))
+
+
+SEARCH_BACKENDS = {
+    backend.vendor: backend for backend in (SQLiteSearchBackend, PostgresSearchBackend)
+}
+
+_availability = {}
+# پایگاه داده‌هایی که ایندکسشان پر دیده شده؛ ایندکس خالی در هر جستجو دوباره بررسی می‌شود.
+_populated = set()
+
+
+def get_search_backend(using='default', populated=False):
+    """
+    backend مناسب پایگاه داده را برمی‌گرداند؛ اگر پایگاه داده پشتیبانی نشود یا جدول ایندکس ساخته
+    نشده باشد (و با populated اگر ایندکس هنوز ساخته نشده باشد) None برمی‌گرداند (در این حالت جستجو به
+    SearchFilter معمولی برمی‌گردد).
+    """
+    backend_class = SEARCH_BACKENDS.get(connections[using].vendor)
+    if backend_class is None:
+        return None
+    backend = backend_class(using)
+    if using not in _availability:
+        try:
+            _availability[using] = backend.is_available()
+        except DatabaseError:
+            return None
+    if not _availability[using]:
+        return None
+    if populated and using not in _populated:
+        if not backend.is_populated():
+            return None
+        _populated.add(using)
+    return backend
+
+
+def reset_availability():
+    _availability.clear()
+    _populated.clear()
+
+
+def index_movies(movie_ids, using='default'):
+    backend = get_search_backend(using)
+    if backend is not None:
+        backend.index_movies(movie_ids)
+
+
+def remove_movies(movie_ids, using='default'):
+    backend = get_search_backend(using)
+    if backend is not None and movie_ids:
+        backend.remove_movies(movie_ids)
+
@@ -24,7 +24,28 @@ class TypeSerializer(serializers.ModelSerializer):
         model = Type
         fields = ['id', 'name', 'slug', 'parent_slug']
 
-class BaseMovieSerializer(serializers.ModelSerializer):
+class DynamicFieldsMixin:
+    """
+    آرگومان fields (مجموعه نام فیلدها) خروجی را محدود می‌کند؛ فیلدهای فقط نوشتنی دست نمی‌خورند.
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in [name for name, field in self.fields.items() if not field.write_only]:
+                if name not in fields:
+                    self.fields.pop(name)
+
+    @classmethod
+    def readable_field_names(cls):
+        if '_readable_field_names' not in cls.__dict__:
+            cls._readable_field_names = tuple(
+                name for name, field in cls().fields.items() if not field.write_only
+            )
+        return cls._readable_field_names
+
+
+class BaseMovieSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     # Read-only fields for related objects (full representation)
     genres = GenreSerializer(many=True, read_only=True)
     actors = ActorSerializer(many=True, read_only=True)
@@ -83,8 +104,12 @@ class SeriesSerializer(BaseMovieSerializer):
         ]
 
 # Polymorphic serializer to automatically choose MovieOnlySerializer or SeriesSerializer
+# drf-polymorphic سریالایزر را با مقدار object_type (نام کلاس نمونه) انتخاب می‌کند؛ برای لیست‌ها نمونه‌ها
+# باید از قبل زیرکلاس واقعی باشند (Movie.objects.with_subclasses()).
 class MoviePolymorphicSerializer(PolymorphicSerializer):
-    model_serializer_mapping = {
-        Movie: MovieOnlySerializer, 
-        Series: SeriesSerializer
+    object_type = serializers.CharField(read_only=True)
+
+    serializer_mapping = {
+        'Movie': MovieOnlySerializer,
+        'Series': SeriesSerializer,
     }
\ No newline at end of file
@@ -0,0 +1,233 @@
+import threading
+
+from django.core.signals import request_started
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+
+from celebrity import aggregates
+from celebrity.models import Actor, Director
+
+from . import autocomplete, cards, search
+from .models import Genre, Movie, Type
+from .resolver import RESOLVED_FIELDS, invalidate_movie_resolver
+from .response_cache import invalidate_tags
+from .type_tree import invalidate_type_tree
+
+_pending = threading.local()
+
+
+def refresh_movies(movie_ids, using='default'):
+    """
+    همه داده‌های مشتق شده از فیلم‌ها (ایندکس جستجو، کارت‌ها) را برای شناسه‌های داده شده به‌روز می‌کند.
+    """
+    movie_ids = set(movie_ids)
+    if not movie_ids:
+        return
+    search.index_movies(movie_ids, using=using)
+    if cards.cards_enabled():
+        cards.refresh_cards(movie_ids, using=using)
+
+
+def _pending_ids():
+    if not hasattr(_pending, 'movie_ids'):
+        _pending.movie_ids = {}
+    return _pending.movie_ids
+
+
+def _flush(using):
+    refresh_movies(_pending_ids().pop(using, set()), using=using)
+
+
+def schedule_refresh(movie_ids, using='default'):
+    """
+    داخل تراکنش، شناسه‌ها جمع می‌شوند و یک بار بعد از commit به‌روز می‌شوند
+    (مثلا ذخیره فیلم و M2M هایش در ادمین)؛ بیرون از تراکنش بلافاصله اجرا می‌شود.
+    """
+    movie_ids = [pk for pk in movie_ids if pk is not None]
+    if not movie_ids:
+        return
+    if not transaction.get_connection(using).in_atomic_block:
+        refresh_movies(movie_ids, using=using)
+        return
+    _pending_ids().setdefault(using, set()).update(movie_ids)
+    transaction.on_commit(lambda: _flush(using), using=using)
+
+
+def _movie_ids_for_m2m(instance, reverse, pk_set):
+    """
+    در m2m_changed اگر تغییر از سمت Movie باشد instance خود فیلم است، در غیر این صورت
+    (actor.movies_actor.add(...)) شناسه فیلم‌ها در pk_set قرار دارد.
+    """
+    if not reverse:
+        return [instance.pk]
+    if pk_set is not None:
+        return list(pk_set)
+    return getattr(instance, '_cleared_movie_ids', [])
+
+
+def _movie_tags(movie_ids):
+    return {'movie:list'} | {'movie:%s' % pk for pk in movie_ids}
+
+
+def _related_tag_prefix(instance):
+    return type(instance)._meta.model_name
+
+
+def _related_movies(instance):
+    if isinstance(instance, Actor):
+        return instance.movies_actor
+    if isinstance(instance, Director):
+        return instance.movies_director
+    return instance.movie_set
+
+
+def _schedule_people(people, using):
+    for model, person_ids in people.items():
+        aggregates.schedule(model, person_ids, using=using)
+
+
+@receiver(post_save)
+def movie_saved(sender, instance, using, created=False, update_fields=None, **kwargs):
+    if isinstance(instance, Movie):
+        schedule_refresh([instance.pk], using=using)
+        invalidate_tags(_movie_tags([instance.pk]), using=using)
+        if created:
+            # شناسه‌ای که پیدا نشده کش نمی‌شود و فیلم جدید هنوز بازیگر/کارگردانی ندارد.
+            return
+        # مقایسه با مقدارهای خوانده شده (Movie.changed_fields)، بدون کوئری.
+        changed = instance.changed_fields(update_fields)
+        if changed & RESOLVED_FIELDS:
+            invalidate_movie_resolver(using=using)
+        if 'imdb_rating' in changed:
+            # average_rating بازیگران و کارگردان‌ها به imdb_rating این فیلم بستگی دارد.
+            _schedule_people(aggregates.people_for([instance.pk], using=using), using)
+
+
+@receiver(pre_delete)
+def movie_deleting(sender, instance, using, **kwargs):
+    if isinstance(instance, Movie):
+        # لینک‌های M2M با حذف آبشاری و بدون m2m_changed پاک می‌شوند.
+        instance._related_people = aggregates.people_for([instance.pk], using=using)
+
+
+@receiver(post_delete)
+def movie_deleted(sender, instance, using, **kwargs):
+    if isinstance(instance, Movie):
+        search.remove_movies([instance.pk], using=using)
+        invalidate_tags(_movie_tags([instance.pk]), using=using)
+        invalidate_movie_resolver(using=using)
+        _schedule_people(getattr(instance, '_related_people', {}), using)
+
+
+@receiver(m2m_changed, sender=Movie.actors.through)
+@receiver(m2m_changed, sender=Movie.directors.through)
+@receiver(m2m_changed, sender=Movie.genres.through)
+def movie_relations_changed(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._cleared_movie_ids = list(_related_movies(instance).values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        movie_ids = _movie_ids_for_m2m(instance, reverse, pk_set)
+        schedule_refresh(movie_ids, using=using)
+        invalidate_tags(_movie_tags(movie_ids), using=using)
+
+
+@receiver(m2m_changed, sender=Movie.actors.through)
+@receiver(m2m_changed, sender=Movie.directors.through)
+def people_links_changed(sender, instance, action, reverse, pk_set, using, model, **kwargs):
+    """movie_count و average_rating افرادی که لینکشان تغییر کرده (celebrity.aggregates)."""
+    if reverse:
+        # actor.movies_actor.add(...): خود instance همان فرد است.
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            aggregates.schedule(type(instance), [instance.pk], using=using)
+        return
+    if action == 'pre_clear':
+        _through, movie_column, person_column = aggregates.through_columns(model)
+        instance._cleared_people_ids = list(
+            sender.objects.using(using).filter(**{movie_column: instance.pk}).values_list(person_column, flat=True)
+        )
+    elif action in ('post_add', 'post_remove'):
+        aggregates.schedule(model, pk_set or (), using=using)
+    elif action == 'post_clear':
+        aggregates.schedule(model, getattr(instance, '_cleared_people_ids', []), using=using)
+
+
+@receiver(pre_delete, sender=Actor)
+@receiver(pre_delete, sender=Director)
+@receiver(pre_delete, sender=Genre)
+def related_deleting(sender, instance, **kwargs):
+    instance._related_movie_ids = list(_related_movies(instance).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Actor)
+@receiver(post_save, sender=Director)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Actor)
+@receiver(post_delete, sender=Director)
+@receiver(post_delete, sender=Genre)
+def related_changed(sender, instance, using, created=False, **kwargs):
+    prefix = _related_tag_prefix(instance)
+    invalidate_tags({'%s:list' % prefix, '%s:%s' % (prefix, instance.pk)}, using=using)
+    if created:
+        return
+    movie_ids = getattr(instance, '_related_movie_ids', None)
+    if movie_ids is None:
+        movie_ids = list(_related_movies(instance).values_list('pk', flat=True))
+    schedule_refresh(movie_ids, using=using)
+    # پاسخ کش شده این فیلم‌ها نام/اسلاگ همین ردیف را دارد.
+    if movie_ids:
+        invalidate_tags(_movie_tags(movie_ids), using=using)
+
+
+@receiver(pre_delete, sender=Type)
+def type_deleting(sender, instance, **kwargs):
+    # کارت فیلم‌های این نوع و فیلم‌های انواع فرزند (parent_slug) تغییر می‌کند.
+    instance._related_movie_ids = list(
+        Movie.objects.non_polymorphic().filter(type__in=instance.get_descendants(include_self=True))
+        .values_list('pk', flat=True)
+    )
+
+
+@receiver(post_save, sender=Type)
+@receiver(post_delete, sender=Type)
+def type_changed(sender, instance, using, created=False, **kwargs):
+    invalidate_type_tree(using=using)
+    invalidate_tags({'movie:list'}, using=using)
+    if created:
+        return
+    movie_ids = getattr(instance, '_related_movie_ids', None)
+    if movie_ids is None:
+        # کارت فیلم‌های همه نوادگان (parent_slug و مسیر نوع) هم تغییر می‌کند.
+        movie_ids = list(
+            Movie.objects.using(using).non_polymorphic()
+            .filter(type__in=instance.get_descendants(include_self=True)).values_list('pk', flat=True)
+        )
+    schedule_refresh(movie_ids, using=using)
+    invalidate_tags(_movie_tags(movie_ids), using=using)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def autocomplete_changed(sender, instance, using, signal, **kwargs):
+    if not isinstance(instance, (Movie, Actor, Director)):
+        return
+    # بعد از حذف pk نمونه None می‌شود؛ شناسه‌ها همین حالا گرفته می‌شوند.
+    refs = autocomplete.instance_ref(instance)
+    if signal is post_delete:
+        transaction.on_commit(lambda: autocomplete.remove_refs(refs, using=using), using=using)
+    else:
+        transaction.on_commit(lambda: autocomplete.update_instance(instance, using=using), using=using)
+    # بعد از به‌روزرسانی ایندکس همین پروسه (ترتیب on_commit) تا نسخه جدید آن را دوباره نخواند.
+    autocomplete.invalidate_autocomplete(using=using, refs=refs)
+
+
+@receiver(request_started)
+def warm_autocomplete(sender, **kwargs):
+    # ایندکس تکمیل خودکار با اولین درخواست هر پروسه در پس‌زمینه ساخته می‌شود، نه در اولین /autocomplete/.
+    autocomplete.warm()
+
+
+@receiver(post_migrate)
+def search_table_migrated(sender, **kwargs):
+    # جدول جستجو با migration ساخته/حذف می‌شود؛ در دسترس بودن آن دوباره بررسی می‌شود.
+    search.reset_availability()
@@ -0,0 +1,168 @@
+"""
+ایندکس «عنوان‌های مشابه».
+
+هر فیلم دو بردار تنک دارد:
+- بردار کاربران: وزن تعامل هر کاربر با فیلم (علاقه‌مندی، تماشای اخیر، لیست تماشا)؛
+- بردار محتوا: ژانرها، بازیگران و کارگردان‌ها با وزن نوع ویژگی × IDF.
+
+شباهت دو فیلم ترکیب وزنی شباهت کسینوسی این دو بردار است. حاصل ضرب ماتریس‌ها (Xᵀ·X) به شکل تنک با
+ایندکس معکوس حساب می‌شود: برای هر ستون (کاربر یا ویژگی) فقط جفت فیلم‌هایی که هر دو در آن ستون هستند
+جمع زده می‌شوند. ستون‌هایی که بیش از max_df فیلم دارند (مثلا ژانری که نصف کاتالوگ را دارد) در
+ساختن جفت‌ها شرکت نمی‌کنند؛ اطلاعات کمی دارند و هزینه‌شان درجه دوم است. امتیاز همسایه‌های هر فیلم جدا
+حساب و بلافاصله به top_k بریده می‌شود، پس ماتریس کامل جفت‌ها هیچ وقت در حافظه نیست.
+
+برای هر فیلم فقط top_k همسایه در SimilarMovies ذخیره می‌شود؛ endpoint /movie/{id}/similar/ فقط همین
+ردیف را با کلید اصلی می‌خواند.
+"""
+import heapq
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import Movie, Series, SimilarMovies
+from .response_cache import invalidate_tags
+
+DEFAULTS = {
+    'TOP_K': 20,
+    'MAX_DF': 1000,
+    # سهم شباهت رفتاری کاربران و شباهت محتوایی در امتیاز نهایی
+    'BLEND': {'users': 0.6, 'content': 0.4},
+    'INTERACTION_WEIGHTS': {'favorite': 3.0, 'watched': 2.0, 'watchlist': 1.0},
+    'FEATURE_WEIGHTS': {'genres': 1.0, 'actors': 1.5, 'directors': 2.0},
+}
+
+CACHE_TAG = 'similar'
+
+# اندازه هر بار خواندن ردیف‌های تعامل/جدول‌های واسط
+CHUNK_SIZE = 2000
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'SIMILAR_TITLES', {})}
+
+
+def interaction_columns(movies, weights, using=DEFAULT_DB_ALIAS):
+    """
+    ستون‌های کاربران: {user_id: {movie_id: وزن}}؛ وزن تعامل‌های مختلف یک کاربر با یک فیلم جمع می‌شود.
+    movies کوئری‌ست فیلم‌هاست و تعامل‌ها با زیرکوئری همان در خود پایگاه داده فیلتر می‌شوند.
+    """
+    from django.contrib.contenttypes.models import ContentType
+    from user_account.models import FavoriteItem, RecentlyWatchedItem, WatchlistItem
+
+    content_types = [content_type.pk for content_type in
+                     ContentType.objects.db_manager(using).get_for_models(Movie, Series).values()]
+    columns = defaultdict(dict)
+    for model, name in ((FavoriteItem, 'favorite'), (RecentlyWatchedItem, 'watched'), (WatchlistItem, 'watchlist')):
+        rows = (model.objects.using(using)
+                .filter(content_type__in=content_types, object_id__in=movies.values('pk'))
+                .order_by().values_list('user_id', 'object_id'))
+        for user_id, movie_id in rows.iterator(chunk_size=CHUNK_SIZE):
+            column = columns[user_id]
+            column[movie_id] = column.get(movie_id, 0.0) + weights[name]
+    return columns
+
+
+def feature_columns(movies, total, weights, using=DEFAULT_DB_ALIAS):
+    """ستون‌های محتوا: {(رابطه، شناسه): {movie_id: وزن × IDF}}؛ total تعداد فیلم‌ها برای IDF است."""
+    columns = {}
+    total = max(total, 1)
+    for name, weight in weights.items():
+        field = Movie._meta.get_field(name)
+        movie_column = field.m2m_column_name()
+        rows = (field.remote_field.through.objects.using(using)
+                .filter(**{'%s__in' % movie_column: movies.values('pk')})
+                .order_by().values_list(movie_column, field.m2m_reverse_name()))
+        postings = defaultdict(list)
+        for movie_id, related_id in rows.iterator(chunk_size=CHUNK_SIZE):
+            postings[related_id].append(movie_id)
+        for related_id, movie_ids in postings.items():
+            value = weight * math.log(1 + total / len(movie_ids))
+            columns[(name, related_id)] = dict.fromkeys(movie_ids, value)
+    return columns
+
+
+class CosineIndex:
+    """
+    شباهت کسینوسی فیلم‌ها روی ستون‌های داده شده. به جای ماتریس کامل جفت‌ها، ستون‌های هر فیلم نگه داشته
+    می‌شود و similar(movie_id) ضرب داخلی همان فیلم با بقیه را همان لحظه جمع می‌زند.
+    نرم بردارها از همه ستون‌ها حساب می‌شود، حتی ستون‌هایی که به خاطر max_df در جفت‌ها شرکت نمی‌کنند.
+    """
+
+    def __init__(self, columns, max_df):
+        self.norms = defaultdict(float)
+        self.rows = defaultdict(list)
+        for column in columns.values():
+            for movie_id, value in column.items():
+                self.norms[movie_id] += value * value
+            if len(column) > max_df:
+                continue
+            for movie_id, value in column.items():
+                self.rows[movie_id].append((value, column))
+
+    def similar(self, movie_id):
+        """{movie_id: شباهت} فیلم‌هایی که حداقل یک ستون مشترک با movie_id دارند."""
+        dots = defaultdict(float)
+        for value, column in self.rows.get(movie_id, ()):
+            for other, other_value in column.items():
+                if other != movie_id:
+                    dots[other] += value * other_value
+        norm = self.norms[movie_id]
+        return {other: dot / math.sqrt(norm * self.norms[other]) for other, dot in dots.items()}
+
+
+def build_neighbors(using=DEFAULT_DB_ALIAS, top_k=None, max_df=None):
+    """
+    {movie_id: [[movie_id, امتیاز], ...]} برای همه فیلم‌ها (فیلم بدون همسایه لیست خالی دارد).
+    امتیازهای هر فیلم جدا جمع و همان لحظه به top_k بریده می‌شوند؛ حافظه به جای تعداد جفت‌ها با
+    تعداد فیلم‌ها × top_k رشد می‌کند.
+    """
+    config = get_config()
+    top_k = config['TOP_K'] if top_k is None else top_k
+    max_df = config['MAX_DF'] if max_df is None else max_df
+    blend = config['BLEND']
+
+    movies = Movie.objects.using(using).non_polymorphic()
+    movie_ids = list(movies.values_list('pk', flat=True))
+    parts = [
+        (blend['users'], CosineIndex(interaction_columns(movies, config['INTERACTION_WEIGHTS'], using), max_df)),
+        (blend['content'], CosineIndex(
+            feature_columns(movies, len(movie_ids), config['FEATURE_WEIGHTS'], using), max_df)),
+    ]
+
+    neighbors = {}
+    for movie_id in movie_ids:
+        scores = defaultdict(float)
+        for weight, index in parts:
+            for other, value in index.similar(movie_id).items():
+                scores[other] += weight * value
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: (item[1], -item[0]))
+        neighbors[movie_id] = [[other, round(score, 6)] for other, score in best if score > 0]
+    return neighbors
+
+
+def store_neighbors(neighbors, using=DEFAULT_DB_ALIAS, batch_size=1000):
+    """
+    ردیف هر فیلم با INSERT ... ON CONFLICT به‌روز و ردیف فیلم‌هایی که در neighbors نیستند حذف می‌شوند؛ همه در
+    یک تراکنش، پس خواننده‌ها تا commit ایندکس قبلی را کامل می‌بینند و جدول هیچ وقت خالی نمی‌شود.
+    """
+    manager = SimilarMovies.objects.using(using)
+    with transaction.atomic(using=using):
+        manager.bulk_create(
+            [SimilarMovies(movie_id=movie_id, neighbors=items) for movie_id, items in neighbors.items()],
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['movie'],
+            update_fields=['neighbors', 'updated_at'],
+        )
+        stale = sorted(set(manager.values_list('movie_id', flat=True)) - set(neighbors))
+        for start in range(0, len(stale), batch_size):
+            manager.filter(movie_id__in=stale[start:start + batch_size]).delete()
+        invalidate_tags({CACHE_TAG}, using=using)
+
+
+def get_similar_ids(movie_id, limit=None, using=DEFAULT_DB_ALIAS):
+    neighbors = (SimilarMovies.objects.using(using).filter(movie_id=movie_id)
+                 .values_list('neighbors', flat=True).first()) or []
+    return [other for other, _score in neighbors[:limit]]
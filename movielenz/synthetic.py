@@ -0,0 +1,332 @@
+"""
+کاتالوگ مصنوعی برای اندازه‌گیری (دستور generate_catalog).
+
+همه داده‌ها با یک random.Random(seed) ساخته می‌شوند، پس اجرای دوباره با همان اندازه‌ها و seed همان داده را
+می‌سازد و بزرگ‌تر کردن اندازه‌ها فقط ردیف‌های جدید اضافه می‌کند. فیلم‌ها، سریال‌ها، ژانرها و افراد از
+مسیر CatalogImporter (upsert دسته‌ای روی tmdb_id، با کارت‌ها، ایندکس جستجو و ستون‌های تجمیعی) وارد
+می‌شوند؛ tmdb_id آن‌ها از TMDB_BASE شروع می‌شود تا با داده واقعی تداخل نداشته باشد. قسمت‌ها، کیفیت‌ها،
+کاربران و تعامل‌ها مستقیما با bulk_create نوشته می‌شوند.
+
+انتخاب فیلم‌ها و افراد توزیع Zipf دارد (چند عنوان/بازیگر پرطرفدار و دنباله بلند) تا بار کش‌ها و
+ایندکس‌ها شبیه داده واقعی باشد.
+"""
+import datetime
+import itertools
+import random
+from bisect import bisect_left
+from collections import Counter
+
+from django.contrib.auth.hashers import make_password
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from .catalog_import import CatalogImporter, batched
+from .models import Genre, Movie, Series, Type, WatchActivityBucket
+
+TMDB_BASE = 2_000_000_000
+EMAIL_DOMAIN = 'synthetic.invalid'
+
+TYPE_TREE = {
+    'movie': ['feature', 'animation', 'documentary', 'short'],
+    'series': ['tv-series', 'mini-series'],
+}
+GENRES = [
+    ('Action', 'اکشن'), ('Adventure', 'ماجراجویی'), ('Animation', 'انیمیشن'), ('Comedy', 'کمدی'),
+    ('Crime', 'جنایی'), ('Documentary', 'مستند'), ('Drama', 'درام'), ('Family', 'خانوادگی'),
+    ('Fantasy', 'فانتزی'), ('History', 'تاریخی'), ('Horror', 'ترسناک'), ('Music', 'موسیقی'),
+    ('Mystery', 'رازآلود'), ('Romance', 'عاشقانه'), ('Science Fiction', 'علمی تخیلی'), ('Thriller', 'هیجان انگیز'),
+    ('War', 'جنگی'), ('Western', 'وسترن'),
+]
+WORDS = [
+    'silent', 'river', 'shadow', 'last', 'city', 'night', 'golden', 'empire', 'broken', 'winter', 'garden',
+    'secret', 'storm', 'red', 'northern', 'light', 'journey', 'lost', 'kingdom', 'echo', 'iron', 'dream',
+    'ocean', 'fire', 'hidden', 'road', 'crown', 'glass', 'wild', 'memory', 'stone', 'paper', 'moon', 'tehran',
+    'سایه', 'شب', 'دریا', 'باران', 'خاک', 'آینه', 'راز', 'پرواز', 'خانه', 'جاده',
+]
+FIRST_NAMES = [
+    'Ali', 'Sara', 'Reza', 'Maryam', 'John', 'Emma', 'David', 'Olivia', 'Hamed', 'Leila', 'Peter', 'Nina',
+    'Omid', 'Shirin', 'James', 'Laura', 'Kian', 'Parisa', 'Marco', 'Yuki',
+]
+LAST_NAMES = [
+    'Ahmadi', 'Karimi', 'Smith', 'Jones', 'Rahimi', 'Moradi', 'Brown', 'Garcia', 'Tanaka', 'Rossi', 'Hosseini',
+    'Novak', 'Farahani', 'Miller', 'Sadeghi', 'Dubois',
+]
+LANGUAGES = ['fa', 'en', 'fr', 'ko', 'ja', 'es', 'de', 'tr']
+COUNTRIES = ['Iran', 'United States', 'France', 'South Korea', 'Japan', 'Spain', 'Germany', 'Turkey']
+SERIES_STATUSES = ['ongoing', 'ended', 'canceled', 'upcoming']
+QUALITIES = ['720p', '1080p', '480p', '4k']
+
+DEFAULT_SIZES = {
+    'movies': 1000,
+    'series': 100,
+    'seasons': 3,
+    'episodes_per_season': 8,
+    'qualities': 3,
+    'genres': 18,
+    'actors': 2000,
+    'directors': 300,
+    'users': 200,
+    'watched_per_user': 30,
+    'favorites_per_user': 5,
+    'watchlist_per_user': 10,
+    # تعامل‌ها در این تعداد روز اخیر پخش می‌شوند.
+    'days': 14,
+}
+
+
+class Zipf:
+    """انتخاب اندیس‌های 0..size-1 با احتمال متناسب با 1 / (rank + 1) ** exponent."""
+
+    def __init__(self, size, exponent=1.0):
+        self.size = size
+        self.cumulative = list(itertools.accumulate(1.0 / (rank + 1) ** exponent for rank in range(size)))
+
+    def pick(self, rng):
+        return min(bisect_left(self.cumulative, rng.random() * self.cumulative[-1]), self.size - 1)
+
+    def sample(self, rng, count):
+        """حداکثر count اندیس متمایز."""
+        count = min(count, self.size)
+        picked = {}
+        for _ in range(count * 4):
+            if len(picked) >= count:
+                break
+            picked.setdefault(self.pick(rng), None)
+        return list(picked)
+
+
+class CatalogGenerator:
+    def __init__(self, sizes=None, seed=0, using=DEFAULT_DB_ALIAS, batch_size=1000, password=None, stdout=None,
+                 stderr=None):
+        self.sizes = {**DEFAULT_SIZES, **(sizes or {})}
+        self.seed = seed
+        self.using = using
+        self.batch_size = batch_size
+        self.password = password
+        self.stdout = stdout
+        self.stderr = stderr
+        self.now = timezone.now().replace(minute=0, second=0, microsecond=0)
+        self.counts = Counter()
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def rng(self, *scope):
+        # هر بخش random جدای خودش را دارد تا تغییر اندازه یک بخش داده بقیه را جابه‌جا نکند.
+        return random.Random('%s:%s' % (self.seed, ':'.join(str(part) for part in scope)))
+
+    def run(self):
+        self.create_types()
+        self.import_catalog()
+        self.create_episodes()
+        self.create_users()
+        self.create_interactions()
+        return dict(self.counts)
+
+    # --- کاتالوگ ---
+
+    def create_types(self):
+        for root, children in TYPE_TREE.items():
+            parent, _created = Type.objects.using(self.using).get_or_create(slug=root, defaults={'name': root.title()})
+            for slug in children:
+                Type.objects.using(self.using).get_or_create(
+                    slug=slug, defaults={'name': slug.replace('-', ' ').title(), 'parent': parent},
+                )
+
+    def genre_entry(self, index):
+        if index < len(GENRES):
+            name, translated = GENRES[index]
+        else:
+            name = translated = 'Genre %d' % index
+        return {'tmdb_id': TMDB_BASE + index, 'name': name, 'translated_genre': translated}
+
+    def person_entry(self, natural_key, index, size):
+        rng = self.rng(natural_key, index)
+        name = '%s %s %d' % (rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), index)
+        return {
+            'tmdb_id': TMDB_BASE + index,
+            natural_key: name,
+            'poster': 'https://images.%s/people/%d.jpg' % (EMAIL_DOMAIN, index),
+            # محبوبیت با رتبه Zipf هم‌خوان است.
+            'popularity': round(999.0 * (1 - index / size) ** 3, 2),
+        }
+
+    def title(self, rng, index):
+        words = rng.sample(WORDS, rng.randint(1, 3))
+        return '%s %d' % (' '.join(words).title(), index)
+
+    def catalog_rows(self):
+        sizes = self.sizes
+        genres = Zipf(sizes['genres'], 0.6)
+        actors = Zipf(sizes['actors'])
+        directors = Zipf(sizes['directors'])
+        total = sizes['movies'] + sizes['series']
+        for index in range(total):
+            rng = self.rng('title', index)
+            is_series = index >= sizes['movies']
+            row = {
+                'tmdb_id': TMDB_BASE + index,
+                'title': self.title(rng, index),
+                'type': 'series' if is_series else rng.choice(TYPE_TREE['movie']),
+                'release_date': (datetime.date(1970, 1, 1)
+                                 + datetime.timedelta(days=rng.randint(0, 20000))).isoformat(),
+                'description': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(20, 60))),
+                'imdb_id': 'tt%09d' % (900000000 + index),
+                'imdb_rating': round(rng.triangular(2.0, 9.5, 6.8), 1),
+                'tmdb_user_score': round(rng.triangular(2.0, 9.5, 6.5), 1),
+                # چند عنوان بسیار پرطرفدار و دنباله بلند
+                'tmdb_popularity': min(int(1000 * rng.paretovariate(1.2)), 10 ** 7),
+                'duration': rng.randint(20, 60) if is_series else rng.randint(75, 180),
+                'poster': 'https://images.%s/titles/%d.jpg' % (EMAIL_DOMAIN, index),
+                'language': rng.choice(LANGUAGES),
+                'production_country': rng.choice(COUNTRIES),
+                'is_dubbed': rng.random() < 0.3,
+                'is_subtitled': rng.random() < 0.6,
+                'genres': [self.genre_entry(i) for i in genres.sample(rng, rng.randint(1, 3))],
+                'actors': [self.person_entry('name', i, sizes['actors'])
+                           for i in actors.sample(rng, rng.randint(3, 8))],
+                'directors': [self.person_entry('full_name', i, sizes['directors'])
+                              for i in directors.sample(rng, rng.randint(1, 2))],
+            }
+            if is_series:
+                row.update({
+                    'object_type': 'Series',
+                    'number_of_seasons': sizes['seasons'],
+                    'episode_count': sizes['seasons'] * sizes['episodes_per_season'],
+                    'series_status': rng.choice(SERIES_STATUSES),
+                })
+            yield index, row
+
+    def import_catalog(self):
+        importer = CatalogImporter(using=self.using, batch_size=self.batch_size, stderr=self.stderr)
+        imported, skipped = importer.run(self.catalog_rows())
+        self.counts['titles'] = imported
+        self.counts['skipped'] = skipped
+        self.log('Imported %d titles (%d skipped).' % (imported, skipped))
+
+    def title_ids(self):
+        """شناسه عنوان‌های مصنوعی به ترتیب اندیس (همان ترتیب tmdb_id)."""
+        total = self.sizes['movies'] + self.sizes['series']
+        return list(Movie.objects.using(self.using).non_polymorphic()
+                    .filter(tmdb_id__gte=TMDB_BASE, tmdb_id__lt=TMDB_BASE + total)
+                    .order_by('tmdb_id').values_list('pk', 'slug', 'tmdb_popularity'))
+
+    # --- قسمت‌ها ---
+
+    def create_episodes(self):
+        from episode.models import Episode, EpisodeQuality
+
+        sizes = self.sizes
+        first = TMDB_BASE + sizes['movies']
+        series = list(Series.objects.using(self.using)
+                      .filter(tmdb_id__gte=first, tmdb_id__lt=first + sizes['series'])
+                      .order_by('tmdb_id').values_list('pk', 'slug'))
+        qualities = QUALITIES[:max(sizes['qualities'], 0)]
+        per_series = max(sizes['seasons'] * sizes['episodes_per_season'], 1)
+        for chunk in batched(series, max(self.batch_size // per_series, 1)):
+            with transaction.atomic(using=self.using):
+                episodes = [
+                    Episode(movie_id=pk, season=season, title='Season %d Episode %d' % (season, number),
+                            slug='%s-s%02de%02d' % (slug, season, number))
+                    for pk, slug in chunk
+                    for season in range(1, sizes['seasons'] + 1)
+                    for number in range(1, sizes['episodes_per_season'] + 1)
+                ]
+                Episode.objects.using(self.using).bulk_create(episodes, batch_size=self.batch_size,
+                                                              ignore_conflicts=True)
+                episode_rows = list(Episode.objects.using(self.using)
+                                    .filter(movie_id__in=[pk for pk, _slug in chunk], qualities__isnull=True)
+                                    .values_list('pk', 'slug'))
+                EpisodeQuality.objects.using(self.using).bulk_create(
+                    [EpisodeQuality(episode_id=pk, quality=quality,
+                                    file='episodes/synthetic/%s-%s.mp4' % (slug, quality))
+                     for pk, slug in episode_rows for quality in qualities],
+                    batch_size=self.batch_size,
+                )
+            self.counts['episodes'] += len(episodes)
+        self.log('Episodes: %d.' % self.counts['episodes'])
+
+    # --- کاربران و تعامل‌ها ---
+
+    def user_email(self, index):
+        return 'user%d@%s' % (index, EMAIL_DOMAIN)
+
+    def create_users(self):
+        from user_account.models import User
+
+        # یک hash برای همه: make_password عمدا کند است.
+        password = make_password(self.password)
+        for chunk in batched(range(self.sizes['users']), self.batch_size):
+            User.objects.using(self.using).bulk_create(
+                [User(email=self.user_email(index), first_name='User', last_name=str(index), password=password)
+                 for index in chunk],
+                ignore_conflicts=True,
+            )
+        self.counts['users'] = self.sizes['users']
+        self.log('Users: %d.' % self.sizes['users'])
+
+    def create_interactions(self):
+        from user_account.models import FavoriteItem, RecentlyWatchedItem, User, WatchlistItem
+
+        sizes = self.sizes
+        titles = self.title_ids()
+        if not titles:
+            return
+        # انتخاب Zipf روی عنوان‌ها به ترتیب محبوبیت
+        titles.sort(key=lambda row: -(row[2] or 0))
+        popular = Zipf(len(titles))
+        # نوع محتوای تعامل‌ها همان polymorphic_ctype (Movie یا Series) است.
+        content_types = dict(Movie.objects.using(self.using).non_polymorphic()
+                             .filter(pk__in=[pk for pk, _slug, _popularity in titles])
+                             .values_list('pk', 'polymorphic_ctype_id'))
+        genre_ids = list(Genre.objects.using(self.using)
+                         .filter(tmdb_id__gte=TMDB_BASE, tmdb_id__lt=TMDB_BASE + sizes['genres'])
+                         .values_list('pk', flat=True))
+        emails = [self.user_email(index) for index in range(sizes['users'])]
+        window = datetime.timedelta(days=sizes['days']).total_seconds()
+        activity = Counter()
+
+        for chunk in batched(emails, self.batch_size):
+            users = dict(User.objects.using(self.using).filter(email__in=chunk).values_list('email', 'pk'))
+            watched, favorites, watchlist, preferred = [], [], [], []
+            for email in chunk:
+                user_id = users[email]
+                rng = self.rng('user', email)
+
+                def items(model, count):
+                    return [model(user_id=user_id, content_type_id=content_types[titles[i][0]], object_id=titles[i][0])
+                            for i in popular.sample(rng, count)]
+
+                for i in popular.sample(rng, rng.randint(0, 2 * sizes['watched_per_user'])):
+                    movie_id = titles[i][0]
+                    watched_at = self.now - datetime.timedelta(seconds=rng.random() * window)
+                    watched.append(RecentlyWatchedItem(
+                        user_id=user_id, content_type_id=content_types[movie_id], object_id=movie_id,
+                        watched_at=watched_at, progress_seconds=rng.randint(60, 7200),
+                    ))
+                    activity[movie_id, watched_at.replace(minute=0, second=0, microsecond=0)] += 1
+                favorites.extend(items(FavoriteItem, rng.randint(0, 2 * sizes['favorites_per_user'])))
+                watchlist.extend(items(WatchlistItem, rng.randint(0, 2 * sizes['watchlist_per_user'])))
+                preferred.extend(
+                    User.preferred_genres.through(user_id=user_id, genre_id=genre_id)
+                    for genre_id in rng.sample(genre_ids, min(rng.randint(0, 3), len(genre_ids)))
+                )
+
+            with transaction.atomic(using=self.using):
+                for model, objs in ((RecentlyWatchedItem, watched), (FavoriteItem, favorites),
+                                    (WatchlistItem, watchlist), (User.preferred_genres.through, preferred)):
+                    model.objects.using(self.using).bulk_create(objs, batch_size=self.batch_size,
+                                                                 ignore_conflicts=True)
+                    self.counts[model._meta.model_name] += len(objs)
+
+        # bulk_create سیگنال نمی‌فرستد؛ شمارنده‌های ساعتی پرطرفدارها (movielenz.trending) مستقیما نوشته می‌شوند.
+        WatchActivityBucket.objects.using(self.using).bulk_create(
+            [WatchActivityBucket(movie_id=movie_id, hour=hour, count=count)
+             for (movie_id, hour), count in activity.items()],
+            batch_size=self.batch_size,
+            update_conflicts=True, unique_fields=['movie', 'hour'], update_fields=['count'],
+        )
+        self.log('Interactions: %d watched, %d favorites, %d watchlist.' % (
+            self.counts['recentlywatcheditem'], self.counts['favoriteitem'], self.counts['watchlistitem'],
+        ))
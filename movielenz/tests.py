@@ -1,3 +1,966 @@
-from django.test import TestCase
+import datetime
+import json
+from base64 import urlsafe_b64encode
+from collections import Counter
+from decimal import Decimal
+from io import StringIO
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import AllowAny
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.views import APIView
+
+from celebrity.models import Actor, Director
+from common.normalization import normalize_text
+from episode.models import Episode, EpisodeQuality
+from user_account.models import RecentlyWatchedItem, User
+
+from .benchmark import (
+    Endpoint, compare_reports, parse_server_timing, percentile, run_benchmark, run_endpoint, summarize,
+)
+from .catalog_import import CatalogImporter
+from .db_routing import (
+    PIN_KEY, DatabaseRoutingMiddleware, PrimaryReplicaRouter, ReplicaReadMixin, _replica, is_pinned,
+)
+from .fast_serializers import FastMovieSerializer
+from . import autocomplete, search
+from .models import Genre, Movie, MovieCard, Series, Type, WatchActivityBucket
+from .pagination import MovieKeysetPagination
+from .resolver import VERSION_KEY as RESOLVER_VERSION, resolve_movie
+from .response_cache import (
+    ALL_TAG, LRUBackend, SharedBackend, get_response_cache, replica_may_be_stale, reset_response_cache,
+)
+from .synthetic import TYPE_TREE
+from .trending import bucket_hour, compute_trending, prune, record_watch
+from .type_tree import get_type_tree, invalidate_type_tree
+from .versioning import VersionedKey, bump_version, get_versions
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class FreshCacheMixin:
+    """کش جنگو و backend کش پاسخ برای هر تست از نو (پاسخ‌های کش شده تست قبلی دیده نمی‌شوند)."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        reset_response_cache()
+
+
+class FakeTransport:
+    name = 'fake'
+
+    def __init__(self, responses):
+        self.responses = responses
+
+    def get(self, path):
+        response = self.responses[path]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def close(self):
+        pass
+
+
+class BenchmarkTests(SimpleTestCase):
+    def test_percentile(self):
+        self.assertIsNone(percentile([], 50))
+        self.assertEqual(percentile([1.0, 2.0, 3.0, 4.0], 50), 2.5)
+        self.assertEqual(percentile([1.0, 2.0, 3.0, 4.0], 100), 4.0)
+
+    def test_parse_server_timing(self):
+        self.assertEqual(parse_server_timing('app;dur=12.5, db;dur=4.0;desc="3 queries"'), (3, 0.004))
+        self.assertEqual(parse_server_timing('db;dur=2'), (None, 0.002))
+        self.assertEqual(parse_server_timing(None), (None, None))
+
+    def test_run_endpoint_records_statuses_and_exceptions(self):
+        transport = FakeTransport({
+            '/ok/': (200, 'db;dur=1.5;desc="2 queries"'),
+            '/broken/': ConnectionResetError('reset by peer'),
+        })
+        ok = run_endpoint(transport, Endpoint('ok', '/ok/', False), requests=20, concurrency=4)
+        self.assertEqual((ok['requests'], ok['errors'], ok['status']), (20, 0, {'200': 20}))
+        self.assertEqual((ok['queries_mean'], ok['db_mean_ms']), (2, 1.5))
+        self.assertIsNotNone(ok['p99_ms'])
+
+        broken = run_endpoint(transport, Endpoint('broken', '/broken/', False), requests=5, concurrency=2, warmup=3)
+        self.assertEqual((broken['requests'], broken['errors']), (5, 5))
+        self.assertEqual(broken['exceptions'], {'ConnectionResetError: reset by peer': 5})
+
+    def test_failing_endpoint_does_not_abort_the_run(self):
+        class BrokenTransport(FakeTransport):
+            def close(self):
+                raise RuntimeError('closed twice')
+
+        transport = BrokenTransport({'/a/': (200, None), '/b/': (404, None)})
+        report = run_benchmark(transport, [Endpoint('a', '/a/', False), Endpoint('b', '/b/', False)],
+                               requests=3, concurrency=1, warmup=0)
+        self.assertEqual(set(report['endpoints']), {'a', 'b'})
+        self.assertEqual(report['endpoints']['a']['exceptions'], {'RuntimeError: closed twice': 1})
+        self.assertEqual(report['meta']['target'], 'fake')
+
+    def test_compare_reports(self):
+        endpoint = Endpoint('movie-list', '/movie/', False)
+        baseline = {'endpoints': {'movie-list': summarize(endpoint, [], 10)}}
+        current = {'endpoints': {'movie-list': summarize(endpoint, [], 10)}}
+        baseline['endpoints']['movie-list'].update(p50_ms=10.0, throughput_rps=100.0)
+        current['endpoints']['movie-list'].update(p50_ms=15.0, throughput_rps=120.0)
+        rows = {row[1]: row for row in compare_reports(baseline, current)}
+        self.assertEqual(rows['p50_ms'][4:], (50.0, True))
+        self.assertEqual(rows['throughput_rps'][4:], (20.0, False))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class GenerateCatalogTests(TestCase):
+    sizes = {
+        'movies': 12, 'series': 3, 'seasons': 2, 'episodes_per_season': 2, 'qualities': 1, 'genres': 4,
+        'actors': 15, 'directors': 4, 'users': 3, 'watched_per_user': 4, 'favorites_per_user': 1,
+        'watchlist_per_user': 1, 'days': 3,
+    }
+
+    def generate(self, **sizes):
+        options = {**self.sizes, **sizes}
+        call_command('generate_catalog', seed=7, verbosity=0, stdout=StringIO(), **options)
+
+    def snapshot(self):
+        return {
+            'movies': sorted(Movie.objects.non_polymorphic().values_list('tmdb_id', 'title', 'type__slug')),
+            'series': Series.objects.count(),
+            'episodes': Episode.objects.count(),
+            'qualities': EpisodeQuality.objects.count(),
+            'genres': Genre.objects.count(),
+            'people': (Actor.objects.count(), Director.objects.count()),
+            'users': User.objects.count(),
+            'watched': RecentlyWatchedItem.objects.count(),
+        }
+
+    def test_sizes_and_type_tree(self):
+        self.generate()
+        snapshot = self.snapshot()
+        self.assertEqual(len(snapshot['movies']), 15)
+        self.assertEqual(snapshot['series'], 3)
+        self.assertEqual(snapshot['episodes'], 3 * 2 * 2)
+        self.assertEqual(snapshot['people'], (15, 4))
+        self.assertEqual(snapshot['users'], 3)
+        tree = {root: set(children) | {root} for root, children in TYPE_TREE.items()}
+        types = Counter(type_slug for _tmdb_id, _title, type_slug in snapshot['movies'])
+        self.assertTrue(set(types) <= tree['movie'] | tree['series'])
+        series_types = set(Series.objects.values_list('type__slug', flat=True))
+        self.assertTrue(series_types <= tree['series'])
+        self.assertEqual(set(Type.objects.values_list('slug', flat=True)), tree['movie'] | tree['series'])
+
+    def test_rerun_is_deterministic_and_does_not_duplicate(self):
+        self.generate()
+        before = self.snapshot()
+        self.generate()
+        self.assertEqual(self.snapshot(), before)
+
+    def test_growing_sizes_adds_rows(self):
+        self.generate()
+        titles = set(title for _tmdb_id, title, _type in self.snapshot()['movies'])
+        self.generate(movies=20)
+        grown = set(title for _tmdb_id, title, _type in self.snapshot()['movies'])
+        self.assertEqual(len(grown), 23)
+        self.assertTrue(titles < grown)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class KeysetPaginationTests(FreshCacheMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        dates = [datetime.date(2020, 1, 1), None, datetime.date(2021, 6, 1), datetime.date(2020, 1, 1), None,
+                 datetime.date(2019, 3, 3), datetime.date(2021, 6, 1), datetime.date(2018, 1, 1)]
+        now = timezone.now()
+        for number, release_date in enumerate(dates):
+            movie = Movie.objects.create(title='Title %d' % (number % 3 * 10 + number), release_date=release_date,
+                                         tmdb_popularity=number % 4)
+            # چند ردیف با created_at یکسان تا شکننده تساوی (id) هم آزموده شود.
+            Movie.objects.filter(pk=movie.pk).update(created_at=now - datetime.timedelta(minutes=number // 2))
+
+    def setUp(self):
+        super().setUp()
+        self.factory = APIRequestFactory()
+
+    def paginate(self, queryset, params):
+        paginator = MovieKeysetPagination()
+        paginator.page_size = 3
+        page = paginator.paginate_queryset(queryset, Request(self.factory.get('/movie/', params)))
+        return paginator, [row['id'] if isinstance(row, dict) else row.pk for row in page]
+
+    @staticmethod
+    def link_params(link):
+        return {name: values[0] for name, values in parse_qs(urlsplit(link).query).items()}
+
+    def expected(self, ordering):
+        movies = list(Movie.objects.non_polymorphic())
+        if ordering == '-created_at':
+            movies.sort(key=lambda movie: (movie.created_at, movie.pk), reverse=True)
+        elif ordering == '-tmdb_popularity':
+            movies.sort(key=lambda movie: (movie.tmdb_popularity, movie.pk), reverse=True)
+        else:
+            movies.sort(key=lambda movie: movie.pk, reverse=True)
+            movies.sort(key=lambda movie: movie.title)
+            movies.sort(key=lambda movie: movie.release_date or datetime.date.min, reverse=True)
+            movies.sort(key=lambda movie: movie.release_date is None)
+        return [movie.pk for movie in movies]
+
+    def test_round_trip(self):
+        querysets = {
+            'instances': Movie.objects.non_polymorphic(),
+            'values': Movie.objects.non_polymorphic().values('id', 'title', 'release_date', 'created_at',
+                                                             'tmdb_popularity'),
+        }
+        for ordering in MovieKeysetPagination.orderings:
+            for name, queryset in querysets.items():
+                with self.subTest(ordering=ordering, rows=name):
+                    pages = []
+                    params = {'ordering': ordering}
+                    while True:
+                        paginator, page = self.paginate(queryset, params)
+                        pages.append(page)
+                        link = paginator.get_next_link()
+                        if link is None:
+                            break
+                        params = self.link_params(link)
+                    self.assertEqual([pk for page in pages for pk in page], self.expected(ordering))
+                    self.assertEqual(len(pages), 3)
+
+                    # برگشت با previous از صفحه آخر همان صفحه‌ها را به ترتیب عکس می‌دهد.
+                    for expected in reversed(pages[:-1]):
+                        params = self.link_params(paginator.get_previous_link())
+                        paginator, page = self.paginate(queryset, params)
+                        self.assertEqual(page, expected)
+                    self.assertIsNone(paginator.get_previous_link())
+
+    def test_invalid_cursor(self):
+        unknown = urlsafe_b64encode(json.dumps({'o': 'title', 'p': [1], 'r': False}).encode()).decode()
+        wrong_length = urlsafe_b64encode(json.dumps({'o': '-created_at', 'p': [1], 'r': False}).encode()).decode()
+        for cursor in ('garbage', unknown, wrong_length):
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(NotFound):
+                    self.paginate(Movie.objects.non_polymorphic(), {'cursor': cursor})
+
+    def test_api_switches_to_cursor_mode(self):
+        response = self.client.get('/movie/', {'pagination': 'cursor'}, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()), {'next', 'previous', 'results'})
+        self.assertIsNone(response.json()['previous'])
+        default = self.client.get('/movie/', HTTP_HOST='localhost').json()
+        self.assertEqual(default['count'], 8)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class VersioningTests(FreshCacheMixin, SimpleTestCase):
+    def test_missing_keys_are_seeded_above_evicted_versions(self):
+        key = VersionedKey('tests:version')
+        first = key.get()
+        self.assertEqual(key.get(), first)
+        self.assertEqual(key.bump(), first + 1)
+        self.assertEqual(get_versions(['tests:version', 'tests:other'])['tests:version'], first + 1)
+
+        # کلیدی که پاک شده از نو با مقداری بزرگ‌تر از همه نسخه‌های قبلی شروع می‌شود.
+        cache.clear()
+        self.assertGreater(key.get(), first + 1)
+        cache.clear()
+        self.assertGreater(bump_version('tests:version'), first + 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class VersionInvalidationTests(FreshCacheMixin, TestCase):
+    def test_resolver_is_invalidated_only_by_resolved_fields(self):
+        movie = Movie.objects.create(title='Heat')
+        self.assertEqual(resolve_movie('heat').pk, movie.pk)
+        self.assertEqual(resolve_movie('Heat').model, Movie)
+        version = RESOLVER_VERSION.get()
+
+        movie = Movie.objects.get(pk=movie.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            movie.imdb_rating = '8.3'
+            movie.description = 'Los Angeles'
+            movie.save()
+        self.assertEqual(RESOLVER_VERSION.get(), version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            movie.title = 'Heat 1995'
+            movie.save()
+        self.assertEqual(RESOLVER_VERSION.get(), version + 1)
+        self.assertIsNone(resolve_movie('Heat'))
+        self.assertEqual(resolve_movie('Heat 1995').pk, movie.pk)
+
+        # بعد از ذخیره، مقدار ذخیره شده مبنای مقایسه بعدی است.
+        self.assertEqual(movie.changed_fields(), set())
+
+    def test_type_tree_reloads_after_invalidation(self):
+        Type.objects.create(name='Movie', slug='movie')
+        tree = get_type_tree()
+        self.assertIs(get_type_tree(), tree)
+        with self.captureOnCommitCallbacks(execute=True):
+            Type.objects.create(name='Short', slug='short', parent=Type.objects.get(slug='movie'))
+        self.assertIsNot(get_type_tree(), tree)
+        self.assertIsNotNone(get_type_tree().get('short'))
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_type_tree()
+        self.assertIsNotNone(get_type_tree().get('short'))
+
+
+class ResponseCacheBackendTestsMixin:
+    def make_backend(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        super().setUp()
+        self.backend = self.make_backend()
+
+    def store(self, key, value, tags):
+        self.backend.set(key, value, {ALL_TAG} | tags, self.backend.generation())
+
+    def test_invalidate_only_tagged_entries(self):
+        self.store('list', 'movies', {'movie:list'})
+        self.store('detail-1', 'one', {'movie:1'})
+        self.store('detail-2', 'two', {'movie:2'})
+        self.backend.invalidate({'movie:list', 'movie:1'})
+        self.assertIsNone(self.backend.get('list'))
+        self.assertIsNone(self.backend.get('detail-1'))
+        self.assertEqual(self.backend.get('detail-2'), 'two')
+
+    def test_entry_stored_again_after_invalidation(self):
+        self.store('detail-1', 'old', {'movie:1'})
+        self.backend.invalidate({'movie:1'})
+        self.store('detail-1', 'new', {'movie:1'})
+        self.assertEqual(self.backend.get('detail-1'), 'new')
+
+    def test_set_after_concurrent_invalidation_is_dropped(self):
+        generation = self.backend.generation()
+        self.backend.invalidate({'movie:1'})
+        self.backend.set('detail-1', 'stale', {'movie:1'}, generation)
+        self.assertIsNone(self.backend.get('detail-1'))
+
+    def test_invalidated_at(self):
+        self.assertFalse(self.backend.invalidated_at())
+        self.backend.invalidate({'movie:1'})
+        self.assertTrue(self.backend.invalidated_at())
+
+    def test_clear(self):
+        self.store('list', 'movies', {'movie:list'})
+        self.store('detail-1', 'one', {'movie:1'})
+        self.backend.clear()
+        self.assertIsNone(self.backend.get('list'))
+        self.assertIsNone(self.backend.get('detail-1'))
+
+
+class LRUBackendTests(ResponseCacheBackendTestsMixin, SimpleTestCase):
+    def make_backend(self):
+        return LRUBackend(max_entries=3, timeout=None)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        for key in ('a', 'b', 'c'):
+            self.store(key, key, {'tag:%s' % key})
+        self.backend.get('a')
+        self.store('d', 'd', {'tag:d'})
+        self.assertIsNone(self.backend.get('b'))
+        self.assertEqual([self.backend.get(key) for key in ('a', 'c', 'd')], ['a', 'c', 'd'])
+
+    def test_timeout(self):
+        self.backend = LRUBackend(max_entries=3, timeout=0)
+        self.store('a', 'a', {'tag:a'})
+        self.assertIsNone(self.backend.get('a'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SharedBackendTests(FreshCacheMixin, ResponseCacheBackendTestsMixin, SimpleTestCase):
+    def make_backend(self):
+        return SharedBackend(alias='default', timeout=None, key_prefix='test-response-cache')
+
+    def test_invalidation_is_seen_by_other_instances(self):
+        other = self.make_backend()
+        self.store('detail-1', 'one', {'movie:1'})
+        self.assertEqual(other.get('detail-1'), 'one')
+        other.invalidate({'movie:1'})
+        self.assertIsNone(self.backend.get('detail-1'))
+
+    def test_clear_keeps_other_cache_keys(self):
+        cache.set('movielenz:unrelated', 'kept', None)
+        self.backend.clear()
+        self.assertEqual(cache.get('movielenz:unrelated'), 'kept')
+
+    def test_evicted_tag_versions_do_not_revive_old_entries(self):
+        self.store('detail-1', 'old', {'movie:1'})
+        self.backend.invalidate({'movie:1'})
+        cache.delete('test-response-cache:tag:movie:1')
+        # نسخه از نو ساخته شده هرگز با نسخه ذخیره شده در ورودی قدیمی برابر نیست.
+        self.assertIsNone(self.backend.get('detail-1'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ResponseCacheInvalidationTests(FreshCacheMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.genre = Genre.objects.create(name='Crime', translated_genre='جنایی')
+        cls.actor = Actor.objects.create(name='Al Pacino')
+        cls.movie = Movie.objects.create(title='Heat')
+        cls.other = Movie.objects.create(title='Ronin')
+        cls.movie.actors.add(cls.actor)
+        cls.movie.genres.add(cls.genre)
+
+    def get(self, path):
+        response = self.client.get(path, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def detail(self, movie):
+        return self.get('/movie/%s/' % movie.pk)
+
+    def listed(self, movie):
+        return next(item for item in self.get('/movie/')['results'] if item['id'] == movie.pk)
+
+    def test_related_rename_reaches_cached_detail_list_and_card(self):
+        self.assertEqual(self.detail(self.movie)['actors'][0]['name'], 'Al Pacino')
+        self.assertEqual(self.listed(self.movie)['genres'][0]['name'], 'Crime')
+        other = self.detail(self.other)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.actor.name = 'Alfredo Pacino'
+            self.actor.save()
+            self.genre.name = 'Heist'
+            self.genre.save()
+
+        self.assertEqual(self.detail(self.movie)['actors'][0]['name'], 'Alfredo Pacino')
+        self.assertEqual(self.listed(self.movie)['genres'][0]['name'], 'Heist')
+        card = MovieCard.objects.get(movie=self.movie).data
+        self.assertEqual((card['actors'][0]['name'], card['genres'][0]['name']), ('Alfredo Pacino', 'Heist'))
+        # پاسخ فیلمی که به این ردیف‌ها ربطی ندارد باطل نمی‌شود.
+        self.assertEqual(self.detail(self.other), other)
+
+    def test_aggregate_change_reaches_cached_detail(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.directors.add(Director.objects.create(full_name='Michael Mann'))
+        director = self.detail(self.other)['directors'][0]
+        self.assertEqual(director['movie_count'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.movie.directors.add(director['id'])
+        self.assertEqual(self.detail(self.other)['directors'][0]['movie_count'], 2)
+
+    def test_type_rename_reaches_cached_detail(self):
+        self.detail(self.movie)
+        with self.captureOnCommitCallbacks(execute=True):
+            Type.objects.filter(slug='movie').update(name='Feature')
+            movie_type = Type.objects.get(slug='movie')
+            movie_type.save()
+        self.assertEqual(self.detail(self.movie)['type']['name'], 'Feature')
+
+    def test_movie_edit_reaches_cached_list(self):
+        self.assertIsNone(self.listed(self.other)['imdb_rating'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.imdb_rating = '7.4'
+            self.other.save()
+        self.assertEqual(str(self.listed(self.other)['imdb_rating']), '7.4')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConditionalResponseTests(FreshCacheMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.actor = Actor.objects.create(name='Al Pacino')
+        cls.movie = Movie.objects.create(title='Heat')
+        cls.movie.actors.add(cls.actor)
+
+    def get(self, path, **headers):
+        return self.client.get(path, HTTP_HOST='localhost', **headers)
+
+    def test_cached_hit_answers_not_modified_without_queries(self):
+        for path in ('/movie/', '/movie/%s/' % self.movie.pk, '/movie/facets/'):
+            with self.subTest(path=path):
+                first = self.get(path)
+                self.assertEqual(first.status_code, 200)
+                self.assertTrue(first['ETag'].startswith('W/"'))
+                with self.assertNumQueries(0):
+                    cached = self.get(path)
+                    not_modified = self.get(path, HTTP_IF_NONE_MATCH=first['ETag'])
+                self.assertEqual((cached.status_code, cached['ETag']), (200, first['ETag']))
+                self.assertEqual(not_modified.status_code, 304)
+                self.assertEqual(self.get(path, HTTP_IF_NONE_MATCH='W/"other"').status_code, 200)
+
+    @override_settings(MOVIE_CARDS_ENABLED=False)
+    def test_related_rename_changes_etag(self):
+        paths = ('/movie/', '/movie/%s/' % self.movie.pk)
+        etags = {path: self.get(path)['ETag'] for path in paths}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.actor.name = 'Alfredo Pacino'
+            self.actor.save()
+        for path in paths:
+            with self.subTest(path=path):
+                response = self.get(path, HTTP_IF_NONE_MATCH=etags[path])
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etags[path])
+
+    @override_settings(RESPONSE_CACHE={'ENABLED': False})
+    def test_validators_without_response_cache(self):
+        path = '/movie/%s/' % self.movie.pk
+        first = self.get(path)
+        self.assertEqual(self.get(path, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertEqual(self.get(path, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304)
+        Movie.objects.filter(pk=self.movie.pk).update(updated_at=timezone.now() + datetime.timedelta(seconds=5))
+        self.assertEqual(self.get(path, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+        self.assertEqual(self.get('/movie/0/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 404)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FullTextSearchTests(FreshCacheMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.heat = Movie.objects.create(title='Heat', description='A heist in Los Angeles', imdb_id='tt0113277')
+        cls.ronin = Movie.objects.create(title='Ronin', description='Heat of the chase')
+        cls.persian = Movie.objects.create(title='درباره الی')
+        cls.heat.actors.add(Actor.objects.create(name='Al Pacino'))
+        cls.ronin.directors.add(Director.objects.create(full_name='John Frankenheimer'))
+
+    def setUp(self):
+        super().setUp()
+        search.reset_availability()
+        call_command('rebuild_search_index', stdout=StringIO())
+        if search.get_search_backend(populated=True) is None:
+            self.skipTest('SQLite بدون FTS5')
+
+    def search(self, query):
+        response = self.client.get('/movie/', {'search': query}, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.json()['results']]
+
+    def test_matches_and_ranking(self):
+        self.assertEqual(self.search('heat'), [self.heat.pk, self.ronin.pk])
+        self.assertEqual(self.search('pacino'), [self.heat.pk])
+        self.assertEqual(self.search('franken'), [self.ronin.pk])
+        self.assertEqual(self.search('tt0113277'), [self.heat.pk])
+        self.assertEqual(self.search('heat pacino'), [self.heat.pk])
+        self.assertEqual(self.search('nothing'), [])
+        # «ي» عربی و «ی» فارسی یکسان هستند.
+        self.assertEqual(self.search('الي'), [self.persian.pk])
+        self.assertEqual(self.client.get('/movie/', {'search': 'heat', 'ordering': 'title'},
+                                         HTTP_HOST='localhost').json()['count'], 2)
+
+    def test_index_follows_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ronin.title = 'Ronin Reloaded'
+            self.ronin.save()
+            self.heat.actors.first().delete()
+        self.assertEqual(self.search('reloaded'), [self.ronin.pk])
+        self.assertEqual(self.search('pacino'), [])
+
+    def test_empty_index_falls_back_to_search_filter(self):
+        search.get_search_backend().clear()
+        search.reset_availability()
+        self.assertIsNone(search.get_search_backend(populated=True))
+        self.assertEqual(sorted(self.search('heat')), sorted([self.heat.pk, self.ronin.pk]))
+        self.assertEqual(self.search('pacino'), [self.heat.pk])
+        self.assertEqual(self.search('franken'), [self.ronin.pk])
+
+
+class NormalizeTextTests(SimpleTestCase):
+    def test_arabic_letters(self):
+        self.assertEqual(normalize_text('علي كريمي'), normalize_text('علی کریمی'))
+        self.assertEqual(normalize_text('مدرسة'), 'مدرسه')
+        self.assertEqual(normalize_text('أحمد إسلام'), 'احمد اسلام')
+
+    def test_digits(self):
+        self.assertEqual(normalize_text('۱۲۳ ٤٥٦'), '123 456')
+
+    def test_invisible_characters_and_diacritics(self):
+        self.assertEqual(normalize_text('می\u200cخواهم'), 'میخواهم')
+        self.assertEqual(normalize_text('كـتـاب'), 'کتاب')
+        self.assertEqual(normalize_text('مُحَمَّد'), 'محمد')
+
+    def test_whitespace_and_case(self):
+        self.assertEqual(normalize_text('  The\tDark   KNIGHT \n'), 'the dark knight')
+
+    def test_none(self):
+        self.assertEqual(normalize_text(None), '')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class GenreSearchTests(FreshCacheMixin, TestCase):
+    def test_search_matches_inside_normalized_names(self):
+        crime = Genre.objects.create(name='Crime Drama', translated_genre='درام جنايي')
+        Genre.objects.create(name='Comedy', translated_genre='کمدی')
+        for query in ('drama', 'DRAMA', 'جنایی', 'درام جنا'):
+            with self.subTest(query=query):
+                results = self.client.get('/genres/', {'search': query}, HTTP_HOST='localhost').json()['results']
+                self.assertEqual([genre['id'] for genre in results], [crime.pk])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class MovieCardTests(FreshCacheMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.root = Type.objects.create(name='Movie', slug='movie')
+        cls.child = Type.objects.create(name='Animation', slug='animation', parent=cls.root)
+        cls.grandchild = Type.objects.create(name='Anime', slug='anime', parent=cls.child)
+
+    def create_movie(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            movie = Movie.objects.create(**fields)
+            movie.actors.add(Actor.objects.create(name='Actor of %s' % fields['title']))
+        return Movie.objects.get(pk=movie.pk)
+
+    def card(self, movie):
+        return MovieCard.objects.get(movie=movie).data
+
+    def test_type_change_refreshes_cards_of_the_whole_subtree(self):
+        child_movie = self.create_movie(title='Spirited Away', type=self.child)
+        grandchild_movie = self.create_movie(title='Akira', type=self.grandchild)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.child.slug = 'animated'
+            self.child.save()
+        self.assertEqual(self.card(child_movie)['type']['slug'], 'animated')
+        self.assertEqual(self.card(grandchild_movie)['type']['parent_slug'], 'animated')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.child.delete()
+        self.assertIsNone(self.card(child_movie)['type'])
+
+    def test_rating_change_without_reading_the_previous_value(self):
+        movie = self.create_movie(title='Heat', imdb_rating='8.0')
+        actor = movie.actors.get()
+        self.assertEqual(str(Actor.objects.get(pk=actor.pk).average_rating), '8.0')
+
+        movie.imdb_rating = '8.4'
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                movie.save()
+        reads = [query['sql'] for query in queries
+                 if query['sql'].startswith('SELECT') and 'FROM "movielenz_movie" WHERE' in query['sql']]
+        self.assertEqual(reads, [])
+        self.assertEqual(str(Actor.objects.get(pk=actor.pk).average_rating), '8.4')
+        self.assertEqual(str(self.card(movie)['imdb_rating']), '8.4')
+
+        # ذخیره بدون تغییر امتیاز، average_rating افراد را دوباره حساب نمی‌کند.
+        Actor.objects.filter(pk=actor.pk).update(average_rating=None)
+        movie.description = 'Los Angeles'
+        with self.captureOnCommitCallbacks(execute=True):
+            movie.save()
+        self.assertIsNone(Actor.objects.get(pk=actor.pk).average_rating)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CatalogImportTests(TestCase):
+    rows = [
+        {'tmdb_id': 1, 'title': 'Inception', 'type': 'movie', 'release_date': '2010-07-16', 'imdb_rating': '8.8',
+         'genres': [{'tmdb_id': 28, 'name': 'Action', 'translated_genre': 'اکشن'}, 'Drama'],
+         'actors': [{'tmdb_id': 6193, 'name': 'Leonardo DiCaprio'}, 'Tom Hardy'],
+         'directors': [{'tmdb_id': 525, 'full_name': 'Christopher Nolan'}]},
+        {'tmdb_id': 2, 'title': 'Breaking Bad', 'type': 'series', 'number_of_seasons': 5, 'series_status': 'ended',
+         'genres': ['Drama'], 'actors': [{'tmdb_id': 17419, 'name': 'Bryan Cranston'}]},
+        {'title': ''},
+    ]
+
+    def run_import(self, rows):
+        importer = CatalogImporter(batch_size=2, refresh=False)
+        return importer.run(enumerate(rows, 1))
+
+    def snapshot(self):
+        return {
+            'movies': sorted(Movie.objects.non_polymorphic().values_list('tmdb_id', 'title', 'slug', 'type__slug')),
+            'series': sorted(Series.objects.values_list('tmdb_id', 'number_of_seasons', 'series_status')),
+            'genres': sorted(Genre.objects.values_list('name', 'slug')),
+            'actors': sorted(Actor.objects.values_list('name', 'tmdb_id', 'movie_count')),
+            'directors': sorted(Director.objects.values_list('full_name', 'movie_count', 'average_rating')),
+            'links': sorted(Movie.actors.through.objects.values_list('movie__tmdb_id', 'actor__name')),
+        }
+
+    def test_import(self):
+        self.assertEqual(self.run_import(self.rows), (2, 1))
+        snapshot = self.snapshot()
+        self.assertEqual(snapshot['series'], [(2, 5, 'ended')])
+        self.assertEqual([movie[3] for movie in snapshot['movies']], ['movie', 'series'])
+        self.assertEqual(snapshot['links'], [(1, 'Leonardo DiCaprio'), (1, 'Tom Hardy'), (2, 'Bryan Cranston')])
+        self.assertEqual(snapshot['directors'][0][1:], (1, Decimal('8.8')))
+
+    def test_reimport_is_idempotent(self):
+        self.run_import(self.rows)
+        before = self.snapshot()
+        self.assertEqual(self.run_import(self.rows), (2, 1))
+        self.assertEqual(self.snapshot(), before)
+
+    def test_reimport_updates_rows(self):
+        self.run_import(self.rows)
+        self.run_import([
+            {'tmdb_id': 1, 'title': 'Inception', 'imdb_rating': '9.0', 'actors': ['Tom Hardy']},
+            {'tmdb_id': 2, 'title': 'Breaking Bad', 'type': 'series', 'number_of_seasons': 6},
+        ])
+        snapshot = self.snapshot()
+        self.assertEqual(snapshot['series'], [(2, 6, 'ended')])
+        self.assertEqual(snapshot['links'], [(1, 'Tom Hardy'), (2, 'Bryan Cranston')])
+        self.assertEqual(snapshot['directors'][0][1:], (1, Decimal('9.0')))
+        self.assertEqual(Movie.objects.filter(tmdb_id=1).count(), 1)
+
+    def test_reimport_series_as_movie_drops_the_series_row(self):
+        self.run_import(self.rows)
+        series = Movie.objects.get(tmdb_id=2)
+        Episode.objects.create(movie=series, title='Pilot')
+        self.run_import([{'tmdb_id': 2, 'title': 'Breaking Bad', 'type': 'movie'}])
+        self.assertFalse(Series.objects.filter(tmdb_id=2).exists())
+        movie = Movie.objects.get(tmdb_id=2)
+        self.assertIs(type(movie), Movie)
+        self.assertEqual(movie.type.slug, 'movie')
+        self.assertEqual(movie.episodes.count(), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CompiledSerializerParityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        parent = Type.objects.create(name='Movie', slug='movie')
+        child = Type.objects.create(name='Short', slug='short', parent=parent)
+        action = Genre.objects.create(name='Action', translated_genre='اکشن')
+        drama = Genre.objects.create(name='Drama', translated_genre='درام')
+        actor = Actor.objects.create(name='Tom Hardy', popularity=12)
+        other = Actor.objects.create(name='Cillian Murphy')
+        director = Director.objects.create(full_name='Christopher Nolan')
+
+        movie = Movie.objects.create(title='Dunkirk', type=child, release_date=datetime.date(2017, 7, 21),
+                                     imdb_rating='7.8', tmdb_popularity=40, poster='https://example.com/d.jpg')
+        movie.genres.set([action, drama])
+        movie.actors.set([actor, other])
+        movie.directors.set([director])
+        series = Series.objects.create(title='Peaky Blinders', number_of_seasons=6, tmdb_user_score='8.5')
+        series.actors.set([other])
+        Movie.objects.create(title='Untitled', status=False)
+
+    def test_movie_output_matches_drf_serializer(self):
+        queryset = (Movie.objects.with_subclasses().order_by('-created_at', '-id')
+                    .select_related('type__parent').prefetch_related('genres', 'actors', 'directors'))
+        compiled = FastMovieSerializer.for_fields()
+        expected = FastMovieSerializer.serializer_class(queryset, many=True).data
+        actual = compiled.serialize(compiled.values(queryset), using=queryset.db)
+        self.assertEqual(len(actual), 3)
+        self.assertEqual(json.loads(json.dumps(actual, cls=JSONEncoder)),
+                         json.loads(json.dumps(expected, cls=JSONEncoder)))
+
+    def test_field_subset(self):
+        queryset = Movie.objects.with_subclasses().order_by('id')
+        fields = ('id', 'title', 'object_type', 'genres')
+        compiled = FastMovieSerializer.for_fields(fields)
+        expected = FastMovieSerializer.serializer_class(queryset, many=True, fields=fields).data
+        actual = compiled.serialize(compiled.values(queryset), using=queryset.db)
+        self.assertEqual(json.loads(json.dumps(actual, cls=JSONEncoder)),
+                         json.loads(json.dumps(expected, cls=JSONEncoder)))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TrendingTests(FreshCacheMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        movie_type = Type.objects.create(name='Movie', slug='movie')
+        cls.recent, cls.older, cls.inactive = [
+            Movie.objects.create(title=title, type=movie_type, status=status)
+            for title, status in (('Recent', True), ('Older', True), ('Inactive', False))
+        ]
+        cls.now = bucket_hour(timezone.now())
+
+    def watch(self, movie, hours_ago, count=1):
+        for _ in range(count):
+            record_watch(movie.pk, self.now - datetime.timedelta(hours=hours_ago) + datetime.timedelta(minutes=30))
+
+    def test_record_watch_counts_per_hour(self):
+        self.watch(self.recent, 0, count=3)
+        self.watch(self.recent, 1)
+        self.assertEqual(
+            sorted(WatchActivityBucket.objects.values_list('hour', 'count')),
+            [(self.now - datetime.timedelta(hours=1), 1), (self.now, 3)],
+        )
+
+    def test_scores_decay_with_half_life(self):
+        # نیمه عمر بازه 24h شش ساعت است: یک تماشای حالا = دو تماشای شش ساعت پیش.
+        self.watch(self.recent, 0)
+        self.watch(self.older, 6, count=2)
+        scores = dict(compute_trending('24h', now=self.now))
+        self.assertAlmostEqual(scores[self.recent.pk], 1.0)
+        self.assertAlmostEqual(scores[self.older.pk], 1.0)
+
+        self.watch(self.older, 12, count=4)
+        self.assertEqual([movie_id for movie_id, _score in compute_trending('24h', now=self.now)],
+                         [self.older.pk, self.recent.pk])
+        self.assertAlmostEqual(dict(compute_trending('24h', now=self.now))[self.older.pk], 2.0)
+
+    def test_window_excludes_older_buckets(self):
+        self.watch(self.recent, 0)
+        self.watch(self.older, 30, count=10)
+        self.assertEqual([movie_id for movie_id, _score in compute_trending('24h', now=self.now)], [self.recent.pk])
+        self.assertEqual([movie_id for movie_id, _score in compute_trending('7d', now=self.now)],
+                         [self.older.pk, self.recent.pk])
+
+    def test_prune_keeps_the_largest_window(self):
+        self.watch(self.recent, 0)
+        self.watch(self.older, 24 * 7 + 1)
+        self.assertEqual(prune(now=self.now), 1)
+        self.assertEqual(list(WatchActivityBucket.objects.values_list('movie_id', flat=True)), [self.recent.pk])
+
+    def test_endpoint_orders_by_score_and_hides_inactive_titles(self):
+        self.watch(self.inactive, 0, count=5)
+        self.watch(self.older, 6, count=3)
+        self.watch(self.recent, 0)
+        response = self.client.get('/movie/trending/', {'window': '24h'}, HTTP_HOST='localhost')
+        self.assertEqual([movie['id'] for movie in response.json()], [self.older.pk, self.recent.pk])
+        self.assertEqual(self.client.get('/movie/trending/', {'window': '1y'}, HTTP_HOST='localhost').status_code,
+                         400)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AutocompleteTests(FreshCacheMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.movie_type = Type.objects.create(name='Movie', slug='movie')
+        Movie.objects.create(title='Inception', type=cls.movie_type, tmdb_popularity=50)
+        cls.actor = Actor.objects.create(name='Tom Hardy', popularity=10)
+        Director.objects.create(full_name='Christopher Nolan')
+
+    def labels(self, index, query):
+        return [entry.label for entry in index.search(query, 10)]
+
+    def test_batched_replace_matches_a_fresh_load(self):
+        config = autocomplete.get_config()
+        entries = [autocomplete.person_entry('actor', pk, None, 'Actor %s %s' % (pk % 7, pk), None, pk, config)
+                   for pk in range(200)]
+        removed = [('actor', pk) for pk in range(150, 160)]
+        for batch in (entries[:5], entries[:150]):
+            # ۵ ورودی با list.insert و ۱۵۰ ورودی (که نیمی از آن‌ها جایگزین می‌شوند) با ادغام آرایه‌ها
+            index = autocomplete.PrefixIndex(config)
+            index.load(entries[100:])
+            index.replace(removed, batch)
+            expected = autocomplete.PrefixIndex(config)
+            expected.load({entry.pk: entry for entry in entries[100:] + batch
+                           if ('actor', entry.pk) not in removed}.values())
+            self.assertEqual(index.keys, expected.keys)
+            self.assertEqual(sorted(index.owners), sorted(expected.owners))
+            self.assertEqual(index.entries, expected.entries)
+
+    def test_other_processes_apply_the_change_log(self):
+        other = autocomplete.build_index()
+        self.assertEqual(self.labels(other, 'tom'), ['Tom Hardy'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.actor.name = 'Thomas Hardy'
+            self.actor.save()
+            Movie.objects.create(title='Tenet', type=self.movie_type)
+        with self.assertNumQueries(2):
+            # فقط فیلم‌ها و بازیگران تغییر کرده؛ کارگردانی تغییر نکرده است.
+            self.assertTrue(autocomplete.apply_changes(other, autocomplete.VERSION_KEY.get()))
+        self.assertEqual(self.labels(other, 'tom'), [])
+        self.assertEqual(self.labels(other, 'hardy'), ['Thomas Hardy'])
+        self.assertEqual(self.labels(other, 'ten'), ['Tenet'])
+
+        # پایان import_catalog لاگ ندارد: ساختن کامل
+        with self.captureOnCommitCallbacks(execute=True):
+            autocomplete.invalidate_autocomplete()
+        self.assertFalse(autocomplete.apply_changes(other, autocomplete.VERSION_KEY.get()))
+
+
+class ReplicaProbeView(ReplicaReadMixin, APIView):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        return Response({'replica': _replica.get()})
+
+    def post(self, request):
+        return Response({'replica': _replica.get()})
+
+
+class RouterTests(SimpleTestCase):
+    def test_reads_follow_the_request_replica(self):
+        router = PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(Movie), 'default')
+        token = _replica.set('replica')
+        try:
+            self.assertEqual(router.db_for_read(Movie), 'replica')
+            # نمونه‌ای که از اصلی خوانده شده روی اصلی می‌ماند.
+            self.assertEqual(router.db_for_read(Genre, instance=Genre(pk=1)), 'replica')
+            primary = Genre(pk=1)
+            primary._state.db = 'default'
+            self.assertEqual(router.db_for_read(Genre, instance=primary), 'default')
+            self.assertEqual(router.db_for_write(Movie), 'default')
+        finally:
+            _replica.reset(token)
+
+
+# default به عنوان تنها replica: مسیر replica بدون پایگاه داده دوم گرفته می‌شود.
+@override_settings(CACHES=LOCMEM_CACHES, DATABASE_REPLICAS=['default'],
+                   DATABASE_ROUTING={'PIN_SECONDS': 5, 'PIN_COOKIE': 'db_pin'})
+class ReplicaPinningTests(FreshCacheMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='writer@example.com', password='secret')
+        cls.other = User.objects.create_user(email='reader@example.com', password='secret')
+
+    def setUp(self):
+        super().setUp()
+        self.factory = RequestFactory()
+
+    def run_middleware(self, request, write):
+        def view(request):
+            if write:
+                PrimaryReplicaRouter().db_for_write(Movie)
+            return HttpResponse()
+        return DatabaseRoutingMiddleware(view)(request)
+
+    def test_reads_inside_a_transaction_stay_on_the_primary(self):
+        token = _replica.set('replica')
+        try:
+            self.assertEqual(PrimaryReplicaRouter().db_for_read(Movie), 'default')
+        finally:
+            _replica.reset(token)
+
+    def test_write_pins_the_client_and_the_user(self):
+        request = self.factory.post('/')
+        request.user = self.user
+        response = self.run_middleware(request, write=True)
+        self.assertEqual(response.cookies['db_pin']['max-age'], 5)
+        self.assertTrue(cache.get(PIN_KEY % self.user.pk))
+
+        with_cookie = self.factory.get('/')
+        with_cookie.COOKIES['db_pin'] = '1'
+        self.assertTrue(is_pinned(with_cookie))
+        for user, pinned in ((self.user, True), (self.other, False)):
+            request = self.factory.get('/')
+            request.user = user
+            self.assertEqual(is_pinned(request), pinned)
+
+    def test_read_only_request_is_not_pinned(self):
+        request = self.factory.get('/')
+        request.user = self.user
+        response = self.run_middleware(request, write=False)
+        self.assertNotIn('db_pin', response.cookies)
+        self.assertIsNone(cache.get(PIN_KEY % self.user.pk))
+
+    def test_only_unpinned_safe_requests_use_a_replica(self):
+        view = ReplicaProbeView.as_view()
+        self.assertEqual(view(self.factory.get('/')).data, {'replica': 'default'})
+        self.assertIsNone(_replica.get())
+        self.assertEqual(view(self.factory.post('/')).data, {'replica': None})
+        pinned = self.factory.get('/')
+        pinned.COOKIES['db_pin'] = '1'
+        self.assertEqual(view(pinned).data, {'replica': None})
+
+    def test_replica_reads_are_not_cached_right_after_an_invalidation(self):
+        response_cache = get_response_cache()
+        response_cache.invalidate({'movie:list'})
+        self.assertFalse(replica_may_be_stale(response_cache))
+        token = _replica.set('default')
+        try:
+            self.assertTrue(replica_may_be_stale(response_cache))
+            with override_settings(DATABASE_ROUTING={'PIN_SECONDS': 0}):
+                self.assertFalse(replica_may_be_stale(response_cache))
+        finally:
+            _replica.reset(token)
@@ -0,0 +1,92 @@
+"""
+پرطرفدارهای اخیر (/movie/trending/?window=24h|7d).
+
+هر ثبت تماشا (RecentlyWatchedItem، از طریق user_account.signals) شمارنده ساعت جاری فیلم را در
+WatchActivityBucket یکی زیاد می‌کند. امتیاز یک فیلم در یک بازه جمع شمارنده‌های ساعتی آن با وزن
+کاهشی نمایی است: 0.5 ** (سن سطل / نیمه عمر). وزن هر ساعت از قبل معلوم است، پس کل رتبه‌بندی یک کوئری
+GROUP BY با CASE روی سطل‌های همان بازه است؛ هزینه آن به تعداد سطل‌های بازه (فیلم‌های فعال × ساعت‌ها)
+بستگی دارد، نه به تعداد کل رویدادهای تماشا.
+
+لیست برتر هر بازه به مدت REFRESH ثانیه در کش جنگو نگه داشته می‌شود.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import Case, F, FloatField, Sum, Value, When
+from django.utils import timezone
+
+from .models import WatchActivityBucket
+
+DEFAULTS = {
+    'WINDOWS': {
+        '24h': {'hours': 24, 'half_life': 6},
+        '7d': {'hours': 24 * 7, 'half_life': 48},
+    },
+    'DEFAULT_WINDOW': '24h',
+    'SIZE': 100,
+    'REFRESH': 60,
+}
+
+CACHE_KEY = 'movielenz:trending:%s:%s'
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'TRENDING', {})}
+
+
+def bucket_hour(when):
+    return when.replace(minute=0, second=0, microsecond=0)
+
+
+def record_watch(movie_id, when=None, using=DEFAULT_DB_ALIAS):
+    """شمارنده ساعت رویداد را یکی زیاد می‌کند (UPDATE، و در اولین رویداد آن ساعت INSERT)."""
+    hour = bucket_hour(when or timezone.now())
+    buckets = WatchActivityBucket.objects.using(using)
+    if buckets.filter(movie_id=movie_id, hour=hour).update(count=F('count') + 1):
+        return
+    try:
+        with transaction.atomic(using=using):
+            buckets.create(movie_id=movie_id, hour=hour, count=1)
+    except IntegrityError:
+        # درخواست دیگری همین سطل را هم‌زمان ساخته است.
+        buckets.filter(movie_id=movie_id, hour=hour).update(count=F('count') + 1)
+
+
+def compute_trending(window, using=DEFAULT_DB_ALIAS, now=None):
+    """[(movie_id, امتیاز), ...] برترین فیلم‌های بازه به ترتیب امتیاز."""
+    config = get_config()
+    spec = config['WINDOWS'][window]
+    current = bucket_hour(now or timezone.now())
+    hours = [current - datetime.timedelta(hours=age) for age in range(spec['hours'])]
+    weight = Case(
+        *[When(hour=hour, then=Value(0.5 ** (age / spec['half_life']))) for age, hour in enumerate(hours)],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    rows = (WatchActivityBucket.objects.using(using)
+            .filter(hour__gte=hours[-1], hour__lte=current)
+            .values('movie_id')
+            .annotate(score=Sum(F('count') * weight, output_field=FloatField()))
+            .order_by('-score', 'movie_id')
+            .values_list('movie_id', 'score')[:config['SIZE']])
+    return [(movie_id, round(score, 6)) for movie_id, score in rows]
+
+
+def get_trending_ids(window, using=DEFAULT_DB_ALIAS):
+    key = CACHE_KEY % (using, window)
+    movie_ids = cache.get(key)
+    if movie_ids is None:
+        movie_ids = [movie_id for movie_id, _score in compute_trending(window, using=using)]
+        cache.set(key, movie_ids, get_config()['REFRESH'])
+    return movie_ids
+
+
+def prune(keep_hours=None, using=DEFAULT_DB_ALIAS, now=None):
+    """سطل‌هایی را که در هیچ بازه‌ای نیستند حذف می‌کند؛ تعداد ردیف‌های حذف شده را برمی‌گرداند."""
+    if keep_hours is None:
+        keep_hours = max(spec['hours'] for spec in get_config()['WINDOWS'].values())
+    cutoff = bucket_hour(now or timezone.now()) - datetime.timedelta(hours=keep_hours)
+    deleted, _rows = WatchActivityBucket.objects.using(using).filter(hour__lt=cutoff).delete()
+    return deleted
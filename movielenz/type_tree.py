@@ -0,0 +1,97 @@
+"""
+کش درختی Type (MPTT).
+
+کل درخت (slug -> pk, tree_id, lft, rght) یک بار خوانده و در حافظه پروسه نگه داشته می‌شود؛ پس تبدیل یک
+اسلاگ به زیردرختش کوئری ندارد. هر نسخه کش یک شماره نسخه دارد (movielenz.versioning) و با
+ذخیره/حذف Type (movielenz.signals) افزایش پیدا می‌کند تا همه پروسه‌ها درخت را از نو بخوانند؛ برای این
+کار CACHES باید بین پروسه‌ها مشترک باشد. هر snapshot در هر حال بعد از TYPE_TREE['TTL'] ثانیه دوباره خوانده
+می‌شود، پس پروسه‌ای که افزایش نسخه را نبیند (مثلا با LocMem) هم حداکثر همین مدت درخت قدیمی دارد.
+
+بعد از Type.objects.rebuild() یا تغییرات دستی lft/rght باید invalidate_type_tree() صدا زده شود.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .versioning import VersionedKey
+
+DEFAULTS = {
+    'TTL': 300,
+}
+
+VERSION_KEY = VersionedKey('movielenz:type-tree-version')
+
+TypeNode = namedtuple('TypeNode', ['pk', 'tree_id', 'lft', 'rght'])
+
+_snapshots = {}
+_lock = threading.Lock()
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'TYPE_TREE', {})}
+
+
+class TypeTree:
+    def __init__(self, version, nodes):
+        self.version = version
+        self.nodes = nodes
+        self.loaded_at = time.monotonic()
+
+    def is_fresh(self, version):
+        ttl = get_config()['TTL']
+        return self.version == version and (ttl is None or time.monotonic() - self.loaded_at < ttl)
+
+    def get(self, slug):
+        return self.nodes.get(slug)
+
+    def subtree_q(self, slugs, prefix='type'):
+        """
+        شرط «نوع در زیردرخت یکی از اسلاگ‌ها» با بازه lft/rght همان درخت (از ایندکس tree_id, lft استفاده می‌کند).
+        اسلاگ ناشناخته هیچ ردیفی را انتخاب نمی‌کند.
+        """
+        condition = Q(pk__in=[])
+        for slug in slugs:
+            node = self.nodes.get(slug)
+            if node is not None:
+                condition |= Q(**{
+                    '%s__tree_id' % prefix: node.tree_id,
+                    '%s__lft__range' % prefix: (node.lft, node.rght),
+                })
+        return condition
+
+
+def get_type_tree(using='default'):
+    from .models import Type
+
+    # نسخه قبل از خواندن درخت خوانده می‌شود؛ اگر وسط کار باطل شود درخواست بعدی دوباره می‌خواند.
+    version = VERSION_KEY.get()
+    snapshot = _snapshots.get(using)
+    if snapshot is not None and snapshot.is_fresh(version):
+        return snapshot
+    with _lock:
+        snapshot = _snapshots.get(using)
+        if snapshot is None or not snapshot.is_fresh(version):
+            nodes = {
+                slug: TypeNode(pk, tree_id, lft, rght)
+                for slug, pk, tree_id, lft, rght in
+                Type.objects.using(using).values_list('slug', 'pk', 'tree_id', 'lft', 'rght')
+            }
+            snapshot = _snapshots[using] = TypeTree(version, nodes)
+    return snapshot
+
+
+def invalidate_type_tree(using='default'):
+    def bump():
+        _snapshots.pop(using, None)
+        VERSION_KEY.bump()
+    transaction.on_commit(bump, using=using)
+
+
+def type_subtree_q(slugs, prefix='type', using='default'):
+    if isinstance(slugs, str):
+        slugs = [slugs]
+    return get_type_tree(using).subtree_q([slug.lower() for slug in slugs], prefix=prefix)
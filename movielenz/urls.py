@@ -3,7 +3,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
-    GenreViewSet, MovieViewSet
+    AutocompleteView, GenreViewSet, MovieViewSet
 )
 
 router = DefaultRouter()
@@ -13,5 +13,6 @@ router.register(r'movie', MovieViewSet, basename='movie')
 app_name = 'cinema'
 
 urlpatterns = [
+    path('autocomplete/', AutocompleteView.as_view(), name='autocomplete'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
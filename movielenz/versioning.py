@@ -0,0 +1,72 @@
+"""
+شماره نسخه‌های مشترک بین پروسه‌ها در کش جنگو.
+
+داده‌هایی که هر پروسه در حافظه خودش نگه می‌دارد (درخت Type، resolver فیلم‌ها، ایندکس تکمیل خودکار) و
+برچسب‌های کش پاسخ با یک کلید نسخه باطل می‌شوند: نوشتن، بعد از commit نسخه را افزایش می‌دهد و خواندن،
+داده‌ای را که با نسخه دیگری ساخته شده دور می‌ریزد.
+
+نسخه‌ها در alias جداگانه VERSION_CACHE['ALIAS'] (اگر در CACHES نباشد همان default) و بدون انقضا نگه داشته
+می‌شوند؛ این alias نباید ورودی‌هایش را بیرون براند (culling). مقدار اولیه هر کلید زمان فعلی به نانوثانیه
+است نه 1، پس کلیدی که با این حال پاک شده از مقداری بزرگ‌تر از همه نسخه‌های قبلی‌اش شروع می‌شود و داده
+ذخیره شده با نسخه قدیمی دوباره معتبر نمی‌شود.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+
+DEFAULTS = {
+    'ALIAS': 'versions',
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'VERSION_CACHE', {})}
+
+
+def get_cache():
+    alias = get_config()['ALIAS']
+    return caches[alias if alias in settings.CACHES else DEFAULT_CACHE_ALIAS]
+
+
+def initial_version():
+    return time.time_ns()
+
+
+def get_versions(keys):
+    """{کلید: نسخه}؛ کلیدی که وجود ندارد با initial_version ساخته می‌شود."""
+    cache = get_cache()
+    keys = list(keys)
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, initial_version(), None)
+        versions.update(cache.get_many(missing))
+    return versions
+
+
+def bump_version(key):
+    """نسخه را افزایش می‌دهد و نسخه جدید را برمی‌گرداند."""
+    cache = get_cache()
+    cache.add(key, initial_version(), None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # کلید بین add و incr پاک شده است.
+        version = initial_version()
+        cache.set(key, version, None)
+        return version
+
+
+class VersionedKey:
+    """یک کلید نسخه؛ get نسخه فعلی و bump افزایش آن (معمولا داخل transaction.on_commit)."""
+
+    def __init__(self, key):
+        self.key = key
+
+    def get(self):
+        return get_versions([self.key]).get(self.key)
+
+    def bump(self):
+        return bump_version(self.key)
@@ -2,21 +2,51 @@ from django.shortcuts import render
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils.translation import gettext_lazy as _
 from django.db.models import Prefetch
+from django.http import Http404
 
 from collections import defaultdict
 
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from .models import Genre,  Movie, Type
 from .serializers import (
-    GenreSerializer,  BaseMovieSerializer
+    GenreSerializer,  BaseMovieSerializer, MoviePolymorphicSerializer
     )
 from .managers import MovieManager 
+from .pagination import MoviePagination
+from .filters import FullTextSearchFilter, MovieFilterSet, NormalizedSearchFilter
+from .cards import cards_enabled, get_cards
+from .response_cache import CachedResponseMixin, cache_response
+from .conditional import ConditionalResponseMixin, conditional_response
+from .db_routing import ReplicaReadMixin
+from .facets import compute_facets
+from .type_tree import type_subtree_q
+from . import autocomplete
+from .trending import get_config as get_trending_config, get_trending_ids
+from .similarity import CACHE_TAG as SIMILAR_CACHE_TAG, get_similar_ids
+from .fast_serializers import FastGenreSerializer, FastListMixin, FastMovieSerializer
+from .instrumentation import serializer_data
 
 
-class GenreViewSet(viewsets.ReadOnlyModelViewSet):
+class AutocompleteView(APIView):
+    """
+    پیشنهادهای جعبه جستجو (فیلم، سریال، بازیگر، کارگردان) از ایندکس پیشوندی داخل حافظه
+    (movielenz.autocomplete)؛ بدون کوئری پایگاه داده. ?q= و ?limit=
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = int(request.query_params.get('limit', 0)) or None
+        except ValueError:
+            return Response({"error": "Invalid limit"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(autocomplete.search(request.query_params.get('q', ''), limit=limit))
+
+
+class GenreViewSet(ReplicaReadMixin, CachedResponseMixin, FastListMixin, viewsets.ReadOnlyModelViewSet):
     """
     این ViewSet اطلاعات ژانرها را فقط برای خواندن (GET) فراهم می‌کند.
     رکوردها با استفاده از اسلاگ قابل دسترسی هستند.
@@ -27,57 +57,173 @@ class GenreViewSet(viewsets.ReadOnlyModelViewSet):
 
     lookup_field = 'slug'
 
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, NormalizedSearchFilter, filters.OrderingFilter]
     filterset_fields = ['name']
-    search_fields = ['name', 'slug']
+    search_fields = ['normalized_name__contains', 'normalized_translated_genre__contains', 'slug']
     ordering_fields = ['name'] 
 
-class MovieViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Movie.objects.all().prefetch_related(
-        'genres', 'actors', 'directors',
-        Prefetch('type', queryset=Type.objects.all())
-    ).select_related('type').order_by('-created_at')
+    cache_tag_prefix = 'genre'
+    compiled_serializer_class = FastGenreSerializer
+
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+class MovieViewSet(ReplicaReadMixin, ConditionalResponseMixin, CachedResponseMixin, FastListMixin,
+                   viewsets.ReadOnlyModelViewSet):
+    # رابطه‌ها (prefetch/select_related) بر اساس ?fields= / ?expand= در with_related اضافه می‌شوند.
+    queryset = Movie.objects.with_subclasses().order_by('-created_at')
 
     # تغییر در اینجا: استفاده از BaseMovieSerializer به جای MoviePolymorphicSerializer
     serializer_class = BaseMovieSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = MoviePagination
 
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = {
-        'release_date': ['exact', 'year', 'year__gte', 'year__lte', 'month', 'day'],
-        'type__slug': ['exact', 'in'],
-        'status': ['exact'],
-        'is_dubbed': ['exact'],
-        'is_subtitled': ['exact'],
-        'genres__slug': ['exact', 'in'],
-        'imdb_rating': ['gte', 'lte', 'exact'],
-        'production_country': ['iexact', 'icontains'],
-        'language': ['iexact', 'icontains'],
-    }
-    search_fields = ['title', 'description', 'actors__name', 'directors__name', 'imdb_id', 'tmdb_id']
+    # جستجو بعد از OrderingFilter اجرا می‌شود تا در نبود ?ordering= ترتیب امتیاز جستجو حفظ شود.
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
+    filterset_class = MovieFilterSet
+    search_fields = ['title', 'description', 'actors__name', 'directors__full_name', 'imdb_id', 'tmdb_id']
     ordering_fields = ['title', 'release_date', 'imdb_rating', 'created_at', 'tmdb_popularity', 'type__name']
     ordering = ['type__name', '-release_date', 'title']
 
+    compiled_serializer_class = FastMovieSerializer
+
+    # فیلدهای تو در تو که فقط با ?expand= (یا نام بردن در ?fields=) برگردانده می‌شوند.
+    expandable_fields = ('genres', 'actors', 'directors')
+
+    cache_tag_prefix = 'movie'
+    # کارت هنگام تغییر بازیگر/کارگردان/ژانر/نوع فیلم هم به‌روز می‌شود.
+    validator_fields = ('updated_at', 'card__updated_at')
+
+    def get_cache_tags(self, data):
+        tags = super().get_cache_tags(data)
+        if self.action == 'facets':
+            # نام و اسلاگ ژانرها در خود پاسخ facets آمده است.
+            tags.add('genre:list')
+        elif self.action == 'similar':
+            # با ساختن دوباره ایندکس یا تغییر یکی از فیلم‌ها (movie:list) باطل می‌شود.
+            tags.add(SIMILAR_CACHE_TAG)
+        return tags
+
+    def get_validator_tags(self):
+        tags = super().get_validator_tags()
+        if self.action == 'facets':
+            tags.append('genre:list')
+        return tags
+
+    def get_requested_fields(self):
+        """
+        مجموعه فیلدهای خروجی بر اساس ?fields=a,b و ?expand=actors,genres؛ بدون هیچ کدام None (همه فیلدها).
+        با fields فقط همان فیلدها، و با expand فقط رابطه‌های نام برده شده از expandable_fields برگردانده
+        می‌شوند. id همیشه در خروجی هست.
+        """
+        if self.request is None or self.get_serializer_class() is not BaseMovieSerializer:
+            return None
+        fields = {name.strip() for name in self.request.query_params.get('fields', '').split(',') if name.strip()}
+        expand = {name.strip() for name in self.request.query_params.get('expand', '').split(',') if name.strip()}
+        if not fields and not expand:
+            return None
+        available = BaseMovieSerializer.readable_field_names()
+        selected = {name for name in available if not fields or name in fields}
+        selected -= {name for name in self.expandable_fields if name not in fields | expand}
+        selected.add('id')
+        return selected
+
+    def with_related(self, queryset):
+        """فقط رابطه‌هایی که در خروجی هستند prefetch یا JOIN می‌شوند."""
+        fields = self.get_requested_fields()
+        queryset = queryset.prefetch_related(
+            *[name for name in self.expandable_fields if fields is None or name in fields]
+        )
+        if fields is None or 'type' in fields:
+            queryset = queryset.select_related('type__parent')
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_requested_fields()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        return super().get_serializer(*args, **kwargs)
+
     def get_queryset(self):
-        qs = super().get_queryset()
+        qs = self.with_related(super().get_queryset())
 
         type_slug_param = self.request.query_params.get('type_slug')
         if type_slug_param:
-            qs = qs.filter(type__slug=type_slug_param.lower())
+            qs = qs.filter(type_subtree_q(type_slug_param, using=qs.db))
 
         movie_type_param = self.request.query_params.get('movie_type')
         if movie_type_param and not type_slug_param:
             standardized_movie_type = movie_type_param.lower()
-            if standardized_movie_type == 'movie':
-                qs = qs.filter(type__slug='movie')
-            elif standardized_movie_type == 'series':
-                qs = qs.filter(type__slug='series')
+            if standardized_movie_type in ('movie', 'series'):
+                qs = qs.filter(type_subtree_q(standardized_movie_type, using=qs.db))
 
         if not self.request.user.is_staff:
             qs = qs.filter(status=True)
         return qs.distinct()
 
+    def get_serializer_class(self):
+        # ?polymorphic=true فیلدهای زیرکلاس (مثلا تعداد فصل‌های سریال) را هم برمی‌گرداند.
+        if self.request is not None and self.request.query_params.get('polymorphic') in ('1', 'true'):
+            return MoviePolymorphicSerializer
+        return super().get_serializer_class()
+
+    def get_compiled_serializer(self):
+        if super().get_compiled_serializer() is None:
+            return None
+        return self.compiled_serializer_class.for_fields(self.get_requested_fields())
+
+    def use_cards(self):
+        """کارت‌ها فقط خروجی BaseMovieSerializer را نگه می‌دارند."""
+        return cards_enabled() and self.get_serializer_class() is BaseMovieSerializer
+
+    def trim_cards(self, cards):
+        fields = self.get_requested_fields()
+        if fields is None:
+            return cards
+        return [{name: value for name, value in card.items() if name in fields} for card in cards]
+
+    def card_response(self, queryset, paginate=True):
+        """
+        پاسخ لیست را از MovieCard می‌سازد: فقط ردیف‌های پایه Movie (بدون prefetch و بدون ارتقای
+        polymorphic) برای صفحه‌بندی خوانده می‌شوند و داده هر ردیف از کارت آن می‌آید.
+        """
+        queryset = queryset.non_polymorphic().select_related(None).prefetch_related(None)
+        page = self.paginate_queryset(queryset) if paginate else None
+        movies = page if page is not None else list(queryset)
+        data = self.trim_cards(get_cards([movie.pk for movie in movies], using=queryset.db))
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def serialize_movie_ids(self, movie_ids):
+        """خروجی فیلم‌های داده شده به همان ترتیب (کارت، مسیر کامپایل شده یا سریالایزر DRF)."""
+        if self.use_cards():
+            return self.trim_cards(get_cards(movie_ids, using=Movie.objects.db))
+        compiled = self.get_compiled_serializer()
+        if compiled is not None:
+            return compiled.serialize_ids(movie_ids, Movie.objects.non_polymorphic())
+        movies = self.with_related(Movie.objects.with_subclasses()).in_bulk(movie_ids)
+        return serializer_data(self.get_serializer([movies[pk] for pk in movie_ids if pk in movies], many=True))
+
+    @cache_response
+    @conditional_response
+    def list(self, request, *args, **kwargs):
+        if not self.use_cards():
+            return super().list(request, *args, **kwargs)
+        return self.card_response(self.filter_queryset(self.get_queryset()))
+
+    @cache_response
+    @conditional_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @action(detail=False, methods=['get'], url_path='type/(?P<type_slug_url>[^/.]+)', permission_classes=[permissions.IsAuthenticatedOrReadOnly])
+    @cache_response
     def by_type_slug(self, request, type_slug_url=None):
         """
         لیستی از فیلم‌ها/سریال‌ها را برای یک نوع (type) خاص بر اساس اسلاگ آن نوع از URL برمی‌گرداند.
@@ -85,41 +231,109 @@ class MovieViewSet(viewsets.ReadOnlyModelViewSet):
         if not type_slug_url:
             return Response({"error": "Type slug not provided"}, status=status.HTTP_400_BAD_REQUEST) # استفاده از _ نیازمند import gettext_lazy است
 
-        qs = Movie.objects.all().prefetch_related(
-            'genres', 'actors', 'directors'
-        ).select_related('type')
+        qs = self.with_related(Movie.objects.with_subclasses())
         if not request.user.is_staff:
             qs = qs.filter(status=True)
 
-        qs = qs.filter(type__slug=type_slug_url.lower())
+        qs = qs.filter(type_subtree_q(type_slug_url, using=qs.db))
 
         filtered_qs = self.filter_queryset(qs.distinct())
+        if self.use_cards():
+            return self.card_response(filtered_qs)
+        compiled = self.get_compiled_serializer()
+        if compiled is not None:
+            return self.compiled_response(compiled, filtered_qs)
 
         page = self.paginate_queryset(filtered_qs)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(serializer_data(serializer))
 
         serializer = self.get_serializer(filtered_qs, many=True)
-        return Response(serializer.data)
+        return Response(serializer_data(serializer))
+
+    def get_latest_queryset(self):
+        qs = self.with_related(Movie.objects.with_subclasses())
+        if not self.request.user.is_staff:
+            qs = qs.filter(status=True)
+
+        type_slug_param = self.request.query_params.get('type_slug')
+        if type_slug_param:
+            qs = qs.filter(type_subtree_q(type_slug_param, using=qs.db))
+
+        return qs.order_by('-release_date', '-created_at')[:10]
 
     @action(detail=False, methods=['get'], url_path='latest')
+    @cache_response
     def latest_content(self, request):
         """
         ۱۰ مورد از جدیدترین فیلم‌ها و سریال‌های منتشر شده را برمی‌گرداند.
         امکان فیلتر بر اساس type_slug از پارامترهای کوئری وجود دارد.
         """
-        qs = Movie.objects.all().prefetch_related(
-            'genres', 'actors', 'directors'
-        ).select_related('type')
-        if not request.user.is_staff:
-            qs = qs.filter(status=True)
+        latest_items = self.get_latest_queryset()
+        if self.use_cards():
+            return self.card_response(latest_items, paginate=False)
+        compiled = self.get_compiled_serializer()
+        if compiled is not None:
+            return self.compiled_response(compiled, latest_items, paginate=False)
 
-        type_slug_param = self.request.query_params.get('type_slug')
-        if type_slug_param:
-            qs = qs.filter(type__slug=type_slug_param.lower())
+        serializer = self.get_serializer(latest_items, many=True)
+        return Response(serializer_data(serializer))
 
-        latest_items = qs.order_by('-release_date', '-created_at')[:10]
+    @action(detail=False, methods=['get'])
+    @cache_response
+    @conditional_response
+    def facets(self, request):
+        """
+        تعداد فیلم‌ها به تفکیک ژانر، نوع، سال انتشار، کشور سازنده، زبان، دوبله و زیرنویس را برای همان
+        پارامترهای فیلتر لیست (filterset_fields، search، type_slug و ...) در یک پاسخ برمی‌گرداند.
+        """
+        return Response(compute_facets(self.filter_queryset(self.get_queryset())))
 
-        serializer = self.get_serializer(latest_items, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+    @action(detail=True, methods=['get'])
+    @cache_response
+    def similar(self, request, pk=None):
+        """
+        عنوان‌های مشابه از ایندکس از پیش ساخته شده (دستور build_similarity_index)، به ترتیب شباهت.
+        ?limit= تعداد (حداکثر همان top_k ذخیره شده).
+        """
+        if not str(pk).isdigit():
+            raise Http404
+        pk = int(pk)
+        try:
+            limit = max(int(request.query_params.get('limit', 10)), 0)
+        except ValueError:
+            return Response({"error": "Invalid limit"}, status=status.HTTP_400_BAD_REQUEST)
+
+        neighbor_ids = get_similar_ids(pk, limit=limit, using=Movie.objects.db)
+        # فیلم‌های غیرفعال (برای غیر کارمندان) هم از خروجی و هم به عنوان مبدا حذف می‌شوند.
+        visible = set(
+            self.get_queryset().non_polymorphic().select_related(None).prefetch_related(None)
+            .filter(pk__in=[pk] + neighbor_ids).values_list('pk', flat=True)
+        )
+        if pk not in visible:
+            raise Http404
+        return Response(self.serialize_movie_ids([movie_id for movie_id in neighbor_ids if movie_id in visible]))
+
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """
+        پرطرفدارترین‌ها بر اساس ثبت‌های تماشای اخیر با کاهش نمایی زمان (movielenz.trending).
+        ?window=24h|7d و ?limit= (حداکثر اندازه لیست ذخیره شده).
+        """
+        config = get_trending_config()
+        window = request.query_params.get('window', config['DEFAULT_WINDOW'])
+        if window not in config['WINDOWS']:
+            return Response({"error": "Invalid window", "choices": list(config['WINDOWS'])},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(int(request.query_params.get('limit', 20)), 0)
+        except ValueError:
+            return Response({"error": "Invalid limit"}, status=status.HTTP_400_BAD_REQUEST)
+
+        movie_ids = get_trending_ids(window, using=Movie.objects.db)
+        if not request.user.is_staff:
+            active = set(Movie.objects.non_polymorphic().filter(pk__in=movie_ids, status=True)
+                         .values_list('pk', flat=True))
+            movie_ids = [movie_id for movie_id in movie_ids if movie_id in active]
+        return Response(self.serialize_movie_ids(movie_ids[:limit]))
@@ -0,0 +1,298 @@
+"""
+فید شخصی صفحه اصلی (/me/feed/).
+
+امتیاز هر فیلم برای یک کاربر ترکیب وزنی سه سیگنال در بازه ۰ تا ۱ است:
+- genre: بیشترین علاقه کاربر به یکی از ژانرهای فیلم (ژانرهای مورد علاقه = ۱، ژانرهای تاریخچه با وزن تازگی)؛
+- history: شباهت فیلم به تاریخچه تماشای اخیر از ایندکس عنوان‌های مشابه (movielenz.similarity)؛
+- popularity: محبوبیت کلی (tmdb_popularity و تعداد تماشاگران، لگاریتمی).
+
+کاندیداها «استخر» محبوب‌ترین فیلم‌ها به همراه همسایه‌های تاریخچه کاربر هستند و فیلم‌های تماشا شده حذف
+می‌شوند. نتیجه در UserFeed ذخیره می‌شود؛ مسیر درخواست فقط همان لیست کوتاه را می‌خواند.
+
+استخر و ژانرهایش برای همه کاربران یکسان است و برای به‌روزرسانی‌های تکی (سیگنال‌ها) در حافظه پروسه نگه
+داشته می‌شود. استخری که از POOL_TTL ثانیه قدیمی‌تر شده همچنان استفاده و در یک thread پس‌زمینه از نو ساخته
+می‌شود.
+
+به‌روزرسانی‌های تکی بعد از commit فقط شناسه کاربر را به صف پروسه اضافه می‌کنند و یک thread پس‌زمینه صف را
+در دسته‌های REFRESH_BATCH_SIZE می‌سازد؛ ذخیره تاریخچه منتظر ساختن فید (یا اولین استخر) نمی‌ماند. کاربری
+که هنوز فید ندارد تا ساخته شدن آن محبوب‌ترین فیلم‌ها را می‌بیند. صف فقط در حافظه است؛ دستور
+build_user_feeds فید همه کاربران را از نو می‌سازد.
+"""
+import heapq
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count
+
+from movielenz.models import Movie, Series, SimilarMovies
+
+from .models import RecentlyWatchedItem, User, UserFeed
+
+DEFAULTS = {
+    'SIZE': 100,
+    'POOL_SIZE': 2000,
+    'POOL_TTL': 600,
+    # تعداد آیتم‌های اخیر تاریخچه و نیمه عمر وزن آن‌ها (بر حسب تعداد آیتم)
+    'HISTORY': 50,
+    'HISTORY_HALF_LIFE': 10,
+    'WEIGHTS': {'genre': 0.4, 'history': 0.4, 'popularity': 0.2},
+    'REFRESH_BATCH_SIZE': 200,
+    # False: صف بعد از commit در همان thread ساخته می‌شود (تست‌ها، یک پروسه)
+    'REFRESH_IN_BACKGROUND': True,
+}
+
+logger = logging.getLogger(__name__)
+
+_pools = {}
+# alias هایی که استخرشان در پس‌زمینه در حال ساخته شدن است
+_refreshing = set()
+# {alias: شناسه کاربرانی که فیدشان باید از نو ساخته شود} و alias هایی که صفشان در حال ساخته شدن است
+_queued = {}
+_draining = set()
+_lock = threading.Lock()
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'USER_FEED', {})}
+
+
+def movie_content_types(using=DEFAULT_DB_ALIAS):
+    return [content_type.pk for content_type in
+            ContentType.objects.db_manager(using).get_for_models(Movie, Series).values()]
+
+
+def movie_genres(movie_ids, using=DEFAULT_DB_ALIAS):
+    genres = defaultdict(list)
+    rows = Movie.genres.through.objects.using(using).filter(movie_id__in=movie_ids).values_list('movie_id', 'genre_id')
+    for movie_id, genre_id in rows:
+        genres[movie_id].append(genre_id)
+    return genres
+
+
+class Pool:
+    """محبوب‌ترین فیلم‌های فعال با امتیاز محبوبیت نرمال شده و ژانرهایشان."""
+
+    def __init__(self, using, size):
+        self.created = time.monotonic()
+        watchers = dict(
+            RecentlyWatchedItem.objects.using(using).filter(content_type__in=movie_content_types(using))
+            .order_by().values_list('object_id').annotate(count=Count('user_id', distinct=True))
+        )
+        movies = list(Movie.objects.using(using).non_polymorphic().filter(status=True)
+                      .values_list('pk', 'tmdb_popularity'))
+        max_tmdb = math.log1p(max((value or 0 for _pk, value in movies), default=0)) or 1.0
+        max_watchers = math.log1p(max(watchers.values(), default=0)) or 1.0
+
+        self.popularity = {
+            pk: 0.5 * math.log1p(tmdb or 0) / max_tmdb + 0.5 * math.log1p(watchers.get(pk, 0)) / max_watchers
+            for pk, tmdb in movies
+        }
+        self.movie_ids = heapq.nlargest(size, self.popularity, key=lambda pk: (self.popularity[pk], -pk))
+        self.genres = movie_genres(self.movie_ids, using)
+
+
+def is_stale(pool, config):
+    return time.monotonic() - pool.created > config['POOL_TTL']
+
+
+def _refresh_in_background(using, size):
+    try:
+        pool = Pool(using, size)
+        with _lock:
+            _pools[using] = pool
+    except Exception:
+        logger.exception('Rebuilding the feed pool failed; the previous pool stays in use.')
+    finally:
+        with _lock:
+            _refreshing.discard(using)
+        # اتصال‌های همین thread
+        connections.close_all()
+
+
+def get_pool(using=DEFAULT_DB_ALIAS, fresh=False):
+    """
+    استخر فعلی؛ استخر کهنه برگردانده و در پس‌زمینه از نو ساخته می‌شود. نبود استخر یا fresh (دستور
+    build_user_feeds) آن را در همین فراخوانی می‌سازد.
+    """
+    config = get_config()
+    pool = _pools.get(using)
+    if pool is not None and not fresh:
+        if is_stale(pool, config):
+            with _lock:
+                # شاید thread دیگری همین حالا استخر را عوض کرده یا بازسازی را شروع کرده باشد.
+                if is_stale(_pools[using], config) and using not in _refreshing:
+                    _refreshing.add(using)
+                    threading.Thread(target=_refresh_in_background, args=(using, config['POOL_SIZE']),
+                                     daemon=True).start()
+        return pool
+    with _lock:
+        pool = _pools.get(using)
+        if fresh or pool is None:
+            pool = _pools[using] = Pool(using, config['POOL_SIZE'])
+    return pool
+
+
+class FeedBuilder:
+    """فید گروهی از کاربران را با چند کوئری گروهی (نه به ازای هر کاربر) می‌سازد و ذخیره می‌کند."""
+
+    def __init__(self, using=DEFAULT_DB_ALIAS, pool=None):
+        self.using = using
+        self.config = get_config()
+        self.pool = pool or get_pool(using)
+
+    def load_histories(self, user_ids):
+        histories = defaultdict(list)
+        rows = (RecentlyWatchedItem.objects.using(self.using)
+                .filter(user_id__in=user_ids, content_type__in=movie_content_types(self.using))
+                .order_by('user_id', '-watched_at').values_list('user_id', 'object_id'))
+        for user_id, movie_id in rows:
+            if len(histories[user_id]) < self.config['HISTORY']:
+                histories[user_id].append(movie_id)
+        return histories
+
+    def load_preferred_genres(self, user_ids):
+        preferred = defaultdict(set)
+        rows = (User.preferred_genres.through.objects.using(self.using)
+                .filter(user_id__in=user_ids).values_list('user_id', 'genre_id'))
+        for user_id, genre_id in rows:
+            preferred[user_id].add(genre_id)
+        return preferred
+
+    def rank(self, history, preferred, neighbors, genres):
+        pool = self.pool
+        weights = self.config['WEIGHTS']
+        half_life = self.config['HISTORY_HALF_LIFE']
+        recency = [0.5 ** (index / half_life) for index in range(len(history))]
+
+        affinity = dict.fromkeys(preferred, 1.0)
+        history_genres = defaultdict(float)
+        for movie_id, weight in zip(history, recency):
+            for genre_id in genres.get(movie_id, ()):
+                history_genres[genre_id] += weight
+        top = max(history_genres.values(), default=0)
+        for genre_id, value in history_genres.items():
+            affinity[genre_id] = max(affinity.get(genre_id, 0.0), value / top)
+
+        similarity = defaultdict(float)
+        total_recency = sum(recency) or 1.0
+        for movie_id, weight in zip(history, recency):
+            for other, score in neighbors.get(movie_id, ()):
+                similarity[other] += weight * score / total_recency
+
+        watched = set(history)
+        scores = {}
+        for movie_id in set(pool.movie_ids) | set(similarity):
+            if movie_id in watched or movie_id not in pool.popularity:
+                continue
+            genre_score = max((affinity.get(genre_id, 0.0) for genre_id in genres.get(movie_id, ())), default=0.0)
+            scores[movie_id] = (weights['genre'] * genre_score
+                                + weights['history'] * similarity.get(movie_id, 0.0)
+                                + weights['popularity'] * pool.popularity[movie_id])
+        best = heapq.nlargest(self.config['SIZE'], scores.items(), key=lambda item: (item[1], -item[0]))
+        return [[movie_id, round(score, 6)] for movie_id, score in best]
+
+    def build(self, user_ids):
+        user_ids = list(user_ids)
+        histories = self.load_histories(user_ids)
+        preferred = self.load_preferred_genres(user_ids)
+
+        watched = {movie_id for history in histories.values() for movie_id in history}
+        neighbors = dict(SimilarMovies.objects.using(self.using).filter(movie_id__in=watched)
+                         .values_list('movie_id', 'neighbors'))
+        candidates = {other for items in neighbors.values() for other, _score in items}
+        genres = dict(self.pool.genres)
+        genres.update(movie_genres((watched | candidates) - set(genres), self.using))
+
+        feeds = [
+            UserFeed(user_id=user_id, candidates=self.rank(histories.get(user_id, []),
+                                                           preferred.get(user_id, set()), neighbors, genres))
+            for user_id in user_ids
+        ]
+        UserFeed.objects.using(self.using).bulk_create(
+            feeds, update_conflicts=True, unique_fields=['user'], update_fields=['candidates', 'updated_at'],
+        )
+        return {feed.user_id: feed.candidates for feed in feeds}
+
+
+def refresh_feeds(user_ids, using=DEFAULT_DB_ALIAS):
+    # کاربرانی که در همین تراکنش حذف شده‌اند (حذف آبشاری تاریخچه) کنار گذاشته می‌شوند.
+    user_ids = list(User.objects.using(using).filter(pk__in=set(user_ids)).values_list('pk', flat=True))
+    if not user_ids:
+        return {}
+    return FeedBuilder(using).build(user_ids)
+
+
+def _drain_queue(using):
+    """صف alias را تا خالی شدن در دسته‌های REFRESH_BATCH_SIZE می‌سازد."""
+    batch_size = get_config()['REFRESH_BATCH_SIZE']
+    while True:
+        with _lock:
+            queued = _queued.get(using)
+            if not queued:
+                _draining.discard(using)
+                return
+            batch = [queued.pop() for _ in range(min(batch_size, len(queued)))]
+        try:
+            refresh_feeds(batch, using=using)
+        except Exception:
+            logger.exception('Refreshing %d user feeds failed.', len(batch))
+
+
+def _drain_in_background(using):
+    try:
+        _drain_queue(using)
+    finally:
+        # اتصال‌های همین thread
+        connections.close_all()
+
+
+def enqueue_feed_refresh(user_ids, using=DEFAULT_DB_ALIAS):
+    """کاربران را به صف اضافه می‌کند و اگر صف alias در حال ساخته شدن نیست آن را شروع می‌کند."""
+    with _lock:
+        _queued.setdefault(using, set()).update(user_ids)
+        if using in _draining:
+            return
+        _draining.add(using)
+    if get_config()['REFRESH_IN_BACKGROUND']:
+        threading.Thread(target=_drain_in_background, args=(using,), daemon=True).start()
+    else:
+        _drain_queue(using)
+
+
+def schedule_feed_refresh(user_ids, using=DEFAULT_DB_ALIAS):
+    """مثل movielenz.signals.schedule_refresh بعد از commit (بیرون از تراکنش بلافاصله)، اما فقط به صف."""
+    user_ids = {pk for pk in user_ids if pk is not None}
+    if user_ids:
+        transaction.on_commit(lambda: enqueue_feed_refresh(user_ids, using=using), using=using)
+
+
+def popular_ids(limit=None, using=DEFAULT_DB_ALIAS):
+    """
+    محبوب‌ترین فیلم‌های فعال برای کاربری که هنوز فید ندارد: از استخر اگر ساخته شده، وگرنه به ترتیب
+    tmdb_popularity از ایندکس movie_popularity_keyset_idx (بدون GROUP BY تاریخچه).
+    """
+    limit = get_config()['SIZE'] if limit is None else limit
+    pool = _pools.get(using)
+    if pool is not None:
+        return pool.movie_ids[:limit]
+    return list(Movie.objects.using(using).non_polymorphic()
+                .filter(status=True, tmdb_popularity__isnull=False)
+                .order_by('-tmdb_popularity', '-id').values_list('pk', flat=True)[:limit])
+
+
+def get_feed_ids(user, limit=None, using=DEFAULT_DB_ALIAS):
+    """
+    شناسه‌های فید کاربر به ترتیب رتبه. فیدی که هنوز ساخته نشده در مسیر درخواست ساخته نمی‌شود: به صف
+    اضافه و تا آن موقع popular_ids برگردانده می‌شود.
+    """
+    candidates = UserFeed.objects.using(using).filter(user=user).values_list('candidates', flat=True).first()
+    if candidates is None:
+        schedule_feed_refresh([user.pk], using=using)
+        return popular_ids(limit, using=using)
+    return [movie_id for movie_id, _score in candidates[:limit]]
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from user_account.feed import FeedBuilder, get_pool
+from user_account.models import User
+
+
+class Command(BaseCommand):
+    help = "فید شخصی (UserFeed) همه کاربران فعال را به صورت دسته‌ای از نو می‌سازد."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        batch_size = options['batch_size']
+        start = time.perf_counter()
+
+        builder = FeedBuilder(using, pool=get_pool(using, fresh=True))
+        user_ids = list(User.objects.using(using).filter(is_active=True).order_by('pk').values_list('pk', flat=True))
+        for offset in range(0, len(user_ids), batch_size):
+            builder.build(user_ids[offset:offset + batch_size])
+        self.stdout.write(self.style.SUCCESS("Built feeds for %d users in %.1fs." % (
+            len(user_ids), time.perf_counter() - start,
+        )))
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_account', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserFeed',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='feed', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('candidates', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'فید کاربر',
+                'verbose_name_plural': 'فید کاربران',
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='favoriteitem',
+            options={'ordering': ['-added_at'], 'verbose_name': 'فیلم مورد علاقه', 'verbose_name_plural': 'فیلم های مورد علاقه'},
+        ),
+        migrations.AlterModelOptions(
+            name='recentlywatcheditem',
+            options={'ordering': ['-watched_at'], 'verbose_name': 'فیلم اخیراً تماشا شده', 'verbose_name_plural': 'فیلم های اخیراً تماشا شده'},
+        ),
+        migrations.AlterModelOptions(
+            name='watchlistitem',
+            options={'ordering': ['-added_at'], 'verbose_name': 'لیست تماشا فیلم', 'verbose_name_plural': 'لیست تماشا فیلم ها'},
+        ),
+    ]
@@ -241,4 +241,21 @@ class RecentlyWatchedItem(models.Model):
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"{self.user.email} - {self.content_object} @ {self.watched_at.strftime('%Y-%m-%d %H:%M')}"
\ No newline at end of file
+        return f"{self.user.email} - {self.content_object} @ {self.watched_at.strftime('%Y-%m-%d %H:%M')}"
+
+class UserFeed(models.Model):
+    """
+    لیست از پیش رتبه‌بندی شده پیشنهادهای صفحه اصلی هر کاربر: [[شناسه فیلم، امتیاز], ...].
+    با دستور build_user_feeds ساخته و با تغییر تاریخچه یا ژانرهای مورد علاقه کاربر به‌روز می‌شود
+    (user_account.feed).
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='feed')
+    candidates = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("فید کاربر")
+        verbose_name_plural = _("فید کاربران")
+
+    def __str__(self):
+        return self.user.email
@@ -12,7 +12,8 @@ from rest_framework import serializers
 
 from .models import WatchlistItem, FavoriteItem, RecentlyWatchedItem, User
 
-from movielenz.models import Genre
+from movielenz.models import Genre, Movie
+from movielenz.resolver import resolve_movie
 
 class BaseContentSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(read_only=True)
@@ -208,7 +209,12 @@ class BaseUserContentInteractionSerializer(serializers.ModelSerializer):
                 object_pk = int(object_pk_str)
             except ValueError:
                  raise serializers.ValidationError({'content_item_url': _("Object ID extracted from URL is not a valid integer.")})
-            if not model_class.objects.filter(pk=object_pk).exists():
+            if issubclass(model_class, Movie):
+                # فیلم‌ها از LRU مشترک movielenz.resolver (بدون کوئری برای آدرس‌های تکراری)
+                exists = resolve_movie(object_pk) is not None
+            else:
+                exists = model_class.objects.filter(pk=object_pk).exists()
+            if not exists:
                 raise serializers.ValidationError({'content_item_url': _("The content object linked by the URL does not exist.")})
             
             content_type_resolved = ContentType.objects.get_for_model(model_class)
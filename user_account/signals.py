@@ -0,0 +1,34 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from movielenz.trending import record_watch
+
+from .feed import movie_content_types, schedule_feed_refresh
+from .models import RecentlyWatchedItem, User
+
+
+@receiver([post_save, post_delete], sender=RecentlyWatchedItem)
+def history_changed(sender, instance, using, **kwargs):
+    schedule_feed_refresh([instance.user_id], using=using)
+
+
+@receiver(post_save, sender=RecentlyWatchedItem)
+def record_watch_activity(sender, instance, using, raw=False, **kwargs):
+    # هر ثبت/به‌روزرسانی تماشا یک رویداد برای /movie/trending/ است.
+    if not raw and instance.content_type_id in movie_content_types(using):
+        record_watch(instance.object_id, instance.watched_at, using=using)
+
+
+@receiver(m2m_changed, sender=User.preferred_genres.through)
+def preferred_genres_changed(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # genre.users_preferring.clear(): pk_set خالی است.
+        instance._cleared_user_ids = list(instance.users_preferring.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            user_ids = [instance.pk]
+        elif pk_set is not None:
+            user_ids = pk_set
+        else:
+            user_ids = getattr(instance, '_cleared_user_ids', [])
+        schedule_feed_refresh(user_ids, using=using)
@@ -1,3 +1,43 @@
-from django.test import TestCase
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from movielenz.models import Movie, Type
+
+from . import feed
+from .models import RecentlyWatchedItem, User, UserFeed
+
+
+@override_settings(USER_FEED={'REFRESH_IN_BACKGROUND': False})
+class UserFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        movie_type = Type.objects.create(name='Movie', slug='movie')
+        cls.movies = [Movie.objects.create(title='Movie %s' % popularity, type=movie_type, tmdb_popularity=popularity)
+                      for popularity in (10, 30, 20)]
+        Movie.objects.create(title='Inactive', type=movie_type, tmdb_popularity=99, status=False)
+        cls.user = User.objects.create_user(email='viewer@example.com', password='secret')
+
+    def setUp(self):
+        feed._pools.clear()
+
+    def test_missing_feed_is_queued_instead_of_built_on_read(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            ids = feed.get_feed_ids(self.user)
+        self.assertEqual(ids, [self.movies[1].pk, self.movies[2].pk, self.movies[0].pk])
+        self.assertFalse(UserFeed.objects.filter(user=self.user).exists())
+        self.assertFalse(feed._pools)
+
+        for callback in callbacks:
+            callback()
+        self.assertTrue(UserFeed.objects.filter(user=self.user).exists())
+
+    def test_history_change_refreshes_after_commit(self):
+        watched = self.movies[1]
+        with self.captureOnCommitCallbacks() as callbacks:
+            RecentlyWatchedItem.objects.create(user=self.user, content_type=ContentType.objects.get_for_model(Movie),
+                                               object_id=watched.pk)
+        self.assertFalse(UserFeed.objects.filter(user=self.user).exists())
+
+        for callback in callbacks:
+            callback()
+        self.assertNotIn(watched.pk, feed.get_feed_ids(self.user))
@@ -9,7 +9,7 @@ from rest_framework_simplejwt.views import (
 )
 
 from .views import (
-    UserRegistrationView, UserProfileView,
+    UserRegistrationView, UserProfileView, UserFeedView,
     WatchlistViewSet, FavoriteViewSet, RecentlyWatchedViewSet
 )
 
@@ -22,6 +22,7 @@ router.register(r'history', RecentlyWatchedViewSet, basename='recentlywatched')
 urlpatterns = [
     path('register/', UserRegistrationView.as_view(), name='user-register'),
     path('me/', UserProfileView.as_view(), name='user-profile'),
+    path('me/feed/', UserFeedView.as_view(), name='user-feed'),
     
     path('login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('login/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
@@ -12,6 +12,11 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.decorators import action
 
+from movielenz.cards import get_movie_data
+from movielenz.instrumentation import SerializePhaseMixin
+from movielenz.models import Movie
+
+from .feed import get_config as get_feed_config, get_feed_ids
 from .models import WatchlistItem, FavoriteItem, RecentlyWatchedItem
 from .serializers import (
     UserRegistrationSerializer, UserProfileSerializer,
@@ -25,7 +30,7 @@ class UserRegistrationView(generics.CreateAPIView):
     serializer_class = UserRegistrationSerializer
     permission_classes = [AllowAny]
 
-class UserProfileView(generics.RetrieveUpdateAPIView):
+class UserProfileView(SerializePhaseMixin, generics.RetrieveUpdateAPIView):
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
     
@@ -39,7 +44,26 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
         serializer.save(user=self.request.user)
 
 
-class BaseUserContentInteractionViewSet(viewsets.ModelViewSet):
+class UserFeedView(generics.GenericAPIView):
+    """
+    فید شخصی کاربر: فیلم‌ها و سریال‌ها به ترتیب رتبه از لیست از پیش ساخته شده UserFeed (user_account.feed).
+    ?limit= تعداد آیتم‌ها.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 0), get_feed_config()['SIZE'])
+        except ValueError:
+            return Response({"error": "Invalid limit"}, status=status.HTTP_400_BAD_REQUEST)
+
+        movie_ids = get_feed_ids(request.user)
+        # فیلم‌هایی که بعد از ساختن فید غیرفعال شده‌اند نمایش داده نمی‌شوند.
+        active = set(Movie.objects.non_polymorphic().filter(pk__in=movie_ids, status=True).values_list('pk', flat=True))
+        return Response(get_movie_data([movie_id for movie_id in movie_ids if movie_id in active][:limit]))
+
+
+class BaseUserContentInteractionViewSet(SerializePhaseMixin, viewsets.ModelViewSet):
     http_method_names = ['get', 'post', 'delete', 'head', 'options']
     permission_classes = [IsAuthenticated]
 